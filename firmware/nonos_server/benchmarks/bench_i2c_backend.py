@@ -0,0 +1,94 @@
+"""Benchmark the raw i2c-dev backend against the smbus2 backend.
+
+Run against hardware:
+
+    python benchmarks/bench_i2c_backend.py 0 0x3B
+
+or with the ioctl replaced by a no-op to compare pure userspace overhead:
+
+    python benchmarks/bench_i2c_backend.py 0 0x3B --fake
+"""
+
+import ctypes
+import os
+import time
+from collections.abc import Callable
+from contextlib import ExitStack
+from unittest.mock import patch
+
+import smbus2
+import typer
+
+from tcp_i2c_bridge.i2c_backend import I2CBackend, SMBusI2CBackend
+from tcp_i2c_bridge.i2c_dev import I2C_FUNC_I2C, I2C_FUNCS, I2CDevBackend
+from tcp_i2c_bridge.logging_config import setup_logging
+
+
+def _fake_ioctl(fd: int, request: int, arg: object = 0, *args: object) -> int:
+    if request == I2C_FUNCS and isinstance(arg, int):
+        ctypes.c_ulong.from_address(arg).value = I2C_FUNC_I2C
+    return 0
+
+
+def _time(fn: Callable[[], object], iterations: int) -> float:
+    """Return the mean time per call in microseconds."""
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def _bench(name: str, backend: I2CBackend, addr: int, length: int, n: int) -> None:
+    data = bytes(range(256)) * (length // 256 + 1)
+    data = data[:length]
+
+    read_us = _time(lambda: backend.read(addr, length), n)
+    write_us = _time(lambda: backend.write(addr, data), n)
+    print(f"{name:8} read {read_us:8.1f} us   write {write_us:8.1f} us")
+
+
+def main(
+    i2c_bus: int,
+    device_addr: str,
+    addr: str = typer.Option("0x4000", help="Register address to access"),
+    length: int = typer.Option(4, help="Bytes per read and write"),
+    iterations: int = typer.Option(1000, help="Calls per measurement"),
+    fake: bool = typer.Option(False, help="Replace ioctls with a no-op"),
+) -> None:
+    setup_logging("WARNING")
+    device_addr_int = int(device_addr, 0)
+    addr_int = int(addr, 0)
+
+    with ExitStack() as stack:
+        if fake:
+            null_fd = os.open(os.devnull, os.O_RDWR)
+            stack.callback(os.close, null_fd)
+            stack.enter_context(patch("smbus2.smbus2.ioctl", _fake_ioctl))
+            stack.enter_context(
+                patch("tcp_i2c_bridge.i2c_dev.fcntl.ioctl", _fake_ioctl)
+            )
+            stack.enter_context(
+                patch("tcp_i2c_bridge.i2c_dev.os.open", return_value=null_fd)
+            )
+            stack.enter_context(patch("tcp_i2c_bridge.i2c_dev.os.close"))
+            stack.enter_context(
+                patch("tcp_i2c_bridge.i2c_dev.Path.exists", return_value=True)
+            )
+            bus = smbus2.SMBus()
+            bus.fd = null_fd
+            smbus = SMBusI2CBackend(bus, device_addr_int)
+        else:
+            smbus = SMBusI2CBackend(i2c_bus, device_addr_int)
+        stack.callback(smbus.close)
+
+        i2c_dev = I2CDevBackend(i2c_bus, device_addr_int)
+        stack.callback(i2c_dev.close)
+
+        print(f"{length} bytes at 0x{addr_int:04X}, {iterations} iterations")
+        _bench("smbus2", smbus, addr_int, length, iterations)
+        _bench("i2c-dev", i2c_dev, addr_int, length, iterations)
+
+
+if __name__ == "__main__":
+    typer.run(main)
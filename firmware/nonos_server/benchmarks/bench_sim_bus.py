@@ -0,0 +1,57 @@
+"""Model the bus time of bridge workloads on a simulated I2C bus.
+
+Runs without hardware. Each workload is played against the simulated backend
+with a virtual clock, once as individual calls and once as one transaction:
+
+    python benchmarks/bench_sim_bus.py
+    python benchmarks/bench_sim_bus.py --writes 200 --length 16
+"""
+
+import typer
+
+from tcp_i2c_bridge.i2c_backend import AdapterLimits
+from tcp_i2c_bridge.logging_config import setup_logging
+from tcp_i2c_bridge.sim_backend import BusSpeed, BusTiming, SimulatedI2CBackend
+
+
+def _report(name: str, backend: SimulatedI2CBackend) -> None:
+    stats = backend.report()
+    print(
+        f"  {name:12} {stats['elapsed'] * 1e3:8.2f} ms"
+        f"  {stats['ioctls']:5} ioctls"
+        f"  bus {stats['utilisation'] * 100:5.1f} %"
+    )
+
+
+def main(
+    writes: int = typer.Option(100, help="Parameter writes per workload"),
+    length: int = typer.Option(4, help="Bytes per parameter write"),
+    download: int = typer.Option(8192, help="Bytes of the bulk program download"),
+    max_msg_len: int = typer.Option(8192, help="Adapter message length limit"),
+) -> None:
+    setup_logging("WARNING")
+    limits = AdapterLimits(max_msg_len=max_msg_len)
+    payload = bytes(length)
+
+    for speed in BusSpeed:
+        print(f"{speed.name} ({speed.value // 1000} kHz)")
+        timing = BusTiming(clock_hz=speed)
+
+        backend = SimulatedI2CBackend(timing=timing, adapter_limits=limits)
+        for i in range(writes):
+            backend.write(i * (length // 4 or 1), payload)
+        _report("calls", backend)
+
+        backend = SimulatedI2CBackend(timing=timing, adapter_limits=limits)
+        with backend.transaction() as txn:
+            for i in range(writes):
+                txn.write(i * (length // 4 or 1), payload)
+        _report("transaction", backend)
+
+        backend = SimulatedI2CBackend(timing=timing, adapter_limits=limits)
+        backend.write(0xC000, bytes(download - download % 5))
+        _report("download", backend)
+
+
+if __name__ == "__main__":
+    typer.run(main)
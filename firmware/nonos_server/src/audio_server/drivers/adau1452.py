@@ -1,12 +1,15 @@
+from contextlib import nullcontext
 from enum import IntEnum
+from pathlib import Path
 from time import sleep
 
-from smbus2 import SMBus
-
+from audio_server.drivers.bus import DeviceHandle
 from audio_server.drivers.common import (
     set_gpio_output,
 )
-from tcp_i2c_bridge.i2c_backend import SMBusI2CBackend
+from tcp_i2c_bridge.boot_image import read_boot_image, run_boot_image
+from tcp_i2c_bridge.i2c_backend import I2CBackend, SMBusI2CBackend
+from tcp_i2c_bridge.safeload import pack_safeloads, run_safeloads
 
 SLEEP_TIME = 0.5
 
@@ -33,11 +36,21 @@ class _Register(IntEnum):
 
 
 class ADAU1452:
-    def __init__(self, smbus: SMBus, addr: int = 0x3B, gpio_enable: int = 20):
-        self.smbus = smbus
+    def __init__(
+        self,
+        bus: DeviceHandle | None,
+        addr: int = 0x3B,
+        gpio_enable: int = 20,
+        i2c: I2CBackend | None = None,
+    ):
+        # Passing `i2c` instead of a bus handle drives the DSP through another
+        # backend, e.g. a NetworkI2CBackend talking to a speaker's bridge
+        if bus is None and i2c is None:
+            raise ValueError("ADAU1452 needs a bus handle or an I2C backend")
+        self.bus = bus
         self.addr = addr
         self.gpio_enable = gpio_enable
-        self.i2c = SMBusI2CBackend(smbus, addr)
+        self.i2c = i2c or SMBusI2CBackend(bus, addr)
 
     def write_reg(self, addr: int | _Register, data: str) -> None:
         data_bytes = bytes.fromhex(data)
@@ -61,6 +74,11 @@ class ADAU1452:
                 f"Expected {expected_bytes.hex()} at {addr.name}, got {val.hex()}"
             )
 
+    def safeload(self, addr: int, data: str) -> None:
+        """Write parameter words through the safeload registers."""
+        with self.bus.atomic() if self.bus else nullcontext():
+            run_safeloads(self.i2c, pack_safeloads([(addr, bytes.fromhex(data))]))
+
     def set_sout_source(self, index: int, source: str) -> None:
         assert 0 <= index <= 23
         self.write_reg(_Register.SOUT_SOURCE0 + index, source)
@@ -69,10 +87,20 @@ class ADAU1452:
         assert 0 <= index <= 7
         self.write_reg(_Register.SERIAL_BYTE_0_0 + index * 4, data)
 
-    def enable(self):
+    def boot(self, image: Path) -> None:
+        """Load a boot image compiled with `tcp-i2c-bridge capture boot-image`."""
+        entries = read_boot_image(image)
+        print(f"Booting from {image} ({len(entries)} entries)")
+        run_boot_image(self.i2c, entries)
+
+    def enable(self, boot_image: Path | None = None):
         set_gpio_output(self.gpio_enable, True)
         sleep(0.5)
 
+        if boot_image is not None:
+            self.boot(boot_image)
+            return
+
         # Soft reset
         self.write_reg(_Register.SOFT_RESET, "0000")
         self.write_reg(_Register.SOFT_RESET, "0001")
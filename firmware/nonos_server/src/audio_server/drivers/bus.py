@@ -0,0 +1,199 @@
+"""
+Shared I2C bus access for the device drivers.
+
+The BusManager owns one smbus2.SMBus per bus and hands out DeviceHandles.
+Every call on a handle holds the lock of its bus, so drivers on the same bus
+can be used from different threads; drivers on different buses never wait for
+each other. Multi-message sequences (read-modify-write, NVM programming, ...)
+are made atomic with `with handle.atomic():`.
+
+With a broker socket, the buses are shared with other processes (e.g. the
+TCP-I2C bridge) through the I2C broker instead of being opened directly.
+With a BusTracer, every transfer is also traced per device and register.
+"""
+
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+import smbus2
+
+from tcp_i2c_bridge.broker import BrokerSMBus, Priority
+from tcp_i2c_bridge.tracing import BusTracer, TracingSMBus
+
+
+@dataclass
+class DeviceStats:
+    transfers: int = 0
+    bus_time: float = 0.0
+    wait_time: float = 0.0
+
+    def __str__(self):
+        return (
+            f"{self.transfers} transfers, "
+            f"{self.bus_time * 1000:.1f} ms on the bus, "
+            f"{self.wait_time * 1000:.1f} ms waiting for it"
+        )
+
+
+def _bus_path(bus: int | str) -> str:
+    return f"/dev/i2c-{bus}" if isinstance(bus, int) else bus
+
+
+def _bus_number(path: str) -> int:
+    return int(path.rsplit("-", 1)[1])
+
+
+class ManagedBus:
+    """One I2C bus shared by all devices on it."""
+
+    def __init__(
+        self,
+        bus: int | str,
+        broker: Path | None = None,
+        tracer: BusTracer | None = None,
+    ):
+        self.path = _bus_path(bus)
+        self.smbus: smbus2.SMBus | BrokerSMBus | TracingSMBus
+        self.broker: BrokerSMBus | None = None
+        if broker is not None:
+            self.broker = BrokerSMBus(
+                broker, _bus_number(self.path), Priority.INTERACTIVE, "audio_server"
+            )
+            self.smbus = self.broker
+        else:
+            self.smbus = smbus2.SMBus(self.path)
+        if tracer is not None:
+            self.smbus = TracingSMBus(self.smbus, tracer)
+        self.lock = threading.RLock()
+        self.stats: dict[int, DeviceStats] = {}
+
+    @contextmanager
+    def locked(self, addr: int) -> Iterator[None]:
+        """Hold the bus, accounting the wait to the device."""
+        stats = self.stats.setdefault(addr, DeviceStats())
+        start = time.perf_counter()
+        with self.lock:
+            stats.wait_time += time.perf_counter() - start
+            yield
+
+    @contextmanager
+    def reserved(self, addr: int) -> Iterator[None]:
+        """Hold the bus, against other processes too when using a broker."""
+        with self.locked(addr):
+            if self.broker is not None:
+                with self.broker.reserve():
+                    yield
+            else:
+                yield
+
+    @contextmanager
+    def transfer(self, addr: int) -> Iterator[None]:
+        """Run one transfer, accounting its bus time to the device."""
+        with self.locked(addr):
+            stats = self.stats[addr]
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                stats.transfers += 1
+                stats.bus_time += time.perf_counter() - start
+
+    def close(self):
+        with self.lock:
+            self.smbus.close()
+
+
+class DeviceHandle:
+    """
+    A device's view of a managed bus.
+
+    Offers the smbus2.SMBus calls the drivers use, so a handle can be passed
+    wherever a driver expects an SMBus. The device address argument is kept
+    for compatibility and must match the handle's device.
+    """
+
+    def __init__(self, bus: ManagedBus, addr: int):
+        self.bus = bus
+        self.addr = addr
+
+    def __repr__(self):
+        return f"DeviceHandle({self.bus.path}, 0x{self.addr:02X})"
+
+    @property
+    def stats(self) -> DeviceStats:
+        return self.bus.stats.setdefault(self.addr, DeviceStats())
+
+    def _check(self, addr: int):
+        if addr != self.addr:
+            raise ValueError(
+                f"{self!r} cannot access device 0x{addr:02X}, "
+                "request a handle for it from the bus manager"
+            )
+
+    def atomic(self):
+        """Keep other devices off the bus for a sequence of calls."""
+        return self.bus.reserved(self.addr)
+
+    def read_byte_data(self, i2c_addr: int, register: int) -> int:
+        self._check(i2c_addr)
+        with self.bus.transfer(self.addr):
+            return self.bus.smbus.read_byte_data(i2c_addr, register)
+
+    def write_byte_data(self, i2c_addr: int, register: int, value: int) -> None:
+        self._check(i2c_addr)
+        with self.bus.transfer(self.addr):
+            self.bus.smbus.write_byte_data(i2c_addr, register, value)
+
+    def i2c_rdwr(self, *i2c_msgs: smbus2.i2c_msg) -> None:
+        for msg in i2c_msgs:
+            self._check(msg.addr)
+        with self.bus.transfer(self.addr):
+            self.bus.smbus.i2c_rdwr(*i2c_msgs)
+
+    def close(self):
+        """The bus belongs to the bus manager; closing a handle does nothing."""
+        pass
+
+
+class BusManager:
+    """Owns the I2C buses and hands out per-device handles."""
+
+    def __init__(self, broker: Path | None = None, tracer: BusTracer | None = None):
+        self.broker = broker
+        self.tracer = tracer
+        self.buses: dict[str, ManagedBus] = {}
+        self._lock = threading.Lock()
+
+    def bus(self, bus: int | str) -> ManagedBus:
+        """Open a bus on first use; `0` and `"/dev/i2c-0"` are the same bus."""
+        path = _bus_path(bus)
+        with self._lock:
+            if path not in self.buses:
+                self.buses[path] = ManagedBus(path, self.broker, self.tracer)
+            return self.buses[path]
+
+    def device(self, bus: int | str, addr: int) -> DeviceHandle:
+        if not (0 <= addr <= 0x7F):
+            raise ValueError(f"Invalid I2C device address: 0x{addr:02X}")
+        return DeviceHandle(self.bus(bus), addr)
+
+    def stats(self) -> dict[tuple[str, int], DeviceStats]:
+        return {
+            (path, addr): stats
+            for path, bus in self.buses.items()
+            for addr, stats in bus.stats.items()
+        }
+
+    def print_stats(self):
+        for (path, addr), stats in sorted(self.stats().items()):
+            print(f"{path} 0x{addr:02X}: {stats}")
+
+    def close(self):
+        with self._lock:
+            for bus in self.buses.values():
+                bus.close()
+            self.buses.clear()
@@ -9,10 +9,11 @@ from datetime import datetime
 from enum import IntEnum
 
 import gpiod
-import smbus2
 import typer
 from gpiod.line import Direction, Edge
 
+from audio_server.drivers.bus import BusManager, DeviceHandle
+
 
 class _Registers(IntEnum):
     PRODUCT_ID = 0xFD
@@ -66,15 +67,21 @@ class Button:
 
 class CAP1188:
     def __init__(
-        self, i2c_bus=1, i2c_address=0x2B, gpio_chip="gpiochip0", interrupt_pin=22
+        self,
+        i2c_bus=1,
+        i2c_address=0x2B,
+        gpio_chip="gpiochip0",
+        interrupt_pin=22,
+        bus: DeviceHandle | None = None,
     ):
         self.i2c_bus = i2c_bus
         self.i2c_address = i2c_address
         self.gpio_chip_name = gpio_chip
         self.interrupt_pin = interrupt_pin
 
-        # Initialize components
-        self.bus = smbus2.SMBus(self.i2c_bus)
+        # Initialize components, with a bus of our own unless one is shared
+        self.bus_manager = BusManager() if bus is None else None
+        self.bus = bus or self.bus_manager.device(self.i2c_bus, self.i2c_address)
 
         # Initialize GPIO using modern gpiod v2.0+ API
         self.interrupt_request = gpiod.request_lines(
@@ -124,24 +131,27 @@ class CAP1188:
         the multiplier to the bit-weighting presented in these register descriptions.
         """
 
-        if not base_shift_pow_2:
-            base_shift_pow_2 = self.read_reg(_Registers.SENSITIVITY) & 0x0F
-            if base_shift_pow_2 > 8:
-                base_shift_pow_2 = 8
+        with self.bus.atomic():
+            if not base_shift_pow_2:
+                base_shift_pow_2 = self.read_reg(_Registers.SENSITIVITY) & 0x0F
+                if base_shift_pow_2 > 8:
+                    base_shift_pow_2 = 8
 
-        assert 0 <= sensitivity_multiplier_pow_2 <= 7
-        assert 0 <= base_shift_pow_2 <= 8
+            assert 0 <= sensitivity_multiplier_pow_2 <= 7
+            assert 0 <= base_shift_pow_2 <= 8
 
-        delta_sense = (~sensitivity_multiplier_pow_2) & 0x7
+            delta_sense = (~sensitivity_multiplier_pow_2) & 0x7
 
-        data = (delta_sense << 4) | (base_shift_pow_2 & 0x0F)
+            data = (delta_sense << 4) | (base_shift_pow_2 & 0x0F)
 
-        self.write_reg(_Registers.SENSITIVITY, data)
+            self.write_reg(_Registers.SENSITIVITY, data)
 
     def clear_interrupt(self):
-        self.write_reg(
-            _Registers.MAIN_CONTROL, self.read_reg(_Registers.MAIN_CONTROL) & ~(0x1)
-        )
+        with self.bus.atomic():
+            self.write_reg(
+                _Registers.MAIN_CONTROL,
+                self.read_reg(_Registers.MAIN_CONTROL) & ~(0x1),
+            )
 
     def enable(self):
         """Initialize CAP1188 touch controller"""
@@ -213,8 +223,8 @@ class CAP1188:
         """Clean up resources"""
         if hasattr(self, "interrupt_request"):
             self.interrupt_request.release()
-        if self.bus:
-            self.bus.close()
+        if self.bus_manager:
+            self.bus_manager.close()
         print("Cleanup complete")
 
     def run(self):
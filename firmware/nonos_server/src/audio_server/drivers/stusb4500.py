@@ -26,7 +26,7 @@ import subprocess
 from dataclasses import dataclass
 from time import sleep
 
-from smbus2 import SMBus
+from audio_server.drivers.bus import BusManager, DeviceHandle
 
 
 @dataclass
@@ -253,13 +253,16 @@ class STUSB4500:
     including reading status, configuring PDOs, and managing NVM.
 
     Args:
-        i2c_bus: I2C bus number (default: 0).
+        i2c_bus: Handle of the chip on the shared I2C bus.
         i2c_addr: I2C address of the chip (default: 0x28).
         reset_pin: GPIO pin number for hardware reset (default: 4).
     """
 
     def __init__(
-        self, i2c_bus: SMBus, i2c_addr: int = 0x28, reset_pin: int | None = None
+        self,
+        i2c_bus: DeviceHandle,
+        i2c_addr: int = 0x28,
+        reset_pin: int | None = None,
     ):
         self.addr = i2c_addr
         self.bus = i2c_bus
@@ -303,8 +306,9 @@ class STUSB4500:
         Returns:
             PortStatus: Object containing port connection and power status.
         """
-        PORT_STATUS_0 = self.bus.read_byte_data(self.addr, 0x0D)
-        PORT_STATUS_1 = self.bus.read_byte_data(self.addr, 0x0E)
+        with self.bus.atomic():
+            PORT_STATUS_0 = self.bus.read_byte_data(self.addr, 0x0D)
+            PORT_STATUS_1 = self.bus.read_byte_data(self.addr, 0x0E)
 
         return PortStatus(
             stateChanged=PORT_STATUS_0 & 0x01,
@@ -344,8 +348,9 @@ class STUSB4500:
             dict: Dictionary with PDO numbers (1-3) as keys and PDO objects as values.
         """
         bvalues = []  # byte values
-        for reg in range(0x85, 0x91):
-            bvalues.append(self.bus.read_byte_data(self.addr, reg))
+        with self.bus.atomic():
+            for reg in range(0x85, 0x91):
+                bvalues.append(self.bus.read_byte_data(self.addr, reg))
 
         pdo = {}
         for i in range(0, 3):
@@ -399,10 +404,11 @@ class STUSB4500:
             Rdo: Object containing the negotiated power parameters.
         """
         bvalues = []  # byte values
-        for reg in range(0x91, 0x95):
-            bvalues.append(self.bus.read_byte_data(self.addr, reg))
+        with self.bus.atomic():
+            for reg in range(0x91, 0x95):
+                bvalues.append(self.bus.read_byte_data(self.addr, reg))
 
-        requested_voltage = self.bus.read_byte_data(self.addr, 0x21)  # *100mV
+            requested_voltage = self.bus.read_byte_data(self.addr, 0x21)  # *100mV
         requested_voltage /= 10.0  # I want it in Volt not milli volt
 
         reg = bvalues[3] << 24 | bvalues[2] << 16 | bvalues[1] << 8 | bvalues[0]
@@ -424,8 +430,9 @@ class STUSB4500:
 
         Uses RESET_CTRL Register @0x23 bit 0 = {1 := reset, 0 := no reset}.
         """
-        RESET_CTRL = self.bus.read_byte_data(self.addr, 0x23)
-        self.bus.write_byte_data(self.addr, 0x23, RESET_CTRL | 0x01)
+        with self.bus.atomic():
+            RESET_CTRL = self.bus.read_byte_data(self.addr, 0x23)
+            self.bus.write_byte_data(self.addr, 0x23, RESET_CTRL | 0x01)
         sleep(0.25)
         self.bus.write_byte_data(self.addr, 0x23, RESET_CTRL & ~0x01)
 
@@ -439,16 +446,17 @@ class STUSB4500:
         """
         if num > 0 and num < 4:
             reg32 = (int(current / 10) & 0x3FF) | int(volt / 50) << 10 | (1 << 29)
-            self.bus.write_byte_data(self.addr, 0x85 + (num - 1) * 4, reg32 & 0xFF)
-            self.bus.write_byte_data(
-                self.addr, 0x86 + (num - 1) * 4, (reg32 >> 8) & 0xFF
-            )
-            self.bus.write_byte_data(
-                self.addr, 0x87 + (num - 1) * 4, (reg32 >> 16) & 0xFF
-            )
-            self.bus.write_byte_data(
-                self.addr, 0x88 + (num - 1) * 4, (reg32 >> 24) & 0xFF
-            )
+            with self.bus.atomic():
+                self.bus.write_byte_data(self.addr, 0x85 + (num - 1) * 4, reg32 & 0xFF)
+                self.bus.write_byte_data(
+                    self.addr, 0x86 + (num - 1) * 4, (reg32 >> 8) & 0xFF
+                )
+                self.bus.write_byte_data(
+                    self.addr, 0x87 + (num - 1) * 4, (reg32 >> 16) & 0xFF
+                )
+                self.bus.write_byte_data(
+                    self.addr, 0x88 + (num - 1) * 4, (reg32 >> 24) & 0xFF
+                )
         else:
             print(num, " is no valid pdo!")
 
@@ -474,18 +482,19 @@ class STUSB4500:
                 reg32 |= int(min_voltage / 50) << 10  # min voltage
                 reg32 |= int(max_voltage / 50) << 20  # max voltage
 
-                self.bus.write_byte_data(
-                    self.addr, 0x85 + (pdo_num - 1) * 4, reg32 & 0xFF
-                )
-                self.bus.write_byte_data(
-                    self.addr, 0x86 + (pdo_num - 1) * 4, (reg32 >> 8) & 0xFF
-                )
-                self.bus.write_byte_data(
-                    self.addr, 0x87 + (pdo_num - 1) * 4, (reg32 >> 16) & 0xFF
-                )
-                self.bus.write_byte_data(
-                    self.addr, 0x88 + (pdo_num - 1) * 4, (reg32 >> 24) & 0xFF
-                )
+                with self.bus.atomic():
+                    self.bus.write_byte_data(
+                        self.addr, 0x85 + (pdo_num - 1) * 4, reg32 & 0xFF
+                    )
+                    self.bus.write_byte_data(
+                        self.addr, 0x86 + (pdo_num - 1) * 4, (reg32 >> 8) & 0xFF
+                    )
+                    self.bus.write_byte_data(
+                        self.addr, 0x87 + (pdo_num - 1) * 4, (reg32 >> 16) & 0xFF
+                    )
+                    self.bus.write_byte_data(
+                        self.addr, 0x88 + (pdo_num - 1) * 4, (reg32 >> 24) & 0xFF
+                    )
         elif pdo_num == 1:
             print("PDO#1 cannot have a variable supply")
 
@@ -510,7 +519,6 @@ class STUSB4500:
             00 19 56 af f5 35 5f 00 (0xd8-0xdf)
             00 4b 90 21 43 00 40 fb (0xe0-0xe7)
         """
-        self.nvm_lock(False)  # unlock NVM
 
         def nvm_wait_for_execution():
             while True:
@@ -518,21 +526,24 @@ class STUSB4500:
                 if reg8 & 0x10 == 0x00:
                     break
 
-        sector_data = []
-        for num_sector in range(0, 5):
-            # send command opcode READ(0x00) to FTP_CTRL_1(0x97)
-            self.bus.write_byte_data(self.addr, 0x97, 0 & 0x07)
-            # execute command
-            self.bus.write_byte_data(
-                self.addr, 0x96, (num_sector & 0x07) | 0x80 | 0x40 | 0x10
-            )
-            nvm_wait_for_execution()
-            # read 8 bytes that are copied from nvm to 0x53-0x5a
-            sector = []
-            for i in range(0, 8):
-                sector.append(self.bus.read_byte_data(self.addr, 0x53 + i))
-            sector_data.append(sector)
-        self.nvm_lock(True)  # lock NVM
+        with self.bus.atomic():
+            self.nvm_lock(False)  # unlock NVM
+
+            sector_data = []
+            for num_sector in range(0, 5):
+                # send command opcode READ(0x00) to FTP_CTRL_1(0x97)
+                self.bus.write_byte_data(self.addr, 0x97, 0 & 0x07)
+                # execute command
+                self.bus.write_byte_data(
+                    self.addr, 0x96, (num_sector & 0x07) | 0x80 | 0x40 | 0x10
+                )
+                nvm_wait_for_execution()
+                # read 8 bytes that are copied from nvm to 0x53-0x5a
+                sector = []
+                for i in range(0, 8):
+                    sector.append(self.bus.read_byte_data(self.addr, 0x53 + i))
+                sector_data.append(sector)
+            self.nvm_lock(True)  # lock NVM
 
         # nicely print out the values
         data = dict(enumerate(sector_data))
@@ -597,38 +608,39 @@ class STUSB4500:
                 print(f"Invalid sector {k}")
                 return
 
-        self.nvm_lock(False)
-        # Erase specified sectors to be able to program them
-        # self.bus.write_byte_data(self.addr, 0x53, 0x00)
-        # self.bus.write_byte_data(self.addr, 0x96, pwr | rst_n)
-        self.bus.write_byte_data(
-            self.addr, 0x97, section_mask << 3 | 0x02
-        )  # WRITE_SER opcode
-        self.bus.write_byte_data(self.addr, 0x96, pwr | rst_n | req)
-        nvm_wait_for_execution()
-        self.bus.write_byte_data(self.addr, 0x97, 0x07)  # Soft_prog_sector opcode
-        self.bus.write_byte_data(self.addr, 0x96, pwr | rst_n | req)
-        nvm_wait_for_execution()
-        self.bus.write_byte_data(self.addr, 0x97, 0x05)  # erase_sector opcode
-        self.bus.write_byte_data(self.addr, 0x96, pwr | rst_n | req)
-        nvm_wait_for_execution()
-        # Write data to sectors
-        for k, v in sector_data.items():
-            # write new data into rw_bufer@0x53
-            rw_buffer = 0x53
-            for byte in v:
-                self.bus.write_byte_data(self.addr, rw_buffer, byte)
-                rw_buffer += 1
-            self.bus.write_byte_data(self.addr, 0x97, 0x01)  # WRITE_PLR opcode
+        with self.bus.atomic():
+            self.nvm_lock(False)
+            # Erase specified sectors to be able to program them
+            # self.bus.write_byte_data(self.addr, 0x53, 0x00)
+            # self.bus.write_byte_data(self.addr, 0x96, pwr | rst_n)
+            self.bus.write_byte_data(
+                self.addr, 0x97, section_mask << 3 | 0x02
+            )  # WRITE_SER opcode
             self.bus.write_byte_data(self.addr, 0x96, pwr | rst_n | req)
             nvm_wait_for_execution()
-            self.bus.write_byte_data(self.addr, 0x97, 0x06)  # PROG_SECTOR opcode
-            self.bus.write_byte_data(self.addr, 0x96, pwr | rst_n | req | k)
+            self.bus.write_byte_data(self.addr, 0x97, 0x07)  # Soft_prog_sector opcode
+            self.bus.write_byte_data(self.addr, 0x96, pwr | rst_n | req)
+            nvm_wait_for_execution()
+            self.bus.write_byte_data(self.addr, 0x97, 0x05)  # erase_sector opcode
+            self.bus.write_byte_data(self.addr, 0x96, pwr | rst_n | req)
             nvm_wait_for_execution()
-        # Exit programming mode
-        self.bus.write_byte_data(self.addr, 0x96, rst_n)
-        self.bus.write_byte_data(self.addr, 0x97, 0)
-        self.nvm_lock(True)
+            # Write data to sectors
+            for k, v in sector_data.items():
+                # write new data into rw_bufer@0x53
+                rw_buffer = 0x53
+                for byte in v:
+                    self.bus.write_byte_data(self.addr, rw_buffer, byte)
+                    rw_buffer += 1
+                self.bus.write_byte_data(self.addr, 0x97, 0x01)  # WRITE_PLR opcode
+                self.bus.write_byte_data(self.addr, 0x96, pwr | rst_n | req)
+                nvm_wait_for_execution()
+                self.bus.write_byte_data(self.addr, 0x97, 0x06)  # PROG_SECTOR opcode
+                self.bus.write_byte_data(self.addr, 0x96, pwr | rst_n | req | k)
+                nvm_wait_for_execution()
+            # Exit programming mode
+            self.bus.write_byte_data(self.addr, 0x96, rst_n)
+            self.bus.write_byte_data(self.addr, 0x97, 0)
+            self.nvm_lock(True)
 
     def vbus_ctrl(self):
         """Read VBUS control and discharge configuration.
@@ -637,9 +649,10 @@ class STUSB4500:
             Vbus: Object containing VBUS discharge and control settings.
         """
         # Read out relevant registers
-        VBUS_DISCHARGE_TIME_CTRL = self.bus.read_byte_data(self.addr, 0x25)
-        VBUS_DISCHARGE_CTRL = self.bus.read_byte_data(self.addr, 0x26)
-        VBUS_CTRL = self.bus.read_byte_data(self.addr, 0x27)
+        with self.bus.atomic():
+            VBUS_DISCHARGE_TIME_CTRL = self.bus.read_byte_data(self.addr, 0x25)
+            VBUS_DISCHARGE_CTRL = self.bus.read_byte_data(self.addr, 0x26)
+            VBUS_CTRL = self.bus.read_byte_data(self.addr, 0x27)
 
         # Map data to the type
         return Vbus(
@@ -668,7 +681,8 @@ class STUSB4500:
 # Example usage
 if __name__ == "__main__":
     # Create instance of STUSB4500
-    stusb = STUSB4500(SMBus(0))
+    buses = BusManager()
+    stusb = STUSB4500(buses.device(0, 0x28))
 
     # Dump NVM to compare
     stusb.nvm_dump()
@@ -1,8 +1,9 @@
 from enum import IntEnum
 
-import smbus2
 import typer
 
+from audio_server.drivers.bus import BusManager, DeviceHandle
+
 
 class Map:
     # RESET = 0x00
@@ -85,16 +86,18 @@ class Register:
         self.device.write_register(self.address, value)
 
     def set_bit(self, bit: int, value: bool):
-        if value:
-            self.value |= 1 << bit
-        else:
-            self.value &= ~(1 << bit)
+        with self.device.bus.atomic():
+            if value:
+                self.value |= 1 << bit
+            else:
+                self.value &= ~(1 << bit)
 
     def read_bit(self, bit: int) -> bool:
         return bool(self.value & (1 << bit))
 
     def set_bits(self, mask: int, value: int):
-        self.value = (self.value & ~mask) | (value & mask)
+        with self.device.bus.atomic():
+            self.value = (self.value & ~mask) | (value & mask)
 
 
 class Field:
@@ -299,7 +302,7 @@ class FaultClear(Register):
 
 
 class TAS5825:
-    def __init__(self, bus: smbus2.SMBus, address: int):
+    def __init__(self, bus: DeviceHandle, address: int):
         self.bus = bus
         self.address = address
 
@@ -308,9 +311,10 @@ class TAS5825:
         self.bus.write_byte_data(self.address, register, value)
 
     def write_register(self, register: int, value: int) -> None:
-        pre_value = self.read_register(register)
-        self._write_register(register, value)
-        value_read = self.read_register(register)
+        with self.bus.atomic():
+            pre_value = self.read_register(register)
+            self._write_register(register, value)
+            value_read = self.read_register(register)
         if pre_value != value:
             print(f"Changed register {register:02X}: {pre_value:02X} -> {value:02X}")
             return
@@ -322,26 +326,29 @@ class TAS5825:
         return self.bus.read_byte_data(self.address, register)
 
     def enable_shortcut(self) -> None:
-        Reset(device=self).clear()
-        # tas5825.book()
-        DigitalVolume(device=self).db = -12.0
-        ctrl2 = DeviceControl2(device=self)
-        DeviceControl2.DisableDsp(ctrl2).value = False
-        DeviceControl2.Mute(ctrl2).value = False
-        DeviceControl2.PlayMode(ctrl2).value = DeviceControl2.PlayMode.State.Play
-        AnalogGain(device=self).db = 0.0
-        FaultClear(device=self).clear()
+        with self.bus.atomic():
+            Reset(device=self).clear()
+            # tas5825.book()
+            DigitalVolume(device=self).db = -12.0
+            ctrl2 = DeviceControl2(device=self)
+            DeviceControl2.DisableDsp(ctrl2).value = False
+            DeviceControl2.Mute(ctrl2).value = False
+            DeviceControl2.PlayMode(ctrl2).value = DeviceControl2.PlayMode.State.Play
+            AnalogGain(device=self).db = 0.0
+            FaultClear(device=self).clear()
 
     def set_volume(self, db: float) -> None:
-        AnalogGain(device=self).db = 0.0
-        DigitalVolume(device=self).db = db
+        with self.bus.atomic():
+            AnalogGain(device=self).db = 0.0
+            DigitalVolume(device=self).db = db
 
 
 def main(volume: float) -> None:
-    bus = smbus2.SMBus("/dev/i2c-0")
-    tas5825 = TAS5825(bus, 0x4E)
+    buses = BusManager()
+    tas5825 = TAS5825(buses.device("/dev/i2c-0", 0x4E), 0x4E)
 
     tas5825.set_volume(volume)
+    buses.close()
 
 
 if __name__ == "__main__":
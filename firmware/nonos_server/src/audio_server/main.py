@@ -1,11 +1,12 @@
 import signal
 import socket
 import threading
+from pathlib import Path
 
-import smbus2
 import typer
 
 from audio_server.drivers.adau1452 import ADAU1452
+from audio_server.drivers.bus import BusManager
 from audio_server.drivers.cap1188 import CAP1188, Button, Buttons
 from audio_server.drivers.stusb4500 import STUSB4500
 from audio_server.drivers.tas5825 import TAS5825
@@ -16,6 +17,7 @@ from audio_server.mediactrl import (
     previous_track,
 )
 from audio_server.processing.chain import enable_filter_chain
+from tcp_i2c_bridge.tracing import BusTracer
 
 I2C_BUS = "/dev/i2c-0"
 DSP_I2C_ADDRESS = 0x3B
@@ -107,15 +109,40 @@ def main(
     init: bool = True,
     reload_filter: bool = True,
     mpv: bool = HOST_CONFIG.get("mpv", True),
+    broker: Path | None = None,
+    trace: bool = False,
+    boot_image: Path | None = None,
 ):
-    i2c = smbus2.SMBus(I2C_BUS)
-    dsp = ADAU1452(i2c, DSP_I2C_ADDRESS, DSP_GPIO_ENABLE)
-    amp = TAS5825(i2c, AMP_I2C_ADDRESS)
-    pd_controller = STUSB4500(i2c, PD_CONTROLLER_ADDRESS, reset_pin=None)
-    buttons = CAP1188(HAT_I2C_BUS, CAP1188_I2C_ADDRESS)
+    # With tracing, `kill -USR1` prints where the bus time goes
+    tracer = None
+    if trace:
+        tracer = BusTracer("audio_server")
+        tracer.dump_on_signal()
+        tracer.dump_at_exit()
+
+    # All drivers go through the bus manager, which serialises access per bus
+    # so the button thread can change the volume while others use the bus.
+    # With a broker socket the buses are shared with the TCP-I2C bridge.
+    buses = BusManager(broker, tracer)
+    dsp = ADAU1452(
+        buses.device(I2C_BUS, DSP_I2C_ADDRESS), DSP_I2C_ADDRESS, DSP_GPIO_ENABLE
+    )
+    amp = TAS5825(buses.device(I2C_BUS, AMP_I2C_ADDRESS), AMP_I2C_ADDRESS)
+    pd_controller = STUSB4500(
+        buses.device(I2C_BUS, PD_CONTROLLER_ADDRESS),
+        PD_CONTROLLER_ADDRESS,
+        reset_pin=None,
+    )
+    buttons = CAP1188(
+        HAT_I2C_BUS,
+        CAP1188_I2C_ADDRESS,
+        bus=buses.device(HAT_I2C_BUS, CAP1188_I2C_ADDRESS),
+    )
 
     if init:
-        dsp.enable()
+        # A boot image compiled from a SigmaStudio capture replaces the
+        # built-in program
+        dsp.enable(boot_image)
         amp.enable_shortcut()
 
     rdo = pd_controller.read_rdo()
@@ -155,6 +182,8 @@ def main(
     if mpv:
         play_mpv()
     buttons.run()
+    buses.print_stats()
+    buses.close()
     # buttons_thread.start()
     # print("Buttons thread started")
     # buttons_thread.join()
@@ -2,16 +2,61 @@
 
 import asyncio
 import signal
+from collections.abc import Callable
+from functools import partial
 from pathlib import Path
 
 import structlog
 
+from tcp_i2c_bridge.broker import BrokerI2CBackend
+from tcp_i2c_bridge.capture import DEFAULT_MAX_CAPTURE_SIZE, Compression
+from tcp_i2c_bridge.capture_filter import CaptureFilter
+from tcp_i2c_bridge.capture_tap import CaptureTap
+from tcp_i2c_bridge.device_sim import adau1452_device
 from tcp_i2c_bridge.i2c_backend import DebugI2CBackend, I2CBackend, SMBusI2CBackend
+from tcp_i2c_bridge.i2c_dev import I2CDevBackend
 from tcp_i2c_bridge.logging_config import setup_logging
+from tcp_i2c_bridge.protocol_dumper import DumpMode, ProtocolDumper
+from tcp_i2c_bridge.recording import I2CRecorder, RecordingI2CBackend, ReplayI2CBackend
+from tcp_i2c_bridge.router import BackendRouter
 from tcp_i2c_bridge.server import TCPServer
+from tcp_i2c_bridge.sim_backend import (
+    BusTiming,
+    RealtimeClock,
+    SimulatedI2CBackend,
+    VirtualClock,
+)
+from tcp_i2c_bridge.tracing import BusTracer, TracingI2CBackend
 
 logger = structlog.get_logger()
 
+# Hardware backends selectable by name
+I2C_BACKENDS: dict[str, type[SMBusI2CBackend] | type[I2CDevBackend]] = {
+    "smbus": SMBusI2CBackend,
+    "i2c-dev": I2CDevBackend,
+}
+
+
+def _recorded(
+    factory: Callable[[], I2CBackend], recorder: I2CRecorder
+) -> RecordingI2CBackend:
+    """Open a backend and record its traffic."""
+    return RecordingI2CBackend(factory(), recorder)
+
+
+def _traced(factory: Callable[[], I2CBackend], tracer: BusTracer) -> TracingI2CBackend:
+    """Open a backend and trace its bus usage."""
+    return TracingI2CBackend(factory(), tracer)
+
+
+def _open_backend(
+    backend: str, broker: Path | None
+) -> Callable[[int, int], I2CBackend]:
+    """Look up how to open a hardware backend for (I2C bus, device address)."""
+    if broker is not None:
+        return partial(BrokerI2CBackend, broker)
+    return I2C_BACKENDS[backend]
+
 
 class TCPBridgeApp:
     """Main application class for TCP-I2C bridge."""
@@ -20,27 +65,51 @@ class TCPBridgeApp:
         self,
         host: str = "0.0.0.0",
         port: int = 8086,
-        i2c_backend: I2CBackend | None = None,
+        i2c_backend: I2CBackend | BackendRouter | None = None,
         dump_dir: Path | None = None,
         log_level: str = "INFO",
         log_file: Path | None = None,
         json_logs: bool = False,
+        recorder: I2CRecorder | None = None,
+        tracer: BusTracer | None = None,
+        flight_recorder: bool = False,
+        latency_threshold: float | None = None,
+        segment_size: int | None = None,
+        max_capture_size: int = DEFAULT_MAX_CAPTURE_SIZE,
+        compression: Compression = Compression.ZLIB,
+        capture_filter: CaptureFilter | str | None = None,
+        tap_port: int | None = None,
     ):
         """Initialize the TCP-I2C bridge application.
 
         Args:
             host: TCP server host to bind to
             port: TCP server port to bind to
-            i2c_backend: I2C backend instance
+            i2c_backend: I2C backend instance or chip-address router
             dump_dir: Directory to dump protocol logs
             log_level: Logging level
             log_file: Optional log file path
             json_logs: Whether to use JSON log format
+            recorder: I2C recording to close after the backends
+            tracer: Bus tracer to report on SIGUSR1 and at shutdown
+            flight_recorder: Keep protocol dumps in memory and write them only
+                on errors, slow requests or SIGUSR2
+            latency_threshold: Seconds an I2C request may take before the
+                flight recorder dumps
+            segment_size: Write protocol dumps as compressed segments of this
+                many bytes
+            max_capture_size: Bytes of all segments of a session at most
+            compression: Compression of the segments
+            capture_filter: Filter expression of the protocol dumps to keep
+            tap_port: Port to stream live capture records to subscribers on
         """
         self.host = host
         self.port = port
         self.i2c_backend = i2c_backend or DebugI2CBackend()
         self.dump_dir = dump_dir
+        self.recorder = recorder
+        self.tracer = tracer
+        self.tap = CaptureTap(host, tap_port) if tap_port is not None else None
 
         # Set up logging
         setup_logging(log_level, log_file, json_logs)
@@ -50,7 +119,16 @@ class TCPBridgeApp:
             host=self.host,
             port=self.port,
             i2c_backend=self.i2c_backend,
-            dump_dir=self.dump_dir,
+            protocol_dumper=ProtocolDumper(
+                self.dump_dir,
+                DumpMode.FLIGHT if flight_recorder else DumpMode.SESSION,
+                latency_threshold=latency_threshold,
+                segment_size=segment_size,
+                max_capture_size=max_capture_size,
+                compression=compression,
+                capture_filter=capture_filter,
+                tap=self.tap,
+            ),
         )
 
         # Track if we're running
@@ -64,6 +142,8 @@ class TCPBridgeApp:
 
             # Start TCP server
             await self.server.start()
+            if self.tap:
+                await self.tap.start()
             self.running = True
 
             # Set up signal handlers
@@ -87,6 +167,12 @@ class TCPBridgeApp:
         loop = asyncio.get_running_loop()
         loop.add_signal_handler(signal.SIGINT, signal_handler, signal.SIGINT)
         loop.add_signal_handler(signal.SIGTERM, signal_handler, signal.SIGTERM)
+        if self.tracer:
+            loop.add_signal_handler(signal.SIGUSR1, self.tracer.dump)
+        if self.server.protocol_dumper.mode is DumpMode.FLIGHT:
+            loop.add_signal_handler(
+                signal.SIGUSR2, self.server.protocol_dumper.trigger, "signal"
+            )
 
     async def run(self) -> None:
         """Run the application until shutdown."""
@@ -112,14 +198,21 @@ class TCPBridgeApp:
             # Stop server
             if self.server:
                 await self.server.stop()
+            if self.tap:
+                await self.tap.stop()
 
-            # Close I2C backend
-            if self.i2c_backend:
-                self.i2c_backend.close()
+            # Close I2C backends
+            if self.server:
+                self.server.router.close()
+            if self.recorder:
+                self.recorder.close()
+            if self.tracer:
+                self.tracer.dump()
 
             # Create protocol dump summary
-            if self.server.protocol_dumper:
+            if self.server and self.server.protocol_dumper:
                 self.server.protocol_dumper.create_summary_report()
+                self.server.protocol_dumper.close()
 
             logger.info("Cleanup completed")
 
@@ -130,32 +223,149 @@ class TCPBridgeApp:
 
     @classmethod
     def create_with_i2c_backend(
-        cls, i2c_bus: int, device_addr: int, **kwargs
+        cls,
+        i2c_bus: int,
+        device_addr: int,
+        backend: str = "smbus",
+        record: Path | None = None,
+        broker: Path | None = None,
+        trace: bool = False,
+        **kwargs,
     ) -> "TCPBridgeApp":
-        """Create application with SMBus I2C backend.
+        """Create application with a hardware I2C backend.
 
         Args:
             i2c_bus: I2C bus number
             device_addr: I2C device address
+            backend: Backend name from I2C_BACKENDS
+            record: File to record all I2C traffic to
+            broker: Socket of an I2C broker to share the bus through, instead
+                of opening it directly
+            trace: Trace bus usage per device and register
+            **kwargs: Additional arguments for TCPBridgeApp
+
+        Returns:
+            Configured application instance
+        """
+        i2c_backend: I2CBackend = _open_backend(backend, broker)(i2c_bus, device_addr)
+        tracer = BusTracer("tcp-i2c-bridge") if trace else None
+        if tracer:
+            i2c_backend = TracingI2CBackend(i2c_backend, tracer)
+        recorder = I2CRecorder(record) if record else None
+        if recorder:
+            i2c_backend = RecordingI2CBackend(i2c_backend, recorder)
+        return cls(i2c_backend=i2c_backend, recorder=recorder, tracer=tracer, **kwargs)
+
+    @classmethod
+    def create_with_routes(
+        cls,
+        routes: dict[int, tuple[int, int]],
+        default: tuple[int, int] | None = None,
+        backend: str = "smbus",
+        record: Path | None = None,
+        broker: Path | None = None,
+        trace: bool = False,
+        **kwargs,
+    ) -> "TCPBridgeApp":
+        """Create application routing chip addresses to hardware I2C backends.
+
+        Backends are opened on first use of their chip address.
+
+        Args:
+            routes: Mapping of protocol chip address to (I2C bus, device address)
+            default: (I2C bus, device address) for chip addresses without a route
+            backend: Backend name from I2C_BACKENDS
+            record: File to record the I2C traffic of all devices to
+            broker: Socket of an I2C broker to share the buses through,
+                instead of opening them directly
+            trace: Trace bus usage per device and register
             **kwargs: Additional arguments for TCPBridgeApp
 
         Returns:
             Configured application instance
         """
-        i2c_backend = SMBusI2CBackend(i2c_bus, device_addr)
+        backend_class = _open_backend(backend, broker)
+        recorder = I2CRecorder(record) if record else None
+        tracer = BusTracer("tcp-i2c-bridge") if trace else None
+
+        def factory(i2c_bus: int, device_addr: int) -> Callable[[], I2CBackend]:
+            open_backend = partial(backend_class, i2c_bus, device_addr)
+            if tracer:
+                open_backend = partial(_traced, open_backend, tracer)
+            if recorder:
+                return partial(_recorded, open_backend, recorder)
+            return open_backend
+
+        router = BackendRouter()
+        for chip_address, (i2c_bus, device_addr) in routes.items():
+            router.add_route(chip_address, factory(i2c_bus, device_addr), bus=i2c_bus)
+        if default is not None:
+            i2c_bus, device_addr = default
+            router.set_default_route(factory(i2c_bus, device_addr), bus=i2c_bus)
+        return cls(i2c_backend=router, recorder=recorder, tracer=tracer, **kwargs)
+
+    @classmethod
+    def create_with_debug_backend(
+        cls, chip_addresses: list[int] | None = None, **kwargs
+    ) -> "TCPBridgeApp":
+        """Create application with simulated ADAU1452 devices.
+
+        Every simulated device covers the full address space. Chip addresses
+        listed get a device of their own; all other chip addresses share one.
+
+        Args:
+            chip_addresses: Protocol chip addresses with their own device
+            **kwargs: Additional arguments for TCPBridgeApp
+
+        Returns:
+            Configured application instance
+        """
+        router = BackendRouter(default=adau1452_device())
+        for chip_address in chip_addresses or []:
+            router.add_route(chip_address, adau1452_device, bus="debug")
+        return cls(i2c_backend=router, **kwargs)
+
+    @classmethod
+    def create_with_simulated_backend(
+        cls, clock_hz: int, realtime: bool = True, **kwargs
+    ) -> "TCPBridgeApp":
+        """Create application with a timing-accurate simulated I2C bus.
+
+        Args:
+            clock_hz: Simulated I2C bus clock in Hz
+            realtime: Sleep for modelled durations instead of using a virtual
+                clock
+            **kwargs: Additional arguments for TCPBridgeApp
+
+        Returns:
+            Configured application instance
+        """
+        i2c_backend = SimulatedI2CBackend(
+            timing=BusTiming(clock_hz=clock_hz),
+            clock=RealtimeClock() if realtime else VirtualClock(),
+            device=adau1452_device(),
+        )
         return cls(i2c_backend=i2c_backend, **kwargs)
 
     @classmethod
-    def create_with_debug_backend(cls, **kwargs) -> "TCPBridgeApp":
-        """Create application with debug I2C backend.
+    def create_with_replay_backend(
+        cls, recording: Path, realtime: bool = False, **kwargs
+    ) -> "TCPBridgeApp":
+        """Create application replaying a recorded I2C session.
+
+        Clients must repeat the recorded session: reads return the recorded
+        data and writes are checked against the recording.
 
         Args:
+            recording: Recording file written with the record option
+            realtime: Take the recorded time for every operation instead of
+                replaying at full speed
             **kwargs: Additional arguments for TCPBridgeApp
 
         Returns:
             Configured application instance
         """
-        i2c_backend = DebugI2CBackend()
+        i2c_backend = ReplayI2CBackend.from_file(recording, realtime=realtime)
         return cls(i2c_backend=i2c_backend, **kwargs)
 
 
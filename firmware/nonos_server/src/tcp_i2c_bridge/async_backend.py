@@ -0,0 +1,197 @@
+"""Asyncio I2C backend interface and adapters."""
+
+import asyncio
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypeVar
+
+import structlog
+
+from tcp_i2c_bridge.i2c_backend import (
+    DebugI2CBackend,
+    I2CBackend,
+    I2COperation,
+    I2COperationQueue,
+    I2COpKind,
+)
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+
+class AsyncI2CTransaction(I2COperationQueue):
+    """Batch of I2C operations submitted to an async backend together.
+
+    Operations are queued and run in order when the transaction is submitted,
+    either explicitly or when leaving the `async with` block::
+
+        async with backend.transaction() as txn:
+            txn.write(0xF400, b"\\x00\\x01")
+            txn.read(0xF401, 2)
+        status = txn.results[1]
+    """
+
+    def __init__(self, backend: "AsyncI2CBackend"):
+        """Initialize transaction.
+
+        Args:
+            backend: Backend the transaction is submitted to
+        """
+        super().__init__()
+        self.backend = backend
+
+    async def submit(self) -> list[bytes | None]:
+        """Submit all queued operations.
+
+        Returns:
+            One result per operation: read data, or None for writes
+        """
+        if self.results is not None:
+            raise RuntimeError("Transaction already submitted")
+        self.results = await self.backend.submit(self.operations)
+        return self.results
+
+    async def __aenter__(self) -> "AsyncI2CTransaction":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None and self.results is None:
+            await self.submit()
+
+
+class AsyncI2CBackend(ABC):
+    """Abstract base class for asyncio I2C backends."""
+
+    @abstractmethod
+    async def read(self, addr: int, length: int) -> bytes:
+        """Read data from I2C device."""
+        pass
+
+    @abstractmethod
+    async def write(self, addr: int, data: bytes) -> None:
+        """Write data to I2C device."""
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Close the I2C backend."""
+        pass
+
+    @abstractmethod
+    async def write_read(self, data: bytes, length: int) -> bytes:
+        """Write raw bytes and read back after a repeated start."""
+        pass
+
+    def transaction(self) -> AsyncI2CTransaction:
+        """Start a batch of operations submitted together."""
+        return AsyncI2CTransaction(self)
+
+    async def submit(self, operations: Sequence[I2COperation]) -> list[bytes | None]:
+        """Run a batch of operations in order.
+
+        Args:
+            operations: Operations to run
+
+        Returns:
+            One result per operation: read data, or None for writes
+        """
+        results: list[bytes | None] = []
+        for op in operations:
+            if op.kind is I2COpKind.READ:
+                results.append(await self.read(op.addr, op.length))
+            elif op.kind is I2COpKind.WRITE:
+                await self.write(op.addr, op.data)
+                results.append(None)
+            else:
+                results.append(await self.write_read(op.data, op.length))
+        return results
+
+
+class ThreadedAsyncI2CBackend(AsyncI2CBackend):
+    """Run a synchronous backend on its own thread.
+
+    Every call is handed to a single dedicated worker thread, so accesses to the
+    wrapped backend stay serialised while the event loop keeps running. Wrapping
+    the backends of different buses gives each bus its own thread, letting their
+    operations be in flight at the same time.
+    """
+
+    def __init__(self, backend: I2CBackend, name: str = "i2c"):
+        """Initialize threaded adapter.
+
+        Args:
+            backend: Synchronous backend to wrap
+            name: Name prefix of the worker thread
+        """
+        self.backend = backend
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+
+    async def _run(self, func: Callable[..., T], *args) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def read(self, addr: int, length: int) -> bytes:
+        """Read data from I2C device on the worker thread."""
+        return await self._run(self.backend.read, addr, length)
+
+    async def write(self, addr: int, data: bytes) -> None:
+        """Write data to I2C device on the worker thread."""
+        await self._run(self.backend.write, addr, data)
+
+    async def write_read(self, data: bytes, length: int) -> bytes:
+        """Write raw bytes and read back on the worker thread."""
+        return await self._run(self.backend.write_read, data, length)
+
+    async def submit(self, operations: Sequence[I2COperation]) -> list[bytes | None]:
+        """Run a batch of operations as one call on the worker thread."""
+        return await self._run(self.backend.submit, operations)
+
+    async def close(self) -> None:
+        """Close the wrapped backend and stop the worker thread."""
+        try:
+            await self._run(self.backend.close)
+        finally:
+            self._executor.shutdown(wait=False)
+
+
+class AsyncDebugI2CBackend(AsyncI2CBackend):
+    """Debug backend running on the event loop without any threads."""
+
+    def __init__(self, memory_size: int = 256, latency: float = 0.0):
+        """Initialize async debug backend with simulated memory.
+
+        Args:
+            memory_size: Size of the simulated memory in bytes
+            latency: Simulated time per operation in seconds
+        """
+        self.debug = DebugI2CBackend(memory_size)
+        self.latency = latency
+
+    @property
+    def memory(self) -> bytearray:
+        return self.debug.memory
+
+    async def _wait(self) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def read(self, addr: int, length: int) -> bytes:
+        """Read from simulated memory."""
+        await self._wait()
+        return self.debug.read(addr, length)
+
+    async def write(self, addr: int, data: bytes) -> None:
+        """Write to simulated memory."""
+        await self._wait()
+        self.debug.write(addr, data)
+
+    async def write_read(self, data: bytes, length: int) -> bytes:
+        """Set the register pointer, write any further bytes and read back."""
+        await self._wait()
+        return self.debug.write_read(data, length)
+
+    async def close(self) -> None:
+        """Close debug backend."""
+        self.debug.close()
@@ -0,0 +1,338 @@
+"""DSP boot images compiled from captured I2C sessions.
+
+A SigmaStudio download writes the program and parameters in many small,
+often repeated bursts between control register writes. Compiling the I2C
+transactions of a capture folds them into the shortest equivalent sequence:
+
+- Memory writes (data and program memory) between two control steps are
+  overlaid word by word, so later writes win, and written as one burst per
+  contiguous run of words.
+- Control register writes keep their order. Consecutive identical writes are
+  dropped, and writes continuing at the next register are merged into one
+  auto-incrementing burst.
+- Gaps in the session longer than a threshold become delays, e.g. for the PLL
+  to lock. Reads are dropped, or kept as checks of the value read.
+
+The image file holds the resulting entries (little endian):
+
+File header:
+    magic       4s  b"NBOT"
+    version     B
+    reserved    3x
+    entries     I   number of entries
+
+Entry header, followed by `length` bytes of data (none for delays):
+    kind        B   BootEntryKind
+    reserved    x
+    addr        H   register address
+    length      I   data length, or delay in microseconds
+"""
+
+import struct
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from enum import IntEnum
+from pathlib import Path
+
+import structlog
+
+from tcp_i2c_bridge.capture import CaptureRecord, CaptureRecordType, Operation
+from tcp_i2c_bridge.i2c_backend import I2CBackend
+from tcp_i2c_bridge.memory_map import ADAU1452_MEMORY_MAP, MemoryMap
+from tcp_i2c_bridge.safeload import SafeloadRegister, pack_safeloads, run_safeloads
+
+logger = structlog.get_logger()
+
+BOOT_IMAGE_MAGIC = b"NBOT"
+BOOT_IMAGE_VERSION = 1
+
+_HEADER = struct.Struct("<4sB3xI")
+_ENTRY = struct.Struct("<BxHI")
+
+# Gaps between transactions of at least this many seconds become delays, of
+# at most the maximum
+DEFAULT_DELAY_THRESHOLD = 0.01
+DEFAULT_MAX_DELAY = 1.0
+
+# Memory regions whose writes have no side effects and may be folded
+ADAU1452_MEMORIES = ("DM0", "DM1", "PM")
+
+# Registers inside data memory that act on writes
+_SIDE_EFFECT_ADDRESSES = frozenset(
+    range(SafeloadRegister.DATA0, SafeloadRegister.NUM + 1)
+)
+
+
+class BootEntryKind(IntEnum):
+    """Step of a boot image."""
+
+    WRITE = 0
+    SAFELOAD = 1
+    CHECK = 2
+    """
+    Read the register and fail unless it holds the data
+    """
+    DELAY = 3
+
+
+@dataclass(frozen=True)
+class BootEntry:
+    """One step of a boot image."""
+
+    kind: BootEntryKind
+    addr: int = 0
+    data: bytes = b""
+    delay: float = 0.0
+    """
+    Seconds to wait, for delays
+    """
+
+    def pack(self) -> bytes:
+        """Pack into the entry header and data."""
+        if self.kind == BootEntryKind.DELAY:
+            return _ENTRY.pack(self.kind, 0, round(self.delay * 1e6))
+        return _ENTRY.pack(self.kind, self.addr, len(self.data)) + self.data
+
+
+class BootImageCompiler:
+    """Fold I2C transactions into the entries of a boot image."""
+
+    def __init__(
+        self,
+        memory_map: MemoryMap = ADAU1452_MEMORY_MAP,
+        memories: Iterable[str] = ADAU1452_MEMORIES,
+    ):
+        """Start an empty image.
+
+        Args:
+            memory_map: Word widths of the device's registers and memories
+            memories: Names of the memory map regions whose writes are folded
+        """
+        self.memory_map = memory_map
+        self.memories = frozenset(memories)
+        self.entries: list[BootEntry] = []
+        self.transactions = 0
+        self._words: dict[int, bytes] = {}
+        # Whether the last entry is a control write later writes may extend
+        self._extendable = False
+
+    def _foldable(self, addr: int, data: bytes) -> bool:
+        """Whether a write only stores whole words in memory."""
+        region = self.memory_map.region(addr)
+        if region is None or region.name not in self.memories:
+            return False
+        words = len(data) // region.word_size
+        if not data or len(data) % region.word_size or addr + words - 1 > region.end:
+            return False
+        return _SIDE_EFFECT_ADDRESSES.isdisjoint(range(addr, addr + words))
+
+    def _flush_memory(self) -> None:
+        """Write the folded memory words as one burst per contiguous run."""
+        if not self._words:
+            return
+
+        start = 0
+        run: list[bytes] = []
+        region = None
+        for addr in sorted(self._words):
+            addr_region = self.memory_map.region(addr)
+            if run and (addr != start + len(run) or addr_region is not region):
+                self.entries.append(
+                    BootEntry(BootEntryKind.WRITE, start, b"".join(run))
+                )
+                run = []
+            if not run:
+                start, region = addr, addr_region
+            run.append(self._words[addr])
+        self.entries.append(BootEntry(BootEntryKind.WRITE, start, b"".join(run)))
+
+        self._words.clear()
+        self._extendable = False
+
+    def _append(self, entry: BootEntry, extendable: bool = False) -> None:
+        self._flush_memory()
+        self.entries.append(entry)
+        self._extendable = extendable
+
+    def write(self, addr: int, data: bytes) -> None:
+        """Add a register or memory write."""
+        self.transactions += 1
+        if self._foldable(addr, data):
+            word_size = self.memory_map.word_size(addr)
+            for i in range(0, len(data), word_size):
+                self._words[addr + i // word_size] = data[i : i + word_size]
+            return
+
+        if self._extendable and not self._words:
+            last = self.entries[-1]
+            if last.addr == addr and last.data == data:
+                return
+            word_size = self.memory_map.word_size(last.addr)
+            if (
+                len(last.data) % word_size == 0
+                and last.addr + len(last.data) // word_size == addr
+                and self.memory_map.region(last.addr) is self.memory_map.region(addr)
+            ):
+                self.entries[-1] = BootEntry(
+                    BootEntryKind.WRITE, last.addr, last.data + data
+                )
+                return
+
+        self._append(BootEntry(BootEntryKind.WRITE, addr, data), extendable=True)
+
+    def safeload(self, addr: int, data: bytes) -> None:
+        """Add a safeload write of parameter words."""
+        self.transactions += 1
+        self._append(BootEntry(BootEntryKind.SAFELOAD, addr, data))
+
+    def check(self, addr: int, data: bytes) -> None:
+        """Add a read that must return data."""
+        self.transactions += 1
+        self._append(BootEntry(BootEntryKind.CHECK, addr, data))
+
+    def delay(self, seconds: float) -> None:
+        """Add a delay."""
+        self._append(BootEntry(BootEntryKind.DELAY, delay=seconds))
+
+    def finish(self) -> list[BootEntry]:
+        """Return the entries, with the pending memory writes."""
+        self._flush_memory()
+        return self.entries
+
+
+def compile_boot_image(
+    records: Iterable[CaptureRecord],
+    memory_map: MemoryMap = ADAU1452_MEMORY_MAP,
+    delay_threshold: float = DEFAULT_DELAY_THRESHOLD,
+    max_delay: float = DEFAULT_MAX_DELAY,
+    checks: bool = False,
+    chip: int | None = None,
+) -> list[BootEntry]:
+    """Compile the I2C transactions of a session into boot image entries.
+
+    Args:
+        records: Capture records of the session; network records are ignored
+        memory_map: Word widths of the device's registers and memories
+        delay_threshold: Seconds between transactions from which on the gap
+            becomes a delay
+        max_delay: Longest delay in seconds
+        checks: Keep reads as checks of the data read
+        chip: Only compile the transactions of this protocol chip address
+
+    Returns:
+        Boot image entries in order
+    """
+    compiler = BootImageCompiler(memory_map)
+    last: int | None = None
+    for record in records:
+        if record.type != CaptureRecordType.I2C:
+            continue
+        if chip is not None and record.chip != chip:
+            continue
+        if record.operation == Operation.READ and not checks:
+            continue
+
+        if last is not None and record.timestamp - last >= delay_threshold * 1e9:
+            compiler.delay(min((record.timestamp - last) / 1e9, max_delay))
+        last = record.timestamp
+
+        if record.operation == Operation.READ:
+            compiler.check(record.addr, record.data)
+        elif record.operation == Operation.SAFELOAD:
+            compiler.safeload(record.addr, record.data)
+        else:
+            compiler.write(record.addr, record.data)
+
+    entries = compiler.finish()
+    logger.info(
+        "Boot image compiled",
+        transactions=compiler.transactions,
+        entries=len(entries),
+        bytes=sum(len(entry.data) for entry in entries),
+    )
+    return entries
+
+
+def write_boot_image(path: Path, entries: Iterable[BootEntry]) -> int:
+    """Write a boot image file.
+
+    Args:
+        path: File to write; replaced if it exists
+        entries: Boot image entries
+
+    Returns:
+        Size of the file in bytes
+    """
+    body = [entry.pack() for entry in entries]
+    data = _HEADER.pack(BOOT_IMAGE_MAGIC, BOOT_IMAGE_VERSION, len(body)) + b"".join(
+        body
+    )
+    path.write_bytes(data)
+    return len(data)
+
+
+def read_boot_image(path: Path) -> list[BootEntry]:
+    """Read the entries of a boot image file.
+
+    Args:
+        path: Boot image file
+
+    Returns:
+        Entries in order
+    """
+    data = path.read_bytes()
+    if len(data) < _HEADER.size:
+        raise ValueError(f"Not a boot image: {path}")
+    magic, version, count = _HEADER.unpack_from(data)
+    if magic != BOOT_IMAGE_MAGIC:
+        raise ValueError(f"Not a boot image: {path}")
+    if version != BOOT_IMAGE_VERSION:
+        raise ValueError(f"Unsupported boot image version: {version}")
+
+    entries = []
+    offset = _HEADER.size
+    for _ in range(count):
+        if offset + _ENTRY.size > len(data):
+            raise ValueError(f"Truncated boot image: {path}")
+        kind, addr, length = _ENTRY.unpack_from(data, offset)
+        offset += _ENTRY.size
+        if kind == BootEntryKind.DELAY:
+            entries.append(BootEntry(BootEntryKind.DELAY, delay=length / 1e6))
+            continue
+        if offset + length > len(data):
+            raise ValueError(f"Truncated boot image: {path}")
+        entries.append(
+            BootEntry(BootEntryKind(kind), addr, data[offset : offset + length])
+        )
+        offset += length
+
+    return entries
+
+
+def run_boot_image(
+    backend: I2CBackend,
+    entries: Iterable[BootEntry],
+    sleep: Callable[[float], None] = time.sleep,
+) -> None:
+    """Run the entries of a boot image against a device.
+
+    Args:
+        backend: Backend of the device
+        entries: Boot image entries
+        sleep: Called for delays
+    """
+    for entry in entries:
+        if entry.kind == BootEntryKind.WRITE:
+            backend.write(entry.addr, entry.data)
+        elif entry.kind == BootEntryKind.SAFELOAD:
+            run_safeloads(backend, pack_safeloads([(entry.addr, entry.data)]))
+        elif entry.kind == BootEntryKind.CHECK:
+            data = backend.read(entry.addr, len(entry.data))
+            if data != entry.data:
+                raise RuntimeError(
+                    f"Boot check failed at 0x{entry.addr:04X}: expected "
+                    f"{entry.data.hex()}, got {data.hex()}"
+                )
+        else:
+            sleep(entry.delay)
@@ -0,0 +1,858 @@
+"""I2C broker daemon sharing the physical buses between processes.
+
+The broker owns the buses and runs I2C messages for its clients over a Unix
+socket. Every request is a list of messages run as one I2C_RDWR transfer
+(repeated starts, no other traffic in between). Each bus is served by its own
+thread in priority order, so interactive requests overtake queued bulk
+downloads and different buses run in parallel. A request can hold the bus
+for its client, which keeps multi-request sequences atomic.
+"""
+
+import asyncio
+import ctypes
+import errno
+import heapq
+import itertools
+import os
+import socket
+import struct
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass
+from enum import IntEnum, IntFlag
+from pathlib import Path
+
+import smbus2
+import structlog
+
+from tcp_i2c_bridge.i2c_backend import (
+    AdapterLimits,
+    I2CBackend,
+    I2COperation,
+    I2COpKind,
+    MessageGroup,
+    batch_message_groups,
+    plan_message_groups,
+)
+from tcp_i2c_bridge.memory_map import ADAU1452_MEMORY_MAP, MemoryMap
+
+logger = structlog.get_logger()
+
+BROKER_MAGIC = b"I2CB"
+BROKER_VERSION = 1
+
+# Longest message the broker runs by default: about 25 ms of bus time at
+# 400 kHz, which bounds how long a bulk download delays interactive requests
+BROKER_MAX_MSG_LEN = 1024
+
+# Seconds a client may hold a bus between requests before losing it
+HOLD_TIMEOUT = 0.5
+
+# Client hello: magic, version, client name length; answered with the limits
+_HELLO = struct.Struct("<4sBxH")
+_LIMITS = struct.Struct("<HB")
+# Request: id, bus, device address, priority, flags, message count
+_REQUEST = struct.Struct("<IBBBBB")
+# Message: flags, length; write data follows
+_MESSAGE = struct.Struct("<BH")
+# Response: id, errno (0 on success), result count; results are length + data
+_RESPONSE = struct.Struct("<IBB")
+_LENGTH = struct.Struct("<H")
+
+_M_READ = 1
+
+
+class Priority(IntEnum):
+    """Scheduling priority of broker requests; lower runs first."""
+
+    INTERACTIVE = 0
+    NORMAL = 1
+    BULK = 2
+
+
+class RequestFlags(IntFlag):
+    """Flags of a broker request."""
+
+    NONE = 0
+    HOLD = 1
+    """
+    Keep the bus for this client after the request
+    """
+
+
+@dataclass(frozen=True)
+class BrokerMessage:
+    """One I2C message of a broker request."""
+
+    read: bool
+    data: bytes = b""
+    """
+    Data to write (write messages)
+    """
+    length: int = 0
+    """
+    Bytes to read (read messages)
+    """
+
+    @classmethod
+    def write(cls, data: bytes) -> "BrokerMessage":
+        return cls(read=False, data=bytes(data))
+
+    @classmethod
+    def read_bytes(cls, length: int) -> "BrokerMessage":
+        return cls(read=True, length=length)
+
+    @property
+    def size(self) -> int:
+        """Bytes on the bus, excluding the address byte."""
+        return self.length if self.read else len(self.data)
+
+
+class BusAdapter(ABC):
+    """Physical bus driven by the broker."""
+
+    @abstractmethod
+    def transfer(self, device: int, messages: Sequence[BrokerMessage]) -> list[bytes]:
+        """Run messages as one transfer and return the data of the reads."""
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        """Close the bus."""
+        pass
+
+
+class SMBusAdapter(BusAdapter):
+    """Bus adapter using I2C_RDWR through smbus2."""
+
+    def __init__(self, i2c_bus: int):
+        """Open an I2C bus.
+
+        Args:
+            i2c_bus: I2C bus number (e.g., 1 for /dev/i2c-1)
+        """
+        path = Path(f"/dev/i2c-{i2c_bus}")
+        if not path.exists():
+            raise FileNotFoundError(f"I2C device not found: {path}")
+        self.bus = smbus2.SMBus(i2c_bus)
+
+    def transfer(self, device: int, messages: Sequence[BrokerMessage]) -> list[bytes]:
+        msgs = [
+            (
+                smbus2.i2c_msg.read(device, message.length)
+                if message.read
+                else smbus2.i2c_msg.write(device, message.data)
+            )
+            for message in messages
+        ]
+        self.bus.i2c_rdwr(*msgs)
+        return [
+            bytes(msg)
+            for msg, message in zip(msgs, messages, strict=True)
+            if message.read
+        ]
+
+    def close(self) -> None:
+        self.bus.close()
+
+
+class DeviceAdapter(BusAdapter):
+    """Bus adapter serving messages from backends, e.g. simulated devices.
+
+    Messages use 16-bit register addressing: a write of two address bytes
+    followed by a read is a write-read, any other write is a register write.
+    """
+
+    def __init__(
+        self,
+        devices: dict[int, I2CBackend] | None = None,
+        factory: Callable[[], I2CBackend] | None = None,
+    ):
+        """Initialize device adapter.
+
+        Args:
+            devices: Backends by device address
+            factory: Creates a backend for other device addresses on first
+                use; without it, those addresses do not acknowledge
+        """
+        self.devices = dict(devices or {})
+        self.factory = factory
+
+    def _device(self, device: int) -> I2CBackend:
+        if device not in self.devices:
+            if self.factory is None:
+                raise OSError(errno.ENXIO, f"No device at 0x{device:02X}")
+            self.devices[device] = self.factory()
+        return self.devices[device]
+
+    def transfer(self, device: int, messages: Sequence[BrokerMessage]) -> list[bytes]:
+        backend = self._device(device)
+        results = []
+        position = 0
+        while position < len(messages):
+            message = messages[position]
+            following = messages[position + 1] if position + 1 < len(messages) else None
+            if message.read:
+                raise OSError(errno.EPROTO, "Read without register address")
+            if following is not None and following.read:
+                results.append(backend.write_read(message.data, following.length))
+                position += 2
+                continue
+            if len(message.data) < 3:
+                raise OSError(errno.EPROTO, "Write without data")
+            backend.write(int.from_bytes(message.data[:2], "big"), message.data[2:])
+            position += 1
+        return results
+
+    def close(self) -> None:
+        for backend in self.devices.values():
+            backend.close()
+
+
+@dataclass
+class ClientStats:
+    """Broker usage of one client."""
+
+    requests: int = 0
+    messages: int = 0
+    bytes: int = 0
+    rejected: int = 0
+    """
+    Requests exceeding the broker limits
+    """
+    errors: int = 0
+    bus_time: float = 0.0
+    """
+    Seconds the client's transfers took
+    """
+    wait_time: float = 0.0
+    """
+    Seconds the client's requests waited for the bus
+    """
+    max_wait: float = 0.0
+
+
+@dataclass
+class BrokerJob:
+    """A request queued for a bus."""
+
+    client: object
+    """
+    Identity of the requesting connection
+    """
+    stats: ClientStats
+    device: int
+    messages: Sequence[BrokerMessage]
+    priority: Priority
+    flags: RequestFlags
+    done: Callable[[list[bytes] | BaseException], None]
+    """
+    Called from the bus thread with the read data or the error
+    """
+    queued: float = 0.0
+
+
+class BusScheduler:
+    """Runs the jobs of one bus in priority order on a thread of its own."""
+
+    def __init__(
+        self,
+        name: str,
+        adapter: BusAdapter,
+        limits: AdapterLimits,
+        hold_timeout: float = HOLD_TIMEOUT,
+    ):
+        """Initialize and start the bus thread.
+
+        Args:
+            name: Bus name for logging
+            adapter: Bus to drive
+            limits: Largest requests to run; larger ones are rejected
+            hold_timeout: Seconds a holding client may stay idle
+        """
+        self.name = name
+        self.adapter = adapter
+        self.limits = limits
+        self.hold_timeout = hold_timeout
+        self._queue: list[tuple[int, int, BrokerJob]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._held_by: object | None = None
+        self._held_until = 0.0
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name=f"i2c-broker-{name}", daemon=True
+        )
+        self._thread.start()
+
+    def put(self, job: BrokerJob) -> None:
+        """Queue a job."""
+        job.queued = time.perf_counter()
+        with self._condition:
+            heapq.heappush(self._queue, (job.priority, next(self._sequence), job))
+            self._condition.notify()
+
+    def release(self, client: object) -> None:
+        """Release the bus if the client holds it, e.g. on disconnect."""
+        with self._condition:
+            if self._held_by is client:
+                self._held_by = None
+                self._condition.notify()
+
+    def _next(self) -> BrokerJob | None:
+        with self._condition:
+            while not self._closed:
+                now = time.perf_counter()
+                if self._held_by is not None and now >= self._held_until:
+                    logger.warning("I2C bus hold timed out", bus=self.name)
+                    self._held_by = None
+
+                if self._held_by is None:
+                    if self._queue:
+                        return heapq.heappop(self._queue)[2]
+                    self._condition.wait()
+                    continue
+
+                # Only the holding client's jobs run until it releases the bus
+                held = [
+                    entry for entry in self._queue if entry[2].client is self._held_by
+                ]
+                if held:
+                    entry = min(held, key=lambda e: e[:2])
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                    return entry[2]
+                self._condition.wait(self._held_until - now)
+            return None
+
+    def _run(self) -> None:
+        while (job := self._next()) is not None:
+            self._execute(job)
+
+    def _execute(self, job: BrokerJob) -> None:
+        start = time.perf_counter()
+        wait = start - job.queued
+        stats = job.stats
+        stats.requests += 1
+        stats.wait_time += wait
+        stats.max_wait = max(stats.max_wait, wait)
+
+        if len(job.messages) > self.limits.max_msgs or any(
+            message.size > self.limits.max_msg_len for message in job.messages
+        ):
+            stats.rejected += 1
+            job.done(OSError(errno.EOPNOTSUPP, "Request exceeds broker limits"))
+            return
+
+        try:
+            results = (
+                self.adapter.transfer(job.device, job.messages) if job.messages else []
+            )
+        except Exception as e:
+            stats.errors += 1
+            results = e
+        finally:
+            stats.messages += len(job.messages)
+            stats.bytes += sum(message.size for message in job.messages)
+            stats.bus_time += time.perf_counter() - start
+
+        with self._condition:
+            if job.flags & RequestFlags.HOLD:
+                self._held_by = job.client
+                self._held_until = time.perf_counter() + self.hold_timeout
+            elif self._held_by is job.client:
+                self._held_by = None
+
+        job.done(results)
+
+    def close(self) -> None:
+        """Stop the bus thread and close the bus."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        self.adapter.close()
+
+
+async def _read_frame(reader: asyncio.StreamReader, header: struct.Struct) -> tuple:
+    return header.unpack(await reader.readexactly(header.size))
+
+
+def _pack_response(request_id: int, result: list[bytes] | BaseException) -> bytes:
+    if isinstance(result, BaseException):
+        code = result.errno if isinstance(result, OSError) and result.errno else 0
+        message = str(result).encode()[:0xFFFF]
+        return (
+            _RESPONSE.pack(request_id, code or errno.EIO, 1)
+            + _LENGTH.pack(len(message))
+            + message
+        )
+    return _RESPONSE.pack(request_id, 0, len(result)) + b"".join(
+        _LENGTH.pack(len(data)) + data for data in result
+    )
+
+
+class I2CBroker:
+    """Unix socket server sharing I2C buses between client processes."""
+
+    def __init__(
+        self,
+        socket_path: Path,
+        adapters: dict[int, BusAdapter],
+        limits: AdapterLimits | None = None,
+        hold_timeout: float = HOLD_TIMEOUT,
+    ):
+        """Initialize broker.
+
+        Args:
+            socket_path: Unix socket to listen on
+            adapters: Buses to serve by bus number
+            limits: Largest requests to run; clients are told on connect
+            hold_timeout: Seconds a holding client may stay idle
+        """
+        self.socket_path = socket_path
+        self.limits = limits or AdapterLimits(max_msg_len=BROKER_MAX_MSG_LEN)
+        self.schedulers = {
+            bus: BusScheduler(str(bus), adapter, self.limits, hold_timeout)
+            for bus, adapter in adapters.items()
+        }
+        self.stats: dict[str, ClientStats] = {}
+        self.server: asyncio.AbstractServer | None = None
+
+    async def start(self) -> None:
+        """Start listening."""
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        self.server = await asyncio.start_unix_server(
+            self._handle_client, path=str(self.socket_path)
+        )
+        logger.info(
+            "I2C broker started",
+            socket=str(self.socket_path),
+            buses=sorted(self.schedulers),
+            max_msg_len=self.limits.max_msg_len,
+        )
+
+    async def serve_forever(self) -> None:
+        """Serve until cancelled."""
+        await self.start()
+        assert self.server is not None
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self) -> None:
+        """Stop listening and close the buses."""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        for scheduler in self.schedulers.values():
+            await asyncio.to_thread(scheduler.close)
+        self.schedulers = {}
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        self.report()
+
+    def report(self) -> None:
+        """Log the usage of every client."""
+        for name, stats in self.stats.items():
+            logger.info("I2C broker client statistics", client=name, **vars(stats))
+
+    async def _handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        client = object()
+        name = None
+        try:
+            magic, version, name_length = await _read_frame(reader, _HELLO)
+            if magic != BROKER_MAGIC or version != BROKER_VERSION:
+                logger.warning("Invalid I2C broker client", magic=magic.hex())
+                return
+            name = (await reader.readexactly(name_length)).decode(errors="replace")
+            stats = self.stats.setdefault(name, ClientStats())
+            writer.write(_LIMITS.pack(self.limits.max_msg_len, self.limits.max_msgs))
+            logger.info("I2C broker client connected", client=name)
+
+            loop = asyncio.get_running_loop()
+
+            while True:
+                request_id, bus, device, priority, flags, count = await _read_frame(
+                    reader, _REQUEST
+                )
+                messages = []
+                for _ in range(count):
+                    message_flags, length = await _read_frame(reader, _MESSAGE)
+                    if message_flags & _M_READ:
+                        messages.append(BrokerMessage.read_bytes(length))
+                    else:
+                        messages.append(
+                            BrokerMessage.write(await reader.readexactly(length))
+                        )
+
+                scheduler = self.schedulers.get(bus)
+                if scheduler is None:
+                    writer.write(
+                        _pack_response(
+                            request_id, OSError(errno.ENODEV, f"No I2C bus {bus}")
+                        )
+                    )
+                    continue
+
+                scheduler.put(
+                    BrokerJob(
+                        client=client,
+                        stats=stats,
+                        device=device,
+                        messages=messages,
+                        priority=Priority(min(priority, Priority.BULK)),
+                        flags=RequestFlags(flags),
+                        done=lambda result, request_id=request_id: (
+                            loop.call_soon_threadsafe(
+                                writer.write, _pack_response(request_id, result)
+                            )
+                        ),
+                    )
+                )
+                await writer.drain()
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for scheduler in self.schedulers.values():
+                scheduler.release(client)
+            writer.close()
+            if name is not None:
+                logger.info(
+                    "I2C broker client disconnected",
+                    client=name,
+                    **vars(self.stats[name]),
+                )
+
+
+class BrokerConnection:
+    """Blocking client connection to an I2C broker."""
+
+    def __init__(self, socket_path: Path, name: str):
+        """Connect to a broker.
+
+        Args:
+            socket_path: Unix socket of the broker
+            name: Client name for the broker's accounting
+        """
+        self.socket_path = socket_path
+        self.name = name
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.sock.connect(str(socket_path))
+        except OSError as e:
+            self.sock.close()
+            raise RuntimeError(f"Failed to connect to I2C broker: {e}") from e
+
+        encoded = name.encode()
+        self.sock.sendall(
+            _HELLO.pack(BROKER_MAGIC, BROKER_VERSION, len(encoded)) + encoded
+        )
+        max_msg_len, max_msgs = _LIMITS.unpack(self._recv(_LIMITS.size))
+        try:
+            self.limits = AdapterLimits(max_msg_len=max_msg_len, max_msgs=max_msgs)
+        except ValueError as e:
+            self.sock.close()
+            raise RuntimeError(f"Invalid limits from I2C broker: {e}") from e
+
+        logger.info("Connected to I2C broker", socket=str(socket_path), client=name)
+
+    def _recv(self, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("I2C broker closed the connection")
+            data += chunk
+        return bytes(data)
+
+    def transfer(
+        self,
+        bus: int,
+        device: int,
+        messages: Sequence[BrokerMessage],
+        priority: Priority = Priority.NORMAL,
+        hold: bool = False,
+    ) -> list[bytes]:
+        """Run messages as one transfer on a broker bus.
+
+        Args:
+            bus: Bus number
+            device: 7-bit device address
+            messages: Messages of the transfer
+            priority: Scheduling priority
+            hold: Keep the bus after the transfer until a request without hold
+
+        Returns:
+            Data of the read messages
+
+        Raises:
+            OSError: The broker or the bus rejected the transfer
+        """
+        flags = RequestFlags.HOLD if hold else RequestFlags.NONE
+        frame = bytearray()
+        with self._lock:
+            request_id = next(self._ids) & 0xFFFFFFFF
+            frame += _REQUEST.pack(
+                request_id, bus, device, priority, flags, len(messages)
+            )
+            for message in messages:
+                frame += _MESSAGE.pack(_M_READ if message.read else 0, message.size)
+                if not message.read:
+                    frame += message.data
+            self.sock.sendall(frame)
+
+            response_id, code, count = _RESPONSE.unpack(self._recv(_RESPONSE.size))
+            results = []
+            for _ in range(count):
+                (length,) = _LENGTH.unpack(self._recv(_LENGTH.size))
+                results.append(self._recv(length))
+
+        if response_id != request_id:
+            raise ConnectionError("I2C broker response out of order")
+        if code:
+            message = results[0].decode(errors="replace") if results else ""
+            raise OSError(code, message or os.strerror(code))
+        return results
+
+    def release(self, bus: int) -> None:
+        """Release a bus held by this connection."""
+        self.transfer(bus, 0, [])
+
+    def close(self) -> None:
+        """Close the connection."""
+        self.sock.close()
+
+
+class BrokerI2CBackend(I2CBackend):
+    """I2C backend running transfers through an I2C broker.
+
+    Transfers are split into broker requests the same way as into ioctls by
+    the hardware backends. Transactions spanning several requests hold the
+    bus, so they stay atomic.
+    """
+
+    def __init__(
+        self,
+        socket_path: Path,
+        i2c_bus: int,
+        device_addr: int,
+        priority: Priority = Priority.NORMAL,
+        name: str | None = None,
+        memory_map: MemoryMap = ADAU1452_MEMORY_MAP,
+    ):
+        """Initialize broker backend.
+
+        Args:
+            socket_path: Unix socket of the broker
+            i2c_bus: I2C bus number
+            device_addr: I2C device address (7-bit)
+            priority: Scheduling priority of the transfers
+            name: Client name for the broker's accounting
+            memory_map: Word widths of the device memory, used to split large
+                transfers on word boundaries
+        """
+        if not (0 <= device_addr <= 0x7F):
+            raise ValueError(f"Invalid I2C device address: 0x{device_addr:02X}")
+
+        self.i2c_bus = i2c_bus
+        self.device_addr = device_addr
+        self.priority = priority
+        self.memory_map = memory_map
+        self.connection = BrokerConnection(
+            socket_path, name or f"tcp-i2c-bridge {i2c_bus}:0x{device_addr:02X}"
+        )
+        self.limits = self.connection.limits
+
+    def _transfer_batch(
+        self,
+        operations: Sequence[I2COperation],
+        results: list[bytearray | None],
+        batch: list[MessageGroup],
+        hold: bool,
+    ) -> None:
+        messages = []
+        for group in batch:
+            op = operations[group.index]
+            addr_bytes = group.addr.to_bytes(2, "big")
+            if op.kind is I2COpKind.WRITE:
+                data = op.data[group.offset : group.offset + group.size]
+                messages.append(BrokerMessage.write(addr_bytes + data))
+                continue
+
+            prefix = op.data if op.kind is I2COpKind.WRITE_READ else addr_bytes
+            messages.append(BrokerMessage.write(prefix))
+            messages.append(BrokerMessage.read_bytes(group.size))
+
+        data = iter(
+            self.connection.transfer(
+                self.i2c_bus, self.device_addr, messages, self.priority, hold
+            )
+        )
+        for group in batch:
+            result = results[group.index]
+            if result is not None:
+                result[group.offset : group.offset + group.size] = next(data)
+
+    def submit(self, operations: Sequence[I2COperation]) -> list[bytes | None]:
+        """Run a batch of operations in as few broker requests as possible.
+
+        Args:
+            operations: Operations to run
+
+        Returns:
+            One result per operation: read data, or None for writes
+        """
+        results = [
+            None if op.kind is I2COpKind.WRITE else bytearray(op.length)
+            for op in operations
+        ]
+
+        held = False
+        resume = None
+        try:
+            while True:
+                try:
+                    batches = list(
+                        batch_message_groups(
+                            plan_message_groups(
+                                operations, self.limits, self.memory_map, resume
+                            ),
+                            self.limits.max_msgs,
+                        )
+                    )
+                    for i, batch in enumerate(batches):
+                        resume = batch[0]
+                        held = i < len(batches) - 1
+                        self._transfer_batch(operations, results, batch, held)
+                    break
+                except OSError as e:
+                    limits = self.limits.reduced(e)
+                    if limits is None:
+                        raise
+                    self.limits = limits
+        except Exception as e:
+            if held:
+                self.connection.release(self.i2c_bus)
+            logger.error(
+                "I2C transaction failed", operations=len(operations), error=str(e)
+            )
+            raise RuntimeError(f"I2C transaction failed: {e}") from e
+
+        return [None if data is None else bytes(data) for data in results]
+
+    def read(self, addr: int, length: int) -> bytes:
+        """Read through the broker using 16-bit register addressing."""
+        if length <= 0:
+            raise ValueError("Read length must be positive")
+        data = self.submit([I2COperation(I2COpKind.READ, addr=addr, length=length)])
+        assert data[0] is not None
+        return data[0]
+
+    def write(self, addr: int, data: bytes) -> None:
+        """Write through the broker using 16-bit register addressing."""
+        if len(data) == 0:
+            raise ValueError("Write data cannot be empty")
+        self.submit([I2COperation(I2COpKind.WRITE, addr=addr, data=bytes(data))])
+
+    def write_read(self, data: bytes, length: int) -> bytes:
+        """Write raw bytes and read back after a repeated start."""
+        operation = I2COperation(I2COpKind.WRITE_READ, data=bytes(data), length=length)
+        result = self.submit([operation])[0]
+        assert result is not None
+        return result
+
+    def close(self) -> None:
+        """Close the broker connection."""
+        self.connection.close()
+        logger.info("Broker I2C backend closed")
+
+
+class BrokerSMBus:
+    """Stand-in for smbus2.SMBus running transfers through an I2C broker.
+
+    Provides the SMBus calls used by the audio_server drivers, so drivers
+    written against SMBus share the bus with other processes unchanged.
+    """
+
+    def __init__(
+        self,
+        socket_path: Path,
+        i2c_bus: int,
+        priority: Priority = Priority.INTERACTIVE,
+        name: str = "smbus",
+    ):
+        """Connect to a broker bus.
+
+        Args:
+            socket_path: Unix socket of the broker
+            i2c_bus: I2C bus number
+            priority: Scheduling priority of the transfers
+            name: Client name for the broker's accounting
+        """
+        self.i2c_bus = i2c_bus
+        self.priority = priority
+        self.connection = BrokerConnection(socket_path, name)
+        self._reserved = 0
+
+    def _transfer(self, device: int, messages: list[BrokerMessage]) -> list[bytes]:
+        return self.connection.transfer(
+            self.i2c_bus, device, messages, self.priority, hold=self._reserved > 0
+        )
+
+    @contextmanager
+    def reserve(self) -> Iterator[None]:
+        """Keep other clients off the bus for a sequence of calls."""
+        self._reserved += 1
+        try:
+            yield
+        finally:
+            self._reserved -= 1
+            if self._reserved == 0:
+                self.connection.release(self.i2c_bus)
+
+    def read_byte_data(self, i2c_addr: int, register: int) -> int:
+        data = self._transfer(
+            i2c_addr,
+            [BrokerMessage.write(bytes([register])), BrokerMessage.read_bytes(1)],
+        )
+        return data[0][0]
+
+    def write_byte_data(self, i2c_addr: int, register: int, value: int) -> None:
+        self._transfer(i2c_addr, [BrokerMessage.write(bytes([register, value]))])
+
+    def i2c_rdwr(self, *i2c_msgs: smbus2.i2c_msg) -> None:
+        if not i2c_msgs:
+            raise ValueError("A broker transfer needs at least one message")
+        if len({msg.addr for msg in i2c_msgs}) > 1:
+            raise ValueError(
+                "All messages of a broker transfer must address one device"
+            )
+
+        messages = [
+            (
+                BrokerMessage.read_bytes(msg.len)
+                if msg.flags & smbus2.smbus2.I2C_M_RD
+                else BrokerMessage.write(bytes(msg))
+            )
+            for msg in i2c_msgs
+        ]
+        data = iter(self._transfer(i2c_msgs[0].addr, messages))
+        for msg in i2c_msgs:
+            if msg.flags & smbus2.smbus2.I2C_M_RD:
+                result = next(data)
+                ctypes.memmove(msg.buf, result, len(result))
+
+    def close(self) -> None:
+        self.connection.close()
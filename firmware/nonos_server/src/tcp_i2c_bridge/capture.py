@@ -0,0 +1,1433 @@
+"""Append-only binary capture of bridge traffic.
+
+A capture holds every network packet and I2C transaction of a session in one
+file: a file header followed by records, each a fixed header plus payload.
+Clients are named once in a client record and referenced by index afterwards.
+
+File header (little endian):
+    magic       4s  b"NCAP"
+    version     B
+    reserved    3x
+
+Record header (little endian), followed by `size` bytes of payload:
+    type        B   CaptureRecordType
+    code        B   Direction for network records, Operation for I2C records
+    client      H   client index
+    timestamp   Q   nanoseconds since the epoch
+    addr        H   I2C register address
+    chip        H   protocol chip address of I2C records, 0xFFFF if unknown
+    length      I   I2C transaction length
+    size        I   payload size
+
+Records are persisted by a background writer thread, or kept in a flight
+recorder ring buffer and written only when something goes wrong. Text logs in
+the format of the former network.log and i2c.log are generated from a capture
+on demand.
+
+A sidecar index (capture.idx next to capture.bin) written when a session ends,
+or built on first query otherwise, lets queries seek to matching records.
+While it is built, postings beyond a bounded number are spilled to a temporary
+file next to the capture, so indexing long sessions takes bounded memory:
+
+    header              magic b"NIDX", version, bucket width, indexed capture
+                        size and the number of entries of each table
+    clients             index H, name length H, name
+    time buckets        bucket q (timestamp // width), first record offset Q,
+                        end offset Q of the records in that bucket
+    address postings    register address H, offset Q, count I
+    client postings     client index H, offset Q, count I
+    postings            sorted capture offsets (Q) of the I2C records of an
+                        address and of all records of a client
+"""
+
+import gzip
+import heapq
+import lzma
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum, IntEnum
+from pathlib import Path
+from typing import BinaryIO
+
+import structlog
+
+logger = structlog.get_logger()
+
+CAPTURE_MAGIC = b"NCAP"
+CAPTURE_VERSION = 2
+
+_HEADER = struct.Struct("<4sB3x")
+_RECORD = struct.Struct("<BBHQHHII")
+
+# Chip address field of records without one
+NO_CHIP = 0xFFFF
+
+# Every capture, segment and tap stream starts with this
+CAPTURE_HEADER = _HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION)
+
+INDEX_MAGIC = b"NIDX"
+INDEX_VERSION = 1
+
+# Width of the index time buckets in nanoseconds
+INDEX_BUCKET_NS = 1_000_000_000
+
+# Postings an index builder keeps in memory before spilling them to disk
+INDEX_MAX_POSTINGS = 256 * 1024
+
+# Bytes copied at once from the spill file into the index
+_SPILL_COPY_SIZE = 1024 * 1024
+
+_INDEX_HEADER = struct.Struct("<4sB3xQQIIII")
+_INDEX_CLIENT = struct.Struct("<HH")
+_INDEX_BUCKET = struct.Struct("<qQQ")
+_INDEX_POSTINGS = struct.Struct("<HQI")
+
+# Buffer of the open capture file; records reach the disk in large writes
+CAPTURE_BUFFER_SIZE = 256 * 1024
+
+# Records queued for the writer thread before the queue policy applies
+DEFAULT_QUEUE_SIZE = 16384
+
+# Seconds between fsyncs of the capture file
+DEFAULT_FSYNC_INTERVAL = 1.0
+
+# The writer thread writes queued records at least this often (seconds), and
+# as soon as this many are queued
+WRITE_INTERVAL = 0.1
+WRITE_BATCH_SIZE = 256
+
+# Flight recorder: ring buffer size, seconds of traffic kept and seconds during
+# which further triggers are ignored after a dump
+DEFAULT_RING_SIZE = 8 * 1024 * 1024
+DEFAULT_RING_SECONDS = 30.0
+DEFAULT_TRIGGER_HOLDOFF = 1.0
+
+# Segmented captures: compressed bytes per segment and of all segments at most
+DEFAULT_SEGMENT_SIZE = 16 * 1024 * 1024
+DEFAULT_MAX_CAPTURE_SIZE = 256 * 1024 * 1024
+
+
+class CaptureRecordType(IntEnum):
+    """Type of a capture record."""
+
+    CLIENT = 0
+    NETWORK = 1
+    I2C = 2
+
+
+class Direction(IntEnum):
+    """Direction of a captured network packet."""
+
+    RX = 0
+    TX = 1
+    RX_RAW = 2
+    RX_DECODED = 3
+
+
+class Operation(IntEnum):
+    """Captured I2C operation."""
+
+    READ = 0
+    WRITE = 1
+    SAFELOAD = 2
+
+
+@dataclass(frozen=True)
+class CaptureRecord:
+    """One captured network packet or I2C transaction."""
+
+    type: CaptureRecordType
+    code: int
+    client: str
+    timestamp: int
+    """
+    Nanoseconds since the epoch
+    """
+    data: bytes
+    addr: int = 0
+    length: int = 0
+    chip: int | None = None
+    """
+    Protocol chip address of I2C transactions, if known
+    """
+
+    @property
+    def direction(self) -> Direction:
+        return Direction(self.code)
+
+    @property
+    def operation(self) -> Operation:
+        return Operation(self.code)
+
+    @property
+    def time(self) -> datetime:
+        return datetime.fromtimestamp(self.timestamp / 1e9)
+
+
+class QueuePolicy(Enum):
+    """What recording does when the writer thread falls behind."""
+
+    DROP = "drop"
+    """
+    Drop the record and count it, never delaying the caller
+    """
+    BLOCK = "block"
+    """
+    Wait for the writer thread to make room
+    """
+
+
+class Compression(Enum):
+    """Compression of capture segments."""
+
+    ZLIB = "zlib"
+    """
+    gzip streams; readable up to the last periodic sync after a crash
+    """
+    LZMA = "lzma"
+    """
+    xz streams; smaller, but only what was flushed to complete streams is
+    readable after a crash
+    """
+
+
+SEGMENT_SUFFIXES = {Compression.ZLIB: ".bin.gz", Compression.LZMA: ".bin.xz"}
+
+
+def pack_record(
+    kind: CaptureRecordType,
+    code: int,
+    client: int,
+    timestamp: int,
+    data: bytes,
+    addr: int = 0,
+    length: int = 0,
+    chip: int | None = None,
+) -> bytes:
+    """Pack a record header and its payload."""
+    if chip is None:
+        chip = NO_CHIP
+    return (
+        _RECORD.pack(kind, code, client, timestamp, addr, chip, length, len(data))
+        + data
+    )
+
+
+class CaptureSink(ABC):
+    """Destination of capture records."""
+
+    def __init__(self):
+        self.clients: dict[str, int] = {}
+        self.counts = dict.fromkeys(CaptureRecordType, 0)
+        self.dropped = 0
+        self._clients_lock = threading.Lock()
+
+    @abstractmethod
+    def _put(self, kind: CaptureRecordType, timestamp: int, record: bytes) -> None:
+        """Store a packed record."""
+        pass
+
+    def _record(
+        self,
+        kind: CaptureRecordType,
+        code: int,
+        client: int,
+        data: bytes,
+        addr: int = 0,
+        length: int = 0,
+        chip: int | None = None,
+    ) -> None:
+        timestamp = time.time_ns()
+        self._put(
+            kind,
+            timestamp,
+            pack_record(kind, code, client, timestamp, data, addr, length, chip),
+        )
+
+    def _client(self, client_id: str) -> int:
+        index = self.clients.get(client_id)
+        if index is None:
+            with self._clients_lock:
+                index = self.clients.get(client_id)
+                if index is None:
+                    index = len(self.clients)
+                    self._record(CaptureRecordType.CLIENT, 0, index, client_id.encode())
+                    self.clients[client_id] = index
+        return index
+
+    def network(self, client_id: str, direction: Direction, data: bytes) -> None:
+        """Capture a network packet."""
+        self._record(
+            CaptureRecordType.NETWORK, direction, self._client(client_id), data
+        )
+
+    def i2c(
+        self,
+        client_id: str,
+        operation: Operation,
+        addr: int,
+        length: int,
+        data: bytes,
+        chip: int | None = None,
+    ) -> None:
+        """Capture an I2C transaction."""
+        self._record(
+            CaptureRecordType.I2C,
+            operation,
+            self._client(client_id),
+            data,
+            addr,
+            length,
+            chip,
+        )
+
+    @abstractmethod
+    def flush(self) -> None:
+        """Wait until captured records are on disk."""
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        """Write what is pending and release the sink."""
+        pass
+
+
+class CaptureWriter(CaptureSink):
+    """Append records to a capture file from a background writer thread.
+
+    Recording only packs the record and appends it to an in-memory queue
+    (a deque, whose appends need no lock); the writer thread persists queued
+    records in batched writes and fsyncs periodically, keeping disk latency
+    off the caller's path.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        fsync_interval: float | None = DEFAULT_FSYNC_INTERVAL,
+        policy: QueuePolicy = QueuePolicy.DROP,
+        index: bool = True,
+    ):
+        """Create a capture file and start its writer thread.
+
+        Args:
+            path: Capture file to create
+            queue_size: Records queued at most before the policy applies;
+                client records are always queued
+            fsync_interval: Seconds between fsyncs of the capture, or None to
+                leave syncing to the operating system
+            policy: What to do with records while the queue is full
+            index: Whether to write the sidecar index when closing
+        """
+        if queue_size <= 0:
+            raise ValueError("Queue size must be positive")
+
+        super().__init__()
+        self.path = path
+        self.queue_size = queue_size
+        self.fsync_interval = fsync_interval
+        self.policy = policy
+        self.error: OSError | None = None
+        # Built by the writer thread from the records it writes
+        self.index = CaptureIndexBuilder(spill_dir=path.parent) if index else None
+        self._open()
+
+        # Queue entries are (kind, packed record), or (None, event) to be set
+        # once everything before has been written, or (None, None) to stop
+        self._queue: deque[
+            tuple[CaptureRecordType, bytes] | tuple[None, threading.Event | None]
+        ] = deque()
+        self._wake = threading.Event()
+        self._space = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name=f"capture-{path.name}", daemon=True
+        )
+        self._thread.start()
+
+    def _open(self) -> None:
+        self.file: BinaryIO = open(self.path, "wb", buffering=CAPTURE_BUFFER_SIZE)
+        self.file.write(CAPTURE_HEADER)
+
+    def _write(self, records: list[bytes]) -> None:
+        """Write records on the writer thread."""
+        self.file.write(b"".join(records))
+        if self.index is not None:
+            try:
+                for record in records:
+                    self.index.add(record)
+            except OSError as e:
+                # The capture goes on; it is indexed on first query instead
+                logger.error(
+                    "Capture index spill failed", path=str(self.path), error=str(e)
+                )
+                self.index.close()
+                self.index = None
+
+    def _finish(self) -> None:
+        """Complete the capture once the writer thread has stopped."""
+        self._flush_file(sync=self.fsync_interval is not None)
+        self.file.close()
+        if self.index is not None and self.error is None:
+            try:
+                self.index.write(index_path(self.path), self.index.size)
+            except OSError as e:
+                logger.error(
+                    "Capture index write failed", path=str(self.path), error=str(e)
+                )
+        if self.index is not None:
+            self.index.close()
+
+    def _put(self, kind: CaptureRecordType, timestamp: int, record: bytes) -> None:
+        # Client records go past the cap: the client is registered once, so
+        # losing its record would leave all its later records unnamed
+        if len(self._queue) >= self.queue_size and kind != CaptureRecordType.CLIENT:
+            if self.policy is QueuePolicy.DROP:
+                self.dropped += 1
+                return
+            with self._space:
+                self._wake.set()
+                self._space.wait_for(
+                    lambda: len(self._queue) < self.queue_size or self._closed
+                )
+        self._queue.append((kind, record))
+        if len(self._queue) >= WRITE_BATCH_SIZE:
+            self._wake.set()
+
+    def _drain(self) -> bool:
+        """Write all queued records; returns whether to stop."""
+        chunks = []
+        flushed = []
+        stop = False
+        while self._queue:
+            kind, item = self._queue.popleft()
+            if kind is None:
+                if item is None:
+                    stop = True
+                else:
+                    flushed.append(item)
+                continue
+            chunks.append(item)
+            self.counts[kind] += 1
+
+        with self._space:
+            self._space.notify_all()
+
+        if chunks and self.error is None:
+            try:
+                self._write(chunks)
+            except OSError as e:
+                self.error = e
+                logger.error(
+                    "Capture write failed, dropping further records",
+                    path=str(self.path),
+                    error=str(e),
+                )
+        if self.error is not None:
+            self.dropped += len(chunks)
+
+        if flushed:
+            self._flush_file()
+            for event in flushed:
+                event.set()
+        return stop
+
+    def _flush_file(self, sync: bool = False) -> None:
+        if self.error is not None:
+            return
+        try:
+            self.file.flush()
+            if sync:
+                os.fsync(self.file.fileno())
+        except OSError as e:
+            self.error = e
+            logger.error("Capture flush failed", path=str(self.path), error=str(e))
+
+    def _run(self) -> None:
+        last_sync = time.monotonic()
+        while True:
+            self._wake.wait(WRITE_INTERVAL)
+            self._wake.clear()
+            stop = self._drain()
+
+            now = time.monotonic()
+            if self.fsync_interval is not None and now - last_sync >= (
+                self.fsync_interval
+            ):
+                self._flush_file(sync=True)
+                last_sync = now
+            if stop:
+                return
+
+    def flush(self) -> None:
+        """Wait until everything queued so far is written to the file."""
+        if self._closed:
+            return
+        event = threading.Event()
+        self._queue.append((None, event))
+        self._wake.set()
+        event.wait()
+
+    def close(self) -> None:
+        """Write the remaining records, sync and close the capture file."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.append((None, None))
+        self._wake.set()
+        with self._space:
+            self._space.notify_all()
+        self._thread.join()
+
+        self._finish()
+        if self.dropped:
+            logger.warning(
+                "Capture records dropped", path=str(self.path), dropped=self.dropped
+            )
+
+
+class SegmentedCaptureWriter(CaptureWriter):
+    """Write a capture as rotating compressed segments of bounded total size.
+
+    Each segment in the directory is a complete capture compressed as one
+    gzip or xz stream, starting with the client records of every client seen
+    so far, so segments can be read on their own. A segment is closed once it
+    holds segment_size compressed bytes; before a new one is started, the
+    oldest segments are deleted to keep the directory within max_size.
+    Compression runs on the writer thread.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        segment_size: int = DEFAULT_SEGMENT_SIZE,
+        max_size: int = DEFAULT_MAX_CAPTURE_SIZE,
+        compression: Compression = Compression.ZLIB,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        fsync_interval: float | None = DEFAULT_FSYNC_INTERVAL,
+        policy: QueuePolicy = QueuePolicy.DROP,
+    ):
+        """Create the segment directory and start the writer thread.
+
+        Args:
+            directory: Directory for the segments
+            segment_size: Compressed bytes per segment at most
+            max_size: Compressed bytes of all segments at most
+            compression: Compression of the segments
+            queue_size: Records queued at most before the policy applies
+            fsync_interval: Seconds between syncs of the open segment, or None
+            policy: What to do with records while the queue is full
+        """
+        if segment_size <= 0:
+            raise ValueError("Segment size must be positive")
+        if max_size < segment_size:
+            raise ValueError("Capture size cap must hold at least one segment")
+
+        self.segment_size = segment_size
+        self.max_size = max_size
+        self.compression = compression
+        self.segments: deque[tuple[Path, int]] = deque()
+        """
+        Closed segments, oldest first, with their sizes
+        """
+        self.evicted = 0
+        super().__init__(directory, queue_size, fsync_interval, policy, index=False)
+
+    def _open(self) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        existing = capture_segments(self.path)
+        self.segments.extend((segment, segment.stat().st_size) for segment in existing)
+        self._next = _segment_number(existing[-1]) + 1 if existing else 0
+        self._client_records: list[bytes] = []
+        self._segment: BinaryIO | None = None
+        self._segment_path = self.path
+        self._segment_bytes = 0
+
+    @property
+    def size(self) -> int:
+        """Compressed bytes in the directory, the open segment included."""
+        return sum(size for _, size in list(self.segments)) + self._segment_bytes
+
+    def _emit(self, data: bytes) -> None:
+        if data:
+            assert self._segment is not None
+            self._segment.write(data)
+            self._segment_bytes += len(data)
+
+    def _start_segment(self) -> None:
+        closed = sum(size for _, size in self.segments)
+        while self.segments and closed + self.segment_size > self.max_size:
+            oldest, size = self.segments.popleft()
+            closed -= size
+            oldest.unlink(missing_ok=True)
+            self.evicted += 1
+            logger.info("Capture segment evicted", path=str(oldest))
+
+        suffix = SEGMENT_SUFFIXES[self.compression]
+        self._segment_path = self.path / f"segment_{self._next:06d}{suffix}"
+        self._next += 1
+        self._segment = open(self._segment_path, "wb", buffering=CAPTURE_BUFFER_SIZE)
+        self._segment_bytes = 0
+        if self.compression is Compression.LZMA:
+            self._compressor = lzma.LZMACompressor()
+        else:
+            # wbits 31: gzip framing
+            self._compressor = zlib.compressobj(wbits=31)
+        self._emit(
+            self._compressor.compress(CAPTURE_HEADER + b"".join(self._client_records))
+        )
+
+    def _end_segment(self) -> None:
+        assert self._segment is not None
+        self._emit(self._compressor.flush())
+        self._segment.flush()
+        if self.fsync_interval is not None:
+            os.fsync(self._segment.fileno())
+        self._segment.close()
+        self.segments.append((self._segment_path, self._segment_bytes))
+        self._segment = None
+        self._segment_bytes = 0
+
+    def _write(self, records: list[bytes]) -> None:
+        for record in records:
+            if self._segment is None:
+                self._start_segment()
+            if record[0] == CaptureRecordType.CLIENT:
+                self._client_records.append(record)
+            self._emit(self._compressor.compress(record))
+            if self._segment_bytes >= self.segment_size:
+                self._end_segment()
+
+    def _flush_file(self, sync: bool = False) -> None:
+        if self.error is not None or self._segment is None:
+            return
+        try:
+            if self.compression is Compression.ZLIB:
+                self._emit(self._compressor.flush(zlib.Z_SYNC_FLUSH))
+            elif not sync:
+                # An xz stream cannot be flushed without ending it
+                self._end_segment()
+                return
+            self._segment.flush()
+            if sync:
+                os.fsync(self._segment.fileno())
+        except OSError as e:
+            self.error = e
+            logger.error("Capture flush failed", path=str(self.path), error=str(e))
+
+    def _finish(self) -> None:
+        if self._segment is None:
+            return
+        try:
+            self._end_segment()
+        except OSError as e:
+            self.error = e
+            logger.error("Capture close failed", path=str(self.path), error=str(e))
+
+
+class FlightRecorder(CaptureSink):
+    """Keep the most recent records in memory and dump them on a trigger.
+
+    Records are kept in a ring buffer preallocated at start, evicting the
+    oldest ones to bound its size and, optionally, their age. Nothing touches
+    the filesystem until `trigger` writes the buffer to a capture file, which
+    happens on a background thread.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        capacity: int = DEFAULT_RING_SIZE,
+        max_age: float | None = DEFAULT_RING_SECONDS,
+        holdoff: float = DEFAULT_TRIGGER_HOLDOFF,
+    ):
+        """Initialize flight recorder.
+
+        Args:
+            directory: Directory to write dumps to; created on the first dump
+            capacity: Ring buffer size in bytes
+            max_age: Seconds of traffic to keep at most, or None for as much
+                as fits
+            holdoff: Seconds after a dump during which triggers are ignored,
+                so a burst of errors produces one dump
+        """
+        if capacity <= _RECORD.size:
+            raise ValueError(f"Ring buffer too small: {capacity} bytes")
+
+        super().__init__()
+        self.directory = directory
+        self.capacity = capacity
+        self.max_age = max_age
+        self.holdoff = holdoff
+        self.buffer = bytearray(capacity)
+        self.dumps: list[Path] = []
+
+        # Records in the ring, oldest first: (offset, size, timestamp)
+        self._entries: deque[tuple[int, int, int]] = deque()
+        self._head = 0
+        self._used = 0
+        self._lock = threading.Lock()
+        self._last_dump = -float("inf")
+        self._writers: list[threading.Thread] = []
+
+    def _evict(self, now: int, needed: int) -> None:
+        oldest = now - int(self.max_age * 1e9) if self.max_age is not None else None
+        while self._entries and (
+            self._used + needed > self.capacity
+            or (oldest is not None and self._entries[0][2] < oldest)
+        ):
+            _, size, _ = self._entries.popleft()
+            self._used -= size
+
+    def _put(self, kind: CaptureRecordType, timestamp: int, record: bytes) -> None:
+        # Client names are written at the start of every dump instead
+        if kind == CaptureRecordType.CLIENT:
+            return
+
+        size = len(record)
+        if size > self.capacity:
+            self.dropped += 1
+            return
+
+        with self._lock:
+            self._evict(timestamp, size)
+            head = self._head
+            end = head + size
+            if end <= self.capacity:
+                self.buffer[head:end] = record
+            else:
+                split = self.capacity - head
+                self.buffer[head:] = record[:split]
+                self.buffer[: size - split] = record[split:]
+            self._entries.append((head, size, timestamp))
+            self._head = end % self.capacity
+            self._used += size
+            self.counts[kind] += 1
+
+    def snapshot(self) -> bytes:
+        """Records currently in the ring, oldest first."""
+        with self._lock:
+            self._evict(time.time_ns(), 0)
+            chunks = []
+            for offset, size, _ in self._entries:
+                end = offset + size
+                if end <= self.capacity:
+                    chunks.append(self.buffer[offset:end])
+                else:
+                    chunks.append(self.buffer[offset:])
+                    chunks.append(self.buffer[: end - self.capacity])
+            return b"".join(chunks)
+
+    def trigger(self, reason: str) -> Path | None:
+        """Dump the ring to a new capture file in the background.
+
+        Args:
+            reason: Why the dump was triggered; part of the file name
+
+        Returns:
+            Path of the dump, or None if ignored during the holdoff
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_dump < self.holdoff:
+                return None
+            self._last_dump = now
+
+        records = self.snapshot()
+        clients = []
+        for name, index in list(self.clients.items()):
+            encoded = name.encode()
+            clients.append(pack_record(CaptureRecordType.CLIENT, 0, index, 0, encoded))
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        path = self.directory / f"flight_{stamp}_{reason}.bin"
+        self.dumps.append(path)
+
+        writer = threading.Thread(
+            target=self._write_dump,
+            args=(path, b"".join(clients) + records, reason),
+            name=f"flight-{reason}",
+            daemon=True,
+        )
+        self._writers = [thread for thread in self._writers if thread.is_alive()]
+        self._writers.append(writer)
+        writer.start()
+        return path
+
+    def _write_dump(self, path: Path, data: bytes, reason: str) -> None:
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(CAPTURE_HEADER)
+                f.write(data)
+            logger.info(
+                "Flight recorder dumped", path=str(path), reason=reason, size=len(data)
+            )
+        except OSError as e:
+            logger.error("Flight recorder dump failed", path=str(path), error=str(e))
+
+    def flush(self) -> None:
+        """Wait until triggered dumps are written."""
+        for writer in list(self._writers):
+            writer.join()
+
+    def close(self) -> None:
+        """Wait for pending dumps; the ring is discarded."""
+        self.flush()
+
+
+def _read_header(f: BinaryIO, path: Path) -> None:
+    header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise ValueError(f"Not a capture: {path}")
+    magic, version = _HEADER.unpack(header)
+    if magic != CAPTURE_MAGIC:
+        raise ValueError(f"Not a capture: {path}")
+    if version != CAPTURE_VERSION:
+        raise ValueError(f"Unsupported capture version {version}: {path}")
+
+
+def _read_record(f: BinaryIO, path: Path | str) -> bytes | None:
+    """Read the packed record at the file position; None at the end."""
+    header = f.read(_RECORD.size)
+    if not header:
+        return None
+    if len(header) < _RECORD.size:
+        logger.warning("Capture ends in a truncated record", path=str(path))
+        return None
+    size = _RECORD.unpack(header)[-1]
+    data = f.read(size)
+    if len(data) < size:
+        logger.warning("Capture ends in a truncated record", path=str(path))
+        return None
+    return header + data
+
+
+def _unpack_record(record: bytes, clients: dict[int, str]) -> CaptureRecord | None:
+    """Unpack a record; client records are added to clients instead."""
+    kind, code, client, timestamp, addr, chip, length, _ = _RECORD.unpack_from(record)
+    data = record[_RECORD.size :]
+    if kind == CaptureRecordType.CLIENT:
+        clients[client] = data.decode(errors="replace")
+        return None
+
+    return CaptureRecord(
+        type=CaptureRecordType(kind),
+        code=code,
+        client=clients.get(client, f"client{client}"),
+        timestamp=timestamp,
+        data=data,
+        addr=addr,
+        length=length,
+        chip=None if chip == NO_CHIP else chip,
+    )
+
+
+def read_records(
+    f: BinaryIO, source: Path | str, clients: dict[int, str] | None = None
+) -> Iterator[CaptureRecord]:
+    """Read the network and I2C records following a capture header.
+
+    Args:
+        f: Stream positioned after the capture header
+        source: Name of the stream for warnings
+        clients: Client names by index, extended by the client records read
+
+    Yields:
+        Records in capture order, until the stream or a truncated record ends
+    """
+    if clients is None:
+        clients = {}
+    while (record := _read_record(f, source)) is not None:
+        unpacked = _unpack_record(record, clients)
+        if unpacked is not None:
+            yield unpacked
+
+
+def capture_segments(directory: Path) -> list[Path]:
+    """Segments of a segmented capture, oldest first."""
+    return sorted(directory.glob("segment_*.bin*"), key=_segment_number)
+
+
+def _segment_number(path: Path) -> int:
+    return int(path.name.split(".")[0].removeprefix("segment_"))
+
+
+def _open_capture(path: Path) -> BinaryIO:
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")
+    if path.suffix == ".xz":
+        return lzma.open(path, "rb")
+    return open(path, "rb")
+
+
+def is_seekable(capture: Path) -> bool:
+    """Whether records of a capture can be read at their offsets."""
+    return capture.is_file() and capture.suffix not in (".gz", ".xz")
+
+
+def read_capture(path: Path) -> Iterator[CaptureRecord]:
+    """Read the network and I2C records of a capture.
+
+    The capture may be a file, a compressed segment or a directory of
+    segments, which are read one after another. A record cut off at the end,
+    e.g. by a crash, ends the capture or segment.
+
+    Args:
+        path: Capture file, segment or segment directory
+
+    Yields:
+        Records in capture order
+    """
+    segments = capture_segments(path) if path.is_dir() else [path]
+    clients: dict[int, str] = {}
+    for segment in segments:
+        if path.is_dir() and segment.stat().st_size == 0:
+            # Opened just before a crash
+            continue
+        with _open_capture(segment) as f:
+            try:
+                _read_header(f, segment)
+                yield from read_records(f, segment, clients)
+            except EOFError:
+                logger.warning("Capture segment ends early", path=str(segment))
+
+
+def index_path(capture: Path) -> Path:
+    """Path of the sidecar index of a capture."""
+    return capture.with_suffix(".idx")
+
+
+class CaptureIndexBuilder:
+    """Accumulate the index of a capture from its records in file order.
+
+    Postings are kept in memory up to max_postings, then appended to an
+    anonymous spill file in blocks and copied into the index when it is
+    written.
+    """
+
+    def __init__(
+        self,
+        bucket_ns: int = INDEX_BUCKET_NS,
+        max_postings: int = INDEX_MAX_POSTINGS,
+        spill_dir: Path | None = None,
+    ):
+        """Initialize builder.
+
+        Args:
+            bucket_ns: Width of the time buckets in nanoseconds
+            max_postings: Postings kept in memory at most
+            spill_dir: Directory of the spill file; the system temporary
+                directory, which may be in memory, by default
+        """
+        if max_postings <= 0:
+            raise ValueError("Postings kept in memory must be positive")
+        self.bucket_ns = bucket_ns
+        self.max_postings = max_postings
+        self.spill_dir = spill_dir
+        self.size = _HEADER.size
+        """
+        Capture bytes indexed so far
+        """
+        self.clients: dict[int, str] = {}
+        # Bucket -> [first record offset, end offset]; records of concurrent
+        # clients may be a little out of timestamp order, so spans can overlap
+        self.buckets: dict[int, list[int]] = {}
+        self.addresses: dict[int, array] = {}
+        self.client_records: dict[int, array] = {}
+        self._postings = 0
+        self._spill: BinaryIO | None = None
+        # (table, key) -> spill file offset and count of each spilled block,
+        # interleaved; table 0 for addresses and 1 for clients
+        self._spilled: dict[tuple[int, int], array] = {}
+
+    def add(self, record: bytes) -> None:
+        """Index the next record of the capture."""
+        kind, _, client, timestamp, addr, _, _, _ = _RECORD.unpack_from(record)
+        offset = self.size
+        self.size += len(record)
+        if kind == CaptureRecordType.CLIENT:
+            self.clients[client] = record[_RECORD.size :].decode(errors="replace")
+            return
+
+        span = self.buckets.get(timestamp // self.bucket_ns)
+        if span is None:
+            self.buckets[timestamp // self.bucket_ns] = [offset, self.size]
+        else:
+            span[0] = min(span[0], offset)
+            span[1] = self.size
+        if kind == CaptureRecordType.I2C:
+            self.addresses.setdefault(addr, array("Q")).append(offset)
+            self._postings += 1
+        self.client_records.setdefault(client, array("Q")).append(offset)
+        self._postings += 1
+        if self._postings >= self.max_postings:
+            self._spill_postings()
+
+    def _spill_postings(self) -> None:
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile(dir=self.spill_dir)
+        for table, postings_of in enumerate((self.addresses, self.client_records)):
+            for key, postings in postings_of.items():
+                if sys.byteorder != "little":
+                    postings.byteswap()
+                self._spilled.setdefault((table, key), array("Q")).extend(
+                    (self._spill.tell(), len(postings))
+                )
+                postings.tofile(self._spill)
+            postings_of.clear()
+        self._postings = 0
+
+    def _count(self, table: int, key: int, postings: array | None) -> int:
+        spilled = sum(self._spilled.get((table, key), array("Q"))[1::2])
+        return spilled + (len(postings) if postings is not None else 0)
+
+    def _copy_postings(
+        self, f: BinaryIO, table: int, key: int, postings: array | None
+    ) -> None:
+        blocks = self._spilled.get((table, key), array("Q"))
+        for position, count in zip(blocks[::2], blocks[1::2], strict=True):
+            assert self._spill is not None
+            self._spill.seek(position)
+            remaining = count * 8
+            while remaining:
+                chunk = self._spill.read(min(remaining, _SPILL_COPY_SIZE))
+                if not chunk:
+                    raise OSError("Index spill file ends early")
+                f.write(chunk)
+                remaining -= len(chunk)
+        if postings is not None:
+            if sys.byteorder != "little":
+                postings = array("Q", postings)
+                postings.byteswap()
+            postings.tofile(f)
+
+    def close(self) -> None:
+        """Delete the spill file."""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        self._spilled.clear()
+
+    def write(self, path: Path, capture_size: int) -> None:
+        """Write the index, replacing any previous one atomically.
+
+        Args:
+            path: Index file
+            capture_size: Size of the capture the index covers
+        """
+        clients = b"".join(
+            _INDEX_CLIENT.pack(index, len(encoded)) + encoded
+            for index, encoded in (
+                (index, name.encode()) for index, name in sorted(self.clients.items())
+            )
+        )
+        buckets = b"".join(
+            _INDEX_BUCKET.pack(bucket, first, end)
+            for bucket, (first, end) in sorted(self.buckets.items())
+        )
+        tables = [
+            sorted(
+                (key, postings_of.get(key))
+                for key in {
+                    *postings_of,
+                    *(key for spilled, key in self._spilled if spilled == table),
+                }
+            )
+            for table, postings_of in enumerate((self.addresses, self.client_records))
+        ]
+        addresses, client_records = tables
+
+        offset = (
+            _INDEX_HEADER.size
+            + len(clients)
+            + len(buckets)
+            + _INDEX_POSTINGS.size * (len(addresses) + len(client_records))
+        )
+        padding = -offset % 8
+        offset += padding
+        entries = []
+        for table, items in enumerate(tables):
+            for key, postings in items:
+                count = self._count(table, key, postings)
+                entries.append(_INDEX_POSTINGS.pack(key, offset, count))
+                offset += 8 * count
+
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(
+                _INDEX_HEADER.pack(
+                    INDEX_MAGIC,
+                    INDEX_VERSION,
+                    self.bucket_ns,
+                    capture_size,
+                    len(self.clients),
+                    len(self.buckets),
+                    len(addresses),
+                    len(client_records),
+                )
+            )
+            f.write(clients)
+            f.write(buckets)
+            f.write(b"".join(entries))
+            f.write(bytes(padding))
+            for table, items in enumerate(tables):
+                for key, postings in items:
+                    self._copy_postings(f, table, key, postings)
+        os.replace(tmp, path)
+
+
+def build_index(capture: Path, max_postings: int = INDEX_MAX_POSTINGS) -> Path:
+    """Index a capture by reading it once, e.g. after a crash or flight dump.
+
+    Args:
+        capture: Capture file
+        max_postings: Postings kept in memory at most while indexing
+
+    Returns:
+        Path of the written index
+    """
+    if not is_seekable(capture):
+        raise ValueError(f"Only uncompressed capture files can be indexed: {capture}")
+
+    builder = CaptureIndexBuilder(max_postings=max_postings, spill_dir=capture.parent)
+    try:
+        with open(capture, "rb") as f:
+            _read_header(f, capture)
+            while (record := _read_record(f, capture)) is not None:
+                builder.add(record)
+            size = f.seek(0, os.SEEK_END)
+        path = index_path(capture)
+        builder.write(path, size)
+    finally:
+        builder.close()
+    return path
+
+
+class CaptureIndex:
+    """Sidecar index of a capture, mapped into memory.
+
+    Only the tables are parsed on open; postings are used in place from the
+    mapped file, so opening is fast whatever the capture size.
+    """
+
+    def __init__(self, path: Path):
+        """Open an index.
+
+        Args:
+            path: Index file
+        """
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse(path)
+        except (struct.error, ValueError):
+            self._map.close()
+            raise
+
+    def _parse(self, path: Path) -> None:
+        (
+            magic,
+            version,
+            self.bucket_ns,
+            self.capture_size,
+            n_clients,
+            n_buckets,
+            n_addresses,
+            n_clients_postings,
+        ) = _INDEX_HEADER.unpack_from(self._map)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"Not a capture index: {path}")
+
+        offset = _INDEX_HEADER.size
+        self.clients: dict[int, str] = {}
+        for _ in range(n_clients):
+            index, length = _INDEX_CLIENT.unpack_from(self._map, offset)
+            offset += _INDEX_CLIENT.size
+            self.clients[index] = self._map[offset : offset + length].decode(
+                errors="replace"
+            )
+            offset += length
+
+        self._bucket_keys: list[int] = []
+        self._bucket_spans: list[tuple[int, int]] = []
+        for bucket, first, end in _INDEX_BUCKET.iter_unpack(
+            self._map[offset : offset + _INDEX_BUCKET.size * n_buckets]
+        ):
+            self._bucket_keys.append(bucket)
+            self._bucket_spans.append((first, end))
+        offset += _INDEX_BUCKET.size * n_buckets
+
+        tables = list(
+            _INDEX_POSTINGS.iter_unpack(
+                self._map[
+                    offset : offset
+                    + _INDEX_POSTINGS.size * (n_addresses + n_clients_postings)
+                ]
+            )
+        )
+        self.addresses = {
+            key: (start, count) for key, start, count in tables[:n_addresses]
+        }
+        self.client_records = {
+            key: (start, count) for key, start, count in tables[n_addresses:]
+        }
+        self._address_keys = sorted(self.addresses)
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __enter__(self) -> "CaptureIndex":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def _postings(self, table: tuple[int, int], low: int, high: int) -> array:
+        """Copy out the offsets of a postings list within [low, high)."""
+        start, count = table
+        if sys.byteorder != "little":
+            postings = array("Q", self._map[start : start + 8 * count])
+            postings.byteswap()
+            return postings[bisect_left(postings, low) : bisect_left(postings, high)]
+        # Search in place and copy out only the range; the views are released
+        # so the map can be closed
+        with memoryview(self._map) as view:
+            with view[start : start + 8 * count].cast("Q") as postings:
+                first = bisect_left(postings, low)
+                last = bisect_left(postings, high)
+        result = array("Q")
+        result.frombytes(self._map[start + 8 * first : start + 8 * last])
+        return result
+
+    def span(self, start: int | None, end: int | None) -> tuple[int, int]:
+        """Capture byte range holding the records of a time window.
+
+        Args:
+            start: First timestamp in nanoseconds, or None
+            end: Last timestamp in nanoseconds, or None
+
+        Returns:
+            Offsets of the first record and after the last one
+        """
+        first = (
+            0
+            if start is None
+            else bisect_left(self._bucket_keys, start // self.bucket_ns)
+        )
+        last = (
+            len(self._bucket_keys)
+            if end is None
+            else bisect_right(self._bucket_keys, end // self.bucket_ns)
+        )
+        if first >= last:
+            return 0, 0
+        spans = self._bucket_spans[first:last]
+        return min(span[0] for span in spans), max(span[1] for span in spans)
+
+    def address_records(
+        self, addr_min: int, addr_max: int, low: int, high: int
+    ) -> list[array]:
+        """Offsets within [low, high) of the I2C records of each address in a range."""
+        keys = self._address_keys[
+            bisect_left(self._address_keys, addr_min) : bisect_right(
+                self._address_keys, addr_max
+            )
+        ]
+        return [self._postings(self.addresses[key], low, high) for key in keys]
+
+    def records_of(self, clients: Iterable[str], low: int, high: int) -> list[array]:
+        """Offsets within [low, high) of the records of each named client."""
+        wanted = set(clients)
+        return [
+            self._postings(self.client_records[index], low, high)
+            for index, name in self.clients.items()
+            if name in wanted and index in self.client_records
+        ]
+
+
+def open_index(capture: Path) -> CaptureIndex:
+    """Open the index of a capture, building it first if missing or stale.
+
+    Args:
+        capture: Capture file
+
+    Returns:
+        Index covering the whole capture
+    """
+    path = index_path(capture)
+    size = capture.stat().st_size
+    if path.exists():
+        try:
+            index = CaptureIndex(path)
+        except (struct.error, ValueError):
+            logger.warning("Capture index unreadable, rebuilding", path=str(path))
+        else:
+            if index.capture_size == size:
+                return index
+            index.close()
+            logger.info("Capture index stale, rebuilding", path=str(path))
+    return CaptureIndex(build_index(capture))
+
+
+@dataclass(frozen=True)
+class CaptureQuery:
+    """Filter of capture records; fields left None match everything."""
+
+    start: int | None = None
+    """
+    First timestamp in nanoseconds since the epoch
+    """
+    end: int | None = None
+    """
+    Last timestamp in nanoseconds since the epoch
+    """
+    addr_min: int | None = None
+    """
+    Lowest I2C register address; an address range selects I2C records only
+    """
+    addr_max: int | None = None
+    clients: frozenset[str] | None = None
+    code: Direction | Operation | None = None
+    """
+    Direction of network records or operation of I2C records
+    """
+    chip: int | None = None
+    """
+    Protocol chip address; a chip selects I2C records only
+    """
+
+    @property
+    def by_address(self) -> bool:
+        return self.addr_min is not None or self.addr_max is not None
+
+    def matches(self, record: CaptureRecord) -> bool:
+        if self.start is not None and record.timestamp < self.start:
+            return False
+        if self.end is not None and record.timestamp > self.end:
+            return False
+        if self.clients is not None and record.client not in self.clients:
+            return False
+        if self.by_address:
+            if record.type != CaptureRecordType.I2C:
+                return False
+            if not (
+                (self.addr_min or 0)
+                <= record.addr
+                <= (0xFFFF if self.addr_max is None else self.addr_max)
+            ):
+                return False
+        if self.chip is not None and (
+            record.type != CaptureRecordType.I2C or record.chip != self.chip
+        ):
+            return False
+        if self.code is not None:
+            wanted = (
+                CaptureRecordType.NETWORK
+                if isinstance(self.code, Direction)
+                else CaptureRecordType.I2C
+            )
+            if record.type != wanted or record.code != self.code:
+                return False
+        return True
+
+
+def query_capture(capture: Path, query: CaptureQuery) -> Iterator[CaptureRecord]:
+    """Find the records of a capture matching a query using its index.
+
+    The time window narrows the capture to the byte range of its buckets. An
+    address range or client filter then visits only the records in their
+    postings, seeking to each; otherwise the range is read sequentially.
+
+    Args:
+        capture: Capture file
+        query: Filter
+
+    Yields:
+        Matching records in capture order
+    """
+    if not is_seekable(capture):
+        # Compressed segments are read through, filtering on the way
+        yield from (record for record in read_capture(capture) if query.matches(record))
+        return
+
+    with open_index(capture) as index, open(capture, "rb") as f:
+        clients = dict(index.clients)
+        low, high = index.span(query.start, query.end)
+        if low >= high:
+            return
+
+        postings: list[array] | None = None
+        if query.by_address:
+            postings = index.address_records(
+                query.addr_min or 0,
+                0xFFFF if query.addr_max is None else query.addr_max,
+                low,
+                high,
+            )
+        elif query.clients is not None:
+            postings = index.records_of(query.clients, low, high)
+
+        if postings is None:
+            f.seek(low)
+            while f.tell() < high and (record := _read_record(f, capture)):
+                unpacked = _unpack_record(record, clients)
+                if unpacked is not None and query.matches(unpacked):
+                    yield unpacked
+            return
+
+        for offset in heapq.merge(*postings):
+            f.seek(offset)
+            record = _read_record(f, capture)
+            if record is None:
+                return
+            unpacked = _unpack_record(record, clients)
+            if unpacked is not None and query.matches(unpacked):
+                yield unpacked
+
+
+def format_record(record: CaptureRecord) -> str:
+    """Format a record as a line of the network or I2C text log."""
+    timestamp = record.time.isoformat()
+    if record.type == CaptureRecordType.NETWORK:
+        return (
+            f"{timestamp} {record.client} {record.direction.name} "
+            f"len={len(record.data)} data={record.data.hex()}"
+        )
+    return (
+        f"{timestamp} {record.client} {record.operation.name} "
+        f"addr=0x{record.addr:04X} len={record.length} data={record.data.hex()}"
+    )
+
+
+def write_text_logs(capture: Path, output_dir: Path) -> tuple[Path, Path]:
+    """Generate network.log and i2c.log from a capture.
+
+    Args:
+        capture: Capture file
+        output_dir: Directory to write the logs to
+
+    Returns:
+        Paths of the network and I2C logs
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    network_log = output_dir / "network.log"
+    i2c_log = output_dir / "i2c.log"
+    with open(network_log, "w") as network, open(i2c_log, "w") as i2c:
+        for record in read_capture(capture):
+            log = network if record.type == CaptureRecordType.NETWORK else i2c
+            log.write(format_record(record) + "\n")
+    return network_log, i2c_log
@@ -0,0 +1,342 @@
+"""Filter expressions selecting which traffic the protocol dumper keeps.
+
+An expression combines primitives with `and`, `or`, `not` and parentheses,
+`not` binding tightest and `or` loosest:
+
+    addr 0xF000-0xFFFF and not dir rx_raw
+    chip 1,2 or (i2c and size > 64)
+
+Primitives, with comma-separated lists matching any of their values:
+
+    addr N[-M],...      register address of the request or transaction
+    chip N,...          protocol chip address
+    dir D,...           network direction: rx, tx, rx_raw or rx_decoded
+    op O,...            I2C operation: read, write or safeload
+    client C,...        client host, or host:port ([host]:port for IPv6)
+    size OP N           payload bytes compared with <, <=, >, >=, == or !=
+    net                 network packets
+    i2c                 I2C transactions
+
+`dir` only matches network packets and `op` only I2C transactions. The
+address and chip of network packets are taken from the header of the first
+packet in the data; data without a complete header matches neither.
+
+An expression is compiled once into two Python functions, one per record
+type, with terms that cannot match the record type folded away and the
+packet header only decoded when the expression looks at it.
+"""
+
+import re
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import NoReturn
+
+from tcp_i2c_bridge.capture import Direction, Operation
+from tcp_i2c_bridge.protocol import Command
+from tcp_i2c_bridge.protocol import Read as NetworkRead
+from tcp_i2c_bridge.protocol import Write as NetworkWrite
+
+NetworkPredicate = Callable[[str, str, bytes], bool]
+"""
+Called with the client, direction name and packet data
+"""
+I2CPredicate = Callable[[str, str, int, "int | None", int], bool]
+"""
+Called with the client, operation name, address, chip address and length
+"""
+
+_TOKEN = re.compile(r"\s*(?:(\(|\)|<=|>=|==|!=|<|>)|([^\s()<>=!]+))")
+_COMPARISONS = ("<", "<=", ">", ">=", "==", "!=")
+_KEYWORDS = ("and", "or", "not")
+
+
+def network_fields(data: bytes) -> tuple[int | None, int | None]:
+    """Address and chip address from the header of the first packet in data.
+
+    Returns:
+        (address, chip address), or (None, None) without a complete header
+    """
+    if not data:
+        return None, None
+    if data[0] == Command.WRITE_REQUEST and len(data) >= NetworkWrite.Request.SIZE:
+        return data[12] << 8 | data[13], data[7]
+    if data[0] == Command.READ_REQUEST and len(data) >= NetworkRead.Request.SIZE:
+        return data[10] << 8 | data[11], data[5]
+    if data[0] == Command.READ_RESPONSE and len(data) >= NetworkRead.Response.SIZE:
+        return data[10] << 8 | data[11], data[5]
+    return None, None
+
+
+@dataclass(frozen=True)
+class _Term:
+    """Primitive of an expression."""
+
+    field: str
+    values: tuple = ()
+    """
+    Addresses as (low, high) ranges, other fields as values
+    """
+
+
+@dataclass(frozen=True)
+class _Not:
+    operand: "_Node"
+
+
+@dataclass(frozen=True)
+class _Junction:
+    operator: str
+    """
+    "and" or "or"
+    """
+    operands: "tuple[_Node, ...]"
+
+
+_Node = _Term | _Not | _Junction
+
+
+class _Parser:
+    """Recursive descent parser of filter expressions."""
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.tokens: list[str] = []
+        position = 0
+        while expression[position:].strip():
+            match = _TOKEN.match(expression, position)
+            if match is None:
+                self.error(f"unexpected {expression[position:].strip()[0]!r}")
+            self.tokens.append(match.group(1) or match.group(2))
+            position = match.end()
+        self.position = 0
+
+    def error(self, message: str) -> NoReturn:
+        raise ValueError(f"Invalid capture filter {self.expression!r}: {message}")
+
+    def peek(self) -> str | None:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def take(self, what: str) -> str:
+        token = self.peek()
+        if token is None:
+            self.error(f"expected {what} at end")
+        self.position += 1
+        return token
+
+    def parse(self) -> _Node:
+        if not self.tokens:
+            self.error("empty expression")
+        node = self.parse_or()
+        if self.peek() is not None:
+            self.error(f"unexpected {self.peek()!r}")
+        return node
+
+    def parse_or(self) -> _Node:
+        operands = [self.parse_and()]
+        while self.peek() == "or":
+            self.position += 1
+            operands.append(self.parse_and())
+        return operands[0] if len(operands) == 1 else _Junction("or", tuple(operands))
+
+    def parse_and(self) -> _Node:
+        operands = [self.parse_not()]
+        while self.peek() == "and":
+            self.position += 1
+            operands.append(self.parse_not())
+        return operands[0] if len(operands) == 1 else _Junction("and", tuple(operands))
+
+    def parse_not(self) -> _Node:
+        token = self.take("a primitive")
+        if token == "not":
+            return _Not(self.parse_not())
+        if token == "(":
+            node = self.parse_or()
+            if self.take("')'") != ")":
+                self.error("expected ')'")
+            return node
+        return self.parse_primitive(token)
+
+    def parse_primitive(self, field: str) -> _Node:
+        if field in ("net", "i2c"):
+            return _Term(field)
+        if field == "size":
+            comparison = self.take("a comparison")
+            if comparison not in _COMPARISONS:
+                self.error(f"expected a comparison after 'size', got {comparison!r}")
+            return _Term(field, (comparison, self.number(self.value(field), None)))
+        if field not in ("addr", "chip", "dir", "op", "client"):
+            self.error(f"unknown primitive {field!r}")
+
+        items = self.value(field).split(",")
+        if field == "addr":
+            return _Term(field, tuple(self.addr_range(item) for item in items))
+        if field == "chip":
+            return _Term(field, tuple(self.number(item, 0xFF) for item in items))
+        if field == "dir":
+            return _Term(field, tuple(self.member(Direction, item) for item in items))
+        if field == "op":
+            return _Term(field, tuple(self.member(Operation, item) for item in items))
+        return _Term(field, tuple(self.client(item) for item in items))
+
+    def value(self, field: str) -> str:
+        value = self.take(f"a value after {field!r}")
+        if value in _KEYWORDS or value in ("(", ")") or value in _COMPARISONS:
+            self.error(f"expected a value after {field!r}, got {value!r}")
+        return value
+
+    def number(self, value: str, maximum: int | None) -> int:
+        try:
+            number = int(value, 0)
+        except ValueError:
+            self.error(f"invalid number {value!r}")
+        if number < 0 or (maximum is not None and number > maximum):
+            self.error(f"number out of range: {value}")
+        return number
+
+    def addr_range(self, value: str) -> tuple[int, int]:
+        low, _, high = value.partition("-")
+        start = self.number(low, 0xFFFF)
+        end = self.number(high, 0xFFFF) if high else start
+        if end < start:
+            self.error(f"empty address range {value!r}")
+        return start, end
+
+    def member(self, enum: type[Direction] | type[Operation], value: str) -> str:
+        name = value.upper()
+        if name not in enum.__members__:
+            names = ", ".join(member.name.lower() for member in enum)
+            self.error(f"unknown {enum.__name__.lower()} {value!r} ({names})")
+        return name
+
+    def client(self, value: str) -> tuple[str, str | None]:
+        """Split into (host, port); the port is None for whole hosts."""
+        if value.startswith("["):
+            host, bracket, port = value[1:].partition("]")
+            if not bracket or (port and not (port[:1] == ":" and port[1:].isdigit())):
+                self.error(f"invalid client {value!r}")
+            return host, port[1:] or None
+        if value.count(":") > 1:
+            # A bare IPv6 address; its port would be ambiguous
+            return value, None
+        host, colon, port = value.partition(":")
+        if not colon:
+            return value, None
+        if not host or not port.isdigit():
+            self.error(f"invalid client {value!r}, expected host:port or [host]:port")
+        return host, port
+
+
+class CaptureFilter:
+    """Compiled filter expression.
+
+    `network` and `i2c` are the predicates the protocol dumper calls before
+    anything else for every network packet and I2C transaction.
+    """
+
+    def __init__(self, expression: str):
+        """Parse and compile an expression.
+
+        Args:
+            expression: Filter expression, see the module documentation
+
+        Raises:
+            ValueError: If the expression is invalid
+        """
+        self.expression = expression
+        node = _Parser(expression).parse()
+
+        self.constants: dict[str, object] = {"network_fields": network_fields}
+        network = self._emit(node, "net")
+        i2c = self._emit(node, "i2c")
+
+        fields = "    addr, chip = network_fields(data)\n"
+        self.source = (
+            "def network(client, direction, data):\n"
+            + (fields if re.search(r"\b(addr|chip)\b", str(network)) else "")
+            + f"    return {network}\n"
+            "def i2c(client, operation, addr, chip, size):\n"
+            f"    return {i2c}\n"
+        )
+        namespace = dict(self.constants)
+        exec(
+            compile(self.source, f"<capture filter {expression!r}>", "exec"), namespace
+        )
+        self.network: NetworkPredicate = namespace["network"]
+        self.i2c: I2CPredicate = namespace["i2c"]
+
+    def __repr__(self) -> str:
+        return f"CaptureFilter({self.expression!r})"
+
+    def _constant(self, value: object) -> str:
+        name = f"_c{len(self.constants)}"
+        self.constants[name] = value
+        return name
+
+    def _emit(self, node: _Node, kind: str) -> str | bool:
+        """Python expression of a node for one record type.
+
+        Returns:
+            Source of the expression, or True or False if it is constant for
+            records of the type
+        """
+        if isinstance(node, _Not):
+            operand = self._emit(node.operand, kind)
+            if isinstance(operand, bool):
+                return not operand
+            return f"not ({operand})"
+
+        if isinstance(node, _Junction):
+            # and: False wins and True drops out, or: the other way round
+            absorbing = node.operator == "or"
+            operands = []
+            for operand in node.operands:
+                emitted = self._emit(operand, kind)
+                if emitted is absorbing:
+                    return absorbing
+                if not isinstance(emitted, bool):
+                    operands.append(f"({emitted})")
+            if not operands:
+                return not absorbing
+            return f" {node.operator} ".join(operands)
+
+        return self._emit_term(node, kind)
+
+    def _emit_term(self, term: _Term, kind: str) -> str | bool:
+        size = "len(data)" if kind == "net" else "size"
+        if term.field in ("net", "i2c"):
+            return term.field == kind
+        if term.field == "dir":
+            if kind != "net":
+                return False
+            return f"direction in {self._constant(frozenset(term.values))}"
+        if term.field == "op":
+            if kind != "i2c":
+                return False
+            return f"operation in {self._constant(frozenset(term.values))}"
+        if term.field == "size":
+            comparison, value = term.values
+            return f"{size} {comparison} {value}"
+        if term.field == "chip":
+            return f"chip in {self._constant(frozenset(term.values))}"
+        if term.field == "addr":
+            ranges = [
+                f"addr == {start}" if start == end else f"{start} <= addr <= {end}"
+                for start, end in term.values
+            ]
+            if kind != "net":
+                return " or ".join(ranges)
+            return f"addr is not None and ({' or '.join(ranges)})"
+
+        # client
+        clients = {f"{host}:{port}" for host, port in term.values if port}
+        hosts = {host for host, port in term.values if not port}
+        tests = []
+        if clients:
+            tests.append(f"client in {self._constant(frozenset(clients))}")
+        if hosts:
+            tests.append(
+                f"client.rpartition(':')[0] in {self._constant(frozenset(hosts))}"
+            )
+        return " or ".join(tests)
@@ -0,0 +1,362 @@
+"""Live capture tap streaming bridge traffic to remote subscribers.
+
+Subscribers connect over TCP and send one line: a capture filter expression,
+or an empty line for all traffic. The tap answers with a capture stream, the
+capture header followed by records in the capture file format, each client
+named in a client record before its first record. Saved to a file, the stream
+is a capture. An invalid expression is answered with an error line instead,
+and the connection is closed.
+
+Records are handed to the tap on the request path, matched against the filter
+of every subscriber and queued without waiting. Each subscriber has a bounded
+queue drained by its own task; while the queue of a slow subscriber is full,
+its records are dropped and counted instead of backing up requests.
+"""
+
+import asyncio
+import socket
+import time
+from collections.abc import Iterator
+from typing import BinaryIO
+
+import structlog
+
+from tcp_i2c_bridge.capture import (
+    CAPTURE_HEADER,
+    CaptureRecord,
+    CaptureRecordType,
+    Direction,
+    Operation,
+    pack_record,
+    read_records,
+)
+from tcp_i2c_bridge.capture_filter import CaptureFilter
+
+logger = structlog.get_logger()
+
+DEFAULT_TAP_PORT = 8087
+
+# Records queued per subscriber at most
+DEFAULT_TAP_QUEUE_SIZE = 4096
+
+# Seconds a subscriber has to send its filter expression
+HANDSHAKE_TIMEOUT = 5.0
+
+# Records written to a subscriber per write call at most
+TAP_WRITE_BATCH = 256
+
+
+class TapSubscriber:
+    """Remote subscriber of a capture tap."""
+
+    def __init__(
+        self,
+        name: str,
+        writer: asyncio.StreamWriter,
+        capture_filter: CaptureFilter | None,
+        queue_size: int,
+    ):
+        """Initialize subscriber.
+
+        Args:
+            name: Peer address of the subscriber
+            writer: Stream to the subscriber
+            capture_filter: Filter of the records to send, or None for all
+            queue_size: Records queued for the subscriber at most
+        """
+        self.name = name
+        self.writer = writer
+        self.capture_filter = capture_filter
+        self.queue: asyncio.Queue[bytes] = asyncio.Queue(queue_size)
+        self.sent = 0
+        self.dropped = 0
+        # Clients whose client record the subscriber has been sent
+        self._clients: set[int] = set()
+
+    def offer(self, client: int, client_record: bytes, record: bytes) -> None:
+        """Queue a record, or drop it if the queue is full."""
+        if client not in self._clients:
+            record = client_record + record
+        try:
+            self.queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return
+        self._clients.add(client)
+
+    async def run(self) -> None:
+        """Send the capture header and then queued records until cancelled."""
+        self.writer.write(CAPTURE_HEADER)
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < TAP_WRITE_BATCH and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            self.writer.write(b"".join(batch))
+            await self.writer.drain()
+            self.sent += len(batch)
+
+
+class CaptureTap:
+    """TCP server streaming filtered capture records to subscribers."""
+
+    def __init__(
+        self,
+        host: str = "0.0.0.0",
+        port: int = DEFAULT_TAP_PORT,
+        queue_size: int = DEFAULT_TAP_QUEUE_SIZE,
+    ):
+        """Initialize capture tap.
+
+        Args:
+            host: Host to bind to
+            port: Port to bind to; 0 picks a free port
+            queue_size: Records queued per subscriber at most
+        """
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.subscribers: list[TapSubscriber] = []
+        self.server: asyncio.Server | None = None
+        self.clients: dict[str, int] = {}
+        self._client_records: list[bytes] = []
+        # Handler task of every open connection, with its stream
+        self._connections: dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    async def start(self) -> None:
+        """Start accepting subscribers."""
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        logger.info("Capture tap started", host=self.host, port=self.port)
+
+    async def stop(self) -> None:
+        """Stop accepting subscribers and disconnect all."""
+        if self.server is None:
+            return
+        self.server.close()
+        # Handlers see the end of their connection and return
+        for writer in self._connections.values():
+            writer.close()
+        if self._connections:
+            await asyncio.gather(*self._connections, return_exceptions=True)
+        await self.server.wait_closed()
+        self.server = None
+        logger.info("Capture tap stopped")
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = asyncio.current_task()
+        assert task is not None
+        self._connections[task] = writer
+        peer = writer.get_extra_info("peername")
+        name = f"{peer[0]}:{peer[1]}" if peer else "unknown"
+        subscriber = None
+        try:
+            try:
+                line = await asyncio.wait_for(reader.readline(), HANDSHAKE_TIMEOUT)
+            except (TimeoutError, ValueError, ConnectionError):
+                line = b""
+            if not line.endswith(b"\n"):
+                logger.warning("Tap subscriber sent no filter", subscriber=name)
+                return
+
+            expression = line.decode(errors="replace").strip()
+            try:
+                capture_filter = CaptureFilter(expression) if expression else None
+            except ValueError as e:
+                writer.write(f"{e}\n".encode())
+                await writer.drain()
+                return
+
+            subscriber = TapSubscriber(name, writer, capture_filter, self.queue_size)
+            self.subscribers.append(subscriber)
+            logger.info(
+                "Tap subscriber connected", subscriber=name, capture_filter=expression
+            )
+            await self._serve(subscriber, reader)
+        except OSError:
+            # Hung up while records were sent
+            pass
+        finally:
+            if subscriber is not None:
+                self.subscribers.remove(subscriber)
+                logger.info(
+                    "Tap subscriber disconnected",
+                    subscriber=name,
+                    sent=subscriber.sent,
+                    dropped=subscriber.dropped,
+                )
+            writer.close()
+            del self._connections[task]
+
+    async def _serve(
+        self, subscriber: TapSubscriber, reader: asyncio.StreamReader
+    ) -> None:
+        """Send records until the subscriber hangs up, even while idle."""
+        sender = asyncio.create_task(subscriber.run())
+        hangup = asyncio.create_task(_hangup(reader))
+        try:
+            await asyncio.wait({sender, hangup}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            sender.cancel()
+            hangup.cancel()
+            await asyncio.wait({sender, hangup})
+            error = None if sender.cancelled() else sender.exception()
+        if error is not None:
+            raise error
+
+    def _client(self, client_id: str) -> int:
+        index = self.clients.get(client_id)
+        if index is None:
+            index = len(self.clients)
+            self.clients[client_id] = index
+            self._client_records.append(
+                pack_record(CaptureRecordType.CLIENT, 0, index, 0, client_id.encode())
+            )
+        return index
+
+    def _publish(
+        self,
+        subscribers: list[TapSubscriber],
+        client_id: str,
+        kind: CaptureRecordType,
+        code: int,
+        data: bytes,
+        addr: int = 0,
+        length: int = 0,
+        chip: int | None = None,
+    ) -> None:
+        client = self._client(client_id)
+        record = pack_record(
+            kind, code, client, time.time_ns(), data, addr, length, chip
+        )
+        for subscriber in subscribers:
+            subscriber.offer(client, self._client_records[client], record)
+
+    def network(self, client_id: str, direction: str, data: bytes) -> None:
+        """Stream a network packet to the subscribers whose filter matches.
+
+        Args:
+            client_id: Client identifier
+            direction: "RX", "TX", "RX_RAW" or "RX_DECODED"
+            data: Raw packet data
+        """
+        if not self.subscribers:
+            return
+        subscribers = [
+            subscriber
+            for subscriber in self.subscribers
+            if subscriber.capture_filter is None
+            or subscriber.capture_filter.network(client_id, direction, data)
+        ]
+        if subscribers:
+            self._publish(
+                subscribers,
+                client_id,
+                CaptureRecordType.NETWORK,
+                Direction[direction],
+                data,
+            )
+
+    def i2c(
+        self,
+        client_id: str,
+        operation: str,
+        addr: int,
+        length: int,
+        data: bytes,
+        chip: int | None = None,
+    ) -> None:
+        """Stream an I2C transaction to the subscribers whose filter matches.
+
+        Args:
+            client_id: Client identifier
+            operation: "READ", "WRITE" or "SAFELOAD"
+            addr: I2C register address
+            length: Transaction length
+            data: Transaction data
+            chip: Protocol chip address
+        """
+        if not self.subscribers:
+            return
+        subscribers = [
+            subscriber
+            for subscriber in self.subscribers
+            if subscriber.capture_filter is None
+            or subscriber.capture_filter.i2c(client_id, operation, addr, chip, length)
+        ]
+        if subscribers:
+            self._publish(
+                subscribers,
+                client_id,
+                CaptureRecordType.I2C,
+                Operation[operation],
+                data,
+                addr,
+                length,
+                chip,
+            )
+
+
+async def _hangup(reader: asyncio.StreamReader) -> None:
+    """Wait until the peer closes; subscribers send nothing after the filter."""
+    try:
+        while await reader.read(4096):
+            pass
+    except OSError:
+        pass
+
+
+def open_tap(
+    host: str,
+    port: int = DEFAULT_TAP_PORT,
+    expression: str = "",
+    timeout: float = HANDSHAKE_TIMEOUT,
+) -> BinaryIO:
+    """Subscribe to a capture tap.
+
+    Args:
+        host: Host of the bridge
+        port: Port of its capture tap
+        expression: Capture filter expression, or empty for all traffic
+        timeout: Seconds to wait for the connection and the capture header
+
+    Returns:
+        Capture stream positioned after the capture header
+
+    Raises:
+        ValueError: If the tap refused the expression
+        OSError: If the tap cannot be reached
+    """
+    sock = socket.create_connection((host, port), timeout=timeout)
+    # Closing the socket leaves it open until the stream is closed as well
+    with sock:
+        sock.sendall(expression.encode() + b"\n")
+        stream = sock.makefile("rb")
+        try:
+            header = stream.read(len(CAPTURE_HEADER))
+            if header != CAPTURE_HEADER:
+                message = (header + stream.readline()).decode(errors="replace")
+                raise ValueError(message.strip() or f"No capture tap at {host}:{port}")
+        except BaseException:
+            stream.close()
+            raise
+        sock.settimeout(None)
+    return stream
+
+
+def subscribe(
+    host: str, port: int = DEFAULT_TAP_PORT, expression: str = ""
+) -> Iterator[CaptureRecord]:
+    """Records streamed by a capture tap, until it disconnects.
+
+    Args:
+        host: Host of the bridge
+        port: Port of its capture tap
+        expression: Capture filter expression, or empty for all traffic
+
+    Yields:
+        Network and I2C records as the bridge dumps them
+    """
+    with open_tap(host, port, expression) as stream:
+        yield from read_records(stream, f"{host}:{port}")
@@ -1,6 +1,9 @@
 """Command-line interface for TCP-I2C bridge."""
 
 import asyncio
+import sys
+from collections import Counter
+from datetime import datetime
 from pathlib import Path
 
 import typer
@@ -8,9 +11,94 @@ from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
 
-from tcp_i2c_bridge.app import TCPBridgeApp
+from tcp_i2c_bridge.app import I2C_BACKENDS, TCPBridgeApp
+from tcp_i2c_bridge.boot_image import (
+    DEFAULT_DELAY_THRESHOLD,
+    compile_boot_image,
+    write_boot_image,
+)
+from tcp_i2c_bridge.broker import (
+    BROKER_MAX_MSG_LEN,
+    BusAdapter,
+    DeviceAdapter,
+    I2CBroker,
+    SMBusAdapter,
+)
+from tcp_i2c_bridge.capture import (
+    CAPTURE_BUFFER_SIZE,
+    CAPTURE_HEADER,
+    DEFAULT_MAX_CAPTURE_SIZE,
+    CaptureQuery,
+    Compression,
+    Direction,
+    Operation,
+    build_index,
+    format_record,
+    query_capture,
+    read_capture,
+    read_records,
+    write_text_logs,
+)
+from tcp_i2c_bridge.capture_filter import CaptureFilter
+from tcp_i2c_bridge.capture_tap import DEFAULT_TAP_PORT, open_tap
+from tcp_i2c_bridge.device_sim import adau1452_device
+from tcp_i2c_bridge.i2c_backend import AdapterLimits
+from tcp_i2c_bridge.logging_config import setup_logging
+from tcp_i2c_bridge.memory_snapshot import diff_capture, snapshot
+from tcp_i2c_bridge.pcapng import DEFAULT_BRIDGE_PORT, export_pcapng
+from tcp_i2c_bridge.replay import load_sessions
+from tcp_i2c_bridge.replay import replay as run_replay
+from tcp_i2c_bridge.sim_backend import BusSpeed
 
 console = Console()
+
+BUS_SPEEDS = {
+    "100k": BusSpeed.STANDARD,
+    "400k": BusSpeed.FAST,
+    "1M": BusSpeed.FAST_PLUS,
+}
+
+
+def _parse_int(value: str) -> int:
+    """Parse a decimal or 0x-prefixed hexadecimal integer."""
+    if value.startswith("0x") or value.startswith("0X"):
+        return int(value, 16)
+    return int(value)
+
+
+def _parse_route(route: str) -> tuple[int, int, int]:
+    """Parse a CHIP=BUS:ADDR route specification."""
+    chip, _, target = route.partition("=")
+    bus, _, addr = target.partition(":")
+    if not chip or not bus or not addr:
+        raise ValueError(f"Invalid route, expected CHIP=BUS:ADDR: {route}")
+    return _parse_int(chip), int(bus), _parse_int(addr)
+
+
+def _parse_addr_range(value: str) -> tuple[int, int]:
+    """Parse an ADDR or FIRST-LAST register address range."""
+    first, _, last = value.partition("-")
+    return _parse_int(first), _parse_int(last or first)
+
+
+MIB = 1024 * 1024
+
+# Accepted values of `capture query --direction`
+CAPTURE_CODES: dict[str, Direction | Operation] = {
+    **{direction.name.lower(): direction for direction in Direction},
+    **{operation.name.lower(): operation for operation in Operation},
+}
+
+# Accepted formats of `capture query --start/--end`, in local time
+TIME_FORMATS = [
+    "%Y-%m-%d",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y-%m-%d %H:%M:%S.%f",
+]
+
+
 app = typer.Typer(
     name="tcp-i2c-bridge",
     help="Modern TCP-I2C bridge with low-latency focus",
@@ -34,17 +122,21 @@ def debug(
     json_logs: bool = typer.Option(
         False, "--json-logs", help="Use JSON format for logs"
     ),
+    chip: list[int] = typer.Option(
+        [], "--chip", "-c", help="Protocol chip address with its own simulated device"
+    ),
 ) -> None:
     """Run TCP-I2C bridge with debug backend (no hardware required)."""
 
     console.print(
         Panel(
             Text("TCP-I2C Bridge - Debug Mode", style="bold green"),
-            subtitle="Using simulated I2C memory for testing",
+            subtitle="Using simulated ADAU1452 devices for testing",
         )
     )
 
     bridge_app = TCPBridgeApp.create_with_debug_backend(
+        chip_addresses=chip,
         host=host,
         port=port,
         dump_dir=dump_dir,
@@ -62,6 +154,114 @@ def debug(
         raise typer.Exit(1) from e
 
 
+@app.command()
+def sim(
+    host: str = typer.Option(
+        "0.0.0.0", "--host", "-h", help="Host to bind TCP server to"
+    ),
+    port: int = typer.Option(8086, "--port", "-p", help="Port to bind TCP server to"),
+    bus_speed: str = typer.Option(
+        "400k", "--bus-speed", "-s", help="Simulated I2C clock (100k, 400k or 1M)"
+    ),
+    virtual: bool = typer.Option(
+        False, "--virtual", help="Use a virtual clock instead of sleeping"
+    ),
+    dump_dir: Path | None = typer.Option(
+        None, "--dump-dir", "-d", help="Directory to dump protocol logs"
+    ),
+    log_level: str = typer.Option(
+        "INFO", "--log-level", "-l", help="Logging level (DEBUG, INFO, WARNING, ERROR)"
+    ),
+    log_file: Path | None = typer.Option(None, "--log-file", help="Log file path"),
+    json_logs: bool = typer.Option(
+        False, "--json-logs", help="Use JSON format for logs"
+    ),
+) -> None:
+    """Run TCP-I2C bridge with a timing-accurate simulated I2C bus."""
+
+    if bus_speed not in BUS_SPEEDS:
+        console.print(f"[red]Unknown bus speed: {bus_speed}[/red]")
+        raise typer.Exit(1)
+
+    console.print(
+        Panel(
+            Text("TCP-I2C Bridge - Simulated Bus", style="bold green"),
+            subtitle=f"Modelling a {bus_speed}Hz I2C bus",
+        )
+    )
+
+    bridge_app = TCPBridgeApp.create_with_simulated_backend(
+        clock_hz=BUS_SPEEDS[bus_speed],
+        realtime=not virtual,
+        host=host,
+        port=port,
+        dump_dir=dump_dir,
+        log_level=log_level,
+        log_file=log_file,
+        json_logs=json_logs,
+    )
+
+    try:
+        asyncio.run(bridge_app.run())
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Shutting down...[/yellow]")
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise typer.Exit(1) from e
+
+
+@app.command()
+def playback(
+    recording: Path = typer.Argument(..., help="I2C recording to replay"),
+    host: str = typer.Option(
+        "0.0.0.0", "--host", "-h", help="Host to bind TCP server to"
+    ),
+    port: int = typer.Option(8086, "--port", "-p", help="Port to bind TCP server to"),
+    realtime: bool = typer.Option(
+        False, "--realtime", help="Take the recorded time for every operation"
+    ),
+    dump_dir: Path | None = typer.Option(
+        None, "--dump-dir", "-d", help="Directory to dump protocol logs"
+    ),
+    log_level: str = typer.Option(
+        "INFO", "--log-level", "-l", help="Logging level (DEBUG, INFO, WARNING, ERROR)"
+    ),
+    log_file: Path | None = typer.Option(None, "--log-file", help="Log file path"),
+    json_logs: bool = typer.Option(
+        False, "--json-logs", help="Use JSON format for logs"
+    ),
+) -> None:
+    """Run TCP-I2C bridge replaying a recorded I2C session."""
+
+    console.print(
+        Panel(
+            Text("TCP-I2C Bridge - Playback", style="bold green"),
+            subtitle=f"Replaying {recording}",
+        )
+    )
+
+    try:
+        bridge_app = TCPBridgeApp.create_with_replay_backend(
+            recording,
+            realtime=realtime,
+            host=host,
+            port=port,
+            dump_dir=dump_dir,
+            log_level=log_level,
+            log_file=log_file,
+            json_logs=json_logs,
+        )
+        asyncio.run(bridge_app.run())
+    except FileNotFoundError as e:
+        console.print(f"[red]Recording not found: {e}[/red]")
+        raise typer.Exit(1) from e
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Shutting down...[/yellow]")
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise typer.Exit(1) from e
+
+
 @app.command()
 def i2c(
     i2c_bus: int = typer.Argument(..., help="I2C bus number (e.g., 1 for /dev/i2c-1)"),
@@ -82,15 +282,65 @@ def i2c(
     json_logs: bool = typer.Option(
         False, "--json-logs", help="Use JSON format for logs"
     ),
+    route: list[str] = typer.Option(
+        [],
+        "--route",
+        "-r",
+        help="Route a protocol chip address to another device (CHIP=BUS:ADDR)",
+    ),
+    backend: str = typer.Option(
+        "smbus", "--backend", "-b", help="I2C backend (smbus or i2c-dev)"
+    ),
+    record: Path | None = typer.Option(
+        None, "--record", help="Record all I2C traffic to a file for replay"
+    ),
+    broker: Path | None = typer.Option(
+        None, "--broker", help="Share the I2C buses through the broker at this socket"
+    ),
+    trace: bool = typer.Option(
+        False,
+        "--trace",
+        help="Trace bus usage; report on SIGUSR1 and at shutdown",
+    ),
+    flight_recorder: bool = typer.Option(
+        False,
+        "--flight-recorder",
+        help="Keep protocol dumps in memory; write them on errors or SIGUSR2",
+    ),
+    latency_threshold: float | None = typer.Option(
+        None,
+        "--latency-threshold",
+        help="Flight recorder dumps when an I2C request takes longer (ms)",
+    ),
+    segment_size: int | None = typer.Option(
+        None,
+        "--segment-size",
+        help="Write dumps as compressed segments of this size (MiB)",
+    ),
+    max_capture_size: int = typer.Option(
+        DEFAULT_MAX_CAPTURE_SIZE // MIB,
+        "--max-capture-size",
+        help="Delete the oldest segments beyond this total size (MiB)",
+    ),
+    compression: Compression = typer.Option(
+        Compression.ZLIB, "--compression", help="Compression of the segments"
+    ),
+    capture_filter: str | None = typer.Option(
+        None,
+        "--capture-filter",
+        help="Only dump traffic matching this expression, e.g. 'chip 1 and not net'",
+    ),
+    tap_port: int | None = typer.Option(
+        None,
+        "--tap-port",
+        help=f"Stream live traffic to subscribers on this port (e.g. {DEFAULT_TAP_PORT})",
+    ),
 ) -> None:
     """Run TCP-I2C bridge with hardware I2C backend."""
 
     # Parse device address
     try:
-        if device_addr.startswith("0x") or device_addr.startswith("0X"):
-            device_addr_int = int(device_addr, 16)
-        else:
-            device_addr_int = int(device_addr)
+        device_addr_int = _parse_int(device_addr)
     except ValueError as e:
         console.print(f"[red]Invalid device address: {device_addr}[/red]")
         raise typer.Exit(1) from e
@@ -101,6 +351,31 @@ def i2c(
         )
         raise typer.Exit(1)
 
+    if backend not in I2C_BACKENDS:
+        console.print(f"[red]Unknown I2C backend: {backend}[/red]")
+        raise typer.Exit(1)
+
+    # Parse additional chip address routes
+    routes: dict[int, tuple[int, int]] = {}
+    for spec in route:
+        try:
+            chip, bus, addr = _parse_route(spec)
+        except ValueError as e:
+            console.print(f"[red]Invalid route: {spec}[/red]")
+            raise typer.Exit(1) from e
+        if not (0 <= addr <= 0x7F):
+            console.print(f"[red]Device address out of range: 0x{addr:02X}[/red]")
+            raise typer.Exit(1)
+        routes[chip] = (bus, addr)
+
+    threshold = latency_threshold / 1000 if latency_threshold is not None else None
+
+    try:
+        compiled_filter = CaptureFilter(capture_filter) if capture_filter else None
+    except ValueError as e:
+        console.print(Text(str(e), style="red"))
+        raise typer.Exit(1) from e
+
     console.print(
         Panel(
             Text("TCP-I2C Bridge - Hardware Mode", style="bold blue"),
@@ -109,16 +384,50 @@ def i2c(
     )
 
     try:
-        bridge_app = TCPBridgeApp.create_with_i2c_backend(
-            i2c_bus=i2c_bus,
-            device_addr=device_addr_int,
-            host=host,
-            port=port,
-            dump_dir=dump_dir,
-            log_level=log_level,
-            log_file=log_file,
-            json_logs=json_logs,
-        )
+        if routes:
+            bridge_app = TCPBridgeApp.create_with_routes(
+                routes,
+                default=(i2c_bus, device_addr_int),
+                backend=backend,
+                record=record,
+                broker=broker,
+                trace=trace,
+                flight_recorder=flight_recorder,
+                latency_threshold=threshold,
+                segment_size=segment_size * MIB if segment_size else None,
+                max_capture_size=max_capture_size * MIB,
+                compression=compression,
+                capture_filter=compiled_filter,
+                tap_port=tap_port,
+                host=host,
+                port=port,
+                dump_dir=dump_dir,
+                log_level=log_level,
+                log_file=log_file,
+                json_logs=json_logs,
+            )
+        else:
+            bridge_app = TCPBridgeApp.create_with_i2c_backend(
+                i2c_bus=i2c_bus,
+                device_addr=device_addr_int,
+                backend=backend,
+                record=record,
+                broker=broker,
+                trace=trace,
+                flight_recorder=flight_recorder,
+                latency_threshold=threshold,
+                segment_size=segment_size * MIB if segment_size else None,
+                max_capture_size=max_capture_size * MIB,
+                compression=compression,
+                capture_filter=compiled_filter,
+                tap_port=tap_port,
+                host=host,
+                port=port,
+                dump_dir=dump_dir,
+                log_level=log_level,
+                log_file=log_file,
+                json_logs=json_logs,
+            )
 
         asyncio.run(bridge_app.run())
 
@@ -136,6 +445,461 @@ def i2c(
         raise typer.Exit(1) from e
 
 
+@app.command()
+def broker(
+    i2c_bus: list[int] = typer.Argument(..., help="I2C bus numbers to share"),
+    socket_path: Path = typer.Option(
+        Path("/run/i2c-broker.sock"), "--socket", "-s", help="Unix socket to listen on"
+    ),
+    max_msg_len: int = typer.Option(
+        BROKER_MAX_MSG_LEN,
+        "--max-msg-len",
+        help="Longest I2C message run at once; bounds the latency of other clients",
+    ),
+    debug: bool = typer.Option(
+        False, "--debug", help="Serve simulated ADAU1452 devices instead of hardware"
+    ),
+    log_level: str = typer.Option(
+        "INFO", "--log-level", "-l", help="Logging level (DEBUG, INFO, WARNING, ERROR)"
+    ),
+    log_file: Path | None = typer.Option(None, "--log-file", help="Log file path"),
+    json_logs: bool = typer.Option(
+        False, "--json-logs", help="Use JSON format for logs"
+    ),
+) -> None:
+    """Run the I2C broker sharing buses between the bridge and audio_server."""
+
+    setup_logging(log_level, log_file, json_logs)
+
+    console.print(
+        Panel(
+            Text("I2C Broker", style="bold blue"),
+            subtitle=f"Sharing I2C buses {', '.join(map(str, i2c_bus))} on {socket_path}",
+        )
+    )
+
+    try:
+        adapters: dict[int, BusAdapter] = {
+            bus: DeviceAdapter(factory=adau1452_device) if debug else SMBusAdapter(bus)
+            for bus in i2c_bus
+        }
+        i2c_broker = I2CBroker(
+            socket_path, adapters, limits=AdapterLimits(max_msg_len=max_msg_len)
+        )
+        asyncio.run(i2c_broker.serve_forever())
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1) from e
+    except FileNotFoundError as e:
+        console.print(f"[red]I2C device not found: {e}[/red]")
+        raise typer.Exit(1) from e
+    except PermissionError as e:
+        console.print(f"[red]Permission denied: {e}[/red]")
+        raise typer.Exit(1) from e
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Shutting down...[/yellow]")
+
+
+@app.command()
+def replay(
+    capture: Path = typer.Argument(
+        ..., help="Capture file or segment directory to replay"
+    ),
+    host: str = typer.Option("127.0.0.1", "--host", "-h", help="Host of the bridge"),
+    port: int = typer.Option(8086, "--port", "-p", help="Port of the bridge"),
+    clients: int | None = typer.Option(
+        None,
+        "--clients",
+        "-n",
+        help="Virtual clients, replaying the sessions in turn (default: one each)",
+    ),
+    speed: float = typer.Option(
+        1.0, "--speed", "-s", help="Factor applied to the recorded timing"
+    ),
+    fast: bool = typer.Option(
+        False, "--fast", help="Send as fast as possible, ignoring the timing"
+    ),
+    client: list[str] = typer.Option(
+        [], "--client", "-c", help="Only replay the sessions of this client"
+    ),
+    log_level: str = typer.Option(
+        "WARNING",
+        "--log-level",
+        "-l",
+        help="Logging level (DEBUG, INFO, WARNING, ERROR)",
+    ),
+) -> None:
+    """Replay the client traffic of a capture against a bridge as a load test."""
+
+    setup_logging(log_level)
+
+    try:
+        sessions = load_sessions(capture, client or None)
+        console.print(
+            f"Replaying {sum(len(s.requests) for s in sessions)} requests of "
+            f"{len(sessions)} sessions to {host}:{port}"
+        )
+        stats = asyncio.run(
+            run_replay(sessions, host, port, clients, None if fast else speed)
+        )
+    except FileNotFoundError as e:
+        console.print(f"[red]Capture not found: {e}[/red]")
+        raise typer.Exit(1) from e
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1) from e
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Interrupted[/yellow]")
+        raise typer.Exit(1) from None
+
+    console.print(
+        f"{stats.requests} requests ({stats.reads} reads, {stats.writes} writes) "
+        f"from {stats.clients} clients in {stats.duration:.3f}s: "
+        f"{stats.throughput:.0f} requests/s, "
+        f"{stats.bytes_sent / stats.duration / 1024 if stats.duration else 0:.1f} KiB/s"
+    )
+    if stats.latencies:
+        console.print(
+            "Read latency: "
+            + ", ".join(
+                f"p{p}={stats.percentile(p) * 1000:.3f}ms" for p in (50, 90, 99)
+            )
+            + f", max={max(stats.latencies) * 1000:.3f}ms"
+        )
+    console.print(f"Response mismatches: {stats.mismatches}")
+    for mismatch in stats.mismatch_details:
+        console.print(
+            f"  {mismatch.client} addr=0x{mismatch.address:04X} "
+            f"expected={mismatch.expected.hex()} received={mismatch.received.hex()}"
+        )
+    for error in stats.errors:
+        console.print(f"[red]{error}[/red]")
+    if stats.errors:
+        raise typer.Exit(1)
+
+
+@app.command()
+def tap(
+    host: str = typer.Argument("127.0.0.1", help="Host of the bridge"),
+    port: int = typer.Option(
+        DEFAULT_TAP_PORT, "--port", "-p", help="Port of the bridge's capture tap"
+    ),
+    capture_filter: str = typer.Option(
+        "", "--filter", "-f", help="Only stream traffic matching this expression"
+    ),
+    output: Path | None = typer.Option(
+        None, "--output", "-o", help="Save the stream as a capture file"
+    ),
+) -> None:
+    """Watch the live traffic of a bridge running with --tap-port."""
+
+    try:
+        stream = open_tap(host, port, capture_filter)
+    except ValueError as e:
+        console.print(Text(str(e), style="red"))
+        raise typer.Exit(1) from e
+    except OSError as e:
+        console.print(f"[red]Cannot connect to {host}:{port}: {e}[/red]")
+        raise typer.Exit(1) from e
+
+    try:
+        with stream:
+            if output is not None:
+                with open(output, "wb") as f:
+                    f.write(CAPTURE_HEADER)
+                    while chunk := stream.read1(CAPTURE_BUFFER_SIZE):
+                        f.write(chunk)
+            else:
+                for record in read_records(stream, f"{host}:{port}"):
+                    print(format_record(record), flush=True)
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        console.print(f"[red]Capture tap disconnected: {e}[/red]")
+        raise typer.Exit(1) from e
+
+
+capture_app = typer.Typer(help="Inspect protocol dump captures", no_args_is_help=True)
+app.add_typer(capture_app, name="capture")
+
+
+@capture_app.command("logs")
+def capture_logs(
+    capture: Path = typer.Argument(..., help="Capture file or segment directory"),
+    output_dir: Path | None = typer.Option(
+        None, "--output", "-o", help="Directory for the logs (default: next to it)"
+    ),
+) -> None:
+    """Generate network.log and i2c.log from a capture."""
+
+    try:
+        network_log, i2c_log = write_text_logs(capture, output_dir or capture.parent)
+    except FileNotFoundError as e:
+        console.print(f"[red]Capture not found: {e}[/red]")
+        raise typer.Exit(1) from e
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1) from e
+
+    console.print(f"Wrote {network_log} and {i2c_log}")
+
+
+@capture_app.command("query")
+def capture_query(
+    capture: Path = typer.Argument(..., help="Capture file or segment directory"),
+    addr: str | None = typer.Option(
+        None, "--addr", "-a", help="I2C register address or range (0xF400-0xF4FF)"
+    ),
+    client: list[str] = typer.Option(
+        [], "--client", "-c", help="Client (HOST:PORT); may be repeated"
+    ),
+    direction: str | None = typer.Option(
+        None,
+        "--direction",
+        help=f"Packet direction or I2C operation ({', '.join(CAPTURE_CODES)})",
+    ),
+    start: datetime | None = typer.Option(
+        None, "--start", formats=TIME_FORMATS, help="Earliest record (local time)"
+    ),
+    end: datetime | None = typer.Option(
+        None, "--end", formats=TIME_FORMATS, help="Latest record (local time)"
+    ),
+    limit: int | None = typer.Option(
+        None, "--limit", "-n", help="Stop after this many records"
+    ),
+    chip: int | None = typer.Option(
+        None, "--chip", help="Only I2C transactions of this protocol chip address"
+    ),
+) -> None:
+    """Print the records of a capture matching filters, using its index."""
+
+    try:
+        addr_range = _parse_addr_range(addr) if addr is not None else (None, None)
+    except ValueError as e:
+        console.print(f"[red]Invalid address range: {addr}[/red]")
+        raise typer.Exit(1) from e
+    if direction is not None and direction.lower() not in CAPTURE_CODES:
+        console.print(f"[red]Unknown direction: {direction}[/red]")
+        raise typer.Exit(1)
+
+    query = CaptureQuery(
+        start=int(start.timestamp() * 1e9) if start else None,
+        end=int(end.timestamp() * 1e9) if end else None,
+        addr_min=addr_range[0],
+        addr_max=addr_range[1],
+        clients=frozenset(client) if client else None,
+        code=CAPTURE_CODES[direction.lower()] if direction else None,
+        chip=chip,
+    )
+
+    try:
+        for count, record in enumerate(query_capture(capture, query), 1):
+            print(format_record(record))
+            if limit is not None and count >= limit:
+                break
+    except FileNotFoundError as e:
+        console.print(f"[red]Capture not found: {e}[/red]")
+        raise typer.Exit(1) from e
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1) from e
+
+
+@capture_app.command("pcapng")
+def capture_pcapng(
+    capture: Path = typer.Argument(..., help="Capture file or segment directory"),
+    output: str | None = typer.Option(
+        None,
+        "--output",
+        "-o",
+        help="pcapng file, or - for stdout (default: next to it)",
+    ),
+    port: int = typer.Option(
+        DEFAULT_BRIDGE_PORT, "--port", "-p", help="TCP port given to the bridge"
+    ),
+) -> None:
+    """Export a capture to pcapng for Wireshark."""
+
+    try:
+        if output == "-":
+            export_pcapng(capture, sys.stdout.buffer, bridge_port=port)
+            sys.stdout.buffer.flush()
+            return
+
+        path = Path(output) if output else capture.with_suffix(".pcapng")
+        with open(path, "wb") as out:
+            packets = export_pcapng(capture, out, bridge_port=port)
+    except FileNotFoundError as e:
+        console.print(f"[red]Capture not found: {e}[/red]")
+        raise typer.Exit(1) from e
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1) from e
+
+    console.print(f"Wrote {packets} packets to {path}")
+
+
+@capture_app.command("boot-image")
+def capture_boot_image(
+    capture: Path = typer.Argument(..., help="Capture file or segment directory"),
+    output: Path | None = typer.Option(
+        None, "--output", "-o", help="Boot image file (default: next to it, .boot)"
+    ),
+    client: list[str] = typer.Option(
+        [], "--client", "-c", help="Only compile the transactions of this client"
+    ),
+    checks: bool = typer.Option(
+        False, "--checks", help="Keep reads as checks of the value read"
+    ),
+    delay_threshold: float = typer.Option(
+        DEFAULT_DELAY_THRESHOLD * 1000,
+        "--delay-threshold",
+        help="Milliseconds between transactions from which on a delay is kept",
+    ),
+    chip: int | None = typer.Option(
+        None, "--chip", help="Only compile the transactions of this chip address"
+    ),
+) -> None:
+    """Compile the I2C transactions of a capture into a DSP boot image."""
+
+    path = output or capture.with_suffix(".boot")
+    try:
+        records = read_capture(capture)
+        if client:
+            records = (record for record in records if record.client in client)
+        entries = compile_boot_image(
+            records,
+            delay_threshold=delay_threshold / 1000,
+            checks=checks,
+            chip=chip,
+        )
+        size = write_boot_image(path, entries)
+    except FileNotFoundError as e:
+        console.print(f"[red]Capture not found: {e}[/red]")
+        raise typer.Exit(1) from e
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1) from e
+
+    counts = Counter(entry.kind.name.lower() for entry in entries)
+    console.print(
+        f"Wrote {len(entries)} entries ("
+        + ", ".join(f"{count} {kind}" for kind, count in counts.items())
+        + f"), {size} bytes, to {path}"
+    )
+
+
+@capture_app.command("snapshot")
+def capture_snapshot(
+    capture: Path = typer.Argument(..., help="Capture file or segment directory"),
+    at: datetime | None = typer.Option(
+        None, "--at", formats=TIME_FORMATS, help="Point in time (default: the end)"
+    ),
+    addr: str | None = typer.Option(
+        None, "--addr", "-a", help="Register address or range (0x0000-0x00FF)"
+    ),
+    client: list[str] = typer.Option(
+        [], "--client", "-c", help="Only fold the writes of this client"
+    ),
+    chip: int | None = typer.Option(
+        None, "--chip", help="Only fold the writes to this protocol chip address"
+    ),
+) -> None:
+    """Print device memory as written up to a point in time (needs NumPy)."""
+
+    try:
+        addr_min, addr_max = _parse_addr_range(addr) if addr else (0, 0xFFFF)
+    except ValueError as e:
+        console.print(f"[red]Invalid address range: {addr}[/red]")
+        raise typer.Exit(1) from e
+
+    try:
+        memory = snapshot(
+            capture,
+            int(at.timestamp() * 1e9) if at else None,
+            clients=client or None,
+            chip=chip,
+        )
+    except FileNotFoundError as e:
+        console.print(f"[red]Capture not found: {e}[/red]")
+        raise typer.Exit(1) from e
+    except (ValueError, RuntimeError) as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1) from e
+
+    for word_addr, data in memory.words(addr_min, addr_max):
+        print(f"0x{word_addr:04X} {data.hex()}")
+
+
+@capture_app.command("diff")
+def capture_diff(
+    capture: Path = typer.Argument(..., help="Capture file or segment directory"),
+    start: datetime | None = typer.Option(
+        None, "--start", formats=TIME_FORMATS, help="Before (default: the start)"
+    ),
+    end: datetime | None = typer.Option(
+        None, "--end", formats=TIME_FORMATS, help="After (default: the end)"
+    ),
+    addr: str | None = typer.Option(
+        None, "--addr", "-a", help="Register address or range (0x0000-0x00FF)"
+    ),
+    client: list[str] = typer.Option(
+        [], "--client", "-c", help="Only fold the writes of this client"
+    ),
+    chip: int | None = typer.Option(
+        None, "--chip", help="Only fold the writes to this protocol chip address"
+    ),
+) -> None:
+    """Print device memory changed between two points in time (needs NumPy)."""
+
+    try:
+        addr_min, addr_max = _parse_addr_range(addr) if addr else (0, 0xFFFF)
+    except ValueError as e:
+        console.print(f"[red]Invalid address range: {addr}[/red]")
+        raise typer.Exit(1) from e
+
+    try:
+        changes = diff_capture(
+            capture,
+            int(start.timestamp() * 1e9) if start else None,
+            int(end.timestamp() * 1e9) if end else None,
+            clients=client or None,
+            chip=chip,
+        )
+    except FileNotFoundError as e:
+        console.print(f"[red]Capture not found: {e}[/red]")
+        raise typer.Exit(1) from e
+    except (ValueError, RuntimeError) as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1) from e
+
+    for change in changes:
+        if change.addr > addr_max or change.addr + change.words <= addr_min:
+            continue
+        print(
+            f"0x{change.addr:04X} ({change.words} words) "
+            f"{change.before.hex()} -> {change.after.hex()}"
+        )
+
+
+@capture_app.command("index")
+def capture_index(
+    capture: Path = typer.Argument(..., help="Capture file (capture.bin)"),
+) -> None:
+    """Rebuild the sidecar index of a capture."""
+
+    try:
+        index = build_index(capture)
+    except FileNotFoundError as e:
+        console.print(f"[red]Capture not found: {e}[/red]")
+        raise typer.Exit(1) from e
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1) from e
+
+    console.print(f"Wrote {index}")
+
+
 @app.command()
 def version() -> None:
     """Show version information."""
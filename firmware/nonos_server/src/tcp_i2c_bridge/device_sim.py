@@ -0,0 +1,356 @@
+"""Sparse simulation of word-addressed I2C devices."""
+
+import bisect
+import time
+from collections.abc import Callable
+
+import structlog
+
+from tcp_i2c_bridge.i2c_backend import I2CBackend
+from tcp_i2c_bridge.memory_map import ADAU1452_MEMORY_MAP, MemoryMap
+from tcp_i2c_bridge.safeload import SafeloadRegister
+
+logger = structlog.get_logger()
+
+# Word addresses per page; memory map regions must be aligned to pages
+PAGE_WORDS = 256
+
+# ADAU1452 PLL registers and the time the simulated PLL takes to lock
+ADAU1452_PLL_ENABLE = 0xF003
+ADAU1452_PLL_LOCK = 0xF004
+PLL_LOCK_TIME = 0.001
+
+
+class SparseMemory:
+    """Full 16-bit word address space allocated page by page.
+
+    Pages are only allocated when written, so unused memory costs nothing and
+    reads of it return zeros. Every page holds words of a single width, so
+    transfers within a page are plain slices.
+    """
+
+    def __init__(self, memory_map: MemoryMap = ADAU1452_MEMORY_MAP):
+        """Initialize sparse memory.
+
+        Args:
+            memory_map: Word widths of the memory regions
+        """
+        for region in memory_map.regions:
+            if region.start % PAGE_WORDS or (region.end + 1) % PAGE_WORDS:
+                raise ValueError(
+                    f"Memory region {region.name} is not aligned to "
+                    f"{PAGE_WORDS}-word pages"
+                )
+
+        self.memory_map = memory_map
+        self.pages: dict[int, bytearray] = {}
+
+    @property
+    def allocated(self) -> int:
+        """Bytes allocated for pages."""
+        return sum(len(page) for page in self.pages.values())
+
+    def read(self, addr: int, length: int) -> bytes:
+        """Read bytes starting at a word address.
+
+        Args:
+            addr: Word address of the first byte
+            length: Number of bytes to read
+
+        Returns:
+            Read data as bytes
+        """
+        data = bytearray(length)
+        position = 0
+        while position < length:
+            page_number, index = divmod(addr, PAGE_WORDS)
+            word_size = self.memory_map.word_size(addr)
+            start = index * word_size
+            size = min(length - position, PAGE_WORDS * word_size - start)
+
+            page = self.pages.get(page_number)
+            if page is not None:
+                data[position : position + size] = page[start : start + size]
+
+            position += size
+            addr = (addr + PAGE_WORDS - index) % (PAGE_WORDS * PAGE_WORDS)
+        return bytes(data)
+
+    def write(self, addr: int, data: bytes) -> None:
+        """Write bytes starting at a word address.
+
+        Args:
+            addr: Word address of the first byte
+            data: Data to write
+        """
+        view = memoryview(data)
+        position = 0
+        while position < len(data):
+            page_number, index = divmod(addr, PAGE_WORDS)
+            word_size = self.memory_map.word_size(addr)
+            start = index * word_size
+            size = min(len(data) - position, PAGE_WORDS * word_size - start)
+
+            page = self.pages.get(page_number)
+            if page is None:
+                page = self.pages[page_number] = bytearray(PAGE_WORDS * word_size)
+            page[start : start + size] = view[position : position + size]
+
+            position += size
+            addr = (addr + PAGE_WORDS - index) % (PAGE_WORDS * PAGE_WORDS)
+
+
+class RegisterHook:
+    """Behaviour of a simulated register beyond plain memory.
+
+    Hooks see whole words. By default a hooked register behaves like memory.
+    """
+
+    def on_read(self, device: "SimulatedDevice", addr: int, value: bytes) -> bytes:
+        """Return the value a read of the register sees."""
+        return value
+
+    def on_write(
+        self, device: "SimulatedDevice", addr: int, value: bytes
+    ) -> bytes | None:
+        """Handle a write and return the value to store, or None to keep the old."""
+        return value
+
+
+class ReadOnlyRegister(RegisterHook):
+    """Register that ignores writes."""
+
+    def __init__(self, value: int | None = None):
+        """Initialize read-only register.
+
+        Args:
+            value: Fixed value to read, or None to read the stored value
+        """
+        self.value = value
+
+    def on_read(self, device: "SimulatedDevice", addr: int, value: bytes) -> bytes:
+        if self.value is None:
+            return value
+        return self.value.to_bytes(len(value), "big")
+
+    def on_write(
+        self, device: "SimulatedDevice", addr: int, value: bytes
+    ) -> bytes | None:
+        logger.debug("Write to read-only register ignored", addr=f"0x{addr:04X}")
+        return None
+
+
+class TriggerRegister(RegisterHook):
+    """Write-1-to-trigger register that clears itself after running its action."""
+
+    def __init__(self, action: Callable[["SimulatedDevice", int], None]):
+        """Initialize trigger register.
+
+        Args:
+            action: Called with the device and the written value when a
+                non-zero value is written
+        """
+        self.action = action
+
+    def on_write(
+        self, device: "SimulatedDevice", addr: int, value: bytes
+    ) -> bytes | None:
+        written = int.from_bytes(value, "big")
+        if written:
+            self.action(device, written)
+        return bytes(len(value))
+
+
+class DynamicRegister(RegisterHook):
+    """Read-only status register whose value is computed when read."""
+
+    def __init__(self, value: Callable[["SimulatedDevice", float], int]):
+        """Initialize dynamic register.
+
+        Args:
+            value: Called with the device and the current time in seconds
+        """
+        self.value = value
+
+    def on_read(self, device: "SimulatedDevice", addr: int, value: bytes) -> bytes:
+        return self.value(device, device.clock()).to_bytes(len(value), "big")
+
+    def on_write(
+        self, device: "SimulatedDevice", addr: int, value: bytes
+    ) -> bytes | None:
+        return None
+
+
+class SimulatedDevice(I2CBackend):
+    """I2C backend simulating a word-addressed device over its whole address space.
+
+    Register hooks give individual word addresses read-only, trigger or
+    dynamic behaviour. Within a write, all words are stored before the hooks
+    run, so a trigger sees the data written ahead of it in the same burst.
+    """
+
+    def __init__(
+        self,
+        memory_map: MemoryMap = ADAU1452_MEMORY_MAP,
+        hooks: dict[int, RegisterHook] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize simulated device.
+
+        Args:
+            memory_map: Word widths of the device memory
+            hooks: Register hooks by word address
+            clock: Time source for dynamic registers
+        """
+        self.memory_map = memory_map
+        self.memory = SparseMemory(memory_map)
+        self.clock = clock
+        self.hooks: dict[int, RegisterHook] = {}
+        self._hook_addrs: list[int] = []
+        for addr, hook in (hooks or {}).items():
+            self.add_hook(addr, hook)
+
+        logger.info("Simulated I2C device initialized", hooks=len(self.hooks))
+
+    def add_hook(self, addr: int, hook: RegisterHook) -> None:
+        """Attach a hook to a word address."""
+        if addr not in self.hooks:
+            bisect.insort(self._hook_addrs, addr)
+        self.hooks[addr] = hook
+
+    def _hooked_words(self, addr: int, length: int) -> list[tuple[int, int, int]]:
+        """Return (word address, offset, size) of hooked words in a transfer."""
+        if not self._hook_addrs:
+            return []
+
+        # Walk the transfer one run of equally sized words at a time; the last
+        # word may be partial, e.g. a 2-byte read of a 4-byte word
+        words = []
+        word_addr = addr
+        offset = 0
+        while offset < length:
+            word_size = self.memory_map.word_size(word_addr)
+            count = -(-(length - offset) // word_size)
+            words_left = self.memory_map.words_left(word_addr)
+            if words_left is not None:
+                count = min(count, words_left)
+
+            first = bisect.bisect_left(self._hook_addrs, word_addr)
+            last = bisect.bisect_left(self._hook_addrs, word_addr + count)
+            for hooked in self._hook_addrs[first:last]:
+                word_offset = offset + (hooked - word_addr) * word_size
+                words.append(
+                    (hooked, word_offset, min(word_size, length - word_offset))
+                )
+
+            offset += count * word_size
+            word_addr += count
+        return words
+
+    def read_word(self, addr: int) -> int:
+        """Read a whole word as an integer, bypassing hooks."""
+        return int.from_bytes(
+            self.memory.read(addr, self.memory_map.word_size(addr)), "big"
+        )
+
+    def write_word(self, addr: int, value: int) -> None:
+        """Write a whole word from an integer, bypassing hooks."""
+        word_size = self.memory_map.word_size(addr)
+        self.memory.write(addr, value.to_bytes(word_size, "big"))
+
+    def read(self, addr: int, length: int) -> bytes:
+        """Read from simulated memory, applying register hooks."""
+        if length <= 0:
+            raise ValueError("Read length must be positive")
+
+        data = self.memory.read(addr, length)
+        hooked = self._hooked_words(addr, length)
+        if not hooked:
+            return data
+
+        patched = bytearray(data)
+        for word_addr, offset, size in hooked:
+            word = self.memory.read(word_addr, self.memory_map.word_size(word_addr))
+            value = self.hooks[word_addr].on_read(self, word_addr, word)
+            patched[offset : offset + size] = value[:size]
+        return bytes(patched)
+
+    def write(self, addr: int, data: bytes) -> None:
+        """Write to simulated memory, applying register hooks."""
+        if len(data) == 0:
+            raise ValueError("Write data cannot be empty")
+
+        hooked = self._hooked_words(addr, len(data))
+        old = {
+            word_addr: self.memory.read(word_addr, self.memory_map.word_size(word_addr))
+            for word_addr, _, _ in hooked
+        }
+
+        self.memory.write(addr, data)
+
+        for word_addr, _, _ in hooked:
+            word = self.memory.read(word_addr, self.memory_map.word_size(word_addr))
+            value = self.hooks[word_addr].on_write(self, word_addr, word)
+            self.memory.write(word_addr, old[word_addr] if value is None else value)
+
+    def write_read(self, data: bytes, length: int) -> bytes:
+        """Set the register pointer, write any further bytes and read back."""
+        addr = int.from_bytes(data[:2], "big")
+        if len(data) > 2:
+            self.write(addr, data[2:])
+        return self.read(addr, length)
+
+    def close(self) -> None:
+        """Close simulated device."""
+        logger.info("Simulated I2C device closed", allocated=self.memory.allocated)
+
+
+class _PllEnable(RegisterHook):
+    """ADAU1452 PLL enable register; the PLL locks a fixed time after enabling."""
+
+    def __init__(self) -> None:
+        self.enabled_at: float | None = None
+
+    def on_write(
+        self, device: SimulatedDevice, addr: int, value: bytes
+    ) -> bytes | None:
+        enabled = int.from_bytes(value, "big") & 1
+        self.enabled_at = device.clock() if enabled else None
+        return value
+
+    def lock(self, device: SimulatedDevice, now: float) -> int:
+        """Return the PLL lock status."""
+        if self.enabled_at is None:
+            return 0
+        return int(now - self.enabled_at >= PLL_LOCK_TIME)
+
+
+def _adau1452_safeload(device: SimulatedDevice, count: int) -> None:
+    """Copy safeload data words to their target address."""
+    target = device.read_word(SafeloadRegister.ADDRESS)
+    for i in range(min(count, 5)):
+        device.write_word(target + i, device.read_word(SafeloadRegister.DATA0 + i))
+
+
+def adau1452_device(clock: Callable[[], float] = time.monotonic) -> SimulatedDevice:
+    """Create a simulated ADAU1452.
+
+    Models the software safeload (writing the word count applies the update)
+    and the PLL lock status, which is set shortly after the PLL is enabled.
+
+    Args:
+        clock: Time source for the PLL lock status
+
+    Returns:
+        Simulated device
+    """
+    pll = _PllEnable()
+    return SimulatedDevice(
+        ADAU1452_MEMORY_MAP,
+        hooks={
+            SafeloadRegister.NUM: TriggerRegister(_adau1452_safeload),
+            ADAU1452_PLL_ENABLE: pll,
+            ADAU1452_PLL_LOCK: DynamicRegister(pll.lock),
+        },
+        clock=clock,
+    )
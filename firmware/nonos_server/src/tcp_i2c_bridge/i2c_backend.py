@@ -1,13 +1,304 @@
 """I2C backend implementation for TCP-I2C bridge."""
 
+import ctypes
+import errno
 from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass
+from enum import Enum
 from pathlib import Path
 
 import smbus2
 import structlog
 
+from tcp_i2c_bridge.memory_map import ADAU1452_MEMORY_MAP, MemoryMap
+
 logger = structlog.get_logger()
 
+# Limits of the I2C_RDWR ioctl in drivers/i2c/i2c-dev.c
+I2C_RDWR_IOCTL_MAX_MSGS = 42
+I2C_DEV_MAX_MSG_LEN = 8192
+
+# Smallest message length assumed when an adapter keeps rejecting transfers
+MIN_MSG_LEN = 32
+
+# Errors returned when a transfer exceeds the adapter's limits (quirks)
+_LIMIT_ERRNOS = (errno.EINVAL, errno.EOPNOTSUPP)
+
+
+@dataclass(frozen=True)
+class AdapterLimits:
+    """Transfer limits of an I2C adapter as seen through I2C_RDWR."""
+
+    max_msg_len: int = I2C_DEV_MAX_MSG_LEN
+    """
+    Maximum bytes per message, including register address bytes
+    """
+    max_msgs: int = I2C_RDWR_IOCTL_MAX_MSGS
+    """
+    Maximum messages per ioctl
+    """
+
+    def __post_init__(self):
+        if not 2 <= self.max_msgs <= I2C_RDWR_IOCTL_MAX_MSGS:
+            raise ValueError(
+                f"Invalid messages per transfer: {self.max_msgs}, "
+                f"expected 2 to {I2C_RDWR_IOCTL_MAX_MSGS}"
+            )
+        if self.max_msg_len < MIN_MSG_LEN:
+            raise ValueError(
+                f"Invalid message length: {self.max_msg_len}, "
+                f"expected at least {MIN_MSG_LEN}"
+            )
+
+    def reduced(self, error: OSError) -> "AdapterLimits | None":
+        """Return smaller limits after the adapter rejected a transfer.
+
+        i2c-dev only knows its own maxima; adapters with tighter quirks reject
+        larger transfers with EINVAL or EOPNOTSUPP. Halving the limits on those
+        errors converges on what the adapter really accepts.
+
+        Args:
+            error: Error raised by the rejected transfer
+
+        Returns:
+            Reduced limits, or None if the error is not a limit violation or the
+            limits cannot be reduced any further
+        """
+        if error.errno not in _LIMIT_ERRNOS:
+            return None
+
+        if self.max_msg_len <= MIN_MSG_LEN and self.max_msgs <= 2:
+            return None
+
+        return AdapterLimits(
+            max_msg_len=max(self.max_msg_len // 2, MIN_MSG_LEN),
+            max_msgs=max(self.max_msgs // 2, 2),
+        )
+
+
+class I2COpKind(Enum):
+    """Kind of an operation in an I2C transaction."""
+
+    READ = "read"
+    WRITE = "write"
+    WRITE_READ = "write_read"
+
+
+@dataclass(frozen=True)
+class I2COperation:
+    """One operation queued in an I2C transaction."""
+
+    kind: I2COpKind
+    addr: int = 0
+    """
+    16-bit register address (reads and writes)
+    """
+    data: bytes = b""
+    """
+    Data to write; raw bytes without register address for write-reads
+    """
+    length: int = 0
+    """
+    Number of bytes to read (reads and write-reads)
+    """
+
+
+@dataclass(frozen=True)
+class MessageGroup:
+    """I2C messages of one operation chunk that go into the same ioctl.
+
+    Reads and write-reads are a write followed by a repeated-start read, so
+    their two messages must not be split across ioctls.
+    """
+
+    index: int
+    """
+    Index of the operation in the transaction
+    """
+    addr: int
+    """
+    Register address of the chunk
+    """
+    offset: int
+    """
+    Byte offset of the chunk within the operation data
+    """
+    size: int
+    """
+    Bytes written (writes) or read (reads and write-reads) by the chunk
+    """
+    nmsgs: int
+
+
+def plan_message_groups(
+    operations: Sequence[I2COperation],
+    limits: AdapterLimits,
+    memory_map: MemoryMap,
+    resume: MessageGroup | None = None,
+) -> Iterator[MessageGroup]:
+    """Split transaction operations into message groups within adapter limits.
+
+    Args:
+        operations: Operations of the transaction
+        limits: Adapter transfer limits
+        memory_map: Word widths used to split reads and writes
+        resume: Group to restart from, after the adapter rejected a transfer
+
+    Yields:
+        Message groups in transaction order
+    """
+    first = resume.index if resume else 0
+    for index in range(first, len(operations)):
+        op = operations[index]
+        if op.kind is I2COpKind.WRITE_READ:
+            if max(len(op.data), op.length) > limits.max_msg_len:
+                raise ValueError(
+                    f"Write-read exceeds adapter message length {limits.max_msg_len}"
+                )
+            yield MessageGroup(index, 0, 0, op.length, nmsgs=2)
+            continue
+
+        if op.kind is I2COpKind.READ:
+            length, max_chunk, nmsgs = op.length, limits.max_msg_len, 2
+        else:
+            length, max_chunk, nmsgs = len(op.data), limits.max_msg_len - 2, 1
+
+        addr, start = op.addr, 0
+        if resume is not None and index == resume.index:
+            addr, start = resume.addr, resume.offset
+
+        for chunk_addr, offset, size in memory_map.iter_chunks(
+            addr, length - start, max_chunk
+        ):
+            yield MessageGroup(index, chunk_addr, start + offset, size, nmsgs)
+
+
+def batch_message_groups(
+    groups: Iterable[MessageGroup], max_msgs: int
+) -> Iterator[list[MessageGroup]]:
+    """Pack message groups into as few ioctls as the message limit allows.
+
+    Args:
+        groups: Message groups in transaction order
+        max_msgs: Maximum messages per ioctl
+
+    Yields:
+        Groups of each ioctl
+    """
+    batch: list[MessageGroup] = []
+    nmsgs = 0
+    for group in groups:
+        if nmsgs + group.nmsgs > max_msgs:
+            yield batch
+            batch = []
+            nmsgs = 0
+        batch.append(group)
+        nmsgs += group.nmsgs
+
+    if batch:
+        yield batch
+
+
+class I2COperationQueue:
+    """Operations queued for a transaction, with their results once submitted."""
+
+    def __init__(self) -> None:
+        self.operations: list[I2COperation] = []
+        self.results: list[bytes | None] | None = None
+
+    def _queue(self, operation: I2COperation) -> int:
+        if self.results is not None:
+            raise RuntimeError("Transaction already submitted")
+        self.operations.append(operation)
+        return len(self.operations) - 1
+
+    def read(self, addr: int, length: int) -> int:
+        """Queue a read using 16-bit register addressing.
+
+        Args:
+            addr: 16-bit register address
+            length: Number of bytes to read
+
+        Returns:
+            Index of the result
+        """
+        if length <= 0:
+            raise ValueError("Read length must be positive")
+        return self._queue(I2COperation(I2COpKind.READ, addr=addr, length=length))
+
+    def write(self, addr: int, data: bytes) -> int:
+        """Queue a write using 16-bit register addressing.
+
+        Args:
+            addr: 16-bit register address
+            data: Data to write
+
+        Returns:
+            Index of the result (always None)
+        """
+        if len(data) == 0:
+            raise ValueError("Write data cannot be empty")
+        return self._queue(I2COperation(I2COpKind.WRITE, addr=addr, data=bytes(data)))
+
+    def write_read(self, data: bytes, length: int) -> int:
+        """Queue a raw write followed by a repeated-start read.
+
+        Args:
+            data: Bytes to write, including any register address
+            length: Number of bytes to read
+
+        Returns:
+            Index of the result
+        """
+        if len(data) == 0:
+            raise ValueError("Write data cannot be empty")
+        if length <= 0:
+            raise ValueError("Read length must be positive")
+        return self._queue(
+            I2COperation(I2COpKind.WRITE_READ, data=bytes(data), length=length)
+        )
+
+
+class I2CTransaction(I2COperationQueue):
+    """Batch of I2C operations submitted to a backend together.
+
+    Operations are queued and run in order when the transaction is submitted,
+    either explicitly or when leaving the `with` block::
+
+        with backend.transaction() as txn:
+            txn.write(0xF400, b"\\x00\\x01")
+            txn.read(0xF401, 2)
+        status = txn.results[1]
+    """
+
+    def __init__(self, backend: "I2CBackend"):
+        """Initialize transaction.
+
+        Args:
+            backend: Backend the transaction is submitted to
+        """
+        super().__init__()
+        self.backend = backend
+
+    def submit(self) -> list[bytes | None]:
+        """Submit all queued operations.
+
+        Returns:
+            One result per operation: read data, or None for writes
+        """
+        if self.results is not None:
+            raise RuntimeError("Transaction already submitted")
+        self.results = self.backend.submit(self.operations)
+        return self.results
+
+    def __enter__(self) -> "I2CTransaction":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None and self.results is None:
+            self.submit()
+
 
 class I2CBackend(ABC):
     """Abstract base class for I2C backends."""
@@ -27,20 +318,64 @@ class I2CBackend(ABC):
         """Close the I2C backend."""
         pass
 
+    @abstractmethod
+    def write_read(self, data: bytes, length: int) -> bytes:
+        """Write raw bytes and read back after a repeated start."""
+        pass
+
+    def transaction(self) -> I2CTransaction:
+        """Start a batch of operations submitted together."""
+        return I2CTransaction(self)
+
+    def submit(self, operations: Sequence[I2COperation]) -> list[bytes | None]:
+        """Run a batch of operations in order.
+
+        The default runs one call per operation; backends override this to
+        combine the batch into as few kernel calls as possible.
+
+        Args:
+            operations: Operations to run
+
+        Returns:
+            One result per operation: read data, or None for writes
+        """
+        results: list[bytes | None] = []
+        for op in operations:
+            if op.kind is I2COpKind.READ:
+                results.append(self.read(op.addr, op.length))
+            elif op.kind is I2COpKind.WRITE:
+                self.write(op.addr, op.data)
+                results.append(None)
+            else:
+                results.append(self.write_read(op.data, op.length))
+        return results
+
 
 class SMBusI2CBackend(I2CBackend):
     """I2C backend using SMBus/I2C-dev interface."""
 
-    def __init__(self, i2c_bus: int | smbus2.SMBus, device_addr: int):
+    def __init__(
+        self,
+        i2c_bus: int | smbus2.SMBus,
+        device_addr: int,
+        limits: AdapterLimits | None = None,
+        memory_map: MemoryMap = ADAU1452_MEMORY_MAP,
+    ):
         """Initialize SMBus I2C backend.
 
         Args:
             i2c_bus: I2C bus number (e.g., 1 for /dev/i2c-1)
             device_addr: I2C device address (7-bit)
+            limits: Adapter transfer limits; reduced automatically when the
+                adapter rejects a transfer
+            memory_map: Word widths of the device memory, used to split large
+                transfers on word boundaries
         """
         self.i2c_bus = i2c_bus
         self.device_addr = device_addr
         self.bus: smbus2.SMBus | None = None
+        self.limits = limits or AdapterLimits()
+        self.memory_map = memory_map
 
         # Validate device address
         if not (0 <= device_addr <= 0x7F):
@@ -87,20 +422,8 @@ class SMBusI2CBackend(I2CBackend):
         if length <= 0:
             raise ValueError("Read length must be positive")
 
-        if length > 32:
-            # SMBus has a 32-byte limit, use I2C block read for larger transfers
-            return self._read_large(addr, length)
-
         try:
-            # Use I2C write-read transaction for 16-bit addressing
-            addr_bytes = [(addr >> 8) & 0xFF, addr & 0xFF]
-
-            # Write register address, then read data
-            write_msg = smbus2.i2c_msg.write(self.device_addr, addr_bytes)
-            read_msg = smbus2.i2c_msg.read(self.device_addr, length)
-            self.bus.i2c_rdwr(write_msg, read_msg)
-
-            data = bytes(read_msg)
+            data = self._read(addr, length)
             logger.debug(
                 "I2C read completed",
                 addr=f"0x{addr:04X}",
@@ -115,20 +438,43 @@ class SMBusI2CBackend(I2CBackend):
             )
             raise RuntimeError(f"I2C read failed: {e}") from e
 
-    def _read_large(self, addr: int, length: int) -> bytes:
-        """Read large amounts of data using multiple transactions."""
-        data = b""
-        current_addr = addr
-        remaining = length
-
-        while remaining > 0:
-            chunk_size = min(remaining, 32)
-            chunk = self.read(current_addr, chunk_size)
-            data += chunk
-            current_addr += chunk_size
-            remaining -= chunk_size
-
-        return data
+    def _read(self, addr: int, length: int) -> bytes:
+        """Read within the adapter limits, reducing them if a transfer is rejected."""
+        assert self.bus is not None
+        while length <= self.limits.max_msg_len:
+            try:
+                # Use I2C write-read transaction for 16-bit addressing
+                addr_bytes = addr.to_bytes(2, "big")
+
+                # Write register address, then read data
+                write_msg = smbus2.i2c_msg.write(self.device_addr, addr_bytes)
+                read_msg = smbus2.i2c_msg.read(self.device_addr, length)
+                self.bus.i2c_rdwr(write_msg, read_msg)
+                return bytes(read_msg)
+
+            except OSError as e:
+                if not self._reduce_limits(e):
+                    raise
+
+        # Chunked, resuming from the rejected chunk if the limits shrink
+        data = self._transfer([I2COperation(I2COpKind.READ, addr=addr, length=length)])
+        assert data[0] is not None
+        return data[0]
+
+    def _reduce_limits(self, error: OSError) -> bool:
+        """Reduce the adapter limits after a rejected transfer."""
+        limits = self.limits.reduced(error)
+        if limits is None:
+            return False
+
+        logger.warning(
+            "I2C adapter rejected transfer, reducing limits",
+            max_msg_len=limits.max_msg_len,
+            max_msgs=limits.max_msgs,
+            error=str(error),
+        )
+        self.limits = limits
+        return True
 
     def write(self, addr: int, data: bytes) -> None:
         """Write data to I2C device using 16-bit register addressing.
@@ -143,19 +489,8 @@ class SMBusI2CBackend(I2CBackend):
         if len(data) == 0:
             raise ValueError("Write data cannot be empty")
 
-        if len(data) > 30:  # 32 - 2 bytes for address
-            # Split large writes into chunks
-            self._write_large(addr, data)
-            return
-
         try:
-            # Combine address and data for single I2C transaction
-            addr_bytes = [(addr >> 8) & 0xFF, addr & 0xFF]
-            write_data = addr_bytes + list(data)
-
-            write_msg = smbus2.i2c_msg.write(self.device_addr, write_data)
-            self.bus.i2c_rdwr(write_msg)
-
+            self._write(addr, data)
             logger.debug(
                 "I2C write completed",
                 addr=f"0x{addr:04X}",
@@ -173,15 +508,129 @@ class SMBusI2CBackend(I2CBackend):
             )
             raise RuntimeError(f"I2C write failed: {e}") from e
 
-    def _write_large(self, addr: int, data: bytes) -> None:
-        """Write large amounts of data using multiple transactions."""
-        offset = 0
+    def _write(self, addr: int, data: bytes) -> None:
+        """Write within the adapter limits, reducing them if a transfer is rejected."""
+        assert self.bus is not None
+        while len(data) + 2 <= self.limits.max_msg_len:
+            try:
+                # Combine address and data for single I2C transaction
+                write_msg = smbus2.i2c_msg.write(
+                    self.device_addr, addr.to_bytes(2, "big") + data
+                )
+                self.bus.i2c_rdwr(write_msg)
+                return
+
+            except OSError as e:
+                if not self._reduce_limits(e):
+                    raise
 
-        while offset < len(data):
-            chunk_size = min(len(data) - offset, 30)  # 32 - 2 bytes for address
-            chunk = data[offset : offset + chunk_size]
-            self.write(addr + offset, chunk)
-            offset += chunk_size
+        # Chunked, resuming from the rejected chunk if the limits shrink
+        self._transfer([I2COperation(I2COpKind.WRITE, addr=addr, data=data)])
+
+    def write_read(self, data: bytes, length: int) -> bytes:
+        """Write raw bytes and read back after a repeated start.
+
+        Args:
+            data: Bytes to write, including any register address
+            length: Number of bytes to read
+
+        Returns:
+            Read data as bytes
+        """
+        operation = I2COperation(I2COpKind.WRITE_READ, data=data, length=length)
+        result = self.submit([operation])[0]
+        assert result is not None
+        return result
+
+    def submit(self, operations: Sequence[I2COperation]) -> list[bytes | None]:
+        """Run a batch of operations in as few I2C_RDWR ioctls as possible.
+
+        Args:
+            operations: Operations to run
+
+        Returns:
+            One result per operation: read data, or None for writes
+        """
+        if not self.bus:
+            raise RuntimeError("I2C bus not connected")
+
+        try:
+            results = self._transfer(operations)
+        except Exception as e:
+            logger.error(
+                "I2C transaction failed", operations=len(operations), error=str(e)
+            )
+            raise RuntimeError(f"I2C transaction failed: {e}") from e
+
+        logger.debug("I2C transaction completed", operations=len(operations))
+        return results
+
+    def _transfer(self, operations: Sequence[I2COperation]) -> list[bytes | None]:
+        """Run operations within the adapter limits, reducing them on rejection.
+
+        A rejected ioctl never reaches the bus, so the transfer resumes with
+        it under the reduced limits instead of starting over.
+        """
+        # Read messages point straight into one output buffer per operation
+        results = [
+            None if op.kind is I2COpKind.WRITE else bytearray(op.length)
+            for op in operations
+        ]
+        c_results = [
+            None if data is None else (ctypes.c_char * len(data)).from_buffer(data)
+            for data in results
+        ]
+        bases = [None if c is None else ctypes.addressof(c) for c in c_results]
+
+        resume = None
+        while True:
+            try:
+                for batch in batch_message_groups(
+                    plan_message_groups(
+                        operations, self.limits, self.memory_map, resume
+                    ),
+                    self.limits.max_msgs,
+                ):
+                    resume = batch[0]
+                    self._transfer_batch(operations, bases, batch)
+                break
+            except OSError as e:
+                if not self._reduce_limits(e):
+                    raise
+
+        return [None if data is None else bytes(data) for data in results]
+
+    def _transfer_batch(
+        self,
+        operations: Sequence[I2COperation],
+        bases: list[int | None],
+        batch: list[MessageGroup],
+    ) -> None:
+        """Build the messages of a batch and issue them as one ioctl."""
+        assert self.bus is not None
+        msgs = []
+        for group in batch:
+            op = operations[group.index]
+            addr_bytes = group.addr.to_bytes(2, "big")
+            if op.kind is I2COpKind.WRITE:
+                data = op.data[group.offset : group.offset + group.size]
+                msgs.append(smbus2.i2c_msg.write(self.device_addr, addr_bytes + data))
+                continue
+
+            prefix = op.data if op.kind is I2COpKind.WRITE_READ else addr_bytes
+            base = bases[group.index]
+            assert base is not None
+            msgs.append(smbus2.i2c_msg.write(self.device_addr, prefix))
+            msgs.append(
+                smbus2.i2c_msg(
+                    addr=self.device_addr,
+                    flags=smbus2.smbus2.I2C_M_RD,
+                    len=group.size,
+                    buf=ctypes.cast(base + group.offset, ctypes.POINTER(ctypes.c_char)),
+                )
+            )
+
+        self.bus.i2c_rdwr(*msgs)
 
     def close(self) -> None:
         """Close the I2C bus connection."""
@@ -235,6 +684,13 @@ class DebugI2CBackend(I2CBackend):
             data=data.hex(),
         )
 
+    def write_read(self, data: bytes, length: int) -> bytes:
+        """Set the register pointer, write any further bytes and read back."""
+        addr = int.from_bytes(data[:2], "big")
+        if len(data) > 2:
+            self.write(addr, data[2:])
+        return self.read(addr, length)
+
     def close(self) -> None:
         """Close debug backend."""
         logger.info("Debug I2C backend closed")
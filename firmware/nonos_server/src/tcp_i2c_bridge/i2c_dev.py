@@ -0,0 +1,402 @@
+"""I2C backend issuing raw i2c-dev ioctls."""
+
+import ctypes
+import fcntl
+import os
+from collections.abc import Sequence
+from pathlib import Path
+
+import structlog
+
+from tcp_i2c_bridge.i2c_backend import (
+    I2C_RDWR_IOCTL_MAX_MSGS,
+    MIN_MSG_LEN,
+    AdapterLimits,
+    I2CBackend,
+    I2COperation,
+    I2COpKind,
+    MessageGroup,
+    batch_message_groups,
+    plan_message_groups,
+)
+from tcp_i2c_bridge.memory_map import ADAU1452_MEMORY_MAP, MemoryMap
+
+logger = structlog.get_logger()
+
+# From linux/i2c-dev.h and linux/i2c.h
+I2C_FUNCS = 0x0705
+I2C_RDWR = 0x0707
+I2C_FUNC_I2C = 0x00000001
+I2C_M_RD = 0x0001
+
+
+class I2CMsg(ctypes.Structure):
+    """struct i2c_msg from linux/i2c.h."""
+
+    _fields_ = [
+        ("addr", ctypes.c_uint16),
+        ("flags", ctypes.c_uint16),
+        ("len", ctypes.c_uint16),
+        ("buf", ctypes.c_void_p),
+    ]
+
+
+class I2CRdwrIoctlData(ctypes.Structure):
+    """struct i2c_rdwr_ioctl_data from linux/i2c-dev.h."""
+
+    _fields_ = [
+        ("msgs", ctypes.POINTER(I2CMsg)),
+        ("nmsgs", ctypes.c_uint32),
+    ]
+
+
+class _PinnedBuffer:
+    """Reusable bytearray with a stable address for I2C message buffers.
+
+    The buffer only grows, so after the largest transfer has been seen no more
+    allocations happen.
+    """
+
+    def __init__(self, size: int):
+        self.data = bytearray(size)
+        self.view = memoryview(self.data)
+        self._c_data = (ctypes.c_char * size).from_buffer(self.data)
+        self.address = ctypes.addressof(self._c_data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+
+class I2CDevBackend(I2CBackend):
+    """I2C backend using I2C_RDWR ioctls on /dev/i2c-N.
+
+    Message structs and data buffers are allocated once and reused, so a
+    transfer only fills the buffers and issues the ioctl. Large transfers are
+    packed into as many messages per ioctl as the adapter accepts.
+    """
+
+    def __init__(
+        self,
+        i2c_bus: int,
+        device_addr: int,
+        limits: AdapterLimits | None = None,
+        memory_map: MemoryMap = ADAU1452_MEMORY_MAP,
+    ):
+        """Initialize i2c-dev backend.
+
+        Args:
+            i2c_bus: I2C bus number (e.g., 1 for /dev/i2c-1)
+            device_addr: I2C device address (7-bit)
+            limits: Adapter transfer limits; reduced automatically when the
+                adapter rejects a transfer
+            memory_map: Word widths of the device memory, used to split large
+                transfers on word boundaries
+        """
+        self.i2c_bus = i2c_bus
+        self.device_addr = device_addr
+        self.limits = limits or AdapterLimits()
+        self.memory_map = memory_map
+        self.fd: int | None = None
+
+        # Validate device address
+        if not (0 <= device_addr <= 0x7F):
+            raise ValueError(f"Invalid I2C device address: 0x{device_addr:02X}")
+
+        # Check if I2C device exists
+        i2c_dev_path = Path(f"/dev/i2c-{i2c_bus}")
+        if not i2c_dev_path.exists():
+            raise FileNotFoundError(f"I2C device not found: {i2c_dev_path}")
+
+        # Register address of single-message reads
+        self._addr_buf = _PinnedBuffer(2)
+        self._write_buf = _PinnedBuffer(MIN_MSG_LEN)
+        self._read_buf = _PinnedBuffer(MIN_MSG_LEN)
+
+        self._msgs = (I2CMsg * I2C_RDWR_IOCTL_MAX_MSGS)()
+        for msg in self._msgs:
+            msg.addr = device_addr
+        self._ioctl_data = I2CRdwrIoctlData(msgs=self._msgs, nmsgs=0)
+        self._ioctl_arg = ctypes.addressof(self._ioctl_data)
+
+        self._connect(i2c_dev_path)
+
+        logger.info(
+            "I2C backend initialized",
+            bus=i2c_bus,
+            device_addr=f"0x{device_addr:02X}",
+            device_path=str(i2c_dev_path),
+        )
+
+    def _connect(self, i2c_dev_path: Path) -> None:
+        """Open the i2c-dev device and check it supports plain I2C messages."""
+        try:
+            self.fd = os.open(i2c_dev_path, os.O_RDWR)
+        except Exception as e:
+            raise RuntimeError(f"Failed to open I2C bus {self.i2c_bus}: {e}") from e
+
+        funcs = ctypes.c_ulong()
+        try:
+            fcntl.ioctl(self.fd, I2C_FUNCS, ctypes.addressof(funcs))
+        except OSError as e:
+            self.close()
+            raise RuntimeError(f"Failed to query I2C bus {self.i2c_bus}: {e}") from e
+
+        if not funcs.value & I2C_FUNC_I2C:
+            self.close()
+            raise RuntimeError(f"I2C bus {self.i2c_bus} does not support I2C_RDWR")
+
+    def _set_msg(self, index: int, flags: int, length: int, buf: int) -> None:
+        """Point a preallocated message at a buffer."""
+        msg = self._msgs[index]
+        msg.flags = flags
+        msg.len = length
+        msg.buf = buf
+
+    def _transfer(self, nmsgs: int) -> None:
+        """Issue the first nmsgs preallocated messages as one I2C_RDWR ioctl."""
+        self._ioctl_data.nmsgs = nmsgs
+        fcntl.ioctl(self.fd, I2C_RDWR, self._ioctl_arg)
+
+    def _reduce_limits(self, error: OSError) -> bool:
+        """Reduce the adapter limits after a rejected transfer."""
+        limits = self.limits.reduced(error)
+        if limits is None:
+            return False
+
+        logger.warning(
+            "I2C adapter rejected transfer, reducing limits",
+            max_msg_len=limits.max_msg_len,
+            max_msgs=limits.max_msgs,
+            error=str(error),
+        )
+        self.limits = limits
+        return True
+
+    def read(self, addr: int, length: int) -> bytes:
+        """Read data from I2C device using 16-bit register addressing.
+
+        Args:
+            addr: 16-bit register address
+            length: Number of bytes to read
+
+        Returns:
+            Read data as bytes
+        """
+        if self.fd is None:
+            raise RuntimeError("I2C bus not connected")
+
+        if length <= 0:
+            raise ValueError("Read length must be positive")
+
+        if len(self._read_buf) < length:
+            self._read_buf = _PinnedBuffer(length)
+
+        try:
+            while length <= self.limits.max_msg_len:
+                try:
+                    self._read_into(addr, length)
+                    return bytes(self._read_buf.view[:length])
+                except OSError as e:
+                    if not self._reduce_limits(e):
+                        raise
+
+            # Chunked, resuming from the rejected ioctl if the limits shrink
+            data = self._run([I2COperation(I2COpKind.READ, addr=addr, length=length)])
+            assert data[0] is not None
+            return data[0]
+
+        except Exception as e:
+            logger.error(
+                "I2C read failed", addr=f"0x{addr:04X}", length=length, error=str(e)
+            )
+            raise RuntimeError(f"I2C read failed: {e}") from e
+
+    def _read_into(self, addr: int, length: int) -> None:
+        """Read into the read buffer as one write-read message pair."""
+        self._addr_buf.data[0] = (addr >> 8) & 0xFF
+        self._addr_buf.data[1] = addr & 0xFF
+        self._set_msg(0, 0, 2, self._addr_buf.address)
+        self._set_msg(1, I2C_M_RD, length, self._read_buf.address)
+        self._transfer(2)
+
+    def write(self, addr: int, data: bytes) -> None:
+        """Write data to I2C device using 16-bit register addressing.
+
+        Args:
+            addr: 16-bit register address
+            data: Data to write
+        """
+        if self.fd is None:
+            raise RuntimeError("I2C bus not connected")
+
+        if len(data) == 0:
+            raise ValueError("Write data cannot be empty")
+
+        try:
+            while len(data) + 2 <= self.limits.max_msg_len:
+                try:
+                    self._write_from(addr, data)
+                    return
+                except OSError as e:
+                    if not self._reduce_limits(e):
+                        raise
+
+            # Chunked, resuming from the rejected ioctl if the limits shrink
+            self._run([I2COperation(I2COpKind.WRITE, addr=addr, data=bytes(data))])
+
+        except Exception as e:
+            logger.error(
+                "I2C write failed",
+                addr=f"0x{addr:04X}",
+                length=len(data),
+                data=data.hex(),
+                error=str(e),
+            )
+            raise RuntimeError(f"I2C write failed: {e}") from e
+
+    def _write_from(self, addr: int, data: bytes) -> None:
+        """Write [addr_hi, addr_lo, data...] as one message."""
+        length = len(data)
+        if len(self._write_buf) < length + 2:
+            self._write_buf = _PinnedBuffer(length + 2)
+        self._write_buf.data[0] = (addr >> 8) & 0xFF
+        self._write_buf.data[1] = addr & 0xFF
+        self._write_buf.view[2 : 2 + length] = data
+        self._set_msg(0, 0, length + 2, self._write_buf.address)
+        self._transfer(1)
+
+    def write_read(self, data: bytes, length: int) -> bytes:
+        """Write raw bytes and read back after a repeated start.
+
+        Args:
+            data: Bytes to write, including any register address
+            length: Number of bytes to read
+
+        Returns:
+            Read data as bytes
+        """
+        operation = I2COperation(I2COpKind.WRITE_READ, data=data, length=length)
+        result = self.submit([operation])[0]
+        assert result is not None
+        return result
+
+    def submit(self, operations: Sequence[I2COperation]) -> list[bytes | None]:
+        """Run a batch of operations in as few I2C_RDWR ioctls as possible.
+
+        Args:
+            operations: Operations to run
+
+        Returns:
+            One result per operation: read data, or None for writes
+        """
+        if self.fd is None:
+            raise RuntimeError("I2C bus not connected")
+
+        try:
+            return self._run(operations)
+        except Exception as e:
+            logger.error(
+                "I2C transaction failed", operations=len(operations), error=str(e)
+            )
+            raise RuntimeError(f"I2C transaction failed: {e}") from e
+
+    def _run(self, operations: Sequence[I2COperation]) -> list[bytes | None]:
+        """Run operations within the adapter limits, reducing them on rejection.
+
+        A rejected ioctl never reaches the bus, so the transfer resumes with
+        it under the reduced limits instead of starting over.
+        """
+        # Every read lands in its own slice of the shared read buffer
+        read_offsets = []
+        total = 0
+        for op in operations:
+            read_offsets.append(total)
+            if op.kind is not I2COpKind.WRITE:
+                total += op.length
+        if len(self._read_buf) < total:
+            self._read_buf = _PinnedBuffer(total)
+
+        resume = None
+        while True:
+            try:
+                for batch in batch_message_groups(
+                    plan_message_groups(
+                        operations, self.limits, self.memory_map, resume
+                    ),
+                    self.limits.max_msgs,
+                ):
+                    resume = batch[0]
+                    self._transfer_batch(operations, read_offsets, batch)
+                break
+            except OSError as e:
+                if not self._reduce_limits(e):
+                    raise
+
+        view = self._read_buf.view
+        return [
+            (
+                None
+                if op.kind is I2COpKind.WRITE
+                else bytes(view[offset : offset + op.length])
+            )
+            for op, offset in zip(operations, read_offsets, strict=True)
+        ]
+
+    def _transfer_batch(
+        self,
+        operations: Sequence[I2COperation],
+        read_offsets: list[int],
+        batch: list[MessageGroup],
+    ) -> None:
+        """Lay out the write messages of a batch and issue them as one ioctl."""
+        needed = 0
+        for group in batch:
+            op = operations[group.index]
+            if op.kind is I2COpKind.WRITE:
+                needed += group.size + 2
+            elif op.kind is I2COpKind.WRITE_READ:
+                needed += len(op.data)
+            else:
+                needed += 2
+        if len(self._write_buf) < needed:
+            self._write_buf = _PinnedBuffer(needed)
+
+        buffer = self._write_buf.data
+        view = self._write_buf.view
+        base = self._write_buf.address
+        read_base = self._read_buf.address
+
+        nmsgs = 0
+        position = 0
+        for group in batch:
+            op = operations[group.index]
+            if op.kind is I2COpKind.WRITE_READ:
+                size = len(op.data)
+                view[position : position + size] = op.data
+            else:
+                buffer[position] = (group.addr >> 8) & 0xFF
+                buffer[position + 1] = group.addr & 0xFF
+                size = 2
+                if op.kind is I2COpKind.WRITE:
+                    view[position + 2 : position + 2 + group.size] = op.data[
+                        group.offset : group.offset + group.size
+                    ]
+                    size += group.size
+
+            self._set_msg(nmsgs, 0, size, base + position)
+            nmsgs += 1
+            position += size
+
+            if op.kind is not I2COpKind.WRITE:
+                read_addr = read_base + read_offsets[group.index] + group.offset
+                self._set_msg(nmsgs, I2C_M_RD, group.size, read_addr)
+                nmsgs += 1
+
+        self._transfer(nmsgs)
+
+    def close(self) -> None:
+        """Close the i2c-dev file descriptor."""
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+            logger.info("I2C backend closed")
@@ -0,0 +1,130 @@
+"""Word-addressed memory layout of I2C target devices."""
+
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+
+
+@dataclass(frozen=True)
+class MemoryRegion:
+    """A range of register addresses sharing one word width."""
+
+    name: str
+    start: int
+    """
+    First word address of the region
+    """
+    end: int
+    """
+    Last word address of the region (inclusive)
+    """
+    word_size: int
+    """
+    Bytes per address increment
+    """
+
+    def __post_init__(self):
+        if self.word_size <= 0:
+            raise ValueError(f"Invalid word size for {self.name}: {self.word_size}")
+        if self.end < self.start:
+            raise ValueError(f"Invalid address range for {self.name}")
+
+    def __contains__(self, addr: int) -> bool:
+        return self.start <= addr <= self.end
+
+
+@dataclass(frozen=True)
+class MemoryMap:
+    """Memory regions of a device, used to split transfers on word boundaries.
+
+    Addresses outside every region are treated as byte-addressed with
+    `default_word_size`.
+    """
+
+    regions: tuple[MemoryRegion, ...] = ()
+    default_word_size: int = 1
+    _starts: tuple[int, ...] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        regions = tuple(sorted(self.regions, key=lambda region: region.start))
+        for previous, region in zip(regions, regions[1:], strict=False):
+            if region.start <= previous.end:
+                raise ValueError(
+                    f"Memory regions {previous.name} and {region.name} overlap"
+                )
+        object.__setattr__(self, "regions", regions)
+        object.__setattr__(self, "_starts", tuple(r.start for r in regions))
+
+    def region(self, addr: int) -> MemoryRegion | None:
+        """Return the region containing an address, if any."""
+        for region in self.regions:
+            if addr in region:
+                return region
+            if region.start > addr:
+                break
+        return None
+
+    def word_size(self, addr: int) -> int:
+        """Return the number of bytes per word at an address."""
+        region = self.region(addr)
+        return region.word_size if region else self.default_word_size
+
+    def words_left(self, addr: int) -> int | None:
+        """Return the words from an address to the next region boundary, or None."""
+        region = self.region(addr)
+        if region is not None:
+            return region.end - addr + 1
+        for start in self._starts:
+            if start > addr:
+                return start - addr
+        return None
+
+    def iter_chunks(
+        self, addr: int, length: int, max_chunk: int
+    ) -> Iterator[tuple[int, int, int]]:
+        """Split a transfer into word-aligned chunks.
+
+        Each chunk is the largest whole number of words fitting in max_chunk and
+        the register address advances by words, not bytes. Chunks never cross a
+        region boundary, so the word width is constant within a chunk.
+
+        Args:
+            addr: Register address of the first word
+            length: Total number of bytes
+            max_chunk: Maximum number of bytes per chunk
+
+        Yields:
+            (register address, offset, size) of each chunk
+        """
+        offset = 0
+        while offset < length:
+            word_size = self.word_size(addr)
+            if max_chunk < word_size:
+                raise ValueError(
+                    f"Chunk size {max_chunk} is smaller than the {word_size}-byte "
+                    f"word at 0x{addr:04X}"
+                )
+
+            words = max_chunk // word_size
+            words_left = self.words_left(addr)
+            if words_left is not None:
+                words = min(words, words_left)
+
+            size = min(words * word_size, length - offset)
+            yield addr, offset, size
+
+            offset += size
+            addr += words
+
+
+# Byte-addressed devices
+BYTE_MEMORY_MAP = MemoryMap()
+
+# ADAU1452 data memories, program memory and control registers
+ADAU1452_MEMORY_MAP = MemoryMap(
+    regions=(
+        MemoryRegion("DM0", 0x0000, 0x5FFF, 4),
+        MemoryRegion("DM1", 0x6000, 0xBFFF, 4),
+        MemoryRegion("PM", 0xC000, 0xDFFF, 5),
+        MemoryRegion("Registers", 0xF000, 0xFFFF, 2),
+    )
+)
@@ -0,0 +1,419 @@
+"""Device memory snapshots reconstructed from captures.
+
+The I2C writes of a capture are folded into a flat image of the device's
+address space, laid out by its memory map: each word address owns the bytes
+of one word, in address order. Folding works on NumPy arrays of whole batches
+of records, so a capture with millions of transactions is reconstructed
+without a Python loop per record. For uncompressed captures the record
+offsets come from the sidecar index and the headers and payloads are
+gathered straight from the mapped file; segments are decompressed and read
+record by record, then folded in batches.
+
+Snapshots at several points in time are built in one pass: writes are first
+folded per interval between two requested times, then the intervals are
+overlaid in order. A write belongs to the snapshots from its timestamp on.
+
+NumPy is an optional dependency:
+
+    pip install 'nonos-server[analysis]'
+"""
+
+import mmap
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+from tcp_i2c_bridge.capture import (
+    CaptureRecordType,
+    Operation,
+    is_seekable,
+    open_index,
+    read_capture,
+)
+from tcp_i2c_bridge.memory_map import ADAU1452_MEMORY_MAP, MemoryMap
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Register addresses are 16-bit
+ADDRESS_SPACE = 0x10000
+
+# Records gathered and folded at once
+BATCH_SIZE = 1 << 18
+
+# Operations that change device memory
+_WRITES = (Operation.WRITE, Operation.SAFELOAD)
+
+# Record header of a capture, as laid out in capture.py
+_RECORD_FIELDS = [
+    ("type", "u1"),
+    ("code", "u1"),
+    ("client", "<u2"),
+    ("timestamp", "<u8"),
+    ("addr", "<u2"),
+    ("chip", "<u2"),
+    ("length", "<u4"),
+    ("size", "<u4"),
+]
+
+
+def _numpy():
+    """Import NumPy, which only this module needs."""
+    try:
+        import numpy
+    except ImportError as e:
+        raise RuntimeError(
+            "Memory snapshots need NumPy: pip install 'nonos-server[analysis]'"
+        ) from e
+    return numpy
+
+
+def _ranges(starts: "np.ndarray", lengths: "np.ndarray") -> "np.ndarray":
+    """Concatenate the index ranges [start, start + length) of all pairs."""
+    np = _numpy()
+    lengths = lengths.astype(np.int64)
+    before = np.cumsum(lengths) - lengths
+    return np.repeat(starts.astype(np.int64) - before, lengths) + np.arange(
+        lengths.sum(), dtype=np.int64
+    )
+
+
+@dataclass(frozen=True, eq=False)
+class MemoryLayout:
+    """Position of every word address of a device in a flat memory image."""
+
+    offsets: "np.ndarray"
+    """
+    First byte of each word address, followed by the image size
+    """
+
+    @classmethod
+    def of(cls, memory_map: MemoryMap) -> "MemoryLayout":
+        """Lay out the address space of a memory map."""
+        np = _numpy()
+        sizes = np.full(ADDRESS_SPACE, memory_map.default_word_size, dtype=np.int64)
+        for region in memory_map.regions:
+            sizes[region.start : region.end + 1] = region.word_size
+        offsets = np.zeros(ADDRESS_SPACE + 1, dtype=np.int64)
+        np.cumsum(sizes, out=offsets[1:])
+        return cls(offsets)
+
+    @property
+    def size(self) -> int:
+        return int(self.offsets[-1])
+
+    def words(self, byte_offsets: "np.ndarray") -> "np.ndarray":
+        """Word addresses owning bytes of the image."""
+        np = _numpy()
+        return np.searchsorted(self.offsets, byte_offsets, side="right") - 1
+
+
+class _Batch(NamedTuple):
+    """Write records in capture order, as arrays."""
+
+    timestamps: "np.ndarray"
+    addrs: "np.ndarray"
+    sizes: "np.ndarray"
+    payload: "np.ndarray"
+    """
+    Data of all records, concatenated
+    """
+
+    def select(self, mask: "np.ndarray") -> "_Batch":
+        np = _numpy()
+        return _Batch(
+            self.timestamps[mask],
+            self.addrs[mask],
+            self.sizes[mask],
+            self.payload[np.repeat(mask, self.sizes)],
+        )
+
+
+def _indexed_batches(
+    capture: Path,
+    clients: frozenset[str] | None,
+    chip: int | None,
+    end: int | None,
+) -> Iterator[_Batch]:
+    """Gather the write records of an uncompressed capture via its index."""
+    np = _numpy()
+    record = np.dtype(_RECORD_FIELDS)
+
+    with open_index(capture) as index, open(capture, "rb") as f:
+        low, high = index.span(None, end)
+        postings = [
+            np.frombuffer(p, dtype=np.uint64)
+            for p in index.address_records(0, ADDRESS_SPACE - 1, low, high)
+        ]
+        if not postings:
+            return
+        offsets = np.sort(np.concatenate(postings)).astype(np.int64)
+        wanted = (
+            None
+            if clients is None
+            else [i for i, name in index.clients.items() if name in clients]
+        )
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            data = np.frombuffer(mapped, dtype=np.uint8)
+            try:
+                for first in range(0, len(offsets), BATCH_SIZE):
+                    chunk = offsets[first : first + BATCH_SIZE]
+                    # Fancy indexing copies, so nothing refers to the map after
+                    headers = data[chunk[:, None] + np.arange(record.itemsize)]
+                    headers = headers.view(record)[:, 0]
+
+                    keep = np.isin(headers["code"], _WRITES)
+                    if end is not None:
+                        keep &= headers["timestamp"] <= end
+                    if wanted is not None:
+                        keep &= np.isin(headers["client"], wanted)
+                    if chip is not None:
+                        keep &= headers["chip"] == chip
+                    headers, chunk = headers[keep], chunk[keep]
+
+                    sizes = headers["size"].astype(np.int64)
+                    yield _Batch(
+                        headers["timestamp"],
+                        headers["addr"],
+                        sizes,
+                        data[_ranges(chunk + record.itemsize, sizes)],
+                    )
+            finally:
+                del data
+
+
+def _streamed_batches(
+    capture: Path,
+    clients: frozenset[str] | None,
+    chip: int | None,
+    end: int | None,
+) -> Iterator[_Batch]:
+    """Read the write records of segments, batching them as they come."""
+    np = _numpy()
+    timestamps: list[int] = []
+    addrs: list[int] = []
+    payloads: list[bytes] = []
+
+    def batch() -> _Batch:
+        return _Batch(
+            np.array(timestamps, dtype=np.uint64),
+            np.array(addrs, dtype=np.uint16),
+            np.array([len(p) for p in payloads], dtype=np.int64),
+            np.frombuffer(b"".join(payloads), dtype=np.uint8),
+        )
+
+    for record in read_capture(capture):
+        if record.type != CaptureRecordType.I2C or record.code not in _WRITES:
+            continue
+        if clients is not None and record.client not in clients:
+            continue
+        if chip is not None and record.chip != chip:
+            continue
+        if end is not None and record.timestamp > end:
+            continue
+        timestamps.append(record.timestamp)
+        addrs.append(record.addr)
+        payloads.append(record.data)
+        if len(timestamps) == BATCH_SIZE:
+            yield batch()
+            timestamps, addrs, payloads = [], [], []
+
+    if timestamps:
+        yield batch()
+
+
+class _Image:
+    """Bytes of a memory image and which of them were written."""
+
+    def __init__(self, layout: MemoryLayout):
+        np = _numpy()
+        self.layout = layout
+        self.data = np.zeros(layout.size, dtype=np.uint8)
+        self.written = np.zeros(layout.size, dtype=bool)
+
+    def fold(self, batch: _Batch) -> None:
+        """Apply writes in order, the last write of a byte winning."""
+        np = _numpy()
+        destinations = _ranges(self.layout.offsets[batch.addrs], batch.sizes)
+        # First occurrence in reverse is the last write of each byte
+        positions, last = np.unique(destinations[::-1], return_index=True)
+        values = batch.payload[::-1][last]
+        # Writes running past the end of the address space
+        inside = positions < self.layout.size
+        self.data[positions[inside]] = values[inside]
+        self.written[positions[inside]] = True
+
+    def overlay(self, other: "_Image") -> None:
+        """Apply the bytes written in a later image."""
+        self.data[other.written] = other.data[other.written]
+        self.written |= other.written
+
+
+@dataclass(frozen=True)
+class MemoryChange:
+    """Contiguous words that differ between two snapshots."""
+
+    addr: int
+    words: int
+    before: bytes
+    after: bytes
+
+
+@dataclass(frozen=True, eq=False)
+class MemorySnapshot:
+    """Device memory as written up to a point in time.
+
+    Bytes never written read as zero.
+    """
+
+    timestamp: int | None
+    """
+    Nanoseconds since the epoch, or None for the end of the capture
+    """
+    layout: MemoryLayout
+    data: "np.ndarray"
+    written: "np.ndarray"
+
+    def read(self, addr: int, words: int = 1) -> bytes:
+        """Bytes of consecutive words."""
+        offsets = self.layout.offsets
+        return self.data[offsets[addr] : offsets[addr + words]].tobytes()
+
+    def is_written(self, addr: int, words: int = 1) -> bool:
+        """Whether every byte of consecutive words was written."""
+        offsets = self.layout.offsets
+        return bool(self.written[offsets[addr] : offsets[addr + words]].all())
+
+    def words(
+        self, addr_min: int = 0, addr_max: int = ADDRESS_SPACE - 1
+    ) -> list[tuple[int, bytes]]:
+        """Written words of an address range as (address, data) pairs."""
+        np = _numpy()
+        offsets = self.layout.offsets
+        low = offsets[addr_min]
+        written = np.flatnonzero(self.written[low : offsets[addr_max + 1]]) + low
+        return [
+            (int(a), self.read(int(a))) for a in np.unique(self.layout.words(written))
+        ]
+
+    def diff(self, later: "MemorySnapshot") -> list[MemoryChange]:
+        """Runs of consecutive words that differ in a later snapshot."""
+        np = _numpy()
+        changed = (self.data != later.data) | (self.written != later.written)
+        words = np.unique(self.layout.words(np.flatnonzero(changed)))
+        if not len(words):
+            return []
+
+        changes = []
+        for run in np.split(words, np.flatnonzero(np.diff(words) != 1) + 1):
+            addr, count = int(run[0]), len(run)
+            changes.append(
+                MemoryChange(
+                    addr, count, self.read(addr, count), later.read(addr, count)
+                )
+            )
+        return changes
+
+
+def snapshots(
+    capture: Path,
+    times: Iterable[int | None],
+    memory_map: MemoryMap = ADAU1452_MEMORY_MAP,
+    clients: Iterable[str] | None = None,
+    chip: int | None = None,
+) -> list[MemorySnapshot]:
+    """Reconstruct device memory at several points in time in one pass.
+
+    Args:
+        capture: Capture file, segment or segment directory
+        times: Nanoseconds since the epoch, None for the end of the capture
+        memory_map: Word widths of the device's registers and memories
+        clients: Only fold the writes of these clients
+        chip: Only fold the writes to this protocol chip address
+
+    Returns:
+        One snapshot per time, in the order given
+    """
+    np = _numpy()
+    requested = list(times)
+    if not requested:
+        raise ValueError("No times to take snapshots at")
+    end_of_capture = np.iinfo(np.uint64).max
+    bounds = sorted({end_of_capture if t is None else t for t in requested})
+    end = None if None in requested else bounds[-1]
+    wanted = None if clients is None else frozenset(clients)
+
+    layout = MemoryLayout.of(memory_map)
+    intervals = [_Image(layout) for _ in bounds]
+    batches = (
+        _indexed_batches(capture, wanted, chip, end)
+        if is_seekable(capture)
+        else _streamed_batches(capture, wanted, chip, end)
+    )
+    for batch in batches:
+        # Interval of each write: the first requested time not before it
+        interval = np.searchsorted(np.array(bounds, dtype=np.uint64), batch.timestamps)
+        for i in np.unique(interval):
+            if i < len(bounds):
+                intervals[i].fold(batch.select(interval == i))
+
+    image = _Image(layout)
+    by_time = {}
+    for bound, delta in zip(bounds, intervals, strict=True):
+        image.overlay(delta)
+        by_time[bound] = (image.data.copy(), image.written.copy())
+
+    result = []
+    for t in requested:
+        data, written = by_time[end_of_capture if t is None else t]
+        result.append(MemorySnapshot(t, layout, data, written))
+    return result
+
+
+def snapshot(
+    capture: Path,
+    at: int | None = None,
+    memory_map: MemoryMap = ADAU1452_MEMORY_MAP,
+    clients: Iterable[str] | None = None,
+    chip: int | None = None,
+) -> MemorySnapshot:
+    """Reconstruct device memory at a point in time.
+
+    Args:
+        capture: Capture file, segment or segment directory
+        at: Nanoseconds since the epoch, or None for the end of the capture
+        memory_map: Word widths of the device's registers and memories
+        clients: Only fold the writes of these clients
+        chip: Only fold the writes to this protocol chip address
+
+    Returns:
+        Memory as written up to and including `at`
+    """
+    return snapshots(capture, [at], memory_map, clients, chip)[0]
+
+
+def diff_capture(
+    capture: Path,
+    start: int | None,
+    end: int | None,
+    memory_map: MemoryMap = ADAU1452_MEMORY_MAP,
+    clients: Iterable[str] | None = None,
+    chip: int | None = None,
+) -> list[MemoryChange]:
+    """Memory changed by the writes between two points in time.
+
+    Args:
+        capture: Capture file, segment or segment directory
+        start: Nanoseconds since the epoch, or None for the start of the capture
+        end: Nanoseconds since the epoch, or None for the end of the capture
+        memory_map: Word widths of the device's registers and memories
+        clients: Only fold the writes of these clients
+        chip: Only fold the writes to this protocol chip address
+
+    Returns:
+        Changed runs of consecutive words, by address
+    """
+    before, after = snapshots(capture, [start or 0, end], memory_map, clients, chip)
+    return before.diff(after)
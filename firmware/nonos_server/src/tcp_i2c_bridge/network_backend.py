@@ -0,0 +1,240 @@
+"""I2C backend using a remote TCP-I2C bridge as its bus."""
+
+import socket
+import threading
+from collections import deque
+from collections.abc import Sequence
+from concurrent.futures import Future
+
+import structlog
+
+from tcp_i2c_bridge.i2c_backend import I2CBackend, I2COperation, I2COpKind
+from tcp_i2c_bridge.protocol import DecodeException, DecodeExceptionInsufficientData
+from tcp_i2c_bridge.protocol import Read as NetworkRead
+from tcp_i2c_bridge.protocol import Write as NetworkWrite
+
+logger = structlog.get_logger()
+
+DEFAULT_PORT = 8086
+
+
+class NetworkI2CBackend(I2CBackend):
+    """I2C backend talking to a remote bridge over the SigmaStudio protocol.
+
+    Keeps one connection open and pipelines requests: writes are sent without
+    waiting, as the protocol does not acknowledge them, and read requests go
+    out immediately while a receiver thread matches the responses to them in
+    order. A transaction therefore costs about one network round trip, not one
+    per operation.
+
+    Failed writes are only logged by the bridge; a read issued afterwards sees
+    the device state they left. A read not answered within the timeout fails
+    the connection, as later responses could no longer be matched to their
+    requests.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = DEFAULT_PORT,
+        chip_address: int = 1,
+        timeout: float = 5.0,
+    ):
+        """Connect to a remote bridge.
+
+        Args:
+            host: Host running the bridge
+            port: TCP port of the bridge
+            chip_address: Protocol chip address the bridge routes to the device
+            timeout: Seconds to wait for connecting and for read responses
+        """
+        if not (0 <= chip_address <= 0xFF):
+            raise ValueError(f"Invalid chip address: {chip_address}")
+
+        self.host = host
+        self.port = port
+        self.chip_address = chip_address
+        self.timeout = timeout
+        try:
+            self.sock = socket.create_connection((host, port), timeout)
+        except OSError as e:
+            raise RuntimeError(f"Failed to connect to bridge {host}:{port}: {e}") from e
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.settimeout(None)
+
+        self._send_lock = threading.Lock()
+        self._pending: deque[tuple[NetworkRead.Request, Future[bytes]]] = deque()
+        self._error: Exception | None = None
+        self._receiver = threading.Thread(
+            target=self._receive, name=f"i2c-network-{host}:{port}", daemon=True
+        )
+        self._receiver.start()
+
+        logger.info(
+            "Network I2C backend connected",
+            host=host,
+            port=port,
+            chip_address=chip_address,
+        )
+
+    def _receive(self) -> None:
+        """Match read responses to the pending requests in order."""
+        buffer = b""
+        try:
+            while True:
+                data = self.sock.recv(65536)
+                if not data:
+                    raise ConnectionError("Bridge closed the connection")
+                buffer += data
+
+                while buffer:
+                    try:
+                        response, buffer = NetworkRead.Response.unpack(buffer)
+                    except DecodeExceptionInsufficientData:
+                        break
+
+                    request, future = self._pending.popleft()
+                    if response.Address != request.Address:
+                        raise ConnectionError(
+                            f"Response for 0x{response.Address:04X} does not match "
+                            f"the read at 0x{request.Address:04X}"
+                        )
+                    if response.Status:
+                        future.set_exception(
+                            RuntimeError(
+                                f"I2C read failed: bridge reported an error at "
+                                f"0x{request.Address:04X}"
+                            )
+                        )
+                    else:
+                        future.set_result(response.Data)
+
+        except (OSError, DecodeException, IndexError) as e:
+            self._fail(e)
+
+    def _fail(self, error: Exception) -> None:
+        """Mark the connection failed and fail the pending reads."""
+        with self._send_lock:
+            if self._error is None:
+                self._error = error
+            pending = list(self._pending)
+            self._pending.clear()
+        for _, future in pending:
+            future.set_exception(RuntimeError(f"Connection to bridge lost: {error}"))
+
+    def _result(self, future: Future[bytes]) -> bytes:
+        """Wait for a read response, failing the connection on timeout."""
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            self._fail(TimeoutError(f"no response within {self.timeout} s"))
+            # Stops the receiver; responses still in flight cannot be matched
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            raise RuntimeError(
+                f"I2C read failed: bridge did not respond within {self.timeout} s"
+            ) from None
+
+    def _send(self, operations: Sequence[I2COperation]) -> list[Future[bytes] | None]:
+        """Send the requests of operations without waiting for responses."""
+        packets = []
+        reads: list[NetworkRead.Request | None] = []
+        for op in operations:
+            if op.kind is I2COpKind.WRITE:
+                packets.append(
+                    NetworkWrite.Request.create(
+                        chip_address=self.chip_address, address=op.addr, data=op.data
+                    ).pack()
+                )
+                reads.append(None)
+                continue
+
+            if op.kind is I2COpKind.WRITE_READ:
+                # The protocol only reads from a 16-bit register address
+                if len(op.data) != 2:
+                    raise ValueError(
+                        "Network backend only supports write-read transfers "
+                        "of a 16-bit register address"
+                    )
+                addr = int.from_bytes(op.data, "big")
+            else:
+                addr = op.addr
+            request = NetworkRead.Request.create(
+                chip_address=self.chip_address, address=addr, length=op.length
+            )
+            packets.append(request.pack())
+            reads.append(request)
+
+        futures: list[Future[bytes] | None] = []
+        with self._send_lock:
+            if self._error is not None:
+                raise RuntimeError(f"Connection to bridge lost: {self._error}")
+            for request in reads:
+                if request is None:
+                    futures.append(None)
+                    continue
+                future: Future[bytes] = Future()
+                self._pending.append((request, future))
+                futures.append(future)
+            try:
+                self.sock.sendall(b"".join(packets))
+            except OSError as e:
+                raise RuntimeError(f"Failed to send to bridge: {e}") from e
+        return futures
+
+    def read_async(self, addr: int, length: int) -> Future[bytes]:
+        """Send a read request without waiting for its response.
+
+        Args:
+            addr: 16-bit register address
+            length: Number of bytes to read
+
+        Returns:
+            Future resolving to the read data
+        """
+        if length <= 0:
+            raise ValueError("Read length must be positive")
+        future = self._send([I2COperation(I2COpKind.READ, addr=addr, length=length)])
+        assert future[0] is not None
+        return future[0]
+
+    def submit(self, operations: Sequence[I2COperation]) -> list[bytes | None]:
+        """Send all operations at once and wait for the read responses.
+
+        Args:
+            operations: Operations to run
+
+        Returns:
+            One result per operation: read data, or None for writes
+        """
+        futures = self._send(operations)
+        return [None if future is None else self._result(future) for future in futures]
+
+    def read(self, addr: int, length: int) -> bytes:
+        """Read from the remote device using 16-bit register addressing."""
+        return self._result(self.read_async(addr, length))
+
+    def write(self, addr: int, data: bytes) -> None:
+        """Write to the remote device using 16-bit register addressing."""
+        if len(data) == 0:
+            raise ValueError("Write data cannot be empty")
+        self._send([I2COperation(I2COpKind.WRITE, addr=addr, data=bytes(data))])
+
+    def write_read(self, data: bytes, length: int) -> bytes:
+        """Read from the 16-bit register address in data."""
+        operation = I2COperation(I2COpKind.WRITE_READ, data=bytes(data), length=length)
+        result = self.submit([operation])[0]
+        assert result is not None
+        return result
+
+    def close(self) -> None:
+        """Close the connection to the bridge."""
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+        self._receiver.join(self.timeout)
+        logger.info("Network I2C backend closed", host=self.host, port=self.port)
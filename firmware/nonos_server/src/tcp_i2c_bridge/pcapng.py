@@ -0,0 +1,253 @@
+"""pcapng export of protocol dump captures.
+
+A capture is converted record by record into a pcapng file for Wireshark,
+keeping only the TCP sequence numbers of each client in memory, so exporting
+works on captures of any size, also straight into a pipe.
+
+Interface 0 carries the network layer as IPv4/TCP packets between each client
+and the bridge, with synthetic headers: requests as decoded by the bridge
+(RX_DECODED) go from the client to the bridge, responses (TX) back. RX_RAW
+records repeat the receive buffer and are left out. Interface 1 carries the
+I2C layer with link type USER0 and a pseudo header, followed by the data:
+
+    operation   B   Operation
+    reserved    B
+    addr        H   register address (big endian)
+    length      I   transaction length (big endian)
+
+sigmastudio.lua, next to this module, dissects both for Wireshark.
+"""
+
+import ipaddress
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+from tcp_i2c_bridge.capture import (
+    CaptureRecord,
+    CaptureRecordType,
+    Direction,
+    read_capture,
+)
+
+# Wireshark Lua dissector for the SigmaStudio protocol and the I2C layer
+DISSECTOR = Path(__file__).with_name("sigmastudio.lua")
+
+DEFAULT_BRIDGE_ADDRESS = "127.0.0.1"
+DEFAULT_BRIDGE_PORT = 8086
+
+LINKTYPE_IPV4 = 228
+LINKTYPE_I2C = 147
+"""
+LINKTYPE_USER0, reserved for private use
+"""
+
+_SHB = 0x0A0D0D0A
+_IDB = 0x00000001
+_EPB = 0x00000006
+_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+
+_OPT_END = 0
+_OPT_COMMENT = 1
+_OPT_IF_NAME = 2
+_OPT_IF_TSRESOL = 9
+
+_BLOCK = struct.Struct("<II")
+_SECTION = struct.Struct("<IHHq")
+_INTERFACE = struct.Struct("<HHI")
+_PACKET = struct.Struct("<IIIII")
+_OPTION = struct.Struct("<HH")
+
+_IPV4 = struct.Struct(">BBHHHBBH4s4s")
+_TCP = struct.Struct(">HHIIBBHHH")
+_I2C_HEADER = struct.Struct(">BBHI")
+
+_TCP_PSH_ACK = 0x18
+
+# TCP payload of one synthetic packet at most; larger packets are segmented
+MAX_SEGMENT = 0xFFFF - _IPV4.size - _TCP.size
+
+
+def _option(code: int, value: bytes) -> bytes:
+    return _OPTION.pack(code, len(value)) + value + bytes(-len(value) % 4)
+
+
+def _block(block_type: int, body: bytes) -> bytes:
+    length = _BLOCK.size + len(body) + 4
+    return _BLOCK.pack(block_type, length) + body + struct.pack("<I", length)
+
+
+def _checksum(header: bytes) -> int:
+    total = sum(struct.unpack(f">{len(header) // 2}H", header))
+    while total > 0xFFFF:
+        total = (total & 0xFFFF) + (total >> 16)
+    return ~total & 0xFFFF
+
+
+@dataclass
+class _TCPStream:
+    """Synthetic TCP connection of a client."""
+
+    address: bytes
+    port: int
+    client_seq: int = 1
+    bridge_seq: int = 1
+
+
+class PcapngWriter:
+    """Write capture records as pcapng packets to a stream."""
+
+    def __init__(
+        self,
+        out: BinaryIO,
+        bridge_address: str = DEFAULT_BRIDGE_ADDRESS,
+        bridge_port: int = DEFAULT_BRIDGE_PORT,
+    ):
+        """Write the section header and interface descriptions.
+
+        Args:
+            out: Binary stream to write to
+            bridge_address: IPv4 address given to the bridge
+            bridge_port: TCP port given to the bridge
+        """
+        self.out = out
+        self.bridge = (ipaddress.IPv4Address(bridge_address).packed, bridge_port)
+        self.packets = 0
+        self._streams: dict[str, _TCPStream] = {}
+        self._ip_id = 0
+
+        out.write(_block(_SHB, _SECTION.pack(_BYTE_ORDER_MAGIC, 1, 0, -1)))
+        for link_type, name in (
+            (LINKTYPE_IPV4, b"sigmastudio"),
+            (LINKTYPE_I2C, b"i2c"),
+        ):
+            options = (
+                _option(_OPT_IF_NAME, name)
+                + _option(_OPT_IF_TSRESOL, b"\x09")
+                + _option(_OPT_END, b"")
+            )
+            out.write(_block(_IDB, _INTERFACE.pack(link_type, 0, 0) + options))
+
+    def _stream(self, client: str) -> _TCPStream:
+        stream = self._streams.get(client)
+        if stream is None:
+            host, _, port = client.rpartition(":")
+            try:
+                address = ipaddress.IPv4Address(host).packed
+                client_port = int(port)
+            except ValueError:
+                # Not an IPv4 peer: give it an address of its own
+                index = len(self._streams)
+                address = bytes((10, 255, index >> 8 & 0xFF, index & 0xFF))
+                client_port = 49152 + index % 16384
+            stream = self._streams[client] = _TCPStream(address, client_port)
+        return stream
+
+    def _packet(
+        self, interface: int, timestamp: int, data: bytes, options: bytes = b""
+    ) -> None:
+        body = _PACKET.pack(
+            interface,
+            timestamp >> 32,
+            timestamp & 0xFFFFFFFF,
+            len(data),
+            len(data),
+        )
+        self.out.write(_block(_EPB, body + data + bytes(-len(data) % 4) + options))
+        self.packets += 1
+
+    def network(
+        self, client: str, direction: Direction, timestamp: int, data: bytes
+    ) -> None:
+        """Write a network packet as TCP segments of its client's stream."""
+        if direction == Direction.RX_RAW:
+            return
+
+        stream = self._stream(client)
+        peer = (stream.address, stream.port)
+        from_client = direction != Direction.TX
+
+        for start in range(0, max(len(data), 1), MAX_SEGMENT):
+            segment = data[start : start + MAX_SEGMENT]
+            if from_client:
+                src, dst = peer, self.bridge
+                seq, ack = stream.client_seq, stream.bridge_seq
+                stream.client_seq = (seq + len(segment)) & 0xFFFFFFFF
+            else:
+                src, dst = self.bridge, peer
+                seq, ack = stream.bridge_seq, stream.client_seq
+                stream.bridge_seq = (seq + len(segment)) & 0xFFFFFFFF
+
+            tcp = _TCP.pack(
+                src[1],
+                dst[1],
+                seq,
+                ack,
+                _TCP.size // 4 << 4,
+                _TCP_PSH_ACK,
+                0xFFFF,
+                0,
+                0,
+            )
+            length = _IPV4.size + len(tcp) + len(segment)
+            ip = _IPV4.pack(
+                0x45, 0, length, self._ip_id, 0x4000, 64, 6, 0, src[0], dst[0]
+            )
+            ip = ip[:10] + struct.pack(">H", _checksum(ip)) + ip[12:]
+            self._ip_id = (self._ip_id + 1) & 0xFFFF
+            self._packet(0, timestamp, ip + tcp + segment)
+
+    def i2c(
+        self,
+        client: str,
+        operation: int,
+        addr: int,
+        length: int,
+        timestamp: int,
+        data: bytes,
+    ) -> None:
+        """Write an I2C transaction, commented with the client that caused it."""
+        self._packet(
+            1,
+            timestamp,
+            _I2C_HEADER.pack(operation, 0, addr, length) + data,
+            _option(_OPT_COMMENT, client.encode()) + _option(_OPT_END, b""),
+        )
+
+    def write(self, record: CaptureRecord) -> None:
+        """Write a capture record."""
+        if record.type == CaptureRecordType.NETWORK:
+            self.network(record.client, record.direction, record.timestamp, record.data)
+        else:
+            self.i2c(
+                record.client,
+                record.code,
+                record.addr,
+                record.length,
+                record.timestamp,
+                record.data,
+            )
+
+
+def export_pcapng(
+    capture: Path,
+    out: BinaryIO,
+    bridge_address: str = DEFAULT_BRIDGE_ADDRESS,
+    bridge_port: int = DEFAULT_BRIDGE_PORT,
+) -> int:
+    """Convert a capture to pcapng, streaming record by record.
+
+    Args:
+        capture: Capture file
+        out: Binary stream to write the pcapng to
+        bridge_address: IPv4 address given to the bridge
+        bridge_port: TCP port given to the bridge
+
+    Returns:
+        Number of packets written
+    """
+    writer = PcapngWriter(out, bridge_address, bridge_port)
+    for record in read_capture(capture):
+        writer.write(record)
+    return writer.packets
@@ -168,6 +168,43 @@ class Write:
 
             return request, data
 
+        @classmethod
+        def create(
+            cls,
+            *,
+            chip_address: int,
+            address: int,
+            data: bytes,
+            safeload: bool = False,
+            channel: int = 0,
+        ) -> Self:
+            return cls(
+                Block_safeload_write=1 if safeload else 0,
+                Channel_number=channel,
+                Total_length=cls.SIZE + len(data),
+                Chip_address=chip_address,
+                Data_length=len(data),
+                Address=address,
+                Data=data,
+            )
+
+        def pack(self) -> bytes:
+            """Pack into bytes."""
+            FORMAT = ">B B I B I H"
+            return (
+                self.Header.pack()
+                + struct.pack(
+                    FORMAT,
+                    self.Block_safeload_write,
+                    self.Channel_number,
+                    self.Total_length,
+                    self.Chip_address,
+                    self.Data_length,
+                    self.Address,
+                )
+                + self.Data
+            )
+
 
 @dataclass
 class Read:
@@ -221,6 +258,28 @@ class Read:
 
             return request, data[cls.SIZE :]
 
+        @classmethod
+        def create(cls, *, chip_address: int, address: int, length: int) -> Self:
+            return cls(
+                Total_length=cls.SIZE,
+                Chip_address=chip_address,
+                Data_length=length,
+                Address=address,
+                Reserved=0,
+            )
+
+        def pack(self) -> bytes:
+            """Pack into bytes."""
+            FORMAT = ">I B I H H"
+            return self.Header.pack() + struct.pack(
+                FORMAT,
+                self.Total_length,
+                self.Chip_address,
+                self.Data_length,
+                self.Address,
+                self.Reserved,
+            )
+
         def create_response(
             self, error: bool = False, data: bytes = b""
         ) -> "Read.Response":
@@ -282,6 +341,41 @@ class Read:
                 Data=data,
             )
 
+        SIZE = Header.SIZE + 4 + 1 + 4 + 2 + 1 + 1
+
+        @classmethod
+        def unpack(cls, data: bytes) -> tuple[Self, bytes]:
+            if len(data) < cls.SIZE:
+                raise DecodeExceptionInsufficientData(
+                    f"Insufficient data for read response: {len(data)} < {cls.SIZE}"
+                )
+
+            header = Header.unpack(data[: Header.SIZE])
+            if header.Control != Command.READ_RESPONSE:
+                raise DecodeExceptionInvalidHeaderCommand(
+                    f"Expected read response, got {header.Control.name}",
+                    header.Control,
+                )
+
+            total_length, chip_address, data_length, address, status, reserved = (
+                struct.unpack(">I B I H B B", data[Header.SIZE : cls.SIZE])
+            )
+            if len(data) < total_length:
+                raise DecodeExceptionInsufficientData(
+                    f"Insufficient data for read response: {len(data)} < {total_length}"
+                )
+
+            response = cls(
+                Total_length=total_length,
+                Chip_address=chip_address,
+                Data_length=data_length,
+                Address=address,
+                Status=status,
+                Reserved=reserved,
+                Data=data[cls.SIZE : total_length],
+            )
+            return response, data[total_length:]
+
         def pack(self) -> bytes:
             """Pack into bytes."""
             FORMAT = ">I B I H B B"
@@ -1,47 +1,150 @@
 """Protocol dumper for network and I2C layer logging."""
 
 from datetime import datetime
+from enum import Enum
 from pathlib import Path
 
 import structlog
 
+from tcp_i2c_bridge.capture import (
+    DEFAULT_FSYNC_INTERVAL,
+    DEFAULT_MAX_CAPTURE_SIZE,
+    DEFAULT_QUEUE_SIZE,
+    DEFAULT_RING_SECONDS,
+    DEFAULT_RING_SIZE,
+    CaptureRecordType,
+    CaptureWriter,
+    Compression,
+    Direction,
+    FlightRecorder,
+    Operation,
+    QueuePolicy,
+    SegmentedCaptureWriter,
+)
+from tcp_i2c_bridge.capture_filter import CaptureFilter
+from tcp_i2c_bridge.capture_tap import CaptureTap
+
 logger = structlog.get_logger()
 
 
-class ProtocolDumper:
-    """Dump network and I2C protocol layers to files."""
+class DumpMode(Enum):
+    """How the protocol dumper keeps traffic."""
+
+    SESSION = "session"
+    """
+    Capture the whole session to disk
+    """
+    FLIGHT = "flight"
+    """
+    Keep recent traffic in memory and write it to disk only on a trigger
+    """
 
-    def __init__(self, dump_dir: Path | None = None):
+
+class ProtocolDumper:
+    """Dump network and I2C protocol layers to capture files.
+
+    In session mode everything goes to one capture per session. In flight
+    recorder mode recent traffic is kept in memory and written out when
+    `trigger` is called: by the server on decode errors, I2C failures and
+    slow requests, by the application on SIGUSR2, or by anyone else.
+
+    A capture filter decides what is kept before a record is formatted or
+    queued; filtered out records are only counted. A capture tap, if any, is
+    handed every record first and applies the filters of its subscribers.
+    """
+
+    def __init__(
+        self,
+        dump_dir: Path | None = None,
+        mode: DumpMode = DumpMode.SESSION,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        fsync_interval: float | None = DEFAULT_FSYNC_INTERVAL,
+        policy: QueuePolicy = QueuePolicy.DROP,
+        ring_size: int = DEFAULT_RING_SIZE,
+        ring_seconds: float | None = DEFAULT_RING_SECONDS,
+        latency_threshold: float | None = None,
+        segment_size: int | None = None,
+        max_capture_size: int = DEFAULT_MAX_CAPTURE_SIZE,
+        compression: Compression = Compression.ZLIB,
+        capture_filter: CaptureFilter | str | None = None,
+        tap: CaptureTap | None = None,
+    ):
         """Initialize protocol dumper.
 
         Args:
             dump_dir: Directory to dump files to. If None, use current directory.
+            mode: Capture the whole session or run a flight recorder
+            queue_size: Records queued for the capture writer thread at most
+            fsync_interval: Seconds between fsyncs of the capture, or None
+            policy: Whether to drop records or wait while the queue is full
+            ring_size: Flight recorder buffer size in bytes
+            ring_seconds: Seconds of traffic the flight recorder keeps at most
+            latency_threshold: Seconds an I2C request may take before the
+                flight recorder is triggered, or None
+            segment_size: Write the session as compressed segments of this
+                many bytes instead of one capture file
+            max_capture_size: Bytes of all segments of the session at most;
+                the oldest are deleted
+            compression: Compression of the segments
+            capture_filter: Filter expression of the records to keep, or None
+                to keep all
+            tap: Capture tap streaming records to remote subscribers
+
+        Raises:
+            ValueError: If the capture filter is invalid
         """
+        if isinstance(capture_filter, str):
+            capture_filter = CaptureFilter(capture_filter)
+        self.capture_filter = capture_filter
+        self.filtered = 0
+        self.tap = tap
+
         if dump_dir is None:
             dump_dir = Path.cwd() / "dumps"
 
         self.dump_dir = dump_dir
-        self.dump_dir.mkdir(exist_ok=True)
+        self.mode = mode
+        self.latency_threshold = latency_threshold
 
         # Create session-specific directory
         session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.session_dir = self.dump_dir / f"session_{session_id}"
-        self.session_dir.mkdir(exist_ok=True)
-
-        # Create subdirectories for different layers
-        self.network_dir = self.session_dir / "network"
-        self.i2c_dir = self.session_dir / "i2c"
-        self.network_dir.mkdir(exist_ok=True)
-        self.i2c_dir.mkdir(exist_ok=True)
 
-        # File handles for continuous logging
-        self.network_log_file = self.session_dir / "network.log"
-        self.i2c_log_file = self.session_dir / "i2c.log"
+        self.capture: CaptureWriter | FlightRecorder
+        self.capture_file: Path | None = None
+        if mode is DumpMode.FLIGHT:
+            # Nothing touches the filesystem until the first trigger
+            self.capture = FlightRecorder(self.session_dir, ring_size, ring_seconds)
+        else:
+            self.session_dir.mkdir(parents=True, exist_ok=True)
+
+            # One append-only capture per session, written by a background
+            # thread so dumping never waits for the disk; text logs are
+            # generated from it on demand
+            if segment_size is not None:
+                # Long-running sessions: bounded, compressed segments
+                self.capture_file = self.session_dir / "capture"
+                self.capture = SegmentedCaptureWriter(
+                    self.capture_file,
+                    segment_size,
+                    max_capture_size,
+                    compression,
+                    queue_size,
+                    fsync_interval,
+                    policy,
+                )
+            else:
+                self.capture_file = self.session_dir / "capture.bin"
+                self.capture = CaptureWriter(
+                    self.capture_file, queue_size, fsync_interval, policy
+                )
 
         logger.info(
             "Protocol dumper initialized",
+            mode=mode.value,
             dump_dir=str(self.dump_dir),
             session_dir=str(self.session_dir),
+            capture_filter=capture_filter.expression if capture_filter else None,
         )
 
     async def dump_network_packet(
@@ -51,36 +154,19 @@ class ProtocolDumper:
 
         Args:
             client_id: Client identifier
-            direction: "RX" or "TX"
+            direction: "RX", "TX", "RX_RAW" or "RX_DECODED"
             data: Raw packet data
         """
-        timestamp = datetime.now().isoformat()
-
-        # Create individual packet file
-        packet_filename = f"{timestamp}_{client_id.replace(':', '_')}_{direction}.bin"
-        packet_path = self.network_dir / packet_filename
+        if self.tap is not None:
+            self.tap.network(client_id, direction, data)
+        if self.capture_filter and not self.capture_filter.network(
+            client_id, direction, data
+        ):
+            self.filtered += 1
+            return
 
         try:
-            # Write binary data
-            packet_path.write_bytes(data)
-
-            # Append to network log
-            log_entry = (
-                f"{timestamp} {client_id} {direction} "
-                f"len={len(data)} data={data.hex()}\n"
-            )
-
-            with open(self.network_log_file, "a") as f:
-                f.write(log_entry)
-
-            logger.debug(
-                "Network packet dumped",
-                client=client_id,
-                direction=direction,
-                length=len(data),
-                file=str(packet_path),
-            )
-
+            self.capture.network(client_id, Direction[direction], data)
         except Exception as e:
             logger.error(
                 "Failed to dump network packet",
@@ -90,48 +176,34 @@ class ProtocolDumper:
             )
 
     async def dump_i2c_transaction(
-        self, client_id: str, operation: str, addr: int, length: int, data: bytes
+        self,
+        client_id: str,
+        operation: str,
+        addr: int,
+        length: int,
+        data: bytes,
+        chip: int | None = None,
     ) -> None:
         """Dump I2C layer transaction.
 
         Args:
             client_id: Client identifier
-            operation: "READ" or "WRITE"
+            operation: "READ", "WRITE" or "SAFELOAD"
             addr: I2C register address
             length: Transaction length
             data: Transaction data
+            chip: Protocol chip address
         """
-        timestamp = datetime.now().isoformat()
-
-        # Create individual transaction file
-        transaction_filename = (
-            f"{timestamp}_{client_id.replace(':', '_')}_"
-            f"{operation}_{addr:04X}_{length}.bin"
-        )
-        transaction_path = self.i2c_dir / transaction_filename
+        if self.tap is not None:
+            self.tap.i2c(client_id, operation, addr, length, data, chip)
+        if self.capture_filter and not self.capture_filter.i2c(
+            client_id, operation, addr, chip, length
+        ):
+            self.filtered += 1
+            return
 
         try:
-            # Write binary data
-            transaction_path.write_bytes(data)
-
-            # Append to I2C log
-            log_entry = (
-                f"{timestamp} {client_id} {operation} "
-                f"addr=0x{addr:04X} len={length} data={data.hex()}\n"
-            )
-
-            with open(self.i2c_log_file, "a") as f:
-                f.write(log_entry)
-
-            logger.debug(
-                "I2C transaction dumped",
-                client=client_id,
-                operation=operation,
-                addr=f"0x{addr:04X}",
-                length=length,
-                file=str(transaction_path),
-            )
-
+            self.capture.i2c(client_id, Operation[operation], addr, length, data, chip)
         except Exception as e:
             logger.error(
                 "Failed to dump I2C transaction",
@@ -141,37 +213,83 @@ class ProtocolDumper:
                 error=str(e),
             )
 
+    def trigger(self, reason: str) -> Path | None:
+        """Write the flight recorder's traffic to disk.
+
+        Args:
+            reason: Why, e.g. "decode_error"; part of the dump's file name
+
+        Returns:
+            Path of the dump, or None if not in flight recorder mode or a
+            dump was just written
+        """
+        if not isinstance(self.capture, FlightRecorder):
+            return None
+
+        path = self.capture.trigger(reason)
+        if path is not None:
+            logger.warning("Flight recorder triggered", reason=reason, file=str(path))
+        return path
+
+    def note_latency(self, seconds: float) -> None:
+        """Trigger the flight recorder if a request exceeded the threshold."""
+        if self.latency_threshold is not None and seconds > self.latency_threshold:
+            self.trigger("latency")
+
     def create_summary_report(self) -> None:
         """Create a summary report of the session."""
         summary_path = self.session_dir / "summary.txt"
 
+        if isinstance(self.capture, FlightRecorder):
+            self.capture.flush()
+            if not self.capture.dumps:
+                return
+
         try:
-            network_files = list(self.network_dir.glob("*.bin"))
-            i2c_files = list(self.i2c_dir.glob("*.bin"))
+            self.capture.flush()
+            network_packets = self.capture.counts[CaptureRecordType.NETWORK]
+            i2c_transactions = self.capture.counts[CaptureRecordType.I2C]
 
             with open(summary_path, "w") as f:
                 f.write("TCP-I2C Bridge Session Summary\n")
                 f.write("=" * 40 + "\n\n")
                 f.write(f"Session Directory: {self.session_dir}\n")
-                f.write(f"Network Packets: {len(network_files)}\n")
-                f.write(f"I2C Transactions: {len(i2c_files)}\n\n")
-
-                f.write("Network Layer Files:\n")
-                for file_path in sorted(network_files):
-                    size = file_path.stat().st_size
-                    f.write(f"  {file_path.name} ({size} bytes)\n")
-
-                f.write("\nI2C Layer Files:\n")
-                for file_path in sorted(i2c_files):
-                    size = file_path.stat().st_size
-                    f.write(f"  {file_path.name} ({size} bytes)\n")
+                if isinstance(self.capture, SegmentedCaptureWriter):
+                    f.write(
+                        f"Capture: {self.capture_file.name}/ "
+                        f"({len(self.capture.segments)} closed segments, "
+                        f"{self.capture.size} bytes, "
+                        f"{self.capture.evicted} evicted)\n"
+                    )
+                elif self.capture_file is not None:
+                    f.write(
+                        f"Capture: {self.capture_file.name} "
+                        f"({self.capture_file.stat().st_size} bytes)\n"
+                    )
+                else:
+                    f.write(f"Flight Recorder Dumps: {len(self.capture.dumps)}\n")
+                    for path in self.capture.dumps:
+                        f.write(f"  {path.name}\n")
+                f.write(f"Clients: {len(self.capture.clients)}\n")
+                f.write(f"Network Packets: {network_packets}\n")
+                f.write(f"I2C Transactions: {i2c_transactions}\n")
+                f.write(f"Dropped Records: {self.capture.dropped}\n")
+                if self.capture_filter:
+                    f.write(f"Capture Filter: {self.capture_filter.expression}\n")
+                    f.write(f"Filtered Records: {self.filtered}\n")
 
             logger.info(
                 "Session summary created",
                 summary_file=str(summary_path),
-                network_packets=len(network_files),
-                i2c_transactions=len(i2c_files),
+                network_packets=network_packets,
+                i2c_transactions=i2c_transactions,
+                dropped=self.capture.dropped,
+                filtered=self.filtered,
             )
 
         except Exception as e:
             logger.error("Failed to create summary report", error=str(e))
+
+    def close(self) -> None:
+        """Close the capture, waiting for pending writes."""
+        self.capture.close()
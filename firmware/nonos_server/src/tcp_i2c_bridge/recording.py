@@ -0,0 +1,373 @@
+"""Recording of I2C traffic and deterministic replay."""
+
+import struct
+import threading
+import time
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from enum import IntEnum, IntFlag
+from pathlib import Path
+from typing import BinaryIO
+
+import structlog
+
+from tcp_i2c_bridge.i2c_backend import I2CBackend, I2COperation, I2COpKind
+
+logger = structlog.get_logger()
+
+RECORDING_MAGIC = b"NI2C"
+RECORDING_VERSION = 1
+
+# kind, flags, device address, register address, write length, read length,
+# timestamp (ns since start of recording), duration (ns)
+_HEADER = struct.Struct("<4sB3x")
+_RECORD = struct.Struct("<BBBxHIIQI")
+
+
+class RecordKind(IntEnum):
+    """Direction of a recorded operation."""
+
+    READ = 0
+    WRITE = 1
+    WRITE_READ = 2
+
+
+class RecordFlags(IntFlag):
+    """Flags of a recorded operation."""
+
+    NONE = 0
+    ERROR = 1
+    """
+    The operation failed; no read data was recorded
+    """
+
+
+_OP_KINDS = {
+    I2COpKind.READ: RecordKind.READ,
+    I2COpKind.WRITE: RecordKind.WRITE,
+    I2COpKind.WRITE_READ: RecordKind.WRITE_READ,
+}
+
+
+@dataclass(frozen=True)
+class I2CRecord:
+    """One recorded I2C operation."""
+
+    kind: RecordKind
+    device: int
+    """
+    7-bit I2C device address
+    """
+    addr: int
+    """
+    Register address (reads and writes)
+    """
+    written: bytes
+    read: bytes
+    timestamp: float
+    """
+    Seconds since the start of the recording
+    """
+    duration: float
+    """
+    Seconds the operation took
+    """
+    flags: RecordFlags = RecordFlags.NONE
+
+    def pack(self) -> bytes:
+        """Pack into the binary record format."""
+        return (
+            _RECORD.pack(
+                self.kind,
+                self.flags,
+                self.device,
+                self.addr,
+                len(self.written),
+                len(self.read),
+                int(self.timestamp * 1e9),
+                min(int(self.duration * 1e9), 0xFFFFFFFF),
+            )
+            + self.written
+            + self.read
+        )
+
+
+class I2CRecorder:
+    """Append-only writer of a recording file, shared by recording backends."""
+
+    def __init__(self, path: Path):
+        """Open a new recording file.
+
+        Args:
+            path: File to write; replaced if it exists
+        """
+        self.path = path
+        self._file: BinaryIO | None = open(path, "wb")
+        self._file.write(_HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION))
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self.records = 0
+
+        logger.info("I2C recording started", path=str(path))
+
+    def now(self) -> float:
+        """Seconds since the start of the recording."""
+        return time.perf_counter() - self._start
+
+    def record(self, record: I2CRecord) -> None:
+        """Append a record."""
+        data = record.pack()
+        with self._lock:
+            if self._file is None:
+                raise RuntimeError("I2C recording closed")
+            self._file.write(data)
+            self.records += 1
+
+    def close(self) -> None:
+        """Flush and close the recording file."""
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.close()
+            self._file = None
+
+        logger.info("I2C recording closed", path=str(self.path), records=self.records)
+
+
+def read_recording(path: Path) -> Iterator[I2CRecord]:
+    """Read the records of a recording file.
+
+    Args:
+        path: Recording file
+
+    Yields:
+        Records in recording order
+    """
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"Not an I2C recording: {path}")
+        magic, version = _HEADER.unpack(header)
+        if magic != RECORDING_MAGIC:
+            raise ValueError(f"Not an I2C recording: {path}")
+        if version != RECORDING_VERSION:
+            raise ValueError(f"Unsupported I2C recording version: {version}")
+
+        while True:
+            raw = f.read(_RECORD.size)
+            if not raw:
+                return
+            if len(raw) < _RECORD.size:
+                raise ValueError(f"Truncated I2C recording: {path}")
+
+            kind, flags, device, addr, write_len, read_len, timestamp, duration = (
+                _RECORD.unpack(raw)
+            )
+            payload = f.read(write_len + read_len)
+            if len(payload) < write_len + read_len:
+                raise ValueError(f"Truncated I2C recording: {path}")
+
+            yield I2CRecord(
+                kind=RecordKind(kind),
+                device=device,
+                addr=addr,
+                written=payload[:write_len],
+                read=payload[write_len:],
+                timestamp=timestamp / 1e9,
+                duration=duration / 1e9,
+                flags=RecordFlags(flags),
+            )
+
+
+class RecordingI2CBackend(I2CBackend):
+    """Wrap a backend and record every operation it performs."""
+
+    def __init__(
+        self, backend: I2CBackend, recorder: I2CRecorder, device: int | None = None
+    ):
+        """Initialize recording backend.
+
+        Args:
+            backend: Backend to wrap
+            recorder: Recording file writer; may be shared between backends
+            device: Device address to record; defaults to the wrapped backend's
+        """
+        self.backend = backend
+        self.recorder = recorder
+        self.device = (
+            device if device is not None else getattr(backend, "device_addr", 0)
+        )
+
+    def _record(
+        self,
+        operations: Sequence[I2COperation],
+        results: Sequence[bytes | None] | None,
+        start: float,
+    ) -> None:
+        duration = (self.recorder.now() - start) / len(operations)
+        for i, op in enumerate(operations):
+            result = results[i] if results is not None else None
+            self.recorder.record(
+                I2CRecord(
+                    kind=_OP_KINDS[op.kind],
+                    device=self.device,
+                    addr=op.addr,
+                    written=op.data,
+                    read=result or b"",
+                    timestamp=start + i * duration,
+                    duration=duration,
+                    flags=RecordFlags.ERROR if results is None else RecordFlags.NONE,
+                )
+            )
+
+    def submit(self, operations: Sequence[I2COperation]) -> list[bytes | None]:
+        """Run a batch of operations on the wrapped backend and record them."""
+        start = self.recorder.now()
+        try:
+            results = self.backend.submit(operations)
+        except Exception:
+            self._record(operations, None, start)
+            raise
+        self._record(operations, results, start)
+        return results
+
+    def read(self, addr: int, length: int) -> bytes:
+        """Read from the wrapped backend and record the result."""
+        op = I2COperation(I2COpKind.READ, addr=addr, length=length)
+        start = self.recorder.now()
+        try:
+            data = self.backend.read(addr, length)
+        except Exception:
+            self._record([op], None, start)
+            raise
+        self._record([op], [data], start)
+        return data
+
+    def write(self, addr: int, data: bytes) -> None:
+        """Write to the wrapped backend and record the data."""
+        op = I2COperation(I2COpKind.WRITE, addr=addr, data=bytes(data))
+        start = self.recorder.now()
+        try:
+            self.backend.write(addr, data)
+        except Exception:
+            self._record([op], None, start)
+            raise
+        self._record([op], [None], start)
+
+    def write_read(self, data: bytes, length: int) -> bytes:
+        """Run a write-read on the wrapped backend and record the result."""
+        op = I2COperation(I2COpKind.WRITE_READ, data=bytes(data), length=length)
+        start = self.recorder.now()
+        try:
+            result = self.backend.write_read(data, length)
+        except Exception:
+            self._record([op], None, start)
+            raise
+        self._record([op], [result], start)
+        return result
+
+    def close(self) -> None:
+        """Close the wrapped backend."""
+        self.backend.close()
+
+
+class ReplayMismatchError(RuntimeError):
+    """Replayed traffic diverged from the recording."""
+
+
+class ReplayI2CBackend(I2CBackend):
+    """Serve recorded reads back and check writes against a recording.
+
+    Operations must arrive in the recorded order. Reads return the recorded
+    data, writes must match the recorded data exactly, and operations that
+    failed during recording fail again.
+    """
+
+    def __init__(
+        self,
+        records: Sequence[I2CRecord],
+        device: int | None = None,
+        realtime: bool = False,
+    ):
+        """Initialize replay backend.
+
+        Args:
+            records: Recorded operations, e.g. from read_recording()
+            device: Only replay records of this device address; all if None
+            realtime: Sleep for the recorded duration of every operation
+                instead of replaying at full speed
+        """
+        self.records = [r for r in records if device is None or r.device == device]
+        self.realtime = realtime
+        self.position = 0
+
+        logger.info(
+            "Replay I2C backend initialized", records=len(self.records), device=device
+        )
+
+    @classmethod
+    def from_file(cls, path: Path, **kwargs) -> "ReplayI2CBackend":
+        """Create a replay backend from a recording file."""
+        return cls(list(read_recording(path)), **kwargs)
+
+    @property
+    def remaining(self) -> int:
+        """Number of recorded operations not replayed yet."""
+        return len(self.records) - self.position
+
+    def _next(self, kind: RecordKind, addr: int, description: str) -> I2CRecord:
+        if self.position >= len(self.records):
+            raise ReplayMismatchError(
+                f"Replay exhausted at operation {self.position}: {description}"
+            )
+
+        record = self.records[self.position]
+        if record.kind != kind or record.addr != addr:
+            raise ReplayMismatchError(
+                f"Replay mismatch at operation {self.position}: expected "
+                f"{record.kind.name.lower()} at 0x{record.addr:04X}, got "
+                f"{description}"
+            )
+
+        self.position += 1
+        if self.realtime:
+            time.sleep(record.duration)
+        if record.flags & RecordFlags.ERROR:
+            raise RuntimeError(f"Recorded I2C failure: {description}")
+        return record
+
+    def read(self, addr: int, length: int) -> bytes:
+        """Return the recorded data of the next read."""
+        record = self._next(RecordKind.READ, addr, f"read at 0x{addr:04X}")
+        if len(record.read) != length:
+            raise ReplayMismatchError(
+                f"Replay mismatch at operation {self.position - 1}: expected "
+                f"{len(record.read)} byte read at 0x{addr:04X}, got {length}"
+            )
+        return record.read
+
+    def write(self, addr: int, data: bytes) -> None:
+        """Check the next write against the recording."""
+        record = self._next(RecordKind.WRITE, addr, f"write at 0x{addr:04X}")
+        if record.written != bytes(data):
+            raise ReplayMismatchError(
+                f"Replay mismatch at operation {self.position - 1}: write at "
+                f"0x{addr:04X} expected {record.written.hex()}, got {bytes(data).hex()}"
+            )
+
+    def write_read(self, data: bytes, length: int) -> bytes:
+        """Check the next write-read and return its recorded data."""
+        record = self._next(RecordKind.WRITE_READ, 0, f"write-read {data.hex()}")
+        if record.written != bytes(data) or len(record.read) != length:
+            raise ReplayMismatchError(
+                f"Replay mismatch at operation {self.position - 1}: write-read "
+                f"expected {record.written.hex()}/{len(record.read)}, got "
+                f"{bytes(data).hex()}/{length}"
+            )
+        return record.read
+
+    def close(self) -> None:
+        """Close replay backend, reporting unreplayed operations."""
+        if self.remaining:
+            logger.warning("Replay incomplete", remaining=self.remaining)
+        logger.info("Replay I2C backend closed")
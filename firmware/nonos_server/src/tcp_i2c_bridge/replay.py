@@ -0,0 +1,336 @@
+"""Load generation by replaying the client traffic of captures.
+
+Every client connection of a capture is a session: the requests the bridge
+decoded from it, when they arrived and, for reads, the response it sent. A
+replay opens one connection per virtual client and sends the requests of its
+sessions over it again, with the recorded timing, scaled or as fast as
+possible. Like SigmaStudio, a virtual client waits for the response of a read
+before sending the next request, so each read measures one request latency;
+writes are not acknowledged by the protocol and only count for throughput.
+
+Responses are compared to the recorded ones. Against a bridge whose devices
+hold different data than during the recording they will differ; that is what
+the mismatch count reports.
+"""
+
+import asyncio
+import math
+import socket
+import time
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import structlog
+
+from tcp_i2c_bridge.capture import CaptureRecordType, Direction, read_capture
+from tcp_i2c_bridge.protocol import (
+    Command,
+    DecodeException,
+    DecodeExceptionInsufficientData,
+)
+from tcp_i2c_bridge.protocol import Read as NetworkRead
+
+logger = structlog.get_logger()
+
+# Mismatches kept with their details; further ones are only counted
+MAX_MISMATCH_DETAILS = 20
+
+
+@dataclass(frozen=True)
+class ReplayRequest:
+    """One request of a recorded session."""
+
+    offset: int
+    """
+    Nanoseconds since the first request of the capture, so sessions keep
+    their recorded overlap
+    """
+    packet: bytes
+    expected: bytes | None = None
+    """
+    Recorded response of a read; None for writes and for reads captured
+    without their response, which are timed but not compared
+    """
+
+    @property
+    def is_read(self) -> bool:
+        return self.packet[0] == Command.READ_REQUEST
+
+
+@dataclass
+class ReplaySession:
+    """Requests a client sent during a recorded session."""
+
+    client: str
+    requests: list[ReplayRequest] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class ReplayMismatch:
+    """A response that differs from the recorded one."""
+
+    client: str
+    address: int
+    expected: bytes
+    received: bytes
+
+
+@dataclass
+class ReplayStats:
+    """Results of a replay."""
+
+    clients: int = 0
+    requests: int = 0
+    reads: int = 0
+    writes: int = 0
+    bytes_sent: int = 0
+    duration: float = 0.0
+    latencies: list[float] = field(default_factory=list)
+    """
+    Seconds from sending each read to receiving its response
+    """
+    mismatches: int = 0
+    mismatch_details: list[ReplayMismatch] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def throughput(self) -> float:
+        """Requests per second."""
+        return self.requests / self.duration if self.duration else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """Read latency in seconds at a percentile (nearest rank), 0 if none."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        rank = math.ceil(percent / 100 * len(ordered))
+        return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+def load_sessions(
+    capture: Path, clients: Iterable[str] | None = None
+) -> list[ReplaySession]:
+    """Extract the sessions of each client from a capture.
+
+    The server records a request (RX_DECODED) once it has been handled, after
+    its response (TX), and the receive buffer (RX_RAW) each time it starts
+    decoding one; the arrival of a request is therefore taken from the last
+    RX_RAW record of its client before it.
+
+    Args:
+        capture: Capture file, segment or segment directory
+        clients: Only load the sessions of these clients
+
+    Returns:
+        Sessions with at least one request, in order of their first request
+    """
+    wanted = None if clients is None else set(clients)
+    sessions: dict[str, ReplaySession] = {}
+    start: int | None = None
+    arrivals: dict[str, int] = {}
+    responses: dict[str, bytes] = {}
+
+    for record in read_capture(capture):
+        if record.type != CaptureRecordType.NETWORK:
+            continue
+        client = record.client
+        if wanted is not None and client not in wanted:
+            continue
+
+        if record.direction == Direction.RX_RAW:
+            arrivals.setdefault(client, record.timestamp)
+            continue
+        if record.direction == Direction.TX:
+            responses[client] = record.data
+            continue
+
+        arrival = arrivals.pop(client, record.timestamp)
+        response = responses.pop(client, None)
+        if not record.data:
+            continue
+        if start is None:
+            start = arrival
+        session = sessions.setdefault(client, ReplaySession(client))
+        is_read = record.data[0] == Command.READ_REQUEST
+        session.requests.append(
+            ReplayRequest(
+                offset=max(arrival - start, 0),
+                packet=record.data,
+                expected=response if is_read else None,
+            )
+        )
+
+    return list(sessions.values())
+
+
+async def _read_response(
+    reader: asyncio.StreamReader, buffer: bytes
+) -> tuple[NetworkRead.Response, bytes]:
+    """Read one response, returning it and the data received after it."""
+    while True:
+        try:
+            return NetworkRead.Response.unpack(buffer)
+        except DecodeExceptionInsufficientData:
+            data = await reader.read(65536)
+            if not data:
+                raise ConnectionError("Bridge closed the connection") from None
+            buffer += data
+
+
+async def _replay_session(
+    session: ReplaySession,
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    buffer: bytes,
+    speed: float | None,
+    start: float,
+    stats: ReplayStats,
+    name: str,
+) -> bytes:
+    """Send the requests of a session; returns the data received after them."""
+    loop = asyncio.get_running_loop()
+    for request in session.requests:
+        if speed is not None:
+            delay = start + request.offset / 1e9 / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        sent = time.perf_counter()
+        writer.write(request.packet)
+        stats.requests += 1
+        stats.bytes_sent += len(request.packet)
+        if not request.is_read:
+            stats.writes += 1
+            await writer.drain()
+            continue
+
+        response, buffer = await _read_response(reader, buffer)
+        stats.latencies.append(time.perf_counter() - sent)
+        stats.reads += 1
+
+        # Whole packets are compared, so a failed status is a mismatch too
+        received = response.pack()
+        if request.expected is not None and received != request.expected:
+            stats.mismatches += 1
+            if len(stats.mismatch_details) < MAX_MISMATCH_DETAILS:
+                stats.mismatch_details.append(
+                    ReplayMismatch(name, response.Address, request.expected, received)
+                )
+    return buffer
+
+
+async def _run_client(
+    sessions: Sequence[ReplaySession],
+    host: str,
+    port: int,
+    speed: float | None,
+    start: float,
+    stats: ReplayStats,
+    name: str,
+) -> None:
+    """Replay sessions in turn over a connection of their own.
+
+    The first session keeps its recorded timing from loop time start, each
+    further one is shifted to begin once the previous one is done.
+    """
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError as e:
+        stats.errors.append(f"{name}: failed to connect: {e}")
+        return
+
+    sock = writer.get_extra_info("socket")
+    if sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    loop = asyncio.get_running_loop()
+    buffer = b""
+    session_name = name
+    try:
+        for i, session in enumerate(sessions):
+            session_name = f"{name}:{session.client}"
+            if i and speed is not None and session.requests:
+                start = loop.time() - session.requests[0].offset / 1e9 / speed
+            buffer = await _replay_session(
+                session, reader, writer, buffer, speed, start, stats, session_name
+            )
+    except (OSError, DecodeException) as e:
+        stats.errors.append(f"{session_name}: {e}")
+        logger.warning("Replay client failed", client=session_name, error=str(e))
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+
+async def replay(
+    sessions: Sequence[ReplaySession],
+    host: str,
+    port: int,
+    clients: int | None = None,
+    speed: float | None = 1.0,
+) -> ReplayStats:
+    """Replay sessions against a bridge with parallel virtual clients.
+
+    Args:
+        sessions: Recorded sessions
+        host: Host running the bridge
+        port: TCP port of the bridge
+        clients: Number of virtual clients; with fewer clients than sessions,
+            each replays its share of the sessions in turn. Defaults to one
+            per session
+        speed: Factor applied to the recorded timing, e.g. 2 for twice as
+            fast, or None to send as fast as possible
+
+    Returns:
+        Throughput, latencies, mismatches and errors of the replay
+    """
+    if not sessions:
+        raise ValueError("No sessions to replay")
+    if clients is None:
+        clients = len(sessions)
+    if clients <= 0:
+        raise ValueError("Number of clients must be positive")
+    if speed is not None and speed <= 0:
+        raise ValueError("Speed must be positive")
+
+    stats = ReplayStats(clients=clients)
+    logger.info(
+        "Replay started",
+        host=host,
+        port=port,
+        sessions=len(sessions),
+        clients=clients,
+        speed=speed,
+    )
+
+    # Every session is replayed: with fewer clients than sessions, each
+    # client takes every clients-th session, with more they start over
+    assigned = [
+        [
+            sessions[j % len(sessions)]
+            for j in range(i, max(clients, len(sessions)), clients)
+        ]
+        for i in range(clients)
+    ]
+    started = time.perf_counter()
+    loop_start = asyncio.get_running_loop().time()
+    await asyncio.gather(
+        *(
+            _run_client(share, host, port, speed, loop_start, stats, str(i))
+            for i, share in enumerate(assigned)
+        )
+    )
+    stats.duration = time.perf_counter() - started
+
+    logger.info(
+        "Replay finished",
+        requests=stats.requests,
+        duration=round(stats.duration, 3),
+        mismatches=stats.mismatches,
+        errors=len(stats.errors),
+    )
+    return stats
@@ -0,0 +1,164 @@
+"""Chip-address routing of bridge requests to I2C backends."""
+
+import threading
+from collections.abc import Callable, Hashable, Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import structlog
+
+from tcp_i2c_bridge.i2c_backend import I2CBackend, I2COperation, SMBusI2CBackend
+
+logger = structlog.get_logger()
+
+
+@dataclass
+class Route:
+    """A lazily opened backend for one chip address."""
+
+    bus: Hashable
+    """
+    Key of the physical bus the device sits on. Devices sharing a key share a lock
+    """
+    factory: Callable[[], I2CBackend]
+    """
+    Called on first use to open the backend
+    """
+    backend: I2CBackend | None = field(default=None, repr=False)
+
+
+class BackendRouter:
+    """Route requests by protocol chip address to per-device I2C backends.
+
+    Backends are opened on first use. Every bus has its own lock, so devices on
+    different buses can be accessed from different threads in parallel while
+    accesses to a single bus stay serialised.
+    """
+
+    def __init__(self, default: I2CBackend | None = None):
+        """Initialize router.
+
+        Args:
+            default: Backend used for chip addresses without an explicit route
+        """
+        self.routes: dict[int, Route] = {}
+        self.default_route: Route | None = None
+        self._bus_locks: dict[Hashable, threading.Lock] = {}
+        self._open_lock = threading.Lock()
+
+        if default is not None:
+            self.default_route = Route(
+                bus="default", factory=lambda: default, backend=default
+            )
+            self._bus_locks["default"] = threading.Lock()
+
+    def set_default_route(
+        self, factory: Callable[[], I2CBackend], bus: Hashable | None = None
+    ) -> None:
+        """Register the backend factory for chip addresses without a route.
+
+        Args:
+            factory: Callable opening the backend on first use
+            bus: Bus key; defaults to a private bus for the default backend
+        """
+        bus_key = bus if bus is not None else "default"
+        self.default_route = Route(bus=bus_key, factory=factory)
+        self._bus_locks.setdefault(bus_key, threading.Lock())
+
+    def add_route(
+        self,
+        chip_address: int,
+        factory: Callable[[], I2CBackend],
+        bus: Hashable | None = None,
+    ) -> None:
+        """Register a backend factory for a chip address.
+
+        Args:
+            chip_address: Chip address as sent in the protocol
+            factory: Callable opening the backend on first use
+            bus: Bus key; defaults to a private bus for this chip address
+        """
+        if chip_address in self.routes:
+            raise ValueError(f"Route for chip address {chip_address} already exists")
+
+        bus_key = bus if bus is not None else ("chip", chip_address)
+        self.routes[chip_address] = Route(bus=bus_key, factory=factory)
+        self._bus_locks.setdefault(bus_key, threading.Lock())
+
+        logger.info("I2C route added", chip_address=chip_address, bus=bus_key)
+
+    def add_smbus_route(
+        self, chip_address: int, i2c_bus: int, device_addr: int
+    ) -> None:
+        """Register an SMBus backend for a chip address.
+
+        Args:
+            chip_address: Chip address as sent in the protocol
+            i2c_bus: I2C bus number (e.g., 1 for /dev/i2c-1)
+            device_addr: I2C device address (7-bit)
+        """
+        self.add_route(
+            chip_address,
+            lambda: SMBusI2CBackend(i2c_bus, device_addr),
+            bus=i2c_bus,
+        )
+
+    def _open(self, route: Route) -> I2CBackend:
+        with self._open_lock:
+            if route.backend is None:
+                route.backend = route.factory()
+        return route.backend
+
+    @contextmanager
+    def device(self, chip_address: int) -> Iterator[I2CBackend]:
+        """Hold the bus lock of a device and yield its backend.
+
+        Args:
+            chip_address: Chip address as sent in the protocol
+
+        Yields:
+            Backend for the chip address, opened if necessary
+        """
+        route = self.routes.get(chip_address, self.default_route)
+        if route is None:
+            raise LookupError(f"No I2C route for chip address {chip_address}")
+
+        backend = route.backend or self._open(route)
+        with self._bus_locks[route.bus]:
+            yield backend
+
+    def read(self, chip_address: int, addr: int, length: int) -> bytes:
+        """Read from the device behind a chip address."""
+        with self.device(chip_address) as backend:
+            return backend.read(addr, length)
+
+    def write(self, chip_address: int, addr: int, data: bytes) -> None:
+        """Write to the device behind a chip address."""
+        with self.device(chip_address) as backend:
+            backend.write(addr, data)
+
+    def submit(
+        self, chip_address: int, operations: Sequence[I2COperation]
+    ) -> list[bytes | None]:
+        """Run a batch of operations on a device under a single bus lock."""
+        with self.device(chip_address) as backend:
+            return backend.submit(operations)
+
+    def close(self) -> None:
+        """Close all opened backends."""
+        routes: list[tuple[int | None, Route]] = list(self.routes.items())
+        if self.default_route is not None:
+            routes.append((None, self.default_route))
+
+        for chip_address, route in routes:
+            if route.backend is None:
+                continue
+            try:
+                route.backend.close()
+            except Exception as e:
+                logger.error(
+                    "Failed to close I2C backend",
+                    chip_address=chip_address,
+                    error=str(e),
+                )
+            route.backend = None
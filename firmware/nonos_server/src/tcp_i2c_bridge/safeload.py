@@ -0,0 +1,132 @@
+"""ADAU1452 safeload writes."""
+
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from enum import IntEnum
+
+from tcp_i2c_bridge.i2c_backend import I2CBackend
+
+SAFELOAD_MAX_WORDS = 5
+SAFELOAD_WORD_SIZE = 4
+
+# One audio frame at 48 kHz; the DSP applies a safeload at the next frame start
+DEFAULT_FRAME_PERIOD = 1 / 48000
+
+
+class SafeloadRegister(IntEnum):
+    """ADAU1452 software safeload registers (data memory 1, 4-byte words)."""
+
+    DATA0 = 0x6000
+    ADDRESS = 0x6005
+    NUM = 0x6006
+
+
+@dataclass
+class SafeloadCycle:
+    """One safeload trigger updating up to five consecutive parameter words."""
+
+    address: int
+    """
+    Target word address of the first word
+    """
+    data: bytes
+    """
+    1 to 5 words of 4 bytes each
+    """
+
+    def pack(self) -> bytes:
+        """Pack into a single write burst starting at the DATA0 register.
+
+        The data, target address and word count registers are consecutive, so
+        one write loads all of them; writing the count arms the safeload.
+        """
+        words = len(self.data) // SAFELOAD_WORD_SIZE
+        padding = b"\x00" * ((SAFELOAD_MAX_WORDS - words) * SAFELOAD_WORD_SIZE)
+        return (
+            self.data
+            + padding
+            + self.address.to_bytes(SAFELOAD_WORD_SIZE, "big")
+            + words.to_bytes(SAFELOAD_WORD_SIZE, "big")
+        )
+
+
+def pack_safeloads(writes: Iterable[tuple[int, bytes]]) -> list[SafeloadCycle]:
+    """Pack safeload writes into the fewest trigger cycles.
+
+    Writes are applied in order, so a later write to a word wins. A write of
+    up to five words is never split across cycles, so the DSP applies it
+    within one frame; overlapping writes count as one. Writes continuing at
+    the next word share a cycle if the cycle stays within five words. Longer
+    writes are split into cycles of five words.
+
+    Args:
+        writes: (target word address, data) pairs, data a whole number of words
+
+    Returns:
+        Safeload cycles ordered by target address
+    """
+    words: dict[int, bytes] = {}
+    spans: list[tuple[int, int]] = []
+    for address, data in writes:
+        if not data or len(data) % SAFELOAD_WORD_SIZE:
+            raise ValueError(
+                f"Safeload data must be a whole number of {SAFELOAD_WORD_SIZE}-byte "
+                f"words: {len(data)} bytes"
+            )
+        for i in range(0, len(data), SAFELOAD_WORD_SIZE):
+            words[address + i // SAFELOAD_WORD_SIZE] = data[i : i + SAFELOAD_WORD_SIZE]
+        spans.append((address, address + len(data) // SAFELOAD_WORD_SIZE))
+
+    # Word ranges that must be applied atomically: overlapping writes joined,
+    # then cut into pieces that fit a cycle
+    joined: list[list[int]] = []
+    for start, end in sorted(spans):
+        if joined and start < joined[-1][1]:
+            joined[-1][1] = max(joined[-1][1], end)
+        else:
+            joined.append([start, end])
+    units = [
+        (start, min(start + SAFELOAD_MAX_WORDS, end))
+        for first, end in joined
+        for start in range(first, end, SAFELOAD_MAX_WORDS)
+    ]
+
+    ranges: list[tuple[int, int]] = []
+    for start, end in units:
+        if (
+            ranges
+            and ranges[-1][1] == start
+            and end - ranges[-1][0] <= SAFELOAD_MAX_WORDS
+        ):
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+
+    return [
+        SafeloadCycle(
+            address=start,
+            data=b"".join(words[address] for address in range(start, end)),
+        )
+        for start, end in ranges
+    ]
+
+
+def run_safeloads(
+    backend: I2CBackend,
+    cycles: Iterable[SafeloadCycle],
+    frame_period: float = DEFAULT_FRAME_PERIOD,
+) -> None:
+    """Trigger safeload cycles one after another.
+
+    After each trigger the safeload registers are left alone for one audio frame
+    so the DSP can apply the update before they are reloaded.
+
+    Args:
+        backend: Backend of the ADAU1452
+        cycles: Safeload cycles to trigger
+        frame_period: Audio frame period in seconds
+    """
+    for cycle in cycles:
+        backend.write(SafeloadRegister.DATA0, cycle.pack())
+        time.sleep(frame_period)
@@ -24,6 +24,13 @@ from tcp_i2c_bridge.protocol import (
     Write as NetworkWrite,
 )
 from tcp_i2c_bridge.protocol_dumper import ProtocolDumper
+from tcp_i2c_bridge.router import BackendRouter
+from tcp_i2c_bridge.safeload import (
+    SAFELOAD_WORD_SIZE,
+    SafeloadCycle,
+    pack_safeloads,
+    run_safeloads,
+)
 
 logger = structlog.get_logger()
 
@@ -35,17 +42,22 @@ class TCPClientHandler:
         self,
         reader: asyncio.StreamReader,
         writer: asyncio.StreamWriter,
-        i2c_backend: I2CBackend,
+        i2c_backend: I2CBackend | BackendRouter,
         protocol_dumper: ProtocolDumper,
         client_addr: tuple[str, int],
     ):
         self.reader = reader
         self.writer = writer
-        self.i2c_backend = i2c_backend
+        if isinstance(i2c_backend, BackendRouter):
+            self.router = i2c_backend
+        else:
+            self.router = BackendRouter(default=i2c_backend)
         self.protocol_dumper = protocol_dumper
         self.client_addr = client_addr
         self.buffer = b""
         self.client_id = f"{client_addr[0]}:{client_addr[1]}"
+        # Safeload writes of the current receive batch, packed before running
+        self.pending_safeloads: list[NetworkWrite.Request] = []
 
         logger.info("Client connected", client=self.client_id)
 
@@ -66,6 +78,7 @@ class TCPClientHandler:
                 # Process all complete packets in buffer
                 while await self._process_packet():
                     pass
+                await self._flush_safeloads()
 
                 logger.info(
                     "Processed packet: took %0.2f ms, %d bytes",
@@ -108,6 +121,7 @@ class TCPClientHandler:
                 error=str(e),
                 raw=self.buffer.hex(),
             )
+            self.protocol_dumper.trigger("decode_error")
             self.buffer = b""
             return False
         except DecodeException:
@@ -117,6 +131,7 @@ class TCPClientHandler:
                 error=traceback.format_exc(),
                 raw=self.buffer.hex(),
             )
+            self.protocol_dumper.trigger("decode_error")
             self.buffer = b""
             return False
 
@@ -135,6 +150,7 @@ class TCPClientHandler:
                 client=self.client_id,
                 error=str(e),
             )
+            self.protocol_dumper.trigger("decode_error")
             self.buffer = b""
             return False
         except Exception:
@@ -144,19 +160,26 @@ class TCPClientHandler:
                 raw=self.buffer.hex(),
                 error=traceback.format_exc(),
             )
+            self.protocol_dumper.trigger("decode_error")
             self.buffer = b""
             return False
 
-        if isinstance(request, NetworkRead.Request):
+        if isinstance(request, NetworkWrite.Request) and self._is_safeload(request):
+            self.pending_safeloads.append(request)
+        elif isinstance(request, NetworkRead.Request):
+            await self._flush_safeloads()
             await self._handle_read_request(request)
         elif isinstance(request, NetworkWrite.Request):
+            await self._flush_safeloads()
             await self._handle_write_request(request)
         else:
             # Should never happen
             raise Exception(f"Unknown request type: {type(request)}")
 
         await self.protocol_dumper.dump_network_packet(
-            self.client_id, "RX_DECODED", self.buffer[: -len(remaining_buffer)]
+            self.client_id,
+            "RX_DECODED",
+            self.buffer[: len(self.buffer) - len(remaining_buffer)],
         )
 
         # Remove processed data from buffer
@@ -169,17 +192,30 @@ class TCPClientHandler:
         logger.debug(
             "Processing read request",
             client=self.client_id,
+            chip_address=request.Chip_address,
             addr=f"0x{request.Address:04X}",
             length=request.Data_length,
         )
 
         try:
-            # Perform I2C read
-            data = self.i2c_backend.read(request.Address, request.Data_length)
+            # Perform I2C read off the event loop so other buses can proceed
+            start = time.perf_counter()
+            data = await asyncio.to_thread(
+                self.router.read,
+                request.Chip_address,
+                request.Address,
+                request.Data_length,
+            )
+            self.protocol_dumper.note_latency(time.perf_counter() - start)
 
             # Dump I2C layer
             await self.protocol_dumper.dump_i2c_transaction(
-                self.client_id, "READ", request.Address, request.Data_length, data
+                self.client_id,
+                "READ",
+                request.Address,
+                request.Data_length,
+                data,
+                chip=request.Chip_address,
             )
 
             # Send response
@@ -210,6 +246,7 @@ class TCPClientHandler:
                 length=request.Data_length,
                 error=str(e),
             )
+            self.protocol_dumper.trigger("i2c_error")
 
             # Send error response
             response = request.create_response(error=True)
@@ -229,15 +266,21 @@ class TCPClientHandler:
         logger.debug(
             "Processing write request",
             client=self.client_id,
+            chip_address=request.Chip_address,
             addr=f"0x{request.Address:04X}",
             length=len(request.Data),
         )
 
-        # TODO respect chip address
-
         try:
-            # Perform I2C write
-            self.i2c_backend.write(request.Address, request.Data)
+            # Perform I2C write off the event loop so other buses can proceed
+            start = time.perf_counter()
+            await asyncio.to_thread(
+                self.router.write,
+                request.Chip_address,
+                request.Address,
+                request.Data,
+            )
+            self.protocol_dumper.note_latency(time.perf_counter() - start)
 
             # Dump I2C layer
             await self.protocol_dumper.dump_i2c_transaction(
@@ -246,6 +289,7 @@ class TCPClientHandler:
                 request.Address,
                 len(request.Data),
                 request.Data,
+                chip=request.Chip_address,
             )
 
             logger.debug(
@@ -264,6 +308,74 @@ class TCPClientHandler:
                 length=len(request.Data),
                 error=str(e),
             )
+            self.protocol_dumper.trigger("i2c_error")
+
+    def _is_safeload(self, request: NetworkWrite.Request) -> bool:
+        """Check whether a write request can be run as a safeload."""
+        if not request.Block_safeload_write:
+            return False
+
+        if not request.Data or len(request.Data) % SAFELOAD_WORD_SIZE:
+            logger.warning(
+                "Safeload data not word aligned, using block write",
+                client=self.client_id,
+                addr=f"0x{request.Address:04X}",
+                length=len(request.Data),
+            )
+            return False
+
+        return True
+
+    async def _flush_safeloads(self) -> None:
+        """Run the pending safeload writes in as few trigger cycles as possible."""
+        if not self.pending_safeloads:
+            return
+
+        requests = self.pending_safeloads
+        self.pending_safeloads = []
+
+        by_chip: dict[int, list[NetworkWrite.Request]] = {}
+        for request in requests:
+            by_chip.setdefault(request.Chip_address, []).append(request)
+
+        for chip_address, chip_requests in by_chip.items():
+            cycles = pack_safeloads(
+                (request.Address, request.Data) for request in chip_requests
+            )
+
+            logger.debug(
+                "Processing safeload writes",
+                client=self.client_id,
+                chip_address=chip_address,
+                writes=len(chip_requests),
+                cycles=len(cycles),
+            )
+
+            try:
+                await asyncio.to_thread(self._run_safeloads, chip_address, cycles)
+            except Exception as e:
+                logger.error(
+                    "Safeload write failed",
+                    client=self.client_id,
+                    chip_address=chip_address,
+                    error=str(e),
+                )
+                self.protocol_dumper.trigger("i2c_error")
+                continue
+
+            for request in chip_requests:
+                await self.protocol_dumper.dump_i2c_transaction(
+                    self.client_id,
+                    "SAFELOAD",
+                    request.Address,
+                    len(request.Data),
+                    request.Data,
+                    chip=chip_address,
+                )
+
+    def _run_safeloads(self, chip_address: int, cycles: list[SafeloadCycle]) -> None:
+        with self.router.device(chip_address) as backend:
+            run_safeloads(backend, cycles)
 
 
 class TCPServer:
@@ -273,13 +385,17 @@ class TCPServer:
         self,
         host: str,
         port: int,
-        i2c_backend: I2CBackend,
+        i2c_backend: I2CBackend | BackendRouter,
         dump_dir: Path | None = None,
+        protocol_dumper: ProtocolDumper | None = None,
     ):
         self.host = host
         self.port = port
-        self.i2c_backend = i2c_backend
-        self.protocol_dumper = ProtocolDumper(dump_dir)
+        if isinstance(i2c_backend, BackendRouter):
+            self.router = i2c_backend
+        else:
+            self.router = BackendRouter(default=i2c_backend)
+        self.protocol_dumper = protocol_dumper or ProtocolDumper(dump_dir)
         self.server: asyncio.Server | None = None
         self.clients: set[asyncio.Task] = set()
 
@@ -296,9 +412,11 @@ class TCPServer:
             "TCP server started",
             host=server_host,
             port=server_port,
-            dump_dir=str(self.protocol_dumper.dump_dir)
-            if self.protocol_dumper.dump_dir
-            else None,
+            dump_dir=(
+                str(self.protocol_dumper.dump_dir)
+                if self.protocol_dumper.dump_dir
+                else None
+            ),
         )
 
         # Show available IP addresses
@@ -341,7 +459,7 @@ class TCPServer:
             sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
         handler = TCPClientHandler(
-            reader, writer, self.i2c_backend, self.protocol_dumper, client_addr
+            reader, writer, self.router, self.protocol_dumper, client_addr
         )
 
         # Create task for this client
@@ -0,0 +1,152 @@
+-- Wireshark dissector for the SigmaStudio TCP/IP channel protocol served by
+-- tcp-i2c-bridge, and for the I2C layer of `tcp-i2c-bridge capture pcapng`
+-- exports (link type USER0).
+--
+-- Install by copying this file to the personal Lua plugins folder, e.g.
+-- ~/.local/lib/wireshark/plugins/, or load it for one run:
+--     wireshark -X lua_script:sigmastudio.lua capture.pcapng
+
+local sigma = Proto("sigmastudio", "SigmaStudio TCP/IP Channel")
+
+local WRITE = 0x09
+local READ_REQUEST = 0x0A
+local READ_RESPONSE = 0x0B
+
+local commands = {
+    [WRITE] = "Write",
+    [READ_REQUEST] = "Read Request",
+    [READ_RESPONSE] = "Read Response",
+}
+
+local f = sigma.fields
+f.command = ProtoField.uint8("sigmastudio.command", "Command", base.HEX, commands)
+f.safeload = ProtoField.uint8("sigmastudio.safeload", "Block/Safeload", base.DEC,
+    { [0] = "Block write", [1] = "Safeload write" })
+f.channel = ProtoField.uint8("sigmastudio.channel", "Channel", base.DEC)
+f.total_length = ProtoField.uint32("sigmastudio.total_length", "Total length", base.DEC)
+f.chip = ProtoField.uint8("sigmastudio.chip", "Chip address", base.HEX)
+f.data_length = ProtoField.uint32("sigmastudio.data_length", "Data length", base.DEC)
+f.address = ProtoField.uint16("sigmastudio.address", "Address", base.HEX)
+f.status = ProtoField.uint8("sigmastudio.status", "Status", base.DEC,
+    { [0] = "Success", [1] = "Failure" })
+f.reserved = ProtoField.bytes("sigmastudio.reserved", "Reserved")
+f.data = ProtoField.bytes("sigmastudio.data", "Data")
+
+sigma.prefs.port = Pref.uint("TCP port", 8086, "TCP port of the bridge")
+
+-- Every command has a fixed header of 14 bytes; 7 are enough for its length
+local HEADER_SIZE = 14
+local LENGTH_SIZE = 7
+
+local function pdu_length(tvb, pinfo, offset)
+    local command = tvb(offset, 1):uint()
+    if command == WRITE then
+        return tvb(offset + 3, 4):uint()
+    elseif command == READ_REQUEST or command == READ_RESPONSE then
+        return tvb(offset + 1, 4):uint()
+    end
+    -- Not a command: give up on the rest of the segment
+    return tvb:len() - offset
+end
+
+local function dissect_pdu(tvb, pinfo, tree)
+    local command = tvb(0, 1):uint()
+    local name = commands[command]
+    local subtree = tree:add(sigma, tvb(), "SigmaStudio " .. (name or "Unknown"))
+    subtree:add(f.command, tvb(0, 1))
+    pinfo.cols.protocol = "SigmaStudio"
+
+    if name == nil or tvb:len() < HEADER_SIZE then
+        subtree:add_expert_info(PI_MALFORMED, PI_ERROR, "Unknown command or short packet")
+        return tvb:len()
+    end
+
+    local chip, address, length
+    if command == WRITE then
+        subtree:add(f.safeload, tvb(1, 1))
+        subtree:add(f.channel, tvb(2, 1))
+        subtree:add(f.total_length, tvb(3, 4))
+        subtree:add(f.chip, tvb(7, 1))
+        subtree:add(f.data_length, tvb(8, 4))
+        subtree:add(f.address, tvb(12, 2))
+        chip, length, address = tvb(7, 1):uint(), tvb(8, 4):uint(), tvb(12, 2):uint()
+        if tvb(1, 1):uint() == 1 then
+            name = "Safeload"
+        end
+    else
+        subtree:add(f.total_length, tvb(1, 4))
+        subtree:add(f.chip, tvb(5, 1))
+        subtree:add(f.data_length, tvb(6, 4))
+        subtree:add(f.address, tvb(10, 2))
+        chip, length, address = tvb(5, 1):uint(), tvb(6, 4):uint(), tvb(10, 2):uint()
+        if command == READ_REQUEST then
+            subtree:add(f.reserved, tvb(12, 2))
+        else
+            subtree:add(f.status, tvb(12, 1))
+            subtree:add(f.reserved, tvb(13, 1))
+            if tvb(12, 1):uint() ~= 0 then
+                name = name .. " (failed)"
+            end
+        end
+    end
+    if tvb:len() > HEADER_SIZE then
+        subtree:add(f.data, tvb(HEADER_SIZE))
+    end
+
+    pinfo.cols.info:append(string.format(
+        "%s chip=0x%02X addr=0x%04X len=%d; ", name, chip, address, length))
+    return tvb:len()
+end
+
+function sigma.dissector(tvb, pinfo, tree)
+    pinfo.cols.info:clear()
+    dissect_tcp_pdus(tvb, tree, LENGTH_SIZE, pdu_length, dissect_pdu)
+end
+
+local registered_port = sigma.prefs.port
+DissectorTable.get("tcp.port"):add(registered_port, sigma)
+
+function sigma.prefs_changed()
+    if sigma.prefs.port ~= registered_port then
+        DissectorTable.get("tcp.port"):remove(registered_port, sigma)
+        registered_port = sigma.prefs.port
+        DissectorTable.get("tcp.port"):add(registered_port, sigma)
+    end
+end
+
+
+-- I2C layer of the exports: operation, reserved, register address and
+-- transaction length (big endian), followed by the data
+local i2c = Proto("bridge_i2c", "Bridge I2C Transaction")
+
+local operations = { [0] = "Read", [1] = "Write", [2] = "Safeload" }
+
+local fi = i2c.fields
+fi.operation = ProtoField.uint8("bridge_i2c.operation", "Operation", base.DEC, operations)
+fi.address = ProtoField.uint16("bridge_i2c.address", "Address", base.HEX)
+fi.length = ProtoField.uint32("bridge_i2c.length", "Length", base.DEC)
+fi.data = ProtoField.bytes("bridge_i2c.data", "Data")
+
+local I2C_HEADER_SIZE = 8
+
+function i2c.dissector(tvb, pinfo, tree)
+    if tvb:len() < I2C_HEADER_SIZE then
+        return 0
+    end
+    pinfo.cols.protocol = "I2C"
+
+    local subtree = tree:add(i2c, tvb())
+    subtree:add(fi.operation, tvb(0, 1))
+    subtree:add(fi.address, tvb(2, 2))
+    subtree:add(fi.length, tvb(4, 4))
+    if tvb:len() > I2C_HEADER_SIZE then
+        subtree:add(fi.data, tvb(I2C_HEADER_SIZE))
+    end
+
+    pinfo.cols.info = string.format("%s addr=0x%04X len=%d",
+        operations[tvb(0, 1):uint()] or "Unknown", tvb(2, 2):uint(), tvb(4, 4):uint())
+    return tvb:len()
+end
+
+local encaps = wtap_encaps or wtap
+DissectorTable.get("wtap_encap"):add(encaps.USER0, i2c)
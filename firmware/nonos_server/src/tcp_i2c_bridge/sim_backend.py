@@ -0,0 +1,336 @@
+"""Simulated I2C bus with a timing model of the wire and the kernel."""
+
+import errno
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from dataclasses import dataclass
+from enum import IntEnum
+
+import structlog
+
+from tcp_i2c_bridge.device_sim import SimulatedDevice
+from tcp_i2c_bridge.i2c_backend import (
+    AdapterLimits,
+    I2CBackend,
+    I2COperation,
+    I2COpKind,
+    MessageGroup,
+    batch_message_groups,
+    plan_message_groups,
+)
+from tcp_i2c_bridge.memory_map import ADAU1452_MEMORY_MAP, MemoryMap
+
+logger = structlog.get_logger()
+
+
+class BusSpeed(IntEnum):
+    """I2C bus clock rates in Hz."""
+
+    STANDARD = 100_000
+    FAST = 400_000
+    FAST_PLUS = 1_000_000
+
+
+@dataclass(frozen=True)
+class BusTiming:
+    """Timing model of one I2C_RDWR ioctl on an I2C bus.
+
+    Every message costs a start (or repeated start) condition and nine clocks
+    per byte, address byte included: eight data bits and the ACK bit. The ioctl
+    ends with a stop condition. Software costs are added per ioctl and per
+    message on top of the time the bus is busy.
+    """
+
+    clock_hz: int = BusSpeed.FAST
+    start_clocks: float = 1.0
+    """
+    Clocks of a start or repeated start condition, including setup time
+    """
+    stop_clocks: float = 1.0
+    syscall_overhead: float = 30e-6
+    """
+    Seconds per ioctl for the syscall and i2c-dev copying the messages
+    """
+    message_overhead: float = 5e-6
+    """
+    Seconds per message for the adapter driver setting up the transfer
+    """
+
+    def bus_time(self, lengths: Sequence[int]) -> float:
+        """Seconds the bus is busy for messages with the given data lengths."""
+        clocks = self.stop_clocks
+        for length in lengths:
+            clocks += self.start_clocks + 9 * (1 + length)
+        return clocks / self.clock_hz
+
+    def overhead(self, nmsgs: int) -> float:
+        """Seconds of software overhead of one ioctl."""
+        return self.syscall_overhead + nmsgs * self.message_overhead
+
+
+class SimClock(ABC):
+    """Clock advanced by the simulated bus."""
+
+    @abstractmethod
+    def now(self) -> float:
+        """Current time in seconds."""
+        pass
+
+    @abstractmethod
+    def advance(self, duration: float) -> None:
+        """Let a simulated operation take the given time."""
+        pass
+
+
+class VirtualClock(SimClock):
+    """Clock that only moves when the simulation advances it.
+
+    Simulations run as fast as the host allows while still reporting modelled
+    durations, which keeps benchmarks fast and deterministic.
+    """
+
+    def __init__(self) -> None:
+        self.time = 0.0
+
+    def now(self) -> float:
+        return self.time
+
+    def advance(self, duration: float) -> None:
+        self.time += duration
+
+
+class RealtimeClock(SimClock):
+    """Clock that sleeps for simulated durations.
+
+    Operations are scheduled back to back against a deadline, so short sleeps
+    that overshoot are made up by later operations rather than accumulating.
+    """
+
+    def __init__(self) -> None:
+        self._deadline = time.perf_counter()
+
+    def now(self) -> float:
+        return time.perf_counter()
+
+    def advance(self, duration: float) -> None:
+        now = time.perf_counter()
+        self._deadline = max(self._deadline, now) + duration
+        if self._deadline > now:
+            time.sleep(self._deadline - now)
+
+
+@dataclass
+class BusStats:
+    """Modelled activity of a simulated bus."""
+
+    started: float
+    """
+    Clock time the statistics were started at
+    """
+    ioctls: int = 0
+    rejected: int = 0
+    """
+    ioctls rejected for exceeding the adapter limits
+    """
+    messages: int = 0
+    bytes: int = 0
+    bus_time: float = 0.0
+    """
+    Seconds the bus was busy
+    """
+    overhead_time: float = 0.0
+    """
+    Seconds spent in software around the bus transfers
+    """
+
+    def utilisation(self, now: float) -> float:
+        """Fraction of the elapsed time the bus was busy."""
+        elapsed = now - self.started
+        return self.bus_time / elapsed if elapsed > 0 else 0.0
+
+
+class SimulatedI2CBackend(I2CBackend):
+    """I2C backend simulating a device behind an i2c-dev adapter.
+
+    Transfers are split into I2C_RDWR ioctls the same way as by the hardware
+    backends. Each ioctl advances the clock by its modelled bus and software
+    time, and ioctls exceeding the adapter limits are rejected like a real
+    adapter would.
+    """
+
+    def __init__(
+        self,
+        timing: BusTiming | None = None,
+        clock: SimClock | None = None,
+        adapter_limits: AdapterLimits | None = None,
+        memory_map: MemoryMap = ADAU1452_MEMORY_MAP,
+        device: I2CBackend | None = None,
+    ):
+        """Initialize simulated backend.
+
+        Args:
+            timing: Timing model of the bus; 400 kHz by default
+            clock: Clock to advance; a virtual clock by default
+            adapter_limits: Limits of the simulated adapter; the i2c-dev
+                maxima by default
+            memory_map: Word widths of the simulated device memory
+            device: Simulated device behind the bus; a sparse device with the
+                memory map by default
+        """
+        self.timing = timing or BusTiming()
+        self.clock = clock or VirtualClock()
+        self.adapter_limits = adapter_limits or AdapterLimits()
+        self.limits = AdapterLimits()
+        self.memory_map = memory_map
+        self.device = device or SimulatedDevice(memory_map)
+        self.stats = BusStats(started=self.clock.now())
+
+        logger.info(
+            "Simulated I2C backend initialized",
+            clock_hz=self.timing.clock_hz,
+            clock=type(self.clock).__name__,
+        )
+
+    def reset_stats(self) -> None:
+        """Start a new statistics period."""
+        self.stats = BusStats(started=self.clock.now())
+
+    def _ioctl(self, lengths: Sequence[int]) -> None:
+        """Account for one I2C_RDWR ioctl with the given message lengths."""
+        self.stats.ioctls += 1
+        if len(lengths) > self.adapter_limits.max_msgs or any(
+            length > self.adapter_limits.max_msg_len for length in lengths
+        ):
+            # The adapter checks its quirks before touching the bus
+            self.stats.rejected += 1
+            self.stats.overhead_time += self.timing.syscall_overhead
+            self.clock.advance(self.timing.syscall_overhead)
+            raise OSError(errno.EOPNOTSUPP, "Transfer exceeds adapter limits")
+
+        bus_time = self.timing.bus_time(lengths)
+        overhead = self.timing.overhead(len(lengths))
+        self.stats.messages += len(lengths)
+        self.stats.bytes += sum(lengths)
+        self.stats.bus_time += bus_time
+        self.stats.overhead_time += overhead
+        self.clock.advance(bus_time + overhead)
+
+    def _transfer_batch(
+        self,
+        operations: Sequence[I2COperation],
+        results: list[bytearray | None],
+        batch: list[MessageGroup],
+    ) -> None:
+        lengths = []
+        for group in batch:
+            op = operations[group.index]
+            if op.kind is I2COpKind.WRITE:
+                lengths.append(group.size + 2)
+            elif op.kind is I2COpKind.WRITE_READ:
+                lengths += [len(op.data), group.size]
+            else:
+                lengths += [2, group.size]
+
+        self._ioctl(lengths)
+
+        for group in batch:
+            op = operations[group.index]
+            end = group.offset + group.size
+            if op.kind is I2COpKind.WRITE:
+                self.device.write(group.addr, op.data[group.offset : end])
+                continue
+
+            result = results[group.index]
+            assert result is not None
+            if op.kind is I2COpKind.WRITE_READ:
+                result[:] = self.device.write_read(op.data, group.size)
+            else:
+                result[group.offset : end] = self.device.read(group.addr, group.size)
+
+    def _reduce_limits(self, error: OSError) -> bool:
+        limits = self.limits.reduced(error)
+        if limits is None:
+            return False
+        self.limits = limits
+        return True
+
+    def submit(self, operations: Sequence[I2COperation]) -> list[bytes | None]:
+        """Run a batch of operations in as few simulated ioctls as possible.
+
+        Args:
+            operations: Operations to run
+
+        Returns:
+            One result per operation: read data, or None for writes
+        """
+        results = [
+            None if op.kind is I2COpKind.WRITE else bytearray(op.length)
+            for op in operations
+        ]
+
+        resume = None
+        while True:
+            try:
+                for batch in batch_message_groups(
+                    plan_message_groups(
+                        operations, self.limits, self.memory_map, resume
+                    ),
+                    self.limits.max_msgs,
+                ):
+                    resume = batch[0]
+                    self._transfer_batch(operations, results, batch)
+                break
+            except OSError as e:
+                if not self._reduce_limits(e):
+                    raise RuntimeError(f"I2C transaction failed: {e}") from e
+
+        return [None if data is None else bytes(data) for data in results]
+
+    def read(self, addr: int, length: int) -> bytes:
+        """Read from the simulated device."""
+        if length <= 0:
+            raise ValueError("Read length must be positive")
+        data = self.submit([I2COperation(I2COpKind.READ, addr=addr, length=length)])
+        assert data[0] is not None
+        return data[0]
+
+    def write(self, addr: int, data: bytes) -> None:
+        """Write to the simulated device."""
+        if len(data) == 0:
+            raise ValueError("Write data cannot be empty")
+        self.submit([I2COperation(I2COpKind.WRITE, addr=addr, data=data)])
+
+    def write_read(self, data: bytes, length: int) -> bytes:
+        """Set the register pointer, write any further bytes and read back."""
+        operation = I2COperation(I2COpKind.WRITE_READ, data=data, length=length)
+        result = self.submit([operation])[0]
+        assert result is not None
+        return result
+
+    def report(self) -> dict[str, float | int]:
+        """Return and log the modelled bus statistics.
+
+        Returns:
+            Statistics of the current period
+        """
+        now = self.clock.now()
+        stats = self.stats
+        summary: dict[str, float | int] = {
+            "elapsed": now - stats.started,
+            "ioctls": stats.ioctls,
+            "rejected": stats.rejected,
+            "messages": stats.messages,
+            "bytes": stats.bytes,
+            "bus_time": stats.bus_time,
+            "overhead_time": stats.overhead_time,
+            "utilisation": stats.utilisation(now),
+        }
+        logger.info("Simulated I2C bus statistics", **summary)
+        return summary
+
+    def close(self) -> None:
+        """Close simulated backend, reporting its statistics."""
+        self.report()
+        self.device.close()
+        logger.info("Simulated I2C backend closed")
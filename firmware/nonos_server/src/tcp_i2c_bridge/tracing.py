@@ -0,0 +1,353 @@
+"""Bus usage tracing for I2C backends and SMBus users.
+
+A BusTracer accumulates transactions, bytes and wall time per device and per
+register, with a latency histogram per device. It is fed by
+TracingI2CBackend, which wraps an I2CBackend of the bridge, and TracingSMBus,
+which wraps an smbus2.SMBus (or anything with the same calls) used by the
+audio_server drivers, so both sides report bus usage the same way.
+"""
+
+import atexit
+import signal
+import sys
+import threading
+import time
+from collections.abc import Iterator, Mapping, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, TextIO
+
+import smbus2
+
+from tcp_i2c_bridge.i2c_backend import I2CBackend, I2COperation, I2COpKind
+
+# Upper bounds of the latency histogram buckets in microseconds, 1 us to ~1 s;
+# a last bucket takes everything slower
+HISTOGRAM_BOUNDS_US = tuple(2**i for i in range(21))
+
+DEFAULT_TOP_REGISTERS = 10
+
+
+@dataclass
+class TraceStats:
+    """Accumulated bus usage of a device or register."""
+
+    transactions: int = 0
+    bytes_written: int = 0
+    bytes_read: int = 0
+    errors: int = 0
+    time: float = 0.0
+    """
+    Wall time in seconds
+    """
+    histogram: list[int] = field(
+        default_factory=lambda: [0] * (len(HISTOGRAM_BOUNDS_US) + 1)
+    )
+    """
+    Transaction count per latency bucket of HISTOGRAM_BOUNDS_US
+    """
+
+    def add(self, written: int, read: int, duration: float, error: bool) -> None:
+        self.transactions += 1
+        self.bytes_written += written
+        self.bytes_read += read
+        self.errors += error
+        self.time += duration
+
+        micros = duration * 1e6
+        bucket = next(
+            (i for i, bound in enumerate(HISTOGRAM_BOUNDS_US) if micros <= bound),
+            len(HISTOGRAM_BOUNDS_US),
+        )
+        self.histogram[bucket] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Latency below which the given fraction of transactions completed.
+
+        Args:
+            fraction: Fraction of transactions, e.g. 0.99
+
+        Returns:
+            Upper bound of the histogram bucket in seconds; infinity for the
+            overflow bucket
+        """
+        wanted = fraction * self.transactions
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= wanted:
+                if bucket == len(HISTOGRAM_BOUNDS_US):
+                    return float("inf")
+                return HISTOGRAM_BOUNDS_US[bucket] / 1e6
+        return 0.0
+
+
+class BusTracer:
+    """Thread-safe accumulator of I2C bus usage."""
+
+    def __init__(self, name: str = "i2c", top: int = DEFAULT_TOP_REGISTERS):
+        """Initialize tracer.
+
+        Args:
+            name: Name shown in reports
+            top: Number of hot registers shown in reports
+        """
+        self.name = name
+        self.top = top
+        self.started = time.perf_counter()
+        self.devices: dict[int, TraceStats] = {}
+        self.registers: dict[tuple[int, int], TraceStats] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        device: int,
+        register: int,
+        written: int,
+        read: int,
+        duration: float,
+        error: bool = False,
+    ) -> None:
+        """Account one transaction.
+
+        Args:
+            device: 7-bit device address
+            register: Register address the transaction started at
+            written: Bytes written, including register address bytes
+            read: Bytes read
+            duration: Wall time in seconds
+            error: Whether the transaction failed
+        """
+        with self._lock:
+            self.devices.setdefault(device, TraceStats()).add(
+                written, read, duration, error
+            )
+            self.registers.setdefault((device, register), TraceStats()).add(
+                written, read, duration, error
+            )
+
+    @contextmanager
+    def trace(
+        self, device: int, register: int, written: int, read: int
+    ) -> Iterator[None]:
+        """Time a transaction and account it, failed if the block raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.record(
+                device, register, written, read, time.perf_counter() - start, True
+            )
+            raise
+        self.record(device, register, written, read, time.perf_counter() - start)
+
+    def hot_registers(
+        self, n: int | None = None
+    ) -> list[tuple[tuple[int, int], TraceStats]]:
+        """Registers taking the most bus time, as ((device, register), stats)."""
+        with self._lock:
+            registers = sorted(
+                self.registers.items(), key=lambda item: item[1].time, reverse=True
+            )
+        return registers[: n if n is not None else self.top]
+
+    def reset(self) -> None:
+        """Drop everything accumulated so far."""
+        with self._lock:
+            self.devices.clear()
+            self.registers.clear()
+            self.started = time.perf_counter()
+
+    def report(self) -> str:
+        """Format a human-readable report."""
+        elapsed = time.perf_counter() - self.started
+        with self._lock:
+            devices = sorted(self.devices.items())
+        lines = [f"I2C bus trace '{self.name}' over {elapsed:.1f} s"]
+        for device, stats in devices:
+            lines.append(
+                f"  0x{device:02X}: {stats.transactions} transactions, "
+                f"{stats.bytes_written} B written, {stats.bytes_read} B read, "
+                f"{stats.time * 1000:.1f} ms ({stats.time / elapsed:.1%} of wall time), "
+                f"{stats.errors} errors, p50 <= {stats.percentile(0.5) * 1e6:.0f} us, "
+                f"p99 <= {stats.percentile(0.99) * 1e6:.0f} us"
+            )
+        hot = self.hot_registers()
+        if hot:
+            lines.append(f"  Top {len(hot)} registers by bus time:")
+        for (device, register), stats in hot:
+            lines.append(
+                f"    0x{device:02X} 0x{register:04X}: {stats.transactions} transactions, "
+                f"{stats.bytes_written + stats.bytes_read} B, "
+                f"{stats.time * 1000:.1f} ms"
+            )
+        return "\n".join(lines)
+
+    def dump(self, file: TextIO | None = None) -> None:
+        """Print the report, to stderr by default."""
+        print(self.report(), file=file or sys.stderr, flush=True)
+
+    def dump_at_exit(self) -> None:
+        """Print the report when the interpreter exits."""
+        atexit.register(self.dump)
+
+    def dump_on_signal(self, signum: int = signal.SIGUSR1) -> None:
+        """Print the report whenever the process receives a signal.
+
+        The report is printed by a daemon thread the handler wakes: the
+        handler may interrupt record() holding the lock on the main thread.
+        """
+        wake = threading.Event()
+
+        def dumper() -> None:
+            while True:
+                wake.wait()
+                wake.clear()
+                self.dump()
+
+        threading.Thread(target=dumper, name="bus-trace-dump", daemon=True).start()
+        signal.signal(signum, lambda signum, frame: wake.set())
+
+
+def _register(op: I2COperation) -> int:
+    if op.kind is I2COpKind.WRITE_READ:
+        return int.from_bytes(op.data[:2], "big")
+    return op.addr
+
+
+def _bus_bytes(op: I2COperation) -> tuple[int, int]:
+    """Bytes written and read by an operation with 16-bit register addressing."""
+    if op.kind is I2COpKind.WRITE:
+        return 2 + len(op.data), 0
+    if op.kind is I2COpKind.WRITE_READ:
+        return len(op.data), op.length
+    return 2, op.length
+
+
+class TracingI2CBackend(I2CBackend):
+    """Wrap a backend and trace every operation it performs."""
+
+    def __init__(
+        self, backend: I2CBackend, tracer: BusTracer, device: int | None = None
+    ):
+        """Initialize tracing backend.
+
+        Args:
+            backend: Backend to wrap
+            tracer: Tracer to account to; may be shared between backends
+            device: Device address to account to; defaults to the wrapped
+                backend's
+        """
+        self.backend = backend
+        self.tracer = tracer
+        self.device = (
+            device if device is not None else getattr(backend, "device_addr", 0)
+        )
+
+    def _record(
+        self, operations: Sequence[I2COperation], start: float, error: bool
+    ) -> None:
+        # A batch runs as a whole, so its time is shared out by bus bytes
+        duration = time.perf_counter() - start
+        sizes = [_bus_bytes(op) for op in operations]
+        total = sum(written + read for written, read in sizes) or 1
+        for op, (written, read) in zip(operations, sizes, strict=True):
+            self.tracer.record(
+                self.device,
+                _register(op),
+                written,
+                read,
+                duration * (written + read) / total,
+                error,
+            )
+
+    def submit(self, operations: Sequence[I2COperation]) -> list[bytes | None]:
+        """Run a batch of operations on the wrapped backend and trace them."""
+        start = time.perf_counter()
+        try:
+            results = self.backend.submit(operations)
+        except Exception:
+            self._record(operations, start, True)
+            raise
+        self._record(operations, start, False)
+        return results
+
+    def read(self, addr: int, length: int) -> bytes:
+        """Read from the wrapped backend and trace it."""
+        with self.tracer.trace(self.device, addr, 2, length):
+            return self.backend.read(addr, length)
+
+    def write(self, addr: int, data: bytes) -> None:
+        """Write to the wrapped backend and trace it."""
+        with self.tracer.trace(self.device, addr, 2 + len(data), 0):
+            self.backend.write(addr, data)
+
+    def write_read(self, data: bytes, length: int) -> bytes:
+        """Run a write-read on the wrapped backend and trace it."""
+        register = int.from_bytes(data[:2], "big")
+        with self.tracer.trace(self.device, register, len(data), length):
+            return self.backend.write_read(data, length)
+
+    def close(self) -> None:
+        """Close the wrapped backend."""
+        self.backend.close()
+
+
+class TracingSMBus:
+    """Wrap an smbus2.SMBus and trace the calls the drivers use.
+
+    The register of an I2C_RDWR transfer is taken from the first bytes (big
+    endian) of its first write message, as many as the register addresses of
+    the device have. Other attributes pass through untraced.
+    """
+
+    def __init__(
+        self,
+        bus: Any,
+        tracer: BusTracer,
+        register_width: int = 2,
+        register_widths: Mapping[int, int] | None = None,
+    ):
+        """Initialize tracing bus.
+
+        Args:
+            bus: smbus2.SMBus or a stand-in with the same calls
+            tracer: Tracer to account to
+            register_width: Register address bytes of I2C_RDWR transfers
+            register_widths: Register address bytes per device address,
+                overriding register_width
+        """
+        if register_width < 1 or any(
+            width < 1 for width in (register_widths or {}).values()
+        ):
+            raise ValueError("Register addresses must be at least one byte")
+        self.bus = bus
+        self.tracer = tracer
+        self.register_width = register_width
+        self.register_widths = dict(register_widths or {})
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.bus, name)
+
+    def read_byte_data(self, i2c_addr: int, register: int) -> int:
+        with self.tracer.trace(i2c_addr, register, 1, 1):
+            return self.bus.read_byte_data(i2c_addr, register)
+
+    def write_byte_data(self, i2c_addr: int, register: int, value: int) -> None:
+        with self.tracer.trace(i2c_addr, register, 2, 0):
+            self.bus.write_byte_data(i2c_addr, register, value)
+
+    def i2c_rdwr(self, *i2c_msgs: smbus2.i2c_msg) -> None:
+        device = i2c_msgs[0].addr if i2c_msgs else 0
+        width = self.register_widths.get(device, self.register_width)
+        written = read = 0
+        register = None
+        for msg in i2c_msgs:
+            if msg.flags & smbus2.smbus2.I2C_M_RD:
+                read += msg.len
+                continue
+            written += msg.len
+            if register is None:
+                register = int.from_bytes(bytes(msg)[:width], "big")
+        with self.tracer.trace(device, register or 0, written, read):
+            self.bus.i2c_rdwr(*i2c_msgs)
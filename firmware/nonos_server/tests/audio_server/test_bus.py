@@ -0,0 +1,175 @@
+"""Tests for shared I2C bus access of the device drivers."""
+
+import threading
+import time
+
+import pytest
+import smbus2
+
+from audio_server.drivers.bus import BusManager
+
+# Seconds a transfer of the fake bus takes, and a thread is given to get through
+TRANSFER_TIME = 0.05
+BLOCK_TIMEOUT = 0.2
+
+
+class FakeSMBus:
+    """Byte-register bus logging its calls."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.registers: dict[tuple[int, int], int] = {}
+        self.calls: list[tuple[str, int, int]] = []
+        self.delay = 0.0
+        self.closed = False
+
+    def read_byte_data(self, i2c_addr: int, register: int) -> int:
+        time.sleep(self.delay)
+        self.calls.append(("read", i2c_addr, register))
+        return self.registers.get((i2c_addr, register), 0)
+
+    def write_byte_data(self, i2c_addr: int, register: int, value: int) -> None:
+        time.sleep(self.delay)
+        self.calls.append(("write", i2c_addr, register))
+        if register == 0xFF:
+            raise OSError("Remote I/O error")
+        self.registers[(i2c_addr, register)] = value
+
+    def i2c_rdwr(self, *i2c_msgs: smbus2.i2c_msg) -> None:
+        self.calls.append(("rdwr", i2c_msgs[0].addr, len(i2c_msgs)))
+
+    def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr("audio_server.drivers.bus.smbus2.SMBus", FakeSMBus)
+    manager = BusManager()
+    yield manager
+    manager.close()
+
+
+def start(target, *args) -> threading.Thread:
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+class TestBusManager:
+    """Test buses and handles handed out by the manager."""
+
+    def test_one_bus_per_path(self, manager):
+        """Test a bus number and its device path open the same bus once."""
+        assert manager.bus(1) is manager.bus("/dev/i2c-1")
+        assert manager.bus(1) is not manager.bus(2)
+        assert manager.bus(1).smbus.path == "/dev/i2c-1"
+
+    def test_invalid_address(self, manager):
+        """Test handles are only handed out for 7-bit addresses."""
+        with pytest.raises(ValueError, match="Invalid I2C device address"):
+            manager.device(1, 0x80)
+
+    def test_close(self, manager):
+        """Test closing the manager closes its buses."""
+        fake = manager.bus(1).smbus
+        manager.close()
+
+        assert fake.closed
+        assert manager.buses == {}
+
+
+class TestLocking:
+    """Test devices on one bus are serialised and other buses are not."""
+
+    def test_same_bus_serialised(self, manager):
+        """Test a device waits while another holds the same bus."""
+        first = manager.device(1, 0x10)
+        second = manager.device(1, 0x20)
+
+        with first.atomic():
+            thread = start(second.write_byte_data, 0x20, 0x01, 0x05)
+            thread.join(BLOCK_TIMEOUT)
+            assert thread.is_alive()
+            first.write_byte_data(0x10, 0x01, 0x07)
+
+        thread.join(BLOCK_TIMEOUT)
+        assert not thread.is_alive()
+        assert manager.bus(1).smbus.calls == [
+            ("write", 0x10, 0x01),
+            ("write", 0x20, 0x01),
+        ]
+
+    def test_other_buses_independent(self, manager):
+        """Test a device is not held up by a busy device on another bus."""
+        first = manager.device(1, 0x10)
+        other = manager.device(2, 0x10)
+
+        with first.atomic():
+            thread = start(other.write_byte_data, 0x10, 0x01, 0x05)
+            thread.join(BLOCK_TIMEOUT)
+            assert not thread.is_alive()
+
+        assert manager.bus(2).smbus.registers == {(0x10, 0x01): 0x05}
+
+    def test_atomic_read_modify_write(self, manager):
+        """Test no other device gets on the bus between a read and its write."""
+        device = manager.device(1, 0x10)
+        other = manager.device(1, 0x20)
+
+        with device.atomic():
+            value = device.read_byte_data(0x10, 0x02)
+            thread = start(other.read_byte_data, 0x20, 0x02)
+            thread.join(BLOCK_TIMEOUT)
+            device.write_byte_data(0x10, 0x02, value | 0x80)
+
+        thread.join(BLOCK_TIMEOUT)
+        assert manager.bus(1).smbus.calls == [
+            ("read", 0x10, 0x02),
+            ("write", 0x10, 0x02),
+            ("read", 0x20, 0x02),
+        ]
+
+
+class TestDeviceHandle:
+    """Test the SMBus calls of a device handle."""
+
+    def test_address_check(self, manager):
+        """Test a handle refuses to address another device."""
+        device = manager.device(1, 0x10)
+
+        with pytest.raises(ValueError, match="cannot access device 0x11"):
+            device.read_byte_data(0x11, 0x00)
+        with pytest.raises(ValueError, match="cannot access device 0x11"):
+            device.i2c_rdwr(
+                smbus2.i2c_msg.write(0x10, [0x00]), smbus2.i2c_msg.read(0x11, 1)
+            )
+
+        assert manager.bus(1).smbus.calls == []
+        assert device.stats.transfers == 0
+
+    def test_accounting(self, manager):
+        """Test transfers, bus time and time waiting are accounted per device."""
+        manager.bus(1).smbus.delay = TRANSFER_TIME
+        first = manager.device(1, 0x10)
+        second = manager.device(1, 0x20)
+
+        first.write_byte_data(0x10, 0x01, 0x05)
+        first.i2c_rdwr(smbus2.i2c_msg.write(0x10, [0x01]))
+        with pytest.raises(OSError):
+            first.write_byte_data(0x10, 0xFF, 0x00)
+        with first.atomic():
+            thread = start(second.read_byte_data, 0x20, 0x01)
+            time.sleep(2 * TRANSFER_TIME)
+        thread.join()
+
+        assert first.stats.transfers == 3
+        assert first.stats.bus_time >= 2 * TRANSFER_TIME
+        assert first.stats.wait_time < TRANSFER_TIME
+        assert second.stats.transfers == 1
+        assert second.stats.bus_time >= TRANSFER_TIME
+        assert second.stats.wait_time >= TRANSFER_TIME
+        assert manager.stats() == {
+            ("/dev/i2c-1", 0x10): first.stats,
+            ("/dev/i2c-1", 0x20): second.stats,
+        }
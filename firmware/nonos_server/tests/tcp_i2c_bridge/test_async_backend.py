@@ -0,0 +1,123 @@
+"""Tests for asyncio I2C backends."""
+
+import asyncio
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from tcp_i2c_bridge.async_backend import AsyncDebugI2CBackend, ThreadedAsyncI2CBackend
+from tcp_i2c_bridge.i2c_backend import DebugI2CBackend
+
+
+class SlowBackend(DebugI2CBackend):
+    """Debug backend that blocks like a real bus and records its threads."""
+
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+        self.threads: set[str] = set()
+
+    def read(self, addr: int, length: int) -> bytes:
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.delay)
+        return super().read(addr, length)
+
+
+class TestAsyncDebugI2CBackend:
+    """Test async debug backend."""
+
+    @pytest.mark.asyncio
+    async def test_read_write(self):
+        """Test reading back written data."""
+        backend = AsyncDebugI2CBackend()
+
+        await backend.write(0x4000, b"test")
+
+        assert await backend.read(0x4000, 4) == b"test"
+        assert backend.memory[:4] == b"test"
+
+    @pytest.mark.asyncio
+    async def test_transaction(self):
+        """Test transactions run in order."""
+        backend = AsyncDebugI2CBackend()
+
+        async with backend.transaction() as txn:
+            txn.write(0x4000, b"abcd")
+            txn.read(0x4000, 4)
+            txn.write_read(b"\x40\x02", 2)
+
+        assert txn.results == [None, b"abcd", b"cd"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_operations(self):
+        """Test operations overlap instead of running back to back."""
+        backends = [AsyncDebugI2CBackend(latency=0.05) for _ in range(4)]
+
+        start = time.monotonic()
+        await asyncio.gather(*(backend.read(0x4000, 4) for backend in backends))
+
+        assert time.monotonic() - start < 0.15
+
+
+class TestThreadedAsyncI2CBackend:
+    """Test threaded adapter for synchronous backends."""
+
+    @pytest.mark.asyncio
+    async def test_read_write(self):
+        """Test calls are forwarded to the wrapped backend."""
+        backend = ThreadedAsyncI2CBackend(DebugI2CBackend())
+
+        await backend.write(0x4000, b"test")
+
+        assert await backend.read(0x4000, 4) == b"test"
+        assert await backend.write_read(b"\x40\x00", 2) == b"te"
+        await backend.close()
+
+    @pytest.mark.asyncio
+    async def test_transaction(self):
+        """Test transactions are submitted to the wrapped backend."""
+        backend = ThreadedAsyncI2CBackend(DebugI2CBackend())
+
+        async with backend.transaction() as txn:
+            txn.write(0x4000, b"abcd")
+            txn.read(0x4002, 2)
+
+        assert txn.results == [None, b"cd"]
+        await backend.close()
+
+    @pytest.mark.asyncio
+    async def test_one_thread_per_backend(self):
+        """Test a backend is serialised on one thread while buses overlap."""
+        slow = [SlowBackend(delay=0.05) for _ in range(2)]
+        backends = [
+            ThreadedAsyncI2CBackend(backend, name=f"bus{i}")
+            for i, backend in enumerate(slow)
+        ]
+
+        start = time.monotonic()
+        await asyncio.gather(
+            *(backend.read(0x4000, 1) for backend in backends for _ in range(2))
+        )
+        elapsed = time.monotonic() - start
+
+        # Two reads per bus run back to back, the buses run side by side
+        assert 0.1 <= elapsed < 0.2
+        assert all(len(backend.threads) == 1 for backend in slow)
+        assert slow[0].threads != slow[1].threads
+
+        for backend in backends:
+            await backend.close()
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate(self):
+        """Test backend errors are raised in the awaiting task."""
+        failing = DebugI2CBackend()
+        failing.read = Mock(side_effect=RuntimeError("I2C read failed"))
+        backend = ThreadedAsyncI2CBackend(failing)
+
+        with pytest.raises(RuntimeError, match="I2C read failed"):
+            await backend.read(0x4000, 1)
+
+        await backend.close()
@@ -0,0 +1,186 @@
+"""Tests for boot images compiled from captured sessions."""
+
+from dataclasses import replace
+
+import pytest
+
+from tcp_i2c_bridge.boot_image import (
+    BootEntry,
+    BootEntryKind,
+    compile_boot_image,
+    read_boot_image,
+    run_boot_image,
+    write_boot_image,
+)
+from tcp_i2c_bridge.capture import CaptureRecord, CaptureRecordType, Operation
+from tcp_i2c_bridge.device_sim import SimulatedDevice
+
+
+def i2c(operation: Operation, addr: int, data: bytes, ms: int = 0) -> CaptureRecord:
+    return CaptureRecord(
+        type=CaptureRecordType.I2C,
+        code=operation,
+        client="192.168.1.20:51234",
+        timestamp=ms * 1_000_000,
+        data=data,
+        addr=addr,
+        length=len(data),
+    )
+
+
+def write(addr: int, data: str, ms: int = 0) -> CaptureRecord:
+    return i2c(Operation.WRITE, addr, bytes.fromhex(data), ms)
+
+
+def writes(entries: list[BootEntry]) -> list[tuple[int, str]]:
+    return [(e.addr, e.data.hex()) for e in entries if e.kind == BootEntryKind.WRITE]
+
+
+class TestCompile:
+    """Test folding transactions into boot image entries."""
+
+    def test_memory_folded(self):
+        """Test memory writes are overlaid and merged into contiguous bursts."""
+        entries = compile_boot_image(
+            [
+                write(0xC001, "0202020202"),
+                write(0xC000, "0101010101"),
+                write(0x0010, "00000001"),
+                write(0xC001, "0303030303"),
+                write(0x0011, "00000002"),
+            ]
+        )
+
+        assert writes(entries) == [
+            (0x0010, "0000000100000002"),
+            (0xC000, "01010101010303030303"),
+        ]
+
+    def test_control_order_kept(self):
+        """Test control writes keep their order and split memory phases."""
+        entries = compile_boot_image(
+            [
+                write(0x0010, "00000001"),
+                write(0xF890, "0000"),
+                write(0xF890, "0001"),
+                write(0x0010, "00000002"),
+            ]
+        )
+
+        assert writes(entries) == [
+            (0x0010, "00000001"),
+            (0xF890, "0000"),
+            (0xF890, "0001"),
+            (0x0010, "00000002"),
+        ]
+
+    def test_control_merged(self):
+        """Test repeated control writes are dropped and next registers merged."""
+        entries = compile_boot_image(
+            [
+                write(0xF180, "0001"),
+                write(0xF180, "0001"),
+                write(0xF181, "0002"),
+                write(0xF182, "0002"),
+                write(0xF200, "0040"),
+            ]
+        )
+
+        assert writes(entries) == [(0xF180, "000100020002"), (0xF200, "0040")]
+
+    def test_safeload_registers_not_folded(self):
+        """Test writes to the safeload registers keep their order."""
+        entries = compile_boot_image(
+            [
+                write(0x6006, "00000001"),
+                write(0x6010, "00000002"),
+                write(0x6006, "00000001"),
+            ]
+        )
+
+        assert writes(entries) == [
+            (0x6006, "00000001"),
+            (0x6010, "00000002"),
+            (0x6006, "00000001"),
+        ]
+
+    def test_delays_and_checks(self):
+        """Test gaps become delays and reads become checks when asked for."""
+        records = [
+            write(0xF003, "0001", ms=0),
+            i2c(Operation.READ, 0xF405, b"\x00\x01", ms=1),
+            write(0xF050, "1fff", ms=500),
+        ]
+
+        without = compile_boot_image(records)
+        with_checks = compile_boot_image(records, checks=True, max_delay=0.2)
+
+        assert [e.kind for e in without] == [
+            BootEntryKind.WRITE,
+            BootEntryKind.DELAY,
+            BootEntryKind.WRITE,
+        ]
+        assert without[1].delay == pytest.approx(0.5)
+        assert [e.kind for e in with_checks] == [
+            BootEntryKind.WRITE,
+            BootEntryKind.CHECK,
+            BootEntryKind.DELAY,
+            BootEntryKind.WRITE,
+        ]
+        assert with_checks[2].delay == pytest.approx(0.2)
+
+    def test_chip(self):
+        """Test only the transactions of the selected chip are compiled."""
+        records = [
+            replace(write(0xF003, "0001"), chip=1),
+            replace(write(0xF050, "1fff"), chip=2),
+            write(0xF890, "0002"),
+        ]
+
+        assert writes(compile_boot_image(records, chip=2)) == [(0xF050, "1fff")]
+        assert len(writes(compile_boot_image(records))) == 3
+
+
+class TestImageFile:
+    """Test writing, reading and running boot images."""
+
+    ENTRIES = [
+        BootEntry(BootEntryKind.WRITE, 0xF890, b"\x00\x01"),
+        BootEntry(BootEntryKind.DELAY, delay=0.25),
+        BootEntry(BootEntryKind.WRITE, 0x0010, b"\x00\x00\x00\x01\x00\x00\x00\x02"),
+        BootEntry(BootEntryKind.CHECK, 0x0011, b"\x00\x00\x00\x02"),
+    ]
+
+    def test_round_trip(self, tmp_path):
+        """Test entries read back as written."""
+        path = tmp_path / "dsp.boot"
+
+        size = write_boot_image(path, self.ENTRIES)
+
+        assert size == path.stat().st_size
+        assert read_boot_image(path) == self.ENTRIES
+
+    def test_not_a_boot_image(self, tmp_path):
+        """Test other files are refused."""
+        path = tmp_path / "dsp.boot"
+        path.write_bytes(b"NCAP\x01\x00\x00\x00")
+
+        with pytest.raises(ValueError):
+            read_boot_image(path)
+
+    def test_run(self):
+        """Test writes reach the device, delays sleep and checks pass."""
+        device = SimulatedDevice()
+        delays: list[float] = []
+
+        run_boot_image(device, self.ENTRIES, sleep=delays.append)
+
+        assert device.read(0x0010, 8) == bytes.fromhex("0000000100000002")
+        assert delays == [0.25]
+
+    def test_failed_check(self):
+        """Test a register not holding the expected data stops the boot."""
+        entries = [BootEntry(BootEntryKind.CHECK, 0x0010, b"\x00\x00\x00\x01")]
+
+        with pytest.raises(RuntimeError, match="0x0010"):
+            run_boot_image(SimulatedDevice(), entries)
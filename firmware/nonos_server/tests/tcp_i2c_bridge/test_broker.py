@@ -0,0 +1,236 @@
+"""Tests for the I2C broker."""
+
+import asyncio
+import threading
+from collections.abc import Sequence
+
+import pytest
+import smbus2
+
+from tcp_i2c_bridge.broker import (
+    BrokerI2CBackend,
+    BrokerJob,
+    BrokerMessage,
+    BrokerSMBus,
+    BusAdapter,
+    BusScheduler,
+    ClientStats,
+    DeviceAdapter,
+    I2CBroker,
+    Priority,
+    RequestFlags,
+)
+from tcp_i2c_bridge.device_sim import SimulatedDevice
+from tcp_i2c_bridge.i2c_backend import AdapterLimits, SMBusI2CBackend
+
+
+@pytest.fixture
+def broker_socket(tmp_path):
+    """Run a broker serving simulated devices on bus 1 in a thread."""
+    socket_path = tmp_path / "broker.sock"
+    broker = I2CBroker(
+        socket_path,
+        {1: DeviceAdapter(factory=SimulatedDevice)},
+        limits=AdapterLimits(max_msg_len=64, max_msgs=4),
+    )
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    def run() -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(broker.start())
+        started.set()
+        loop.run_forever()
+        loop.run_until_complete(broker.stop())
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    started.wait(5)
+    yield socket_path
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+class GatedAdapter(BusAdapter):
+    """Adapter recording the order of transfers, blocked until opened."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.busy = threading.Event()
+        self.order: list[int] = []
+
+    def transfer(self, device: int, messages: Sequence[BrokerMessage]) -> list[bytes]:
+        self.busy.set()
+        self.gate.wait(5)
+        self.order.append(device)
+        return []
+
+    def close(self) -> None:
+        pass
+
+
+def make_job(
+    client: object,
+    device: int,
+    priority: Priority = Priority.NORMAL,
+    flags: RequestFlags = RequestFlags.NONE,
+    done: threading.Event | None = None,
+) -> BrokerJob:
+    return BrokerJob(
+        client=client,
+        stats=ClientStats(),
+        device=device,
+        messages=[BrokerMessage.write(b"\x00\x00\x00")],
+        priority=priority,
+        flags=flags,
+        done=lambda result: done.set() if done else None,
+    )
+
+
+class TestBusScheduler:
+    """Test scheduling of the jobs of one bus."""
+
+    def test_priority(self):
+        """Test interactive jobs overtake queued bulk jobs."""
+        adapter = GatedAdapter()
+        scheduler = BusScheduler("test", adapter, AdapterLimits())
+        client = object()
+        last = threading.Event()
+
+        scheduler.put(make_job(client, 0x10))
+        assert adapter.busy.wait(5)
+        scheduler.put(make_job(client, 0x20, Priority.BULK))
+        scheduler.put(make_job(client, 0x30, Priority.BULK, done=last))
+        scheduler.put(make_job(client, 0x40, Priority.INTERACTIVE))
+        adapter.gate.set()
+        assert last.wait(5)
+        scheduler.close()
+
+        assert adapter.order == [0x10, 0x40, 0x20, 0x30]
+
+    def test_hold(self):
+        """Test a holding client keeps the bus until it releases it."""
+        adapter = GatedAdapter()
+        scheduler = BusScheduler("test", adapter, AdapterLimits())
+        holder, other = object(), object()
+        last = threading.Event()
+
+        scheduler.put(make_job(holder, 0x10, flags=RequestFlags.HOLD))
+        assert adapter.busy.wait(5)
+        scheduler.put(make_job(other, 0x20, Priority.INTERACTIVE, done=last))
+        scheduler.put(make_job(holder, 0x11, Priority.BULK))
+        adapter.gate.set()
+        assert last.wait(5)
+        scheduler.close()
+
+        assert adapter.order == [0x10, 0x11, 0x20]
+
+    def test_hold_timeout(self):
+        """Test an idle holding client loses the bus."""
+        adapter = GatedAdapter()
+        adapter.gate.set()
+        scheduler = BusScheduler("test", adapter, AdapterLimits(), hold_timeout=0.05)
+        done = threading.Event()
+
+        scheduler.put(make_job(object(), 0x10, flags=RequestFlags.HOLD))
+        scheduler.put(make_job(object(), 0x20, done=done))
+        assert done.wait(5)
+        scheduler.close()
+
+        assert adapter.order == [0x10, 0x20]
+
+    def test_rejects_oversized(self):
+        """Test requests beyond the limits are rejected before the bus."""
+        adapter = GatedAdapter()
+        adapter.gate.set()
+        scheduler = BusScheduler("test", adapter, AdapterLimits(max_msg_len=32))
+        results = []
+        done = threading.Event()
+        job = make_job(object(), 0x10)
+        job.messages = [BrokerMessage.write(bytes(33))]
+        job.done = lambda result: (results.append(result), done.set())
+
+        scheduler.put(job)
+        assert done.wait(5)
+        scheduler.close()
+
+        assert adapter.order == []
+        assert isinstance(results[0], OSError)
+        assert job.stats.rejected == 1
+
+
+class TestBrokerI2CBackend:
+    """Test the bridge backend using the broker."""
+
+    def test_read_write(self, broker_socket):
+        """Test reads and writes reach the device behind the broker."""
+        backend = BrokerI2CBackend(broker_socket, 1, 0x3B, name="bridge")
+        try:
+            backend.write(0x0010, b"\x01\x02\x03\x04")
+            assert backend.read(0x0010, 4) == b"\x01\x02\x03\x04"
+            assert backend.write_read(b"\x00\x10", 4) == b"\x01\x02\x03\x04"
+        finally:
+            backend.close()
+
+    def test_large_transaction(self, broker_socket):
+        """Test transfers beyond the broker limits are split and stay atomic."""
+        backend = BrokerI2CBackend(broker_socket, 1, 0x3B)
+        data = bytes(range(256)) * 2
+        try:
+            with backend.transaction() as txn:
+                txn.write(0x0100, data)
+                txn.read(0x0100, len(data))
+            assert txn.results[1] == data
+        finally:
+            backend.close()
+
+    def test_unknown_bus(self, broker_socket):
+        """Test transfers on a bus the broker does not serve fail."""
+        backend = BrokerI2CBackend(broker_socket, 7, 0x3B)
+        try:
+            with pytest.raises(RuntimeError, match="No I2C bus 7"):
+                backend.read(0x0010, 4)
+        finally:
+            backend.close()
+
+    def test_not_running(self, tmp_path):
+        """Test connecting without a broker."""
+        with pytest.raises(RuntimeError, match="Failed to connect to I2C broker"):
+            BrokerI2CBackend(tmp_path / "missing.sock", 1, 0x3B)
+
+
+class TestBrokerSMBus:
+    """Test the SMBus stand-in used by the audio_server drivers."""
+
+    def test_i2c_rdwr(self, broker_socket):
+        """Test an SMBus driver works unchanged through the broker."""
+        bus = BrokerSMBus(broker_socket, 1, name="audio_server")
+        backend = SMBusI2CBackend(bus, 0x3B)
+        try:
+            with bus.reserve():
+                backend.write(0x0020, b"\xaa\xbb\xcc\xdd")
+                assert backend.read(0x0020, 4) == b"\xaa\xbb\xcc\xdd"
+        finally:
+            bus.close()
+
+    def test_single_device(self, broker_socket):
+        """Test transfers mixing devices are refused."""
+        bus = BrokerSMBus(broker_socket, 1)
+        try:
+            with pytest.raises(ValueError, match="one device"):
+                bus.i2c_rdwr(
+                    smbus2.i2c_msg.write(0x3B, b"\x00\x00"),
+                    smbus2.i2c_msg.read(0x3C, 4),
+                )
+        finally:
+            bus.close()
+
+    def test_no_messages(self, broker_socket):
+        """Test transfers without messages are refused."""
+        bus = BrokerSMBus(broker_socket, 1)
+        try:
+            with pytest.raises(ValueError, match="at least one message"):
+                bus.i2c_rdwr()
+        finally:
+            bus.close()
@@ -0,0 +1,499 @@
+"""Tests for protocol dump captures."""
+
+import os
+import time
+
+import pytest
+
+from tcp_i2c_bridge import capture as capture_module
+from tcp_i2c_bridge.capture import (
+    CaptureIndex,
+    CaptureQuery,
+    CaptureRecordType,
+    CaptureWriter,
+    Compression,
+    Direction,
+    FlightRecorder,
+    Operation,
+    QueuePolicy,
+    SegmentedCaptureWriter,
+    build_index,
+    capture_segments,
+    index_path,
+    query_capture,
+    read_capture,
+    write_text_logs,
+)
+from tcp_i2c_bridge.protocol_dumper import DumpMode, ProtocolDumper
+
+
+def write_session(path) -> None:
+    capture = CaptureWriter(path)
+    capture.network("127.0.0.1:5000", Direction.RX_RAW, b"\x0a\x00")
+    capture.i2c("127.0.0.1:5000", Operation.READ, 0xF003, 2, b"\x00\x01", chip=1)
+    capture.network("127.0.0.1:5001", Direction.TX, b"\x0b\x00")
+    capture.close()
+
+
+class TestCapture:
+    """Test writing and reading captures."""
+
+    def test_roundtrip(self, tmp_path):
+        """Test records are read back with their clients and fields."""
+        path = tmp_path / "capture.bin"
+        write_session(path)
+
+        records = list(read_capture(path))
+
+        assert [r.type for r in records] == [
+            CaptureRecordType.NETWORK,
+            CaptureRecordType.I2C,
+            CaptureRecordType.NETWORK,
+        ]
+        assert records[0].client == "127.0.0.1:5000"
+        assert records[0].direction is Direction.RX_RAW
+        assert records[1].operation is Operation.READ
+        assert (records[1].addr, records[1].length) == (0xF003, 2)
+        assert records[1].data == b"\x00\x01"
+        assert records[1].chip == 1
+        assert records[0].chip is None
+        assert records[2].client == "127.0.0.1:5001"
+        assert records[0].timestamp <= records[2].timestamp
+
+    def test_truncated(self, tmp_path):
+        """Test a record cut off by a crash ends the capture."""
+        path = tmp_path / "capture.bin"
+        write_session(path)
+        path.write_bytes(path.read_bytes()[:-1])
+
+        assert len(list(read_capture(path))) == 2
+
+    def test_not_a_capture(self, tmp_path):
+        """Test reading a file that is not a capture."""
+        path = tmp_path / "junk.bin"
+        path.write_bytes(b"junk data")
+
+        with pytest.raises(ValueError, match="Not a capture"):
+            list(read_capture(path))
+
+    def test_old_version(self, tmp_path):
+        """Test captures without chip addresses are refused."""
+        path = tmp_path / "capture.bin"
+        write_session(path)
+        data = bytearray(path.read_bytes())
+        data[4] = 1
+        path.write_bytes(data)
+
+        with pytest.raises(ValueError, match="Unsupported capture version 1"):
+            list(read_capture(path))
+
+    def test_text_logs(self, tmp_path):
+        """Test text logs are generated in the dumper's former format."""
+        path = tmp_path / "capture.bin"
+        write_session(path)
+
+        network_log, i2c_log = write_text_logs(path, tmp_path / "logs")
+
+        network = network_log.read_text().splitlines()
+        assert len(network) == 2
+        assert network[0].endswith("127.0.0.1:5000 RX_RAW len=2 data=0a00")
+        assert (
+            i2c_log.read_text()
+            .rstrip()
+            .endswith("127.0.0.1:5000 READ addr=0xF003 len=2 data=0001")
+        )
+
+
+def write_timed_session(path, monkeypatch) -> None:
+    """Write records, client records included, two seconds apart from second 100."""
+    clock = iter(range(100 * 10**9, 200 * 10**9, 2 * 10**9))
+    monkeypatch.setattr(capture_module.time, "time_ns", lambda: next(clock))
+    capture = CaptureWriter(path)
+    capture.i2c("127.0.0.1:5000", Operation.WRITE, 0xF403, 2, b"\x00\x01", 1)
+    capture.network("127.0.0.1:5001", Direction.RX_RAW, b"\x0a\x00")
+    capture.i2c("127.0.0.1:5000", Operation.READ, 0xF403, 2, b"\x00\x01", 1)
+    capture.i2c("127.0.0.1:5001", Operation.WRITE, 0xF404, 2, b"\x00\x02", 2)
+    capture.i2c("127.0.0.1:5000", Operation.WRITE, 0x0010, 4, bytes(4))
+    capture.close()
+    monkeypatch.undo()
+
+
+class TestIndex:
+    """Test the sidecar index and queries using it."""
+
+    def test_written_on_close(self, tmp_path, monkeypatch):
+        """Test closing a capture writes an index of its records."""
+        path = tmp_path / "capture.bin"
+        write_timed_session(path, monkeypatch)
+
+        with CaptureIndex(index_path(path)) as index:
+            assert index.capture_size == path.stat().st_size
+            assert sorted(index.clients.values()) == [
+                "127.0.0.1:5000",
+                "127.0.0.1:5001",
+            ]
+            assert sorted(index.addresses) == [0x0010, 0xF403, 0xF404]
+            assert index.addresses[0xF403][1] == 2
+
+    def test_spilled_postings(self, tmp_path, monkeypatch):
+        """Test an index built with postings spilled to disk is the same."""
+        path = tmp_path / "capture.bin"
+        capture = CaptureWriter(path)
+        for i in range(100):
+            capture.i2c(f"127.0.0.1:{5000 + i % 3}", Operation.READ, i % 7, 1, b"")
+        capture.close()
+        expected = index_path(path).read_bytes()
+
+        spills = []
+        temporary_file = capture_module.tempfile.TemporaryFile
+        monkeypatch.setattr(
+            capture_module.tempfile,
+            "TemporaryFile",
+            lambda **kwargs: spills.append(kwargs) or temporary_file(**kwargs),
+        )
+        build_index(path, max_postings=5)
+
+        assert spills == [{"dir": tmp_path}]
+
+        assert index_path(path).read_bytes() == expected
+        assert sorted(p.name for p in tmp_path.iterdir()) == [
+            "capture.bin",
+            "capture.idx",
+        ]
+
+    @pytest.mark.parametrize(
+        ("query", "expected"),
+        [
+            (CaptureQuery(addr_min=0xF403, addr_max=0xF403), [b"\x00\x01"] * 2),
+            (
+                CaptureQuery(addr_min=0xF400, addr_max=0xF4FF),
+                [b"\x00\x01"] * 2 + [b"\x00\x02"],
+            ),
+            (
+                CaptureQuery(addr_min=0xF403, addr_max=0xF404, code=Operation.WRITE),
+                [b"\x00\x01", b"\x00\x02"],
+            ),
+            (
+                CaptureQuery(clients=frozenset({"127.0.0.1:5001"})),
+                [b"\x0a\x00", b"\x00\x02"],
+            ),
+            (CaptureQuery(code=Direction.RX_RAW), [b"\x0a\x00"]),
+            (CaptureQuery(chip=2), [b"\x00\x02"]),
+            (
+                CaptureQuery(chip=1, code=Operation.WRITE),
+                [b"\x00\x01"],
+            ),
+            (
+                CaptureQuery(start=102 * 10**9, end=106 * 10**9),
+                [b"\x00\x01", b"\x0a\x00"],
+            ),
+            (
+                CaptureQuery(start=103 * 10**9, addr_min=0xF403, addr_max=0xF404),
+                [b"\x00\x01", b"\x00\x02"],
+            ),
+            (CaptureQuery(start=200 * 10**9), []),
+        ],
+    )
+    def test_query(self, tmp_path, monkeypatch, query, expected):
+        """Test queries return the matching records in capture order."""
+        path = tmp_path / "capture.bin"
+        write_timed_session(path, monkeypatch)
+
+        assert [r.data for r in query_capture(path, query)] == expected
+
+    def test_rebuilds_missing_index(self, tmp_path, monkeypatch):
+        """Test a capture without an index, e.g. after a crash, is indexed."""
+        path = tmp_path / "capture.bin"
+        write_timed_session(path, monkeypatch)
+        index_path(path).unlink()
+
+        records = list(
+            query_capture(path, CaptureQuery(addr_min=0x0010, addr_max=0x0010))
+        )
+
+        assert [r.client for r in records] == ["127.0.0.1:5000"]
+        assert index_path(path).exists()
+
+    def test_rebuilds_stale_index(self, tmp_path, monkeypatch):
+        """Test an index not covering the whole capture is rebuilt."""
+        path = tmp_path / "capture.bin"
+        write_timed_session(path, monkeypatch)
+        index = index_path(path).read_bytes()
+        write_session(path)
+        index_path(path).write_bytes(index)
+
+        assert len(list(query_capture(path, CaptureQuery(code=Operation.READ)))) == 1
+        with CaptureIndex(index_path(path)) as rebuilt:
+            assert rebuilt.capture_size == path.stat().st_size
+
+
+class TestWriterThread:
+    """Test the background writer thread."""
+
+    def test_flush(self, tmp_path):
+        """Test flushing waits until queued records are in the file."""
+        path = tmp_path / "capture.bin"
+        capture = CaptureWriter(path)
+        capture.network("client", Direction.RX, b"\x01")
+
+        capture.flush()
+
+        assert len(list(read_capture(path))) == 1
+        capture.close()
+
+    def test_drop_when_full(self, tmp_path):
+        """Test the drop policy never waits and counts dropped records."""
+        path = tmp_path / "capture.bin"
+        capture = CaptureWriter(path, queue_size=4, policy=QueuePolicy.DROP)
+        for i in range(100):
+            capture.network("client", Direction.RX, bytes([i]))
+        capture.close()
+
+        written = len(list(read_capture(path)))
+        assert capture.dropped > 0
+        assert written + capture.dropped == 100
+        assert capture.counts[CaptureRecordType.NETWORK] == written
+
+    @pytest.mark.parametrize("segmented", [False, True])
+    def test_client_records_never_dropped(self, tmp_path, monkeypatch, segmented):
+        """Test a client first seen while the queue is full keeps its name."""
+        # Keep the writer thread from draining until flushed
+        monkeypatch.setattr(capture_module, "WRITE_INTERVAL", 60.0)
+        monkeypatch.setattr(capture_module, "WRITE_BATCH_SIZE", 1000)
+        path = tmp_path / "capture"
+        if segmented:
+            capture = SegmentedCaptureWriter(path, queue_size=4)
+        else:
+            capture = CaptureWriter(path, queue_size=4, policy=QueuePolicy.DROP)
+        for i in range(3):
+            capture.network("a:1", Direction.RX, bytes([i]))
+        capture.network("b:2", Direction.RX, b"\xff")
+        capture.flush()
+        capture.network("b:2", Direction.RX, b"\x03")
+        capture.close()
+
+        records = list(read_capture(path))
+        assert capture.dropped == 1
+        assert [r.client for r in records] == ["a:1", "a:1", "a:1", "b:2"]
+
+    def test_block_when_full(self, tmp_path):
+        """Test the block policy waits for room and loses nothing."""
+        path = tmp_path / "capture.bin"
+        capture = CaptureWriter(path, queue_size=4, policy=QueuePolicy.BLOCK)
+        for i in range(100):
+            capture.network("client", Direction.RX, bytes([i]))
+        capture.close()
+
+        records = list(read_capture(path))
+        assert capture.dropped == 0
+        assert [r.data[0] for r in records] == list(range(100))
+
+    def test_fsync(self, tmp_path, monkeypatch):
+        """Test the capture is synced periodically and on close."""
+        synced = []
+        monkeypatch.setattr(capture_module.os, "fsync", synced.append)
+        capture = CaptureWriter(tmp_path / "capture.bin", fsync_interval=0.0)
+        capture.network("client", Direction.RX, b"\x01")
+        capture.close()
+
+        assert len(synced) >= 2
+
+    def test_no_fsync(self, tmp_path, monkeypatch):
+        """Test syncing can be left to the operating system."""
+        synced = []
+        monkeypatch.setattr(capture_module.os, "fsync", synced.append)
+        capture = CaptureWriter(tmp_path / "capture.bin", fsync_interval=None)
+        capture.network("client", Direction.RX, b"\x01")
+        capture.close()
+
+        assert synced == []
+
+
+class TestSegments:
+    """Test rotating compressed capture segments."""
+
+    def test_rotation_and_eviction(self, tmp_path):
+        """Test segments rotate, the oldest are evicted and the rest read on."""
+        directory = tmp_path / "capture"
+        capture = SegmentedCaptureWriter(directory, segment_size=1000, max_size=3000)
+        payloads = [os.urandom(200) for _ in range(100)]
+        for payload in payloads:
+            capture.network("127.0.0.1:5000", Direction.RX_DECODED, payload)
+        capture.close()
+
+        segments = capture_segments(directory)
+        assert capture.evicted > 0
+        assert len(segments) <= 3
+        assert sum(segment.stat().st_size for segment in segments) <= 3000 + 1000
+
+        records = list(read_capture(directory))
+        assert [r.data for r in records] == payloads[-len(records) :]
+        assert {r.client for r in records} == {"127.0.0.1:5000"}
+
+    def test_segments_stand_alone(self, tmp_path):
+        """Test every segment names the clients its records refer to."""
+        directory = tmp_path / "capture"
+        capture = SegmentedCaptureWriter(directory, segment_size=500)
+        for _ in range(20):
+            capture.network("127.0.0.1:5000", Direction.RX_DECODED, os.urandom(100))
+        capture.close()
+
+        last = capture_segments(directory)[-1]
+        assert {r.client for r in read_capture(last)} == {"127.0.0.1:5000"}
+
+    @pytest.mark.parametrize("compression", list(Compression))
+    def test_flush_while_open(self, tmp_path, compression):
+        """Test flushed records can be read while the capture is written."""
+        directory = tmp_path / "capture"
+        capture = SegmentedCaptureWriter(directory, compression=compression)
+        capture.i2c("127.0.0.1:5000", Operation.WRITE, 0x10, 1, b"\x01")
+        capture.flush()
+
+        records = list(read_capture(directory))
+        capture.close()
+
+        assert [r.data for r in records] == [b"\x01"]
+
+    def test_query(self, tmp_path):
+        """Test queries read through compressed segments."""
+        directory = tmp_path / "capture"
+        capture = SegmentedCaptureWriter(directory, compression=Compression.LZMA)
+        capture.i2c("127.0.0.1:5000", Operation.WRITE, 0xF403, 2, b"\x00\x01")
+        capture.i2c("127.0.0.1:5000", Operation.WRITE, 0xF404, 2, b"\x00\x02")
+        capture.close()
+
+        query = CaptureQuery(addr_min=0xF404, addr_max=0xF404)
+        assert [r.data for r in query_capture(directory, query)] == [b"\x00\x02"]
+
+    def test_size_cap_below_segment(self, tmp_path):
+        """Test a total cap smaller than one segment is refused."""
+        with pytest.raises(ValueError, match="at least one segment"):
+            SegmentedCaptureWriter(tmp_path, segment_size=1000, max_size=10)
+
+
+class TestFlightRecorder:
+    """Test the in-memory flight recorder."""
+
+    def test_evicts_oldest(self, tmp_path):
+        """Test the ring keeps the newest records that fit, across wraparound."""
+        # Records of 26 bytes: four fit, and they wrap around the buffer end
+        recorder = FlightRecorder(tmp_path, capacity=110, max_age=None)
+        for i in range(10):
+            recorder.network("127.0.0.1:5000", Direction.RX_RAW, bytes([i, i]))
+
+        path = recorder.trigger("test")
+        recorder.close()
+
+        records = list(read_capture(path))
+        assert [r.data for r in records] == [bytes([i, i]) for i in range(6, 10)]
+        assert records[0].client == "127.0.0.1:5000"
+
+    def test_evicts_by_age(self, tmp_path):
+        """Test records older than the window are dropped."""
+        recorder = FlightRecorder(tmp_path, max_age=0.05)
+        recorder.network("127.0.0.1:5000", Direction.RX_RAW, b"\x01")
+        time.sleep(0.1)
+        recorder.i2c("127.0.0.1:5000", Operation.WRITE, 0x10, 1, b"\x02")
+
+        path = recorder.trigger("test")
+        recorder.close()
+
+        assert [r.data for r in read_capture(path)] == [b"\x02"]
+
+    def test_holdoff(self, tmp_path):
+        """Test a burst of triggers produces one dump."""
+        recorder = FlightRecorder(tmp_path, holdoff=60)
+        recorder.network("127.0.0.1:5000", Direction.RX_RAW, b"\x01")
+
+        assert recorder.trigger("first") is not None
+        assert recorder.trigger("second") is None
+        recorder.close()
+
+        assert [p.name for p in tmp_path.iterdir()] == [recorder.dumps[0].name]
+
+    def test_too_small(self, tmp_path):
+        """Test a ring that cannot hold a record is refused."""
+        with pytest.raises(ValueError, match="too small"):
+            FlightRecorder(tmp_path, capacity=8)
+
+
+class TestProtocolDumper:
+    """Test the dumper writes one capture per session."""
+
+    async def test_dumps_to_capture(self, tmp_path):
+        """Test dumped packets and transactions end up in the capture only."""
+        dumper = ProtocolDumper(tmp_path)
+        await dumper.dump_network_packet("127.0.0.1:5000", "RX_RAW", b"\x09")
+        await dumper.dump_i2c_transaction(
+            "127.0.0.1:5000", "WRITE", 0x10, 1, b"\x01", chip=3
+        )
+        dumper.create_summary_report()
+        dumper.close()
+
+        files = sorted(p.name for p in dumper.session_dir.iterdir())
+        assert files == ["capture.bin", "capture.idx", "summary.txt"]
+        records = list(read_capture(dumper.capture_file))
+        assert [r.chip for r in records] == [None, 3]
+        assert "I2C Transactions: 1" in (dumper.session_dir / "summary.txt").read_text()
+
+    async def test_flight_mode(self, tmp_path):
+        """Test flight mode writes nothing until triggered by a slow request."""
+        dumper = ProtocolDumper(
+            tmp_path / "dumps", DumpMode.FLIGHT, latency_threshold=0.01
+        )
+        await dumper.dump_i2c_transaction("127.0.0.1:5000", "WRITE", 0x10, 1, b"\x01")
+        dumper.note_latency(0.001)
+        dumper.create_summary_report()
+
+        assert not (tmp_path / "dumps").exists()
+
+        dumper.note_latency(0.5)
+        dumper.create_summary_report()
+        dumper.close()
+
+        (dump,) = dumper.capture.dumps
+        assert dump.name.endswith("_latency.bin")
+        assert len(list(read_capture(dump))) == 1
+        summary = (dumper.session_dir / "summary.txt").read_text()
+        assert "Flight Recorder Dumps: 1" in summary
+
+    def test_session_mode_ignores_triggers(self, tmp_path):
+        """Test triggers are no-ops when the whole session is captured."""
+        dumper = ProtocolDumper(tmp_path)
+        try:
+            assert dumper.trigger("test") is None
+        finally:
+            dumper.close()
+
+    async def test_segmented(self, tmp_path):
+        """Test sessions can be written as compressed segments."""
+        dumper = ProtocolDumper(tmp_path, segment_size=1024 * 1024)
+        await dumper.dump_i2c_transaction("127.0.0.1:5000", "WRITE", 0x10, 1, b"\x01")
+        dumper.create_summary_report()
+        dumper.close()
+
+        assert len(list(read_capture(dumper.capture_file))) == 1
+        summary = (dumper.session_dir / "summary.txt").read_text()
+        assert "Capture: capture/" in summary
+
+    async def test_capture_filter(self, tmp_path):
+        """Test filtered out records are counted but not captured."""
+        dumper = ProtocolDumper(tmp_path, capture_filter="i2c and chip 1")
+        await dumper.dump_network_packet("127.0.0.1:5000", "RX_RAW", b"\x09")
+        await dumper.dump_i2c_transaction(
+            "127.0.0.1:5000", "WRITE", 0x10, 1, b"\x01", chip=1
+        )
+        await dumper.dump_i2c_transaction(
+            "127.0.0.1:5000", "WRITE", 0x10, 1, b"\x01", chip=2
+        )
+        dumper.create_summary_report()
+        dumper.close()
+
+        assert len(list(read_capture(dumper.capture_file))) == 1
+        summary = (dumper.session_dir / "summary.txt").read_text()
+        assert "Filtered Records: 2" in summary
+
+    def test_invalid_capture_filter(self, tmp_path):
+        """Test invalid filter expressions are refused."""
+        with pytest.raises(ValueError):
+            ProtocolDumper(tmp_path, capture_filter="addr")
@@ -0,0 +1,122 @@
+"""Tests for compiled capture filter expressions."""
+
+import pytest
+
+from tcp_i2c_bridge.capture_filter import CaptureFilter, network_fields
+from tcp_i2c_bridge.protocol import Read as NetworkRead
+from tcp_i2c_bridge.protocol import Write as NetworkWrite
+
+CLIENT = "192.168.1.20:51234"
+WRITE = NetworkWrite.Request.create(chip_address=1, address=0xF003, data=b"\x00\x01")
+READ = NetworkRead.Request.create(chip_address=2, address=0x0010, length=4)
+RESPONSE = READ.create_response(data=bytes(4))
+
+
+class TestNetworkFields:
+    """Test decoding address and chip address from packet headers."""
+
+    def test_packets(self):
+        """Test requests and responses yield their address and chip."""
+        assert network_fields(WRITE.pack()) == (0xF003, 1)
+        assert network_fields(READ.pack()) == (0x0010, 2)
+        assert network_fields(RESPONSE.pack()) == (0x0010, 2)
+
+    def test_incomplete(self):
+        """Test data without a complete header yields nothing."""
+        assert network_fields(b"") == (None, None)
+        assert network_fields(WRITE.pack()[:5]) == (None, None)
+        assert network_fields(b"\xff" * 20) == (None, None)
+
+
+class TestCaptureFilter:
+    """Test matching records against expressions."""
+
+    @pytest.mark.parametrize(
+        "expression,expected",
+        [
+            ("net", [True, True, True, False, False]),
+            ("i2c", [False, False, False, True, True]),
+            ("addr 0xF000-0xFFFF", [True, False, False, True, False]),
+            ("addr 0x10,0xF003", [True, True, True, True, True]),
+            ("chip 2", [False, True, True, False, True]),
+            ("dir rx_raw,rx_decoded", [True, True, False, False, False]),
+            ("op read", [False, False, False, False, True]),
+            ("not dir tx", [True, True, False, True, True]),
+            ("size > 14", [True, False, True, False, False]),
+            ("size <= 2", [False, False, False, True, False]),
+            ("client 192.168.1.20", [True, True, True, True, True]),
+            ("client 192.168.1.20:1,10.0.0.1", [False] * 5),
+            ("i2c and chip 1 or dir tx", [False, False, True, True, False]),
+            ("i2c and (chip 1 or dir tx)", [False, False, False, True, False]),
+            ("not (net or op write)", [False, False, False, False, True]),
+        ],
+    )
+    def test_matches(self, expression, expected):
+        """Test every primitive and operator against a small session."""
+        capture_filter = CaptureFilter(expression)
+
+        matches = [
+            capture_filter.network(CLIENT, "RX_RAW", WRITE.pack()),
+            capture_filter.network(CLIENT, "RX_DECODED", READ.pack()),
+            capture_filter.network(CLIENT, "TX", RESPONSE.pack()),
+            capture_filter.i2c(CLIENT, "WRITE", 0xF003, 1, 2),
+            capture_filter.i2c(CLIENT, "READ", 0x0010, 2, 4),
+        ]
+
+        assert matches == expected
+
+    def test_ipv6_clients(self):
+        """Test IPv6 hosts and clients are written in brackets."""
+        host = CaptureFilter("client [::1]")
+        client = CaptureFilter("client [::1]:5000")
+
+        assert host.network("::1:5000", "TX", b"")
+        assert client.network("::1:5000", "TX", b"")
+        assert not client.network("::1:5001", "TX", b"")
+
+    @pytest.mark.parametrize("host", ["::1", "fe80::1"])
+    def test_bare_ipv6_hosts(self, host):
+        """Test IPv6 addresses without brackets are whole hosts."""
+        capture_filter = CaptureFilter(f"client {host}")
+
+        assert capture_filter.network(f"{host}:5000", "TX", b"")
+        assert not capture_filter.network("192.168.1.20:5000", "TX", b"")
+
+    def test_unused_fields_not_decoded(self):
+        """Test headers are only decoded if the expression looks at them."""
+        assert "network_fields(data)" not in CaptureFilter("dir tx").source
+        assert "network_fields(data)" in CaptureFilter("dir tx or chip 1").source
+
+    def test_folded(self):
+        """Test terms that cannot match a record type are folded away."""
+        capture_filter = CaptureFilter("op write and chip 1")
+
+        assert "return False" in capture_filter.source
+        assert not capture_filter.network(CLIENT, "RX_RAW", WRITE.pack())
+
+    @pytest.mark.parametrize(
+        "expression",
+        [
+            "",
+            "addr",
+            "addr 5-2",
+            "addr 0x10000",
+            "chip x",
+            "dir up",
+            "op erase",
+            "size 3",
+            "size > -1",
+            "(net",
+            "net net",
+            "net and",
+            "port 8086",
+            "client [::1",
+            "client host:port",
+            "client :5000",
+            "a = b",
+        ],
+    )
+    def test_invalid(self, expression):
+        """Test invalid expressions are refused."""
+        with pytest.raises(ValueError, match="Invalid capture filter"):
+            CaptureFilter(expression)
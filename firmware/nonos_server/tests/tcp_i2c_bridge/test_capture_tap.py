@@ -0,0 +1,184 @@
+"""Tests for the live capture tap."""
+
+import asyncio
+import io
+
+import pytest
+
+from tcp_i2c_bridge.capture import (
+    CAPTURE_HEADER,
+    CaptureRecord,
+    CaptureRecordType,
+    Direction,
+    Operation,
+    read_capture,
+    read_records,
+)
+from tcp_i2c_bridge.capture_tap import CaptureTap, open_tap, subscribe
+from tcp_i2c_bridge.protocol_dumper import ProtocolDumper
+
+CLIENT = "192.168.1.20:51234"
+
+
+class Subscription:
+    """Test subscriber reading the capture stream of a tap."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        # Kept so the connection is not closed when it is garbage collected
+        self.writer = writer
+        self.data = b""
+
+    @classmethod
+    async def connect(cls, tap: CaptureTap, expression: str) -> "Subscription":
+        """Subscribe and wait until the tap has registered the subscriber."""
+        subscribers = len(tap.subscribers)
+        reader, writer = await asyncio.open_connection("127.0.0.1", tap.port)
+        writer.write(expression.encode() + b"\n")
+        async with asyncio.timeout(5):
+            while len(tap.subscribers) == subscribers:
+                await asyncio.sleep(0.01)
+        return cls(reader, writer)
+
+    async def records(self, count: int) -> list[CaptureRecord]:
+        """All records streamed so far, once there are count of them."""
+        records: list[CaptureRecord] = []
+        async with asyncio.timeout(5):
+            while len(records) < count:
+                chunk = await self.reader.read(4096)
+                assert chunk, "capture tap disconnected"
+                self.data += chunk
+                assert self.data.startswith(CAPTURE_HEADER[: len(self.data)])
+                stream = io.BytesIO(self.data[len(CAPTURE_HEADER) :])
+                records = list(read_records(stream, "tap"))
+        return records
+
+
+@pytest.fixture
+async def tap():
+    tap = CaptureTap("127.0.0.1", 0, queue_size=4)
+    await tap.start()
+    yield tap
+    await tap.stop()
+
+
+class TestCaptureTap:
+    """Test streaming records to subscribers."""
+
+    async def test_filtered_stream(self, tap):
+        """Test each subscriber gets the records matching its filter."""
+        everything = await Subscription.connect(tap, "")
+        writes = await Subscription.connect(tap, "op write and chip 1")
+
+        tap.network(CLIENT, "RX_RAW", b"\x09\x00")
+        tap.i2c(CLIENT, "WRITE", 0x10, 1, b"\x01", chip=1)
+        tap.i2c(CLIENT, "WRITE", 0x10, 1, b"\x02", chip=2)
+
+        records = await everything.records(3)
+        (write,) = await writes.records(1)
+        assert [r.type for r in records] == [
+            CaptureRecordType.NETWORK,
+            CaptureRecordType.I2C,
+            CaptureRecordType.I2C,
+        ]
+        assert records[0].direction == Direction.RX_RAW
+        assert (write.client, write.operation, write.addr, write.data) == (
+            CLIENT,
+            Operation.WRITE,
+            0x10,
+            b"\x01",
+        )
+
+    async def test_slow_subscriber_drops(self, tap):
+        """Test records beyond a full queue are dropped and counted."""
+        subscription = await Subscription.connect(tap, "")
+        (subscriber,) = tap.subscribers
+
+        for i in range(6):
+            tap.i2c(CLIENT, "WRITE", i, 1, b"\x00")
+
+        records = await subscription.records(4)
+        assert [r.addr for r in records] == [0, 1, 2, 3]
+        assert subscriber.dropped == 2
+
+        # Client records go out with the first record queued of the client
+        tap.i2c("10.0.0.1:1", "READ", 0x20, 1, b"\x00")
+        records = await subscription.records(5)
+        assert records[-1].client == "10.0.0.1:1"
+
+    async def test_invalid_filter(self, tap):
+        """Test invalid expressions are answered with an error line."""
+        reader, writer = await asyncio.open_connection("127.0.0.1", tap.port)
+        writer.write(b"addr\n")
+
+        line = await reader.readline()
+
+        assert line.startswith(b"Invalid capture filter")
+        assert await reader.read() == b""
+        assert tap.subscribers == []
+
+    async def test_disconnect(self, tap):
+        """Test subscribers that hang up are removed."""
+        subscription = await Subscription.connect(tap, "")
+        subscription.writer.close()
+        await subscription.writer.wait_closed()
+
+        # Noticed without records to send
+        async with asyncio.timeout(5):
+            while tap.subscribers:
+                await asyncio.sleep(0.01)
+
+    async def test_cancelled(self, tap):
+        """Test cancelling a subscriber's handler is not swallowed."""
+        subscription = await Subscription.connect(tap, "")
+        (task,) = tap._connections
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        assert task.cancelled()
+        assert tap.subscribers == []
+        assert await subscription.reader.read() == CAPTURE_HEADER
+
+    async def test_dumper_feeds_tap(self, tap, tmp_path):
+        """Test the tap sees records the dumper's own filter drops."""
+        subscription = await Subscription.connect(tap, "i2c")
+        dumper = ProtocolDumper(tmp_path, capture_filter="net", tap=tap)
+        await dumper.dump_network_packet(CLIENT, "RX_RAW", b"\x09")
+        await dumper.dump_i2c_transaction(CLIENT, "WRITE", 0x10, 1, b"\x01", chip=1)
+        dumper.close()
+
+        (record,) = await subscription.records(1)
+        assert record.type == CaptureRecordType.I2C
+        assert [r.type for r in read_capture(dumper.capture_file)] == [
+            CaptureRecordType.NETWORK
+        ]
+
+
+class TestSubscribe:
+    """Test the blocking subscriber client."""
+
+    async def test_subscribe(self, tap):
+        """Test records arrive through the client until the tap stops."""
+        subscribed = len(tap.subscribers)
+        records = asyncio.create_task(
+            asyncio.to_thread(list, subscribe("127.0.0.1", tap.port, "dir tx"))
+        )
+        async with asyncio.timeout(5):
+            while len(tap.subscribers) == subscribed:
+                await asyncio.sleep(0.01)
+
+        tap.network(CLIENT, "RX", b"\x0a")
+        tap.network(CLIENT, "TX", b"\x0b")
+        async with asyncio.timeout(5):
+            while tap.subscribers[0].sent == 0:
+                await asyncio.sleep(0.01)
+        await tap.stop()
+
+        (record,) = await records
+        assert record.data == b"\x0b"
+
+    async def test_refused_filter(self, tap):
+        """Test the client raises the tap's error for invalid expressions."""
+        with pytest.raises(ValueError, match="Invalid capture filter"):
+            await asyncio.to_thread(open_tap, "127.0.0.1", tap.port, "dir up")
@@ -0,0 +1,171 @@
+"""Tests for the sparse device simulator."""
+
+import pytest
+
+from tcp_i2c_bridge.device_sim import (
+    ADAU1452_PLL_ENABLE,
+    ADAU1452_PLL_LOCK,
+    PLL_LOCK_TIME,
+    DynamicRegister,
+    ReadOnlyRegister,
+    SimulatedDevice,
+    SparseMemory,
+    TriggerRegister,
+    adau1452_device,
+)
+from tcp_i2c_bridge.memory_map import MemoryMap, MemoryRegion
+from tcp_i2c_bridge.safeload import SafeloadCycle, SafeloadRegister
+
+
+class FakeClock:
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self) -> float:
+        return self.time
+
+
+class TestSparseMemory:
+    """Test page-based sparse memory."""
+
+    def test_unwritten_reads_zero(self):
+        """Test reading memory that was never written."""
+        memory = SparseMemory()
+
+        assert memory.read(0xC000, 10) == b"\x00" * 10
+        assert memory.allocated == 0
+
+    def test_full_address_space(self):
+        """Test program memory, data memory and registers are all backed."""
+        memory = SparseMemory()
+        memory.write(0x0000, b"\x01\x02\x03\x04")
+        memory.write(0xC000, b"\x05" * 5)
+        memory.write(0xF400, b"\x00\x01")
+
+        assert memory.read(0x0000, 4) == b"\x01\x02\x03\x04"
+        assert memory.read(0xC000, 5) == b"\x05" * 5
+        assert memory.read(0xF400, 2) == b"\x00\x01"
+        assert len(memory.pages) == 3
+
+    def test_word_addressing(self):
+        """Test addresses advance by one per word."""
+        memory = SparseMemory()
+        memory.write(0x0010, bytes(range(8)))
+        memory.write(0xC000, bytes(range(10)))
+
+        assert memory.read(0x0011, 4) == bytes(range(4, 8))
+        assert memory.read(0xC001, 5) == bytes(range(5, 10))
+
+    def test_cross_page(self):
+        """Test transfers spanning a page boundary."""
+        memory = SparseMemory()
+        data = bytes(range(16))
+        memory.write(0x00FE, data)
+
+        assert memory.read(0x00FE, 16) == data
+        assert memory.read(0x0100, 8) == data[8:]
+
+    def test_unaligned_region(self):
+        """Test regions must be page aligned."""
+        memory_map = MemoryMap(regions=(MemoryRegion("A", 0x0010, 0x00FF, 4),))
+
+        with pytest.raises(ValueError, match="not aligned"):
+            SparseMemory(memory_map)
+
+
+class TestSimulatedDevice:
+    """Test simulated device with register hooks."""
+
+    def test_read_write(self):
+        """Test plain memory access."""
+        device = SimulatedDevice()
+        device.write(0x4000, b"test")
+
+        assert device.read(0x4000, 4) == b"test"
+        assert device.write_read(b"\x40\x00", 2) == b"te"
+
+    def test_read_only_register(self):
+        """Test writes to read-only registers are ignored."""
+        device = SimulatedDevice(hooks={0xF000: ReadOnlyRegister(0x1452)})
+        device.write(0xF000, b"\x00\x00\x00\x07")
+
+        assert device.read(0xF000, 4) == b"\x14\x52\x00\x07"
+
+    def test_trigger_register(self):
+        """Test trigger registers run their action and clear."""
+        triggered = []
+        device = SimulatedDevice(
+            hooks={0xF402: TriggerRegister(lambda dev, value: triggered.append(value))}
+        )
+
+        device.write(0xF402, b"\x00\x01")
+        device.write(0xF402, b"\x00\x00")
+
+        assert triggered == [1]
+        assert device.read(0xF402, 2) == b"\x00\x00"
+
+    def test_dynamic_register(self):
+        """Test status registers change over time."""
+        clock = FakeClock()
+        device = SimulatedDevice(
+            hooks={0xF100: DynamicRegister(lambda dev, now: int(now))}, clock=clock
+        )
+
+        assert device.read(0xF100, 2) == b"\x00\x00"
+        clock.time = 3.5
+        assert device.read(0xF100, 2) == b"\x00\x03"
+
+    def test_sub_word_transfers(self):
+        """Test transfers shorter than a word reach hooked devices."""
+        device = SimulatedDevice(hooks={0xF000: ReadOnlyRegister(0x1452)})
+
+        device.write(0x1000, b"\x12\x34")
+        device.write(0xF000, b"\x00")
+
+        assert device.read(0x1000, 2) == b"\x12\x34"
+        assert device.read(0x1000, 4) == b"\x12\x34\x00\x00"
+        assert device.read(0xF000, 1) == b"\x14"
+        assert device.read(0xF004, 1) == b"\x00"
+
+
+class TestADAU1452Device:
+    """Test the simulated ADAU1452."""
+
+    def test_sub_word_reads(self):
+        """Test SigmaStudio's reads of part of a word work on the ADAU1452."""
+        device = adau1452_device()
+
+        assert device.read(0xF004, 1) == b"\x00"
+        assert device.read(0x1000, 2) == b"\x00\x00"
+
+    def test_safeload(self):
+        """Test a safeload burst updates the target parameters."""
+        device = adau1452_device()
+        cycle = SafeloadCycle(address=0x0010, data=bytes(range(8)))
+
+        device.write(SafeloadRegister.DATA0, cycle.pack())
+
+        assert device.read(0x0010, 8) == bytes(range(8))
+        assert device.read(SafeloadRegister.NUM, 4) == b"\x00" * 4
+
+    def test_pll_lock(self):
+        """Test the PLL locks some time after being enabled."""
+        clock = FakeClock()
+        device = adau1452_device(clock=clock)
+
+        assert device.read(ADAU1452_PLL_LOCK, 2) == b"\x00\x00"
+        device.write(ADAU1452_PLL_ENABLE, b"\x00\x01")
+        assert device.read(ADAU1452_PLL_LOCK, 2) == b"\x00\x00"
+
+        clock.time += PLL_LOCK_TIME
+        assert device.read(ADAU1452_PLL_LOCK, 2) == b"\x00\x01"
+
+    def test_program_download(self):
+        """Test a full program memory download stays sparse."""
+        device = adau1452_device()
+        program = bytes(range(256)) * 40
+
+        device.write(0xC000, program)
+
+        assert device.read(0xC000, len(program)) == program
+        assert device.memory.allocated <= len(program) + 256 * 5
@@ -1,10 +1,106 @@
 """Tests for I2C backend implementations."""
 
+import ctypes
+import errno
+from collections.abc import Iterator
 from unittest.mock import Mock, patch
 
 import pytest
 
-from tcp_i2c_bridge.i2c_backend import DebugI2CBackend, SMBusI2CBackend
+from tcp_i2c_bridge.i2c_backend import (
+    AdapterLimits,
+    DebugI2CBackend,
+    I2COperation,
+    I2COpKind,
+    I2CTransaction,
+    SMBusI2CBackend,
+    batch_message_groups,
+    plan_message_groups,
+)
+from tcp_i2c_bridge.i2c_dev import (
+    I2C_FUNC_I2C,
+    I2C_FUNCS,
+    I2C_M_RD,
+    I2C_RDWR,
+    I2CDevBackend,
+    I2CRdwrIoctlData,
+)
+from tcp_i2c_bridge.memory_map import ADAU1452_MEMORY_MAP, MemoryMap
+
+
+class FakeI2CDev:
+    """Minimal i2c-dev ioctl handler backed by a word-addressed memory.
+
+    Like the ADAU1452, the register pointer advances by one address per word,
+    with the word width taken from the memory map.
+    """
+
+    def __init__(
+        self,
+        funcs: int = I2C_FUNC_I2C,
+        max_msg_len: int = 8192,
+        memory_map: MemoryMap = ADAU1452_MEMORY_MAP,
+    ):
+        self.funcs = funcs
+        self.max_msg_len = max_msg_len
+        self.memory_map = memory_map
+        self.words: dict[int, bytearray] = {}
+        self.pointer = 0
+        self.transfers: list[list[tuple[int, int]]] = []
+        # Register address of every write message, in bus order
+        self.addresses: list[int] = []
+        # Transfers accepted before one I2C_RDWR ioctl is rejected
+        self.reject_after: int | None = None
+
+    def _bytes(self, addr: int, length: int) -> Iterator[tuple[bytearray, int]]:
+        """Yield (word, byte index) of each byte from a register address."""
+        index = 0
+        for _ in range(length):
+            word_size = self.memory_map.word_size(addr)
+            word = self.words.setdefault(addr, bytearray(word_size))
+            yield word, index
+            index += 1
+            if index == word_size:
+                addr += 1
+                index = 0
+
+    def load(self, addr: int, data: bytes) -> None:
+        for (word, index), value in zip(
+            self._bytes(addr, len(data)), data, strict=True
+        ):
+            word[index] = value
+
+    def dump(self, addr: int, length: int) -> bytes:
+        return bytes(word[index] for word, index in self._bytes(addr, length))
+
+    def ioctl(self, fd: int, request: int, arg: int) -> int:
+        if request == I2C_FUNCS:
+            ctypes.c_ulong.from_address(arg).value = self.funcs
+            return 0
+
+        assert request == I2C_RDWR
+        if self.reject_after == len(self.transfers):
+            self.reject_after = None
+            raise OSError(errno.EINVAL, "Invalid argument")
+        ioctl_data = I2CRdwrIoctlData.from_address(arg)
+        if any(
+            ioctl_data.msgs[i].len > self.max_msg_len for i in range(ioctl_data.nmsgs)
+        ):
+            raise OSError(errno.EOPNOTSUPP, "Operation not supported")
+
+        transfer = []
+        for i in range(ioctl_data.nmsgs):
+            msg = ioctl_data.msgs[i]
+            transfer.append((msg.flags, msg.len))
+            if msg.flags & I2C_M_RD:
+                ctypes.memmove(msg.buf, self.dump(self.pointer, msg.len), msg.len)
+            else:
+                data = ctypes.string_at(msg.buf, msg.len)
+                self.pointer = int.from_bytes(data[:2], "big")
+                self.addresses.append(self.pointer)
+                self.load(self.pointer, data[2:])
+        self.transfers.append(transfer)
+        return 0
 
 
 class TestDebugI2CBackend:
@@ -208,6 +304,104 @@ class TestSMBusI2CBackend:
         with pytest.raises(RuntimeError, match="I2C bus not connected"):
             backend.write(0x1000, b"test")
 
+    @patch("tcp_i2c_bridge.i2c_backend.Path")
+    @patch("tcp_i2c_bridge.i2c_backend.smbus2.SMBus")
+    def test_read_large_data(self, mock_smbus, mock_path):
+        """Test large reads pack all chunks into one ioctl."""
+        mock_path.return_value.exists.return_value = True
+        mock_bus = Mock()
+        mock_smbus.return_value = mock_bus
+
+        def fill(*msgs):
+            for msg in msgs:
+                if msg.flags & 0x0001:
+                    ctypes.memset(msg.buf, 0xAB, msg.len)
+
+        mock_bus.i2c_rdwr.side_effect = fill
+
+        backend = SMBusI2CBackend(1, 0x48, AdapterLimits(max_msg_len=32))
+        data = backend.read(0x1000, 100)
+
+        assert data == b"\xab" * 100
+        mock_bus.i2c_rdwr.assert_called_once()
+        assert len(mock_bus.i2c_rdwr.call_args[0]) == 8
+
+    @patch("tcp_i2c_bridge.i2c_backend.Path")
+    @patch("tcp_i2c_bridge.i2c_backend.smbus2.SMBus")
+    def test_write_large_data(self, mock_smbus, mock_path):
+        """Test large writes pack all chunks into one ioctl."""
+        mock_path.return_value.exists.return_value = True
+        mock_bus = Mock()
+        mock_smbus.return_value = mock_bus
+
+        written = []
+        mock_bus.i2c_rdwr.side_effect = lambda *msgs: written.extend(
+            bytes(msg) for msg in msgs
+        )
+
+        backend = SMBusI2CBackend(1, 0x48, AdapterLimits(max_msg_len=32))
+        backend.write(0x1000, bytes(range(64)))
+
+        mock_bus.i2c_rdwr.assert_called_once()
+        assert [len(msg) for msg in written] == [30, 30, 10]
+        assert [msg[:2] for msg in written] == [b"\x10\x00", b"\x10\x07", b"\x10\x0e"]
+        assert b"".join(msg[2:] for msg in written) == bytes(range(64))
+
+    @patch("tcp_i2c_bridge.i2c_backend.Path")
+    @patch("tcp_i2c_bridge.i2c_backend.smbus2.SMBus")
+    def test_read_resumes_after_rejection(self, mock_smbus, mock_path):
+        """Test chunks read before a rejected ioctl are not read again."""
+        mock_path.return_value.exists.return_value = True
+        mock_bus = Mock()
+        mock_smbus.return_value = mock_bus
+
+        chunks = []
+
+        def transfer(*msgs):
+            if len(mock_bus.i2c_rdwr.call_args_list) == 2:
+                raise OSError(errno.EOPNOTSUPP, "Operation not supported")
+            for msg in msgs:
+                if msg.flags & 0x0001:
+                    ctypes.memset(msg.buf, 0xAB, msg.len)
+                else:
+                    chunks.append(bytes(msg))
+
+        mock_bus.i2c_rdwr.side_effect = transfer
+
+        limits = AdapterLimits(max_msg_len=32, max_msgs=4)
+        backend = SMBusI2CBackend(1, 0x48, limits)
+        data = backend.read(0x1000, 100)
+
+        assert data == b"\xab" * 100
+        assert backend.limits == AdapterLimits(max_msg_len=32, max_msgs=2)
+        assert chunks == [b"\x10\x00", b"\x10\x08", b"\x10\x10", b"\x10\x18"]
+
+    @patch("tcp_i2c_bridge.i2c_backend.Path")
+    @patch("tcp_i2c_bridge.i2c_backend.smbus2.SMBus")
+    def test_transaction(self, mock_smbus, mock_path):
+        """Test a transaction is submitted as one ioctl."""
+        mock_path.return_value.exists.return_value = True
+        mock_bus = Mock()
+        mock_smbus.return_value = mock_bus
+
+        def fill(*msgs):
+            for msg in msgs:
+                if msg.flags & 0x0001:
+                    ctypes.memset(msg.buf, 0x5A, msg.len)
+
+        mock_bus.i2c_rdwr.side_effect = fill
+
+        backend = SMBusI2CBackend(1, 0x48)
+        with backend.transaction() as txn:
+            txn.write(0xF400, b"\x00\x01")
+            txn.read(0x1000, 4)
+
+        mock_bus.i2c_rdwr.assert_called_once()
+        msgs = mock_bus.i2c_rdwr.call_args[0]
+        assert bytes(msgs[0]) == b"\xf4\x00\x00\x01"
+        assert bytes(msgs[1]) == b"\x10\x00"
+        assert txn.results == [None, b"\x5a" * 4]
+
     @patch("tcp_i2c_bridge.i2c_backend.Path")
     @patch("tcp_i2c_bridge.i2c_backend.smbus2.SMBus")
     def test_close(self, mock_smbus, mock_path):
@@ -221,3 +415,363 @@ class TestSMBusI2CBackend:
 
         mock_bus.close.assert_called_once()
         assert backend.bus is None
+
+
+class TestI2CDevBackend:
+    """Test raw i2c-dev ioctl backend."""
+
+    @pytest.fixture
+    def fake_dev(self):
+        """Patch the i2c-dev device node and ioctls."""
+        fake = FakeI2CDev()
+        with (
+            patch("tcp_i2c_bridge.i2c_dev.Path") as mock_path,
+            patch("tcp_i2c_bridge.i2c_dev.os.open", return_value=99),
+            patch("tcp_i2c_bridge.i2c_dev.os.close") as mock_close,
+            patch("tcp_i2c_bridge.i2c_dev.fcntl.ioctl", side_effect=fake.ioctl),
+        ):
+            mock_path.return_value.exists.return_value = True
+            fake.close = mock_close
+            yield fake
+
+    def test_init_invalid_device_address(self):
+        """Test initialization with invalid device address."""
+        with pytest.raises(ValueError, match="Invalid I2C device address"):
+            I2CDevBackend(1, 0x80)  # Address too high
+
+        with pytest.raises(ValueError, match="Invalid I2C device address"):
+            I2CDevBackend(1, -1)  # Negative address
+
+    @patch("tcp_i2c_bridge.i2c_dev.Path")
+    def test_init_missing_device(self, mock_path):
+        """Test initialization with missing I2C device."""
+        mock_path.return_value.exists.return_value = False
+
+        with pytest.raises(FileNotFoundError, match="I2C device not found"):
+            I2CDevBackend(1, 0x48)
+
+    def test_init_success(self, fake_dev):
+        """Test successful initialization."""
+        backend = I2CDevBackend(1, 0x48)
+
+        assert backend.i2c_bus == 1
+        assert backend.device_addr == 0x48
+        assert backend.fd == 99
+
+    @patch("tcp_i2c_bridge.i2c_dev.Path")
+    @patch("tcp_i2c_bridge.i2c_dev.os.open")
+    def test_connect_failure(self, mock_open, mock_path):
+        """Test connection failure."""
+        mock_path.return_value.exists.return_value = True
+        mock_open.side_effect = OSError("Connection failed")
+
+        with pytest.raises(RuntimeError, match="Failed to open I2C bus"):
+            I2CDevBackend(1, 0x48)
+
+    def test_init_without_i2c_support(self, fake_dev):
+        """Test initialization on an SMBus-only adapter."""
+        fake_dev.funcs = 0
+
+        with pytest.raises(RuntimeError, match="does not support I2C_RDWR"):
+            I2CDevBackend(1, 0x48)
+
+    def test_read_small_data(self, fake_dev):
+        """Test reading small amount of data."""
+        fake_dev.load(0x1000, b"\x01\x02\x03\x04")
+        backend = I2CDevBackend(1, 0x48)
+
+        data = backend.read(0x1000, 4)
+
+        assert data == b"\x01\x02\x03\x04"
+        assert fake_dev.transfers == [[(0, 2), (I2C_M_RD, 4)]]
+
+    def test_read_large_data(self, fake_dev):
+        """Test reading beyond the SMBus block size in one message."""
+        fake_dev.load(0x1000, bytes(range(0x50)))
+        backend = I2CDevBackend(1, 0x48)
+
+        assert backend.read(0x1000, 0x50) == bytes(range(0x50))
+        assert fake_dev.transfers == [[(0, 2), (I2C_M_RD, 0x50)]]
+
+    def test_read_chunks_share_ioctl(self, fake_dev):
+        """Test chunked reads are packed into one ioctl."""
+        fake_dev.load(0x1000, bytes(range(0x50)))
+        backend = I2CDevBackend(1, 0x48, AdapterLimits(max_msg_len=32))
+
+        assert backend.read(0x1000, 0x50) == bytes(range(0x50))
+        assert fake_dev.transfers == [
+            [(0, 2), (I2C_M_RD, 32), (0, 2), (I2C_M_RD, 32), (0, 2), (I2C_M_RD, 16)]
+        ]
+
+    def test_read_chunks_respect_max_msgs(self, fake_dev):
+        """Test chunked reads are split by the message limit."""
+        fake_dev.load(0x1000, bytes(range(0x50)))
+        backend = I2CDevBackend(1, 0x48, AdapterLimits(max_msg_len=32, max_msgs=4))
+
+        assert backend.read(0x1000, 0x50) == bytes(range(0x50))
+        assert len(fake_dev.transfers) == 2
+
+    def test_write_chunks_share_ioctl(self, fake_dev):
+        """Test chunked writes are packed into one ioctl."""
+        backend = I2CDevBackend(1, 0x48, AdapterLimits(max_msg_len=32))
+
+        backend.write(0x1000, bytes(range(0x40)))
+
+        assert fake_dev.dump(0x1000, 0x40) == bytes(range(0x40))
+        # 30 bytes of data per message, rounded down to whole 4-byte words
+        assert fake_dev.transfers == [[(0, 30), (0, 30), (0, 10)]]
+
+    def test_read_chunks_advance_by_words(self, fake_dev):
+        """Test chunk addresses advance by words, not bytes."""
+        backend = I2CDevBackend(1, 0x48, AdapterLimits(max_msg_len=32))
+
+        backend.read(0x1000, 0x50)
+
+        assert fake_dev.transfers[0][0::2] == [(0, 2)] * 3
+        assert fake_dev.addresses == [0x1000, 0x1008, 0x1010]
+
+    def test_write_program_memory(self, fake_dev):
+        """Test program memory writes are split on 5-byte words."""
+        data = bytes(range(100))
+        backend = I2CDevBackend(1, 0x48, AdapterLimits(max_msg_len=32))
+
+        backend.write(0xC000, data)
+
+        assert fake_dev.dump(0xC000, 100) == data
+        assert fake_dev.transfers == [[(0, 32), (0, 32), (0, 32), (0, 12)]]
+
+    def test_limits_reduced_on_rejection(self, fake_dev):
+        """Test transfers the adapter rejects are retried with smaller limits."""
+        fake_dev.max_msg_len = 64
+        fake_dev.load(0x1000, bytes(range(0x100)))
+        backend = I2CDevBackend(1, 0x48)
+
+        assert backend.read(0x1000, 0x100) == bytes(range(0x100))
+        assert backend.limits.max_msg_len == 64
+
+    def test_write_resumes_after_rejection(self, fake_dev):
+        """Test chunks written before a rejected ioctl are not written again."""
+        fake_dev.reject_after = 1
+        backend = I2CDevBackend(1, 0x48, AdapterLimits(max_msg_len=32, max_msgs=4))
+        data = bytes(range(160))
+        backend.write(0x1000, data)
+
+        assert backend.limits == AdapterLimits(max_msg_len=32, max_msgs=2)
+        assert fake_dev.addresses == [0x1000 + 7 * i for i in range(6)]
+        assert fake_dev.dump(0x1000, len(data)) == data
+
+    def test_transaction_single_ioctl(self, fake_dev):
+        """Test a transaction is submitted as one ioctl."""
+        fake_dev.load(0x1000, b"\x01\x02\x03\x04")
+        backend = I2CDevBackend(1, 0x48)
+
+        with backend.transaction() as txn:
+            txn.write(0xF400, b"\x00\x01")
+            txn.read(0x1000, 4)
+            txn.write_read(b"\xf4\x00", 2)
+
+        assert txn.results == [None, b"\x01\x02\x03\x04", b"\x00\x01"]
+        assert fake_dev.transfers == [
+            [(0, 4), (0, 2), (I2C_M_RD, 4), (0, 2), (I2C_M_RD, 2)]
+        ]
+
+    def test_transaction_keeps_pairs_together(self, fake_dev):
+        """Test write-read pairs are not split across ioctls."""
+        backend = I2CDevBackend(1, 0x48, AdapterLimits(max_msgs=4))
+
+        with backend.transaction() as txn:
+            txn.write(0x1000, b"\x00\x00\x00\x01")
+            txn.read(0x1000, 4)
+            txn.read(0x1001, 4)
+
+        assert fake_dev.transfers == [
+            [(0, 6), (0, 2), (I2C_M_RD, 4)],
+            [(0, 2), (I2C_M_RD, 4)],
+        ]
+        assert txn.results[1] == b"\x00\x00\x00\x01"
+
+    def test_transaction_resumes_after_rejection(self, fake_dev):
+        """Test a rejected ioctl is retried with smaller limits."""
+        fake_dev.max_msg_len = 64
+        data = bytes(range(200))
+        backend = I2CDevBackend(1, 0x48)
+
+        with backend.transaction() as txn:
+            txn.write(0x1000, data)
+            txn.read(0x1000, len(data))
+
+        assert txn.results == [None, data]
+        assert backend.limits.max_msg_len == 64
+
+    def test_transaction_failure(self, fake_dev):
+        """Test ioctl errors are reported as transaction failures."""
+        backend = I2CDevBackend(1, 0x48)
+
+        with patch(
+            "tcp_i2c_bridge.i2c_dev.fcntl.ioctl", side_effect=OSError("Remote I/O")
+        ):
+            with pytest.raises(RuntimeError, match="I2C transaction failed"):
+                backend.write_read(b"\x10\x00", 4)
+
+    def test_read_invalid_length(self, fake_dev):
+        """Test reading with invalid length."""
+        backend = I2CDevBackend(1, 0x48)
+
+        with pytest.raises(ValueError, match="Read length must be positive"):
+            backend.read(0x1000, 0)
+
+        with pytest.raises(ValueError, match="Read length must be positive"):
+            backend.read(0x1000, -1)
+
+    def test_read_no_connection(self, fake_dev):
+        """Test reading without connection."""
+        backend = I2CDevBackend(1, 0x48)
+        backend.fd = None  # Simulate no connection
+
+        with pytest.raises(RuntimeError, match="I2C bus not connected"):
+            backend.read(0x1000, 4)
+
+    def test_read_failure(self, fake_dev):
+        """Test ioctl errors are reported as read failures."""
+        backend = I2CDevBackend(1, 0x48)
+
+        with patch(
+            "tcp_i2c_bridge.i2c_dev.fcntl.ioctl", side_effect=OSError("Remote I/O")
+        ):
+            with pytest.raises(RuntimeError, match="I2C read failed"):
+                backend.read(0x1000, 4)
+
+    def test_write_small_data(self, fake_dev):
+        """Test writing small amount of data."""
+        backend = I2CDevBackend(1, 0x48)
+
+        backend.write(0x1000, b"test")
+
+        assert fake_dev.dump(0x1000, 0x4) == b"test"
+        assert fake_dev.transfers == [[(0, 6)]]
+
+    def test_write_empty_data(self, fake_dev):
+        """Test writing empty data."""
+        backend = I2CDevBackend(1, 0x48)
+
+        with pytest.raises(ValueError, match="Write data cannot be empty"):
+            backend.write(0x1000, b"")
+
+    def test_write_no_connection(self, fake_dev):
+        """Test writing without connection."""
+        backend = I2CDevBackend(1, 0x48)
+        backend.fd = None  # Simulate no connection
+
+        with pytest.raises(RuntimeError, match="I2C bus not connected"):
+            backend.write(0x1000, b"test")
+
+    def test_close(self, fake_dev):
+        """Test closing backend."""
+        backend = I2CDevBackend(1, 0x48)
+        backend.close()
+
+        fake_dev.close.assert_called_once_with(99)
+        assert backend.fd is None
+
+
+class TestAdapterLimits:
+    """Test adapter limit reduction."""
+
+    def test_reduced_on_limit_error(self):
+        """Test limits are halved on EOPNOTSUPP."""
+        limits = AdapterLimits(max_msg_len=256, max_msgs=42)
+        reduced = limits.reduced(OSError(errno.EOPNOTSUPP, "not supported"))
+        assert reduced == AdapterLimits(max_msg_len=128, max_msgs=21)
+
+    def test_not_reduced_on_other_error(self):
+        """Test bus errors do not reduce the limits."""
+        limits = AdapterLimits()
+        assert limits.reduced(OSError(errno.EREMOTEIO, "Remote I/O error")) is None
+
+    def test_not_reduced_below_minimum(self):
+        """Test limits stop at the minimum."""
+        limits = AdapterLimits(max_msg_len=32, max_msgs=2)
+        assert limits.reduced(OSError(errno.EINVAL, "Invalid argument")) is None
+
+    @pytest.mark.parametrize(
+        ("max_msg_len", "max_msgs"), [(8192, 1), (8192, 43), (31, 42), (0, 2)]
+    )
+    def test_invalid(self, max_msg_len, max_msgs):
+        """Test limits the ioctl and chunking cannot work with are refused."""
+        with pytest.raises(ValueError, match="Invalid"):
+            AdapterLimits(max_msg_len=max_msg_len, max_msgs=max_msgs)
+
+
+class TestI2CTransaction:
+    """Test transaction batching."""
+
+    def test_default_submit(self):
+        """Test backends without batching run operations one by one."""
+        backend = DebugI2CBackend()
+
+        with backend.transaction() as txn:
+            txn.write(0x4000, b"abcd")
+            txn.read(0x4000, 4)
+            txn.write_read(b"\x40\x02", 2)
+
+        assert txn.results == [None, b"abcd", b"cd"]
+
+    def test_explicit_submit(self):
+        """Test submitting without a context manager."""
+        backend = DebugI2CBackend()
+        txn = backend.transaction()
+        index = txn.read(0x4000, 2)
+
+        assert txn.submit()[index] == b"\x00\x00"
+
+    def test_submit_twice(self):
+        """Test a transaction can only be submitted once."""
+        txn = DebugI2CBackend().transaction()
+        txn.submit()
+
+        with pytest.raises(RuntimeError, match="already submitted"):
+            txn.read(0x4000, 1)
+        with pytest.raises(RuntimeError, match="already submitted"):
+            txn.submit()
+
+    def test_not_submitted_on_error(self):
+        """Test an exception in the block discards the transaction."""
+        backend = Mock()
+
+        with pytest.raises(KeyError):
+            with I2CTransaction(backend) as txn:
+                txn.write(0x4000, b"x")
+                raise KeyError
+
+        backend.submit.assert_not_called()
+
+    def test_invalid_operations(self):
+        """Test invalid operations are rejected when queued."""
+        txn = DebugI2CBackend().transaction()
+
+        with pytest.raises(ValueError, match="positive"):
+            txn.read(0x4000, 0)
+        with pytest.raises(ValueError, match="empty"):
+            txn.write(0x4000, b"")
+        with pytest.raises(ValueError, match="empty"):
+            txn.write_read(b"", 1)
+
+    def test_plan_and_batch(self):
+        """Test operations are chunked and packed by message count."""
+        operations = [
+            I2COperation(I2COpKind.READ, addr=0x1000, length=64),
+            I2COperation(I2COpKind.WRITE, addr=0x2000, data=b"\x00" * 4),
+        ]
+        groups = list(
+            plan_message_groups(
+                operations, AdapterLimits(max_msg_len=32), ADAU1452_MEMORY_MAP
+            )
+        )
+        assert [(g.index, g.addr, g.offset, g.size) for g in groups] == [
+            (0, 0x1000, 0, 32),
+            (0, 0x1008, 32, 32),
+            (1, 0x2000, 0, 4),
+        ]
+
+        batches = list(batch_message_groups(groups, max_msgs=4))
+        assert [len(batch) for batch in batches] == [2, 1]
@@ -8,6 +8,7 @@ from tempfile import TemporaryDirectory
 import pytest
 
 from tcp_i2c_bridge.app import TCPBridgeApp
+from tcp_i2c_bridge.capture import write_text_logs
 from tcp_i2c_bridge.protocol import Command, ProtocolHeader
 
 
@@ -211,31 +212,17 @@ class TestTCPBridgeIntegration:
 
         session_dir = session_dirs[0]
 
-        # Check for network and i2c directories
-        network_dir = session_dir / "network"
-        i2c_dir = session_dir / "i2c"
+        # Check for the capture file
+        capture = session_dir / "capture.bin"
+        assert capture.exists()
 
-        assert network_dir.exists()
-        assert i2c_dir.exists()
+        # Check that text logs generated from it contain data
+        running_app.server.protocol_dumper.capture.flush()
+        network_log, i2c_log = write_text_logs(capture, temp_dir / "logs")
 
-        # Check for log files
-        network_log = session_dir / "network.log"
-        i2c_log = session_dir / "i2c.log"
-
-        assert network_log.exists()
-        assert i2c_log.exists()
-
-        # Check that files contain data
         assert network_log.stat().st_size > 0
         assert i2c_log.stat().st_size > 0
 
-        # Check for binary dump files
-        network_files = list(network_dir.glob("*.bin"))
-        i2c_files = list(i2c_dir.glob("*.bin"))
-
-        assert len(network_files) > 0
-        assert len(i2c_files) > 0
-
     @pytest.mark.asyncio
     async def test_error_handling(self, running_app):
         """Test error handling for invalid operations."""
@@ -0,0 +1,64 @@
+"""Tests for device memory maps."""
+
+import pytest
+
+from tcp_i2c_bridge.memory_map import (
+    ADAU1452_MEMORY_MAP,
+    BYTE_MEMORY_MAP,
+    MemoryMap,
+    MemoryRegion,
+)
+
+
+class TestMemoryMap:
+    """Test memory map lookups and chunking."""
+
+    def test_word_size(self):
+        """Test word sizes of the ADAU1452 memories."""
+        assert ADAU1452_MEMORY_MAP.word_size(0x0000) == 4
+        assert ADAU1452_MEMORY_MAP.word_size(0x6000) == 4
+        assert ADAU1452_MEMORY_MAP.word_size(0xC000) == 5
+        assert ADAU1452_MEMORY_MAP.word_size(0xF400) == 2
+        assert ADAU1452_MEMORY_MAP.word_size(0xE000) == 1
+
+    def test_words_left(self):
+        """Test the words up to the next region boundary, inside and between."""
+        assert ADAU1452_MEMORY_MAP.words_left(0xBFFE) == 2
+        assert ADAU1452_MEMORY_MAP.words_left(0xEFFE) == 2
+        assert ADAU1452_MEMORY_MAP.words_left(0xFFFF) == 1
+        assert BYTE_MEMORY_MAP.words_left(0x1000) is None
+
+    def test_overlapping_regions(self):
+        """Test overlapping regions are rejected."""
+        with pytest.raises(ValueError, match="overlap"):
+            MemoryMap(
+                regions=(
+                    MemoryRegion("A", 0x0000, 0x00FF, 4),
+                    MemoryRegion("B", 0x0080, 0x01FF, 4),
+                )
+            )
+
+    def test_byte_chunks(self):
+        """Test byte-addressed chunks advance by bytes."""
+        chunks = list(BYTE_MEMORY_MAP.iter_chunks(0x1000, 70, 30))
+        assert chunks == [(0x1000, 0, 30), (0x101E, 30, 30), (0x103C, 60, 10)]
+
+    def test_word_aligned_chunks(self):
+        """Test chunks are whole words and advance by words."""
+        chunks = list(ADAU1452_MEMORY_MAP.iter_chunks(0x1000, 64, 30))
+        assert chunks == [(0x1000, 0, 28), (0x1007, 28, 28), (0x100E, 56, 8)]
+
+    def test_program_memory_chunks(self):
+        """Test program memory uses 5-byte words."""
+        chunks = list(ADAU1452_MEMORY_MAP.iter_chunks(0xC000, 40, 32))
+        assert chunks == [(0xC000, 0, 30), (0xC006, 30, 10)]
+
+    def test_chunks_split_at_region_boundary(self):
+        """Test chunks do not cross into a region with another word width."""
+        chunks = list(ADAU1452_MEMORY_MAP.iter_chunks(0xBFFE, 18, 64))
+        assert chunks == [(0xBFFE, 0, 8), (0xC000, 8, 10)]
+
+    def test_chunk_smaller_than_word(self):
+        """Test chunk sizes that cannot hold a single word."""
+        with pytest.raises(ValueError, match="smaller than"):
+            list(ADAU1452_MEMORY_MAP.iter_chunks(0xC000, 10, 4))
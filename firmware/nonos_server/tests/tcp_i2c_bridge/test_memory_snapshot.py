@@ -0,0 +1,128 @@
+"""Tests for device memory snapshots reconstructed from captures."""
+
+import pytest
+
+from tcp_i2c_bridge.capture import (
+    CaptureWriter,
+    Compression,
+    Direction,
+    Operation,
+    SegmentedCaptureWriter,
+)
+from tcp_i2c_bridge.memory_map import ADAU1452_MEMORY_MAP
+from tcp_i2c_bridge.memory_snapshot import (
+    MemoryChange,
+    MemoryLayout,
+    diff_capture,
+    snapshot,
+    snapshots,
+)
+
+pytest.importorskip("numpy")
+
+CLIENT = "192.168.1.20:51234"
+
+
+def write_session(capture, monkeypatch) -> None:
+    """Write DM0 words, PM words and a register at 1 ms intervals."""
+    clock = iter(range(1_000_000_000, 2_000_000_000, 1_000_000))
+    monkeypatch.setattr("tcp_i2c_bridge.capture.time.time_ns", lambda: next(clock))
+    capture.i2c(CLIENT, Operation.WRITE, 0x0010, 8, bytes.fromhex("0000000100000002"))
+    capture.i2c(CLIENT, Operation.WRITE, 0xC000, 5, bytes.fromhex("0102030405"))
+    capture.i2c(CLIENT, Operation.READ, 0x0010, 4, bytes.fromhex("00000001"))
+    capture.network(CLIENT, Direction.TX, b"\x0b")
+    capture.i2c("10.0.0.1:1", Operation.WRITE, 0xF003, 2, bytes.fromhex("0001"), 2)
+    capture.i2c(CLIENT, Operation.SAFELOAD, 0x0011, 4, bytes.fromhex("000000ff"))
+    capture.close()
+    monkeypatch.undo()
+
+
+@pytest.fixture(params=["file", "segments"])
+def capture(request, tmp_path, monkeypatch):
+    """A session written as one indexed capture file or as segments."""
+    if request.param == "file":
+        path = tmp_path / "capture.bin"
+        write_session(CaptureWriter(path), monkeypatch)
+    else:
+        path = tmp_path / "capture"
+        write_session(
+            SegmentedCaptureWriter(path, 1024, 1 << 20, Compression.ZLIB), monkeypatch
+        )
+    return path
+
+
+# Timestamps of the records of write_session; client records take a tick each
+DM0_WRITTEN = 1_001_000_000
+SAFELOAD_WRITTEN = 1_007_000_000
+
+
+class TestLayout:
+    """Test the flat layout of the address space."""
+
+    def test_word_sizes(self):
+        """Test each word address owns the bytes of one word."""
+        layout = MemoryLayout.of(ADAU1452_MEMORY_MAP)
+
+        assert layout.offsets[1] - layout.offsets[0] == 4
+        assert layout.offsets[0xC001] - layout.offsets[0xC000] == 5
+        assert layout.offsets[0xF001] - layout.offsets[0xF000] == 2
+
+
+class TestSnapshot:
+    """Test folding writes into snapshots."""
+
+    def test_end_of_capture(self, capture):
+        """Test the last write of each word wins and reads are ignored."""
+        memory = snapshot(capture)
+
+        assert memory.words() == [
+            (0x0010, bytes.fromhex("00000001")),
+            (0x0011, bytes.fromhex("000000ff")),
+            (0xC000, bytes.fromhex("0102030405")),
+            (0xF003, bytes.fromhex("0001")),
+        ]
+        assert memory.is_written(0x0010, 2)
+        assert not memory.is_written(0x0012)
+        assert memory.read(0x0012) == bytes(4)
+
+    def test_points_in_time(self, capture):
+        """Test each snapshot only holds the writes up to its time."""
+        first, last = snapshots(capture, [DM0_WRITTEN, None])
+
+        assert first.words() == [
+            (0x0010, bytes.fromhex("00000001")),
+            (0x0011, bytes.fromhex("00000002")),
+        ]
+        assert last.read(0x0011) == bytes.fromhex("000000ff")
+
+    def test_clients(self, capture):
+        """Test writes of other clients are left out."""
+        memory = snapshot(capture, clients=[CLIENT])
+
+        assert not memory.is_written(0xF003)
+        assert memory.is_written(0xC000)
+
+    def test_chip(self, capture):
+        """Test writes to other chips, or to no known chip, are left out."""
+        memory = snapshot(capture, chip=2)
+
+        assert memory.words() == [(0xF003, bytes.fromhex("0001"))]
+        assert diff_capture(capture, None, None, chip=3) == []
+
+    def test_diff(self, capture):
+        """Test changes are reported as runs of consecutive words."""
+        changes = diff_capture(capture, DM0_WRITTEN, None)
+
+        assert changes == [
+            MemoryChange(
+                0x0011, 1, bytes.fromhex("00000002"), bytes.fromhex("000000ff")
+            ),
+            MemoryChange(0xC000, 1, bytes(5), bytes.fromhex("0102030405")),
+            MemoryChange(0xF003, 1, bytes(2), bytes.fromhex("0001")),
+        ]
+        assert diff_capture(capture, SAFELOAD_WRITTEN, None) == []
+
+    def test_no_times(self, capture):
+        """Test asking for no snapshots is refused."""
+        with pytest.raises(ValueError):
+            snapshots(capture, [])
@@ -0,0 +1,110 @@
+"""Tests for the network I2C backend."""
+
+import asyncio
+import socket
+import threading
+
+import pytest
+
+from tcp_i2c_bridge.device_sim import SimulatedDevice
+from tcp_i2c_bridge.network_backend import NetworkI2CBackend
+from tcp_i2c_bridge.server import TCPServer
+
+
+@pytest.fixture
+def bridge_port(tmp_path):
+    """Run a bridge serving a simulated device in a thread."""
+    server = TCPServer("127.0.0.1", 0, SimulatedDevice(), dump_dir=tmp_path)
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    def run() -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.start())
+        started.set()
+        loop.run_forever()
+        loop.run_until_complete(server.stop())
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    started.wait(5)
+    assert server.server is not None
+    yield server.server.sockets[0].getsockname()[1]
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+@pytest.fixture
+def backend(bridge_port):
+    backend = NetworkI2CBackend("127.0.0.1", bridge_port)
+    yield backend
+    backend.close()
+
+
+class TestNetworkI2CBackend:
+    """Test the backend against a local bridge."""
+
+    def test_read_write(self, backend):
+        """Test writes are seen by later reads through the bridge."""
+        backend.write(0x0010, b"\x01\x02\x03\x04")
+        assert backend.read(0x0010, 4) == b"\x01\x02\x03\x04"
+        assert backend.write_read(b"\x00\x10", 4) == b"\x01\x02\x03\x04"
+
+    def test_pipelined_reads(self, backend):
+        """Test many outstanding reads are answered in order."""
+        for i in range(64):
+            backend.write(0x0100 + i, i.to_bytes(4, "big"))
+
+        futures = [backend.read_async(0x0100 + i, 4) for i in range(64)]
+
+        assert [f.result(5) for f in futures] == [
+            i.to_bytes(4, "big") for i in range(64)
+        ]
+
+    def test_transaction(self, backend):
+        """Test a transaction is sent at once and returns read results."""
+        with backend.transaction() as txn:
+            txn.write(0x0200, b"\xaa\xbb\xcc\xdd")
+            txn.read(0x0200, 4)
+            txn.write_read(b"\x02\x00", 2)
+
+        assert txn.results == [None, b"\xaa\xbb\xcc\xdd", b"\xaa\xbb"]
+
+    def test_write_read_register_address_only(self, backend):
+        """Test write-reads other than a register address are refused."""
+        with pytest.raises(ValueError, match="16-bit register address"):
+            backend.write_read(b"\x00\x10\x00", 4)
+
+    def test_connection_lost(self, bridge_port):
+        """Test operations fail once the connection is gone."""
+        backend = NetworkI2CBackend("127.0.0.1", bridge_port)
+        backend.close()
+
+        with pytest.raises(RuntimeError, match="Connection to bridge lost"):
+            backend.read(0x0010, 4)
+
+    def test_timeout(self):
+        """Test an unanswered read fails it and the connection."""
+        with socket.socket() as listener:
+            listener.bind(("127.0.0.1", 0))
+            listener.listen()
+            backend = NetworkI2CBackend(
+                "127.0.0.1", listener.getsockname()[1], timeout=0.2
+            )
+            peer, _ = listener.accept()
+            with peer:
+                with pytest.raises(RuntimeError, match="did not respond"):
+                    backend.read(0x0010, 4)
+                with pytest.raises(RuntimeError, match="Connection to bridge lost"):
+                    backend.read(0x0010, 4)
+                backend.close()
+
+    def test_not_running(self):
+        """Test connecting to a port without a bridge."""
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+
+        with pytest.raises(RuntimeError, match="Failed to connect"):
+            NetworkI2CBackend("127.0.0.1", port, timeout=1.0)
@@ -0,0 +1,123 @@
+"""Tests for pcapng export of captures."""
+
+import io
+import struct
+
+from tcp_i2c_bridge.capture import CaptureWriter, Direction, Operation
+from tcp_i2c_bridge.pcapng import (
+    DISSECTOR,
+    LINKTYPE_I2C,
+    LINKTYPE_IPV4,
+    MAX_SEGMENT,
+    export_pcapng,
+)
+from tcp_i2c_bridge.protocol import Read as NetworkRead
+from tcp_i2c_bridge.protocol import Write as NetworkWrite
+
+
+def read_blocks(data: bytes) -> list[tuple[int, bytes]]:
+    """Split a pcapng file into (block type, body) pairs."""
+    blocks = []
+    offset = 0
+    while offset < len(data):
+        block_type, length = struct.unpack_from("<II", data, offset)
+        (trailer,) = struct.unpack_from("<I", data, offset + length - 4)
+        assert trailer == length
+        blocks.append((block_type, data[offset + 8 : offset + length - 4]))
+        offset += length
+    return blocks
+
+
+def packets(data: bytes) -> list[tuple[int, int, bytes]]:
+    """Enhanced packet blocks as (interface, timestamp, packet data)."""
+    result = []
+    for block_type, body in read_blocks(data):
+        if block_type != 6:
+            continue
+        interface, high, low, captured, _ = struct.unpack_from("<IIIII", body)
+        result.append((interface, high << 32 | low, body[20 : 20 + captured]))
+    return result
+
+
+def export(path) -> bytes:
+    out = io.BytesIO()
+    export_pcapng(path, out)
+    return out.getvalue()
+
+
+def write_session(path) -> tuple[bytes, bytes]:
+    request = NetworkRead.Request.create(chip_address=1, address=0xF003, length=2)
+    response = request.create_response(data=b"\x00\x01").pack()
+    write = NetworkWrite.Request.create(chip_address=1, address=0x10, data=bytes(4))
+    capture = CaptureWriter(path, index=False)
+    capture.network("192.168.1.20:51234", Direction.RX_RAW, request.pack())
+    capture.network("192.168.1.20:51234", Direction.RX_DECODED, request.pack())
+    capture.i2c("192.168.1.20:51234", Operation.READ, 0xF003, 2, b"\x00\x01")
+    capture.network("192.168.1.20:51234", Direction.TX, response)
+    capture.network("192.168.1.20:51234", Direction.RX_DECODED, write.pack())
+    capture.close()
+    return request.pack() + write.pack(), response
+
+
+class TestExport:
+    """Test converting captures to pcapng."""
+
+    def test_interfaces(self, tmp_path):
+        """Test the file starts with a section and the two interfaces."""
+        path = tmp_path / "capture.bin"
+        write_session(path)
+
+        blocks = read_blocks(export(path))
+
+        assert blocks[0][0] == 0x0A0D0D0A
+        assert struct.unpack_from("<I", blocks[0][1])[0] == 0x1A2B3C4D
+        link_types = [
+            struct.unpack_from("<H", body)[0] for kind, body in blocks if kind == 1
+        ]
+        assert link_types == [LINKTYPE_IPV4, LINKTYPE_I2C]
+
+    def test_tcp_streams(self, tmp_path):
+        """Test requests and responses form consecutive TCP streams."""
+        path = tmp_path / "capture.bin"
+        sent, received = write_session(path)
+
+        network = [p for p in packets(export(path)) if p[0] == 0]
+
+        assert len(network) == 3
+        streams: dict[tuple[int, int], bytes] = {}
+        for _, _, packet in network:
+            assert packet[0] == 0x45
+            src_port, dst_port, seq = struct.unpack_from(">HHI", packet, 20)
+            payload = packet[40:]
+            stream = streams.setdefault((src_port, dst_port), b"")
+            assert seq == 1 + len(stream)
+            streams[(src_port, dst_port)] = stream + payload
+        assert streams == {(51234, 8086): sent, (8086, 51234): received}
+
+    def test_i2c_layer(self, tmp_path):
+        """Test I2C transactions carry the pseudo header and timestamps."""
+        path = tmp_path / "capture.bin"
+        write_session(path)
+
+        (i2c,) = [p for p in packets(export(path)) if p[0] == 1]
+
+        _, timestamp, packet = i2c
+        assert struct.unpack_from(">BBHI", packet) == (Operation.READ, 0, 0xF003, 2)
+        assert packet[8:] == b"\x00\x01"
+        assert timestamp > 0
+
+    def test_segments_large_packets(self, tmp_path):
+        """Test packets beyond the IPv4 size limit are split."""
+        path = tmp_path / "capture.bin"
+        data = bytes(MAX_SEGMENT + 10)
+        capture = CaptureWriter(path, index=False)
+        capture.network("192.168.1.20:51234", Direction.RX_DECODED, data)
+        capture.close()
+
+        network = packets(export(path))
+
+        assert [len(packet) - 40 for _, _, packet in network] == [MAX_SEGMENT, 10]
+
+    def test_dissector_shipped(self):
+        """Test the Wireshark dissector is next to the module."""
+        assert "dissect_tcp_pdus" in DISSECTOR.read_text()
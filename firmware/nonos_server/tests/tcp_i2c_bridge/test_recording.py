@@ -0,0 +1,175 @@
+"""Tests for I2C recording and replay."""
+
+import pytest
+
+from tcp_i2c_bridge.device_sim import SimulatedDevice
+from tcp_i2c_bridge.i2c_backend import I2CBackend
+from tcp_i2c_bridge.recording import (
+    I2CRecorder,
+    RecordFlags,
+    RecordingI2CBackend,
+    RecordKind,
+    ReplayI2CBackend,
+    ReplayMismatchError,
+    read_recording,
+)
+
+
+class FailingBackend(I2CBackend):
+    def read(self, addr: int, length: int) -> bytes:
+        raise RuntimeError("I2C read failed: bus error")
+
+    def write(self, addr: int, data: bytes) -> None:
+        raise RuntimeError("I2C write failed: bus error")
+
+    def write_read(self, data: bytes, length: int) -> bytes:
+        raise RuntimeError("I2C write-read failed: bus error")
+
+    def close(self) -> None:
+        pass
+
+
+def record_session(path, backend: I2CBackend | None = None) -> None:
+    recorder = I2CRecorder(path)
+    recording = RecordingI2CBackend(backend or SimulatedDevice(), recorder, 0x3B)
+    recording.write(0x4000, b"\x01\x02\x03\x04")
+    assert recording.read(0x4000, 4) == b"\x01\x02\x03\x04"
+    with recording.transaction() as txn:
+        txn.write(0x4001, b"\x05\x06\x07\x08")
+        txn.read(0x4000, 8)
+    assert recording.write_read(b"\x40\x01", 4) == b"\x05\x06\x07\x08"
+    recording.close()
+    recorder.close()
+
+
+class TestRecording:
+    """Test recording I2C traffic."""
+
+    def test_records(self, tmp_path):
+        """Test every operation is recorded with its data."""
+        path = tmp_path / "session.i2c"
+        record_session(path)
+
+        records = list(read_recording(path))
+
+        assert [r.kind for r in records] == [
+            RecordKind.WRITE,
+            RecordKind.READ,
+            RecordKind.WRITE,
+            RecordKind.READ,
+            RecordKind.WRITE_READ,
+        ]
+        assert all(r.device == 0x3B for r in records)
+        assert records[0].addr == 0x4000
+        assert records[0].written == b"\x01\x02\x03\x04"
+        assert records[3].read == b"\x01\x02\x03\x04\x05\x06\x07\x08"
+        assert records[4].written == b"\x40\x01"
+        assert records[4].read == b"\x05\x06\x07\x08"
+
+        timestamps = [r.timestamp for r in records]
+        assert timestamps == sorted(timestamps)
+        assert all(r.duration >= 0 for r in records)
+
+    def test_records_failures(self, tmp_path):
+        """Test failed operations are recorded and still raise."""
+        path = tmp_path / "session.i2c"
+        recorder = I2CRecorder(path)
+        recording = RecordingI2CBackend(FailingBackend(), recorder)
+
+        with pytest.raises(RuntimeError):
+            recording.read(0x1000, 4)
+        recorder.close()
+
+        (record,) = read_recording(path)
+        assert record.flags & RecordFlags.ERROR
+        assert record.read == b""
+
+    def test_not_a_recording(self, tmp_path):
+        """Test reading a file that is not a recording."""
+        path = tmp_path / "junk.i2c"
+        path.write_bytes(b"junk data")
+
+        with pytest.raises(ValueError, match="Not an I2C recording"):
+            list(read_recording(path))
+
+    def test_truncated(self, tmp_path):
+        """Test reading a recording cut off mid-record."""
+        path = tmp_path / "session.i2c"
+        record_session(path)
+        path.write_bytes(path.read_bytes()[:-3])
+
+        with pytest.raises(ValueError, match="Truncated"):
+            list(read_recording(path))
+
+
+class TestReplay:
+    """Test replaying recorded I2C traffic."""
+
+    def test_replay(self, tmp_path):
+        """Test replaying the recorded session."""
+        path = tmp_path / "session.i2c"
+        record_session(path)
+        replay = ReplayI2CBackend.from_file(path)
+
+        replay.write(0x4000, b"\x01\x02\x03\x04")
+        assert replay.read(0x4000, 4) == b"\x01\x02\x03\x04"
+        with replay.transaction() as txn:
+            txn.write(0x4001, b"\x05\x06\x07\x08")
+            txn.read(0x4000, 8)
+        assert txn.results[1] == b"\x01\x02\x03\x04\x05\x06\x07\x08"
+        assert replay.write_read(b"\x40\x01", 4) == b"\x05\x06\x07\x08"
+        assert replay.remaining == 0
+
+    def test_write_mismatch(self, tmp_path):
+        """Test writes differing from the recording are detected."""
+        path = tmp_path / "session.i2c"
+        record_session(path)
+        replay = ReplayI2CBackend.from_file(path)
+
+        with pytest.raises(ReplayMismatchError, match="expected 01020304"):
+            replay.write(0x4000, b"\x01\x02\x03\xff")
+
+    def test_order_mismatch(self, tmp_path):
+        """Test operations out of the recorded order are detected."""
+        path = tmp_path / "session.i2c"
+        record_session(path)
+        replay = ReplayI2CBackend.from_file(path)
+
+        with pytest.raises(ReplayMismatchError, match="expected write at 0x4000"):
+            replay.read(0x4000, 4)
+
+    def test_exhausted(self, tmp_path):
+        """Test operations beyond the end of the recording."""
+        path = tmp_path / "session.i2c"
+        I2CRecorder(path).close()
+        replay = ReplayI2CBackend.from_file(path)
+
+        with pytest.raises(ReplayMismatchError, match="exhausted"):
+            replay.read(0x4000, 4)
+
+    def test_recorded_failure(self, tmp_path):
+        """Test operations that failed during recording fail again."""
+        path = tmp_path / "session.i2c"
+        recorder = I2CRecorder(path)
+        with pytest.raises(RuntimeError):
+            RecordingI2CBackend(FailingBackend(), recorder).write(0x1000, b"\x00")
+        recorder.close()
+
+        replay = ReplayI2CBackend.from_file(path)
+        with pytest.raises(RuntimeError, match="Recorded I2C failure"):
+            replay.write(0x1000, b"\x00")
+
+    def test_device_filter(self, tmp_path):
+        """Test replaying the traffic of one device of a shared recording."""
+        path = tmp_path / "session.i2c"
+        recorder = I2CRecorder(path)
+        first = RecordingI2CBackend(SimulatedDevice(), recorder, 0x3B)
+        second = RecordingI2CBackend(SimulatedDevice(), recorder, 0x3C)
+        first.write(0x0010, b"\x00\x00\x00\x01")
+        second.write(0x0010, b"\x00\x00\x00\x02")
+        recorder.close()
+
+        replay = ReplayI2CBackend.from_file(path, device=0x3C)
+
+        assert replay.remaining == 1
+        replay.write(0x0010, b"\x00\x00\x00\x02")
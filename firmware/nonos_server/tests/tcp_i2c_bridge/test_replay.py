@@ -0,0 +1,190 @@
+"""Tests for replaying captures against a bridge."""
+
+import asyncio
+
+import pytest
+
+from tcp_i2c_bridge.capture import CaptureWriter, Direction, Operation
+from tcp_i2c_bridge.device_sim import SimulatedDevice
+from tcp_i2c_bridge.protocol import Read as NetworkRead
+from tcp_i2c_bridge.protocol import Write as NetworkWrite
+from tcp_i2c_bridge.protocol_dumper import ProtocolDumper
+from tcp_i2c_bridge.replay import ReplayStats, load_sessions, replay
+from tcp_i2c_bridge.server import TCPServer
+
+WRITE = NetworkWrite.Request.create(chip_address=1, address=0x10, data=b"\x01\x02")
+READ = NetworkRead.Request.create(chip_address=1, address=0x10, length=2)
+
+
+def write_session(
+    path,
+    monkeypatch,
+    response: bytes,
+    clients: tuple[str, ...] = ("192.168.1.20:51234",),
+    responses: bool = True,
+) -> None:
+    """Record a write and a read of each client in the order of the server."""
+    clock = iter(range(1_000_000_000, 2_000_000_000, 1_000_000))
+    monkeypatch.setattr("tcp_i2c_bridge.capture.time.time_ns", lambda: next(clock))
+    capture = CaptureWriter(path, index=False)
+    for client in clients:
+        capture.network(client, Direction.RX_RAW, WRITE.pack() + READ.pack())
+        capture.i2c(client, Operation.WRITE, 0x10, 2, b"\x01\x02")
+        capture.network(client, Direction.RX_DECODED, WRITE.pack())
+        capture.network(client, Direction.RX_RAW, READ.pack())
+        capture.i2c(client, Operation.READ, 0x10, 2, response)
+        if responses:
+            capture.network(
+                client, Direction.TX, READ.create_response(data=response).pack()
+            )
+        capture.network(client, Direction.RX_DECODED, READ.pack())
+    capture.close()
+    monkeypatch.undo()
+
+
+async def start_bridge(tmp_path) -> TCPServer:
+    server = TCPServer(
+        "127.0.0.1", 0, SimulatedDevice(), protocol_dumper=ProtocolDumper(tmp_path)
+    )
+    await server.start()
+    return server
+
+
+def bridge_port(server: TCPServer) -> int:
+    assert server.server is not None
+    return server.server.sockets[0].getsockname()[1]
+
+
+class TestLoadSessions:
+    """Test extracting client sessions from captures."""
+
+    def test_requests_and_responses(self, tmp_path, monkeypatch):
+        """Test requests keep their arrival offsets and read responses."""
+        path = tmp_path / "capture.bin"
+        write_session(path, monkeypatch, b"\x01\x02")
+
+        (session,) = load_sessions(path)
+
+        assert session.client == "192.168.1.20:51234"
+        write, read = session.requests
+        assert (write.packet, write.expected, write.offset) == (WRITE.pack(), None, 0)
+        assert read.packet == READ.pack()
+        assert read.expected == READ.create_response(data=b"\x01\x02").pack()
+        assert read.offset > 0
+        assert read.is_read and not write.is_read
+
+    def test_client_filter(self, tmp_path, monkeypatch):
+        """Test sessions of other clients are left out."""
+        path = tmp_path / "capture.bin"
+        write_session(path, monkeypatch, b"\x01\x02")
+
+        assert load_sessions(path, ["10.0.0.1:1"]) == []
+
+    def test_without_responses(self, tmp_path, monkeypatch):
+        """Test reads captured without their response are not compared."""
+        path = tmp_path / "capture.bin"
+        write_session(path, monkeypatch, b"\x01\x02", responses=False)
+
+        (session,) = load_sessions(path)
+
+        write, read = session.requests
+        assert read.is_read
+        assert read.expected is None
+
+
+class TestReplay:
+    """Test replaying sessions against a local bridge."""
+
+    @pytest.mark.asyncio
+    async def test_recorded_session(self, tmp_path):
+        """Test a session recorded by the bridge replays without mismatches."""
+        server = await start_bridge(tmp_path / "recorded")
+        reader, writer = await asyncio.open_connection("127.0.0.1", bridge_port(server))
+        writer.write(WRITE.pack() + READ.pack())
+        await reader.readexactly(NetworkRead.Response.SIZE + 2)
+        writer.close()
+        await writer.wait_closed()
+        await server.stop()
+        server.protocol_dumper.close()
+        sessions = load_sessions(server.protocol_dumper.capture_file)
+
+        server = await start_bridge(tmp_path / "replayed")
+        try:
+            stats = await replay(sessions, "127.0.0.1", bridge_port(server), 4, None)
+        finally:
+            await server.stop()
+            server.protocol_dumper.close()
+
+        assert (stats.clients, stats.requests, stats.reads) == (4, 8, 4)
+        assert stats.mismatches == 0
+        assert stats.errors == []
+        assert len(stats.latencies) == 4
+
+    @pytest.mark.asyncio
+    async def test_fewer_clients_than_sessions(self, tmp_path, monkeypatch):
+        """Test every session is replayed when clients take turns."""
+        path = tmp_path / "capture.bin"
+        clients = ("10.0.0.1:1", "10.0.0.2:2", "10.0.0.3:3")
+        write_session(path, monkeypatch, b"\x01\x02", clients)
+        server = await start_bridge(tmp_path)
+        try:
+            stats = await replay(
+                load_sessions(path), "127.0.0.1", bridge_port(server), 2
+            )
+        finally:
+            await server.stop()
+            server.protocol_dumper.close()
+
+        assert (stats.clients, stats.requests, stats.reads) == (2, 6, 3)
+        assert stats.mismatches == 0
+        assert stats.errors == []
+
+    @pytest.mark.asyncio
+    async def test_mismatch(self, tmp_path, monkeypatch):
+        """Test responses differing from the recording are reported."""
+        path = tmp_path / "capture.bin"
+        write_session(path, monkeypatch, b"\xff\xff")
+        server = await start_bridge(tmp_path)
+        try:
+            stats = await replay(load_sessions(path), "127.0.0.1", bridge_port(server))
+        finally:
+            await server.stop()
+            server.protocol_dumper.close()
+
+        assert stats.mismatches == 1
+        (mismatch,) = stats.mismatch_details
+        assert mismatch.address == 0x10
+        assert mismatch.received.endswith(b"\x01\x02")
+
+    @pytest.mark.asyncio
+    async def test_connection_refused(self, tmp_path, monkeypatch):
+        """Test clients that cannot connect are reported as errors."""
+        path = tmp_path / "capture.bin"
+        write_session(path, monkeypatch, b"\x01\x02")
+        server = await start_bridge(tmp_path)
+        port = bridge_port(server)
+        await server.stop()
+        server.protocol_dumper.close()
+
+        stats = await replay(load_sessions(path), "127.0.0.1", port)
+
+        assert stats.requests == 0
+        assert len(stats.errors) == 1
+
+    def test_invalid_arguments(self):
+        """Test replays without sessions or clients are refused."""
+        with pytest.raises(ValueError):
+            asyncio.run(replay([], "127.0.0.1", 8086))
+
+
+class TestStats:
+    """Test replay statistics."""
+
+    def test_percentiles(self):
+        """Test nearest-rank percentiles of the read latencies."""
+        stats = ReplayStats(latencies=[i / 1000 for i in range(100, 0, -1)])
+
+        assert stats.percentile(50) == 0.05
+        assert stats.percentile(99) == 0.099
+        assert stats.percentile(100) == 0.1
+        assert ReplayStats().percentile(50) == 0.0
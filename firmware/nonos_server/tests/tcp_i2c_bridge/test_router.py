@@ -0,0 +1,118 @@
+"""Tests for chip-address routing."""
+
+import threading
+from unittest.mock import Mock
+
+import pytest
+
+from tcp_i2c_bridge.i2c_backend import DebugI2CBackend
+from tcp_i2c_bridge.router import BackendRouter
+
+
+class TestBackendRouter:
+    """Test backend router."""
+
+    def test_default_backend(self):
+        """Test requests without a route go to the default backend."""
+        backend = DebugI2CBackend()
+        router = BackendRouter(default=backend)
+
+        router.write(5, 0x4010, b"test")
+
+        assert router.read(7, 0x4010, 4) == b"test"
+        assert backend.read(0x4010, 4) == b"test"
+
+    def test_no_route(self):
+        """Test requests without a route or default backend."""
+        router = BackendRouter()
+
+        with pytest.raises(LookupError, match="No I2C route"):
+            router.read(1, 0x4000, 4)
+
+    def test_routes_by_chip_address(self):
+        """Test requests are routed by chip address."""
+        dsp = DebugI2CBackend()
+        hat = DebugI2CBackend()
+        router = BackendRouter()
+        router.add_route(1, lambda: dsp, bus=0)
+        router.add_route(2, lambda: hat, bus=1)
+
+        router.write(1, 0x4000, b"dsp")
+        router.write(2, 0x4000, b"hat")
+
+        assert dsp.read(0x4000, 3) == b"dsp"
+        assert hat.read(0x4000, 3) == b"hat"
+
+    def test_duplicate_route(self):
+        """Test registering a chip address twice."""
+        router = BackendRouter()
+        router.add_route(1, DebugI2CBackend)
+
+        with pytest.raises(ValueError, match="already exists"):
+            router.add_route(1, DebugI2CBackend)
+
+    def test_lazy_open(self):
+        """Test backends are opened on first use only."""
+        factory = Mock(return_value=DebugI2CBackend())
+        router = BackendRouter()
+        router.add_route(1, factory)
+
+        factory.assert_not_called()
+
+        router.read(1, 0x4000, 1)
+        router.read(1, 0x4000, 1)
+
+        factory.assert_called_once()
+
+    def test_buses_run_in_parallel(self):
+        """Test a held bus does not block devices on another bus."""
+        router = BackendRouter()
+        router.add_route(1, DebugI2CBackend, bus=0)
+        router.add_route(2, DebugI2CBackend, bus=0)
+        router.add_route(3, DebugI2CBackend, bus=1)
+
+        results = {}
+
+        def access(chip_address):
+            acquired = threading.Event()
+
+            def run():
+                with router.device(chip_address):
+                    acquired.set()
+
+            thread = threading.Thread(target=run, daemon=True)
+            thread.start()
+            results[chip_address] = acquired.wait(timeout=0.2)
+            thread.join(timeout=1)
+
+        with router.device(1):
+            access(2)
+            access(3)
+
+        assert results == {2: False, 3: True}
+
+    def test_submit(self):
+        """Test transactions run on the routed backend."""
+        backend = DebugI2CBackend()
+        router = BackendRouter()
+        router.add_route(1, lambda: backend)
+
+        txn = backend.transaction()
+        txn.write(0x4000, b"dsp")
+        txn.read(0x4000, 3)
+
+        assert router.submit(1, txn.operations) == [None, b"dsp"]
+
+    def test_close(self):
+        """Test closing only touches opened backends."""
+        opened = Mock()
+        unopened = Mock()
+        router = BackendRouter()
+        router.add_route(1, lambda: opened)
+        router.add_route(2, lambda: unopened)
+
+        router.read(1, 0x4000, 1)
+        router.close()
+
+        opened.close.assert_called_once()
+        unopened.close.assert_not_called()
@@ -0,0 +1,169 @@
+"""Tests for ADAU1452 safeload support."""
+
+import struct
+from unittest.mock import AsyncMock, Mock, call
+
+import pytest
+
+from tcp_i2c_bridge.protocol_dumper import ProtocolDumper
+from tcp_i2c_bridge.safeload import (
+    SafeloadCycle,
+    SafeloadRegister,
+    pack_safeloads,
+    run_safeloads,
+)
+from tcp_i2c_bridge.server import TCPClientHandler
+
+
+def _word(value: int) -> bytes:
+    return value.to_bytes(4, "big")
+
+
+def _write_packet(addr: int, data: bytes, safeload: int = 1, chip: int = 1) -> bytes:
+    total_length = 1 + 1 + 1 + 4 + 1 + 4 + 2 + len(data)
+    return (
+        struct.pack(">BBBIBIH", 0x09, safeload, 0, total_length, chip, len(data), addr)
+        + data
+    )
+
+
+class TestPackSafeloads:
+    """Test packing safeload writes into trigger cycles."""
+
+    def test_single_write(self):
+        """Test a single word becomes one cycle."""
+        cycles = pack_safeloads([(0x0010, _word(1))])
+        assert cycles == [SafeloadCycle(address=0x0010, data=_word(1))]
+
+    def test_merge_consecutive(self):
+        """Test consecutive writes are merged into one cycle."""
+        cycles = pack_safeloads(
+            [(0x0010, _word(1) + _word(2)), (0x0012, _word(3)), (0x0013, _word(4))]
+        )
+        assert cycles == [
+            SafeloadCycle(
+                address=0x0010, data=_word(1) + _word(2) + _word(3) + _word(4)
+            )
+        ]
+
+    def test_split_at_five_words(self):
+        """Test runs longer than five words are split."""
+        data = b"".join(_word(i) for i in range(7))
+        cycles = pack_safeloads([(0x0100, data)])
+
+        assert [cycle.address for cycle in cycles] == [0x0100, 0x0105]
+        assert cycles[0].data == data[:20]
+        assert cycles[1].data == data[20:]
+
+    def test_writes_not_split(self):
+        """Test a write is kept in one cycle rather than filling the previous."""
+        biquad = b"".join(_word(i) for i in range(5))
+        cycles = pack_safeloads([(0x0010, _word(1) + _word(2)), (0x0012, biquad)])
+
+        assert cycles == [
+            SafeloadCycle(address=0x0010, data=_word(1) + _word(2)),
+            SafeloadCycle(address=0x0012, data=biquad),
+        ]
+
+    def test_gap_starts_new_cycle(self):
+        """Test non-consecutive addresses need separate cycles."""
+        cycles = pack_safeloads([(0x0020, _word(1)), (0x0010, _word(2))])
+        assert [cycle.address for cycle in cycles] == [0x0010, 0x0020]
+
+    def test_later_write_wins(self):
+        """Test overlapping writes keep the last value."""
+        cycles = pack_safeloads([(0x0010, _word(1) + _word(2)), (0x0011, _word(9))])
+        assert cycles == [SafeloadCycle(address=0x0010, data=_word(1) + _word(9))]
+
+    def test_unaligned_data(self):
+        """Test data that is not a whole number of words."""
+        with pytest.raises(ValueError, match="whole number"):
+            pack_safeloads([(0x0010, b"\x00\x01")])
+
+
+class TestRunSafeloads:
+    """Test triggering safeload cycles."""
+
+    def test_cycle_is_one_burst(self):
+        """Test a cycle loads data, address and count in one write."""
+        backend = Mock()
+        run_safeloads(
+            backend, [SafeloadCycle(address=0x1234, data=_word(7))], frame_period=0
+        )
+
+        expected = _word(7) + b"\x00" * 16 + _word(0x1234) + _word(1)
+        backend.write.assert_called_once_with(SafeloadRegister.DATA0, expected)
+
+    def test_multiple_cycles(self):
+        """Test each cycle is triggered separately."""
+        backend = Mock()
+        cycles = pack_safeloads([(0x0010, _word(1)), (0x0020, _word(2))])
+        run_safeloads(backend, cycles, frame_period=0)
+
+        assert backend.write.call_count == 2
+
+
+class TestSafeloadRequests:
+    """Test safeload handling in the TCP client handler."""
+
+    @pytest.fixture
+    def backend(self):
+        return Mock()
+
+    @pytest.fixture
+    def handler(self, backend):
+        reader = Mock()
+        writer = Mock()
+        writer.drain = AsyncMock()
+        writer.wait_closed = AsyncMock()
+        dumper = Mock(spec=ProtocolDumper)
+        dumper.dump_network_packet = AsyncMock()
+        dumper.dump_i2c_transaction = AsyncMock()
+        return TCPClientHandler(reader, writer, backend, dumper, ("127.0.0.1", 1))
+
+    @pytest.mark.asyncio
+    async def test_batch_packed(self, handler, backend):
+        """Test safeload frames of one receive batch share trigger cycles."""
+        handler.reader.read = AsyncMock(
+            side_effect=[
+                _write_packet(0x0010, _word(1))
+                + _write_packet(0x0011, _word(2))
+                + _write_packet(0x0012, _word(3)),
+                b"",
+            ]
+        )
+
+        await handler.handle_connection()
+
+        backend.write.assert_called_once()
+        register, burst = backend.write.call_args[0]
+        assert register == SafeloadRegister.DATA0
+        assert burst[:12] == _word(1) + _word(2) + _word(3)
+        assert burst[20:] == _word(0x0010) + _word(3)
+
+    @pytest.mark.asyncio
+    async def test_block_write_flushes(self, handler, backend):
+        """Test block writes run after pending safeloads."""
+        handler.reader.read = AsyncMock(
+            side_effect=[
+                _write_packet(0x0010, _word(1))
+                + _write_packet(0xF400, b"\x00\x01", safeload=0),
+                b"",
+            ]
+        )
+
+        await handler.handle_connection()
+
+        assert backend.write.call_args_list[0][0][0] == SafeloadRegister.DATA0
+        assert backend.write.call_args_list[1] == call(0xF400, b"\x00\x01")
+
+    @pytest.mark.asyncio
+    async def test_unaligned_falls_back(self, handler, backend):
+        """Test safeload frames with partial words are written directly."""
+        handler.reader.read = AsyncMock(
+            side_effect=[_write_packet(0x0010, b"\x00\x01\x02"), b""]
+        )
+
+        await handler.handle_connection()
+
+        backend.write.assert_called_once_with(0x0010, b"\x00\x01\x02")
@@ -0,0 +1,117 @@
+"""Tests for the simulated I2C bus backend."""
+
+import time
+
+import pytest
+
+from tcp_i2c_bridge.device_sim import adau1452_device
+from tcp_i2c_bridge.i2c_backend import AdapterLimits
+from tcp_i2c_bridge.safeload import SafeloadCycle, SafeloadRegister
+from tcp_i2c_bridge.sim_backend import (
+    BusSpeed,
+    BusTiming,
+    RealtimeClock,
+    SimulatedI2CBackend,
+    VirtualClock,
+)
+
+
+class TestBusTiming:
+    """Test the bus timing model."""
+
+    def test_bus_time(self):
+        """Test start, address, data, ACK and stop clocks."""
+        timing = BusTiming(clock_hz=BusSpeed.STANDARD)
+
+        # Register address write + 4 byte read: 2 starts, 3 + 5 bytes, 1 stop
+        clocks = 1 + 9 * 3 + 1 + 9 * 5 + 1
+        assert timing.bus_time([2, 4]) == pytest.approx(clocks / 100_000)
+
+    def test_faster_clock(self):
+        """Test bus time scales with the clock."""
+        slow = BusTiming(clock_hz=BusSpeed.STANDARD).bus_time([32])
+        fast = BusTiming(clock_hz=BusSpeed.FAST_PLUS).bus_time([32])
+        assert slow == pytest.approx(fast * 10)
+
+
+class TestSimulatedI2CBackend:
+    """Test simulated backend."""
+
+    def test_read_write(self):
+        """Test reading back written data."""
+        backend = SimulatedI2CBackend()
+        backend.write(0x4000, b"test")
+
+        assert backend.read(0x4000, 4) == b"test"
+        assert backend.write_read(b"\x40\x00", 2) == b"te"
+
+    def test_device_hooks(self):
+        """Test transfers reach the simulated device and its registers."""
+        backend = SimulatedI2CBackend(device=adau1452_device())
+        cycle = SafeloadCycle(address=0x0010, data=bytes(range(4)))
+
+        backend.write(SafeloadRegister.DATA0, cycle.pack())
+
+        assert backend.read(0x0010, 4) == bytes(range(4))
+
+    def test_clock_advances(self):
+        """Test the virtual clock advances by bus and software time."""
+        timing = BusTiming(clock_hz=BusSpeed.FAST)
+        clock = VirtualClock()
+        backend = SimulatedI2CBackend(timing=timing, clock=clock)
+
+        backend.read(0x4000, 4)
+
+        expected = timing.bus_time([2, 4]) + timing.overhead(2)
+        assert clock.now() == pytest.approx(expected)
+        assert backend.stats.ioctls == 1
+        assert backend.stats.messages == 2
+
+    def test_transaction_saves_overhead(self):
+        """Test a transaction costs fewer ioctls than separate calls."""
+        calls = SimulatedI2CBackend()
+        for i in range(10):
+            calls.write(i, b"\x00" * 4)
+
+        batched = SimulatedI2CBackend()
+        with batched.transaction() as txn:
+            for i in range(10):
+                txn.write(i, b"\x00" * 4)
+
+        assert batched.stats.ioctls == 1
+        assert batched.stats.bus_time == pytest.approx(
+            calls.stats.bus_time - 9 / BusSpeed.FAST
+        )
+        assert batched.clock.now() < calls.clock.now()
+
+    def test_adapter_limits(self):
+        """Test oversized ioctls are rejected and retried with smaller limits."""
+        backend = SimulatedI2CBackend(adapter_limits=AdapterLimits(max_msg_len=64))
+        data = bytes(range(200))
+
+        backend.write(0x1000, data)
+
+        assert backend.read(0x1000, len(data)) == data
+        assert backend.stats.rejected > 0
+        assert backend.limits.max_msg_len == 64
+
+    def test_report(self):
+        """Test the utilisation report."""
+        backend = SimulatedI2CBackend()
+        backend.write(0x1000, bytes(400))
+
+        report = backend.report()
+
+        assert report["bytes"] == 402
+        assert 0 < report["utilisation"] <= 1
+
+    def test_realtime_clock(self):
+        """Test the realtime clock sleeps for the modelled time."""
+        backend = SimulatedI2CBackend(
+            timing=BusTiming(clock_hz=BusSpeed.STANDARD), clock=RealtimeClock()
+        )
+
+        start = time.perf_counter()
+        backend.write(0x1000, bytes(200))
+
+        assert time.perf_counter() - start >= backend.stats.bus_time
@@ -0,0 +1,198 @@
+"""Tests for bus usage tracing."""
+
+import io
+import os
+import signal
+import time
+
+import pytest
+import smbus2
+
+from tcp_i2c_bridge.device_sim import SimulatedDevice
+from tcp_i2c_bridge.i2c_backend import I2CBackend, SMBusI2CBackend
+from tcp_i2c_bridge.tracing import (
+    BusTracer,
+    TraceStats,
+    TracingI2CBackend,
+    TracingSMBus,
+)
+
+
+class FailingBackend(I2CBackend):
+    def read(self, addr: int, length: int) -> bytes:
+        raise RuntimeError("I2C read failed: bus error")
+
+    def write(self, addr: int, data: bytes) -> None:
+        raise RuntimeError("I2C write failed: bus error")
+
+    def write_read(self, data: bytes, length: int) -> bytes:
+        raise RuntimeError("I2C write-read failed: bus error")
+
+    def close(self) -> None:
+        pass
+
+
+class FakeSMBus:
+    """Byte-register bus remembering written values."""
+
+    def __init__(self):
+        self.registers: dict[tuple[int, int], int] = {}
+        self.closed = False
+
+    def read_byte_data(self, i2c_addr: int, register: int) -> int:
+        return self.registers.get((i2c_addr, register), 0)
+
+    def write_byte_data(self, i2c_addr: int, register: int, value: int) -> None:
+        if register == 0xFF:
+            raise OSError("Remote I/O error")
+        self.registers[(i2c_addr, register)] = value
+
+    def i2c_rdwr(self, *i2c_msgs: smbus2.i2c_msg) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class TestTraceStats:
+    """Test accumulated statistics."""
+
+    def test_histogram(self):
+        """Test latencies land in their buckets and percentiles follow."""
+        stats = TraceStats()
+        for _ in range(99):
+            stats.add(2, 4, 50e-6, False)
+        stats.add(2, 4, 0.1, True)
+
+        assert stats.transactions == 100
+        assert stats.bytes_written == 200
+        assert stats.bytes_read == 400
+        assert stats.errors == 1
+        assert stats.percentile(0.5) == pytest.approx(64e-6)
+        assert stats.percentile(1.0) == pytest.approx(131072e-6)
+
+
+class TestTracingI2CBackend:
+    """Test tracing a bridge backend."""
+
+    def test_operations(self):
+        """Test every operation is accounted to its device and register."""
+        tracer = BusTracer()
+        backend = TracingI2CBackend(SimulatedDevice(), tracer, device=0x3B)
+
+        backend.write(0x0010, b"\x00\x00\x00\x01")
+        backend.read(0x0010, 4)
+        backend.write_read(b"\x00\x10", 4)
+        with backend.transaction() as txn:
+            txn.write(0x0020, bytes(8))
+            txn.read(0x0020, 8)
+
+        device = tracer.devices[0x3B]
+        assert device.transactions == 5
+        assert device.bytes_written == 6 + 2 + 2 + 10 + 2
+        assert device.bytes_read == 4 + 4 + 8
+        assert tracer.registers[(0x3B, 0x0010)].transactions == 3
+        assert tracer.registers[(0x3B, 0x0020)].transactions == 2
+
+    def test_failures(self):
+        """Test failed operations are accounted as errors and still raise."""
+        tracer = BusTracer()
+        backend = TracingI2CBackend(FailingBackend(), tracer, device=0x3B)
+
+        with pytest.raises(RuntimeError):
+            backend.read(0x0010, 4)
+
+        assert tracer.devices[0x3B].errors == 1
+
+
+class TestTracingSMBus:
+    """Test tracing the SMBus calls of the drivers."""
+
+    def test_byte_registers(self):
+        """Test byte-register calls are traced and hot registers ranked."""
+        tracer = BusTracer(top=1)
+        bus = TracingSMBus(FakeSMBus(), tracer)
+
+        for _ in range(10):
+            bus.write_byte_data(0x4C, 0x4C, 0x30)
+        assert bus.read_byte_data(0x4C, 0x4C) == 0x30
+        bus.read_byte_data(0x28, 0x03)
+        with pytest.raises(OSError):
+            bus.write_byte_data(0x28, 0xFF, 0)
+
+        assert tracer.devices[0x4C].transactions == 11
+        assert tracer.devices[0x28].errors == 1
+        (device, register), stats = tracer.hot_registers()[0]
+        assert (device, register) == (0x4C, 0x4C)
+        assert stats.transactions == 11
+
+    def test_i2c_rdwr(self):
+        """Test 16-bit register transfers through I2C_RDWR are traced."""
+        tracer = BusTracer()
+        bus = TracingSMBus(FakeSMBus(), tracer)
+
+        SMBusI2CBackend(bus, 0x3B).read(0xF003, 2)
+
+        stats = tracer.registers[(0x3B, 0xF003)]
+        assert stats.bytes_written == 2
+        assert stats.bytes_read == 2
+
+    def test_i2c_rdwr_byte_registers(self):
+        """Test I2C_RDWR transfers to 8-bit register maps are traced."""
+        tracer = BusTracer()
+        bus = TracingSMBus(FakeSMBus(), tracer, register_widths={0x4C: 1})
+
+        bus.i2c_rdwr(smbus2.i2c_msg.write(0x4C, [0x03, 0x10, 0x20]))
+        bus.i2c_rdwr(smbus2.i2c_msg.write(0x3B, [0xF0, 0x03, 0x00, 0x01]))
+
+        assert tracer.registers[(0x4C, 0x03)].bytes_written == 3
+        assert (0x3B, 0xF003) in tracer.registers
+
+    def test_passthrough(self):
+        """Test other attributes reach the wrapped bus."""
+        fake = FakeSMBus()
+        TracingSMBus(fake, BusTracer()).close()
+
+        assert fake.closed
+
+
+class TestReport:
+    """Test the report."""
+
+    def test_report(self):
+        """Test the report lists devices and hot registers."""
+        tracer = BusTracer("test")
+        tracer.record(0x3B, 0xC000, 1026, 0, 0.025)
+        tracer.record(0x4C, 0x4C, 2, 0, 0.0001)
+        output = io.StringIO()
+
+        tracer.dump(output)
+
+        report = output.getvalue()
+        assert "I2C bus trace 'test'" in report
+        assert "0x3B: 1 transactions" in report
+        assert "0x3B 0xC000" in report.splitlines()[4]
+
+    def test_reset(self):
+        """Test resetting drops accumulated usage."""
+        tracer = BusTracer()
+        tracer.record(0x3B, 0x0000, 2, 4, 0.001)
+        tracer.reset()
+
+        assert tracer.devices == {}
+        assert tracer.hot_registers() == []
+
+    def test_dump_on_signal(self, capsys):
+        """Test a signal arriving while recording holds the lock cannot block."""
+        tracer = BusTracer("signalled")
+        previous = signal.getsignal(signal.SIGUSR1)
+        try:
+            tracer.dump_on_signal()
+            with tracer._lock:
+                os.kill(os.getpid(), signal.SIGUSR1)
+            deadline = time.monotonic() + 5
+            while "signalled" not in capsys.readouterr().err:
+                assert time.monotonic() < deadline, "no report after the signal"
+                time.sleep(0.01)
+        finally:
+            signal.signal(signal.SIGUSR1, previous)